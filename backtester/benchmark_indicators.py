@@ -0,0 +1,526 @@
+"""
+Indicator Throughput & Parity Benchmark
+指标吞吐与一致性基准 - SQZMOM / WaveTrend 各实现的 bars/秒、峰值内存与数值一致性
+
+实现:
+- bt_lines:    原 line 图实现（test_indicator_parity.Reference*），Cerebro runonce
+- bt_once:     SqueezeMomentumSafe / WaveTrendSafe 的向量化 once() 路径
+- bt_next:     同上，runonce=False 的逐bar next() 路径
+- numpy/numba: squeeze_momentum_arrays() / wavetrend_arrays()，分别切换 kernels 后端
+- incremental: SqueezeMomentumStream / WaveTrendStream 逐bar push()
+
+数据: 合成随机游走 10k/100k/1M bar + 真实 2h/4h 数据（9个币种）
+- Cerebro 实现只计指标自身 _once()/_next() 的耗时（feed加载与策略时钟占大头，不计入）
+- 超过 --max-cerebro-bars 的数据集跳过 Cerebro 实现（1M bar 的 line 对象内存过大）
+- 峰值内存由 tracemalloc 在单独一次运行中测得（不与计时混在一起），只追踪指标计算期间
+
+一致性:
+- 各实现 vs bt_lines（未运行时 vs numpy）：连续值最大绝对误差、信号线不一致bar数，
+  沿用 test_indicator_parity 的判定标准，不一致时退出码为1；
+  预热长度差异（一方NaN另一方有值，Cerebro minperiod 与数组 lookback 定义不同）单独计数，不判失败
+- TA-Lib / pandas_ta 已安装时，对 kernels 基础算子（SMA/EMA/StdDev/ATR）与
+  WaveTrend（TA-Lib EMA组合）、SQZMOM挤压信号（pandas_ta squeeze lazybear）做对照，仅报告
+
+结果追加到 results/indicator_benchmark_history.json（每次运行一条记录），
+并与上一次同实现/同数据集的吞吐对比。
+"""
+import os
+import sys
+import io
+import json
+import time
+import platform
+import subprocess
+import tracemalloc
+import contextlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import backtrader as bt
+
+# Add path for imports
+sys.path.append(os.path.dirname(__file__))
+
+import kernels
+from indicators.sqzmom_safe import SqueezeMomentumSafe, SqueezeMomentumStream, squeeze_momentum_arrays
+from indicators.wavetrend_safe import WaveTrendSafe, WaveTrendStream, wavetrend_arrays
+from test_indicator_parity import (
+    SYMBOLS, SIGNAL_LINES, REL_TOL, ReferenceSqueezeMomentum, ReferenceWaveTrend, load_symbol,
+)
+
+try:
+    import talib
+    HAS_TALIB = True
+except ImportError:
+    HAS_TALIB = False
+
+try:
+    import pandas_ta
+    HAS_PANDAS_TA = True
+except ImportError:
+    HAS_PANDAS_TA = False
+
+
+HISTORY_FILE = os.path.join(os.path.dirname(__file__), 'results', 'indicator_benchmark_history.json')
+SYNTHETIC_SIZES = (10_000, 100_000, 1_000_000)
+REAL_INTERVALS = ('2h', '4h')
+INDICATORS = {
+    'SQZMOM': dict(lines=('squeeze_on', 'squeeze_off', 'signal_bar', 'momentum'),
+                   reference=ReferenceSqueezeMomentum, safe=SqueezeMomentumSafe,
+                   arrays=squeeze_momentum_arrays, stream=SqueezeMomentumStream),
+    'WAVETREND': dict(lines=('wt1', 'wt2', 'wt_signal'),
+                      reference=ReferenceWaveTrend, safe=WaveTrendSafe,
+                      arrays=wavetrend_arrays, stream=WaveTrendStream),
+}
+CEREBRO_IMPLS = ('bt_lines', 'bt_once', 'bt_next')
+ARRAY_IMPLS = ('numpy', 'numba', 'incremental')
+
+
+# ---------------------------------------------------------------------------
+# 数据集
+# ---------------------------------------------------------------------------
+
+def synthetic_ohlc(bars, seed=42):
+    """几何随机游走OHLCV（含少量平盘段，覆盖分母夹底分支）"""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0, 0.01, bars)
+    flat = rng.random(bars) < 0.002
+    returns[flat] = 0.0
+    close = 100.0 * np.exp(np.cumsum(returns))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    spread = np.abs(rng.normal(0.0, 0.004, bars)) * close
+    spread[flat] = 0.0
+    df = pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.uniform(100.0, 1000.0, bars),
+    }, index=pd.date_range('2000-01-01', periods=bars, freq='2h'))
+    df.index.name = 'datetime'
+    return df
+
+
+def iter_datasets(sizes, symbols, intervals):
+    for bars in sizes:
+        yield f'synthetic_{bars // 1000}k', synthetic_ohlc(bars)
+    for interval in intervals:
+        for symbol in symbols:
+            yield f'{symbol}_{interval}', load_symbol(symbol, interval)
+
+
+# ---------------------------------------------------------------------------
+# 实现
+# ---------------------------------------------------------------------------
+
+class _BenchStrategy(bt.Strategy):
+    """
+    只实例化待测指标，不下单
+
+    每个指标的 _once()/_next() 被计时包装：只累计指标（含其子line运算）自身的计算时间，
+    不含feed加载与策略时钟。trace=True 时测峰值内存：runonce 下逐次 _once() 调用内追踪，
+    next 模式下从首次 _next() 追踪到 stop()（此时每次运行只应包含一个指标）。
+    """
+    params = (('indicators', ()), ('trace', False))
+
+    def __init__(self):
+        self.timings = {}
+        self.peaks = {}
+        self._built = []
+        for key, indicator_cls, lines in self.p.indicators:
+            indicator = indicator_cls(self.data)
+            self._built.append((key, indicator, lines))
+            self.timings[key] = 0.0
+            indicator._once = self._timed(key, indicator._once, per_call_trace=True)
+            indicator._next = self._timed(key, indicator._next, per_call_trace=False)
+
+    def _timed(self, key, method, per_call_trace):
+        def wrapper(*args, **kwargs):
+            if self.p.trace:
+                if per_call_trace:
+                    tracemalloc.start()
+                elif not tracemalloc.is_tracing():
+                    tracemalloc.start()
+            start_time = time.perf_counter()
+            result = method(*args, **kwargs)
+            self.timings[key] += time.perf_counter() - start_time
+            if self.p.trace and per_call_trace:
+                self.peaks[key] = max(self.peaks.get(key, 0), tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+            return result
+        return wrapper
+
+    def stop(self):
+        if self.p.trace and tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            for key, _, _ in self._built:
+                self.peaks[key] = max(self.peaks.get(key, 0), peak)
+        self.arrays = {key: {name: np.array(getattr(indicator.lines, name).array) for name in lines}
+                       for key, indicator, lines in self._built}
+
+
+def run_cerebro(df, indicators, runonce, trace=False):
+    """
+    Args:
+        indicators: [(键, 指标类, line名)]
+
+    Returns:
+        (timings, peaks, arrays) - 均以键索引，peaks 单位为字节
+    """
+    cerebro = bt.Cerebro(runonce=runonce, stdstats=False)
+    cerebro.adddata(bt.feeds.PandasData(dataname=df))
+    cerebro.addstrategy(_BenchStrategy, indicators=tuple(indicators), trace=trace)
+    with contextlib.redirect_stdout(io.StringIO()):
+        strategy = cerebro.run()[0]
+    return strategy.timings, strategy.peaks, strategy.arrays
+
+
+def benchmark_cerebro(df, memory):
+    """
+    Cerebro 实现：runonce 一次运行内同时测 bt_lines 与 bt_once，next 模式测 bt_next
+
+    Returns:
+        {(指标, 实现): (秒, 峰值MB或None, {line: array})}
+    """
+    once_cases = [((indicator, impl), spec[cls_key], spec['lines'])
+                  for indicator, spec in INDICATORS.items()
+                  for impl, cls_key in (('bt_lines', 'reference'), ('bt_once', 'safe'))]
+    next_cases = [((indicator, 'bt_next'), spec['safe'], spec['lines']) for indicator, spec in INDICATORS.items()]
+
+    results = {}
+    timings, _, arrays = run_cerebro(df, once_cases, True)
+    peaks = run_cerebro(df, once_cases, True, trace=True)[1] if memory else {}
+    for key, _, _ in once_cases:
+        results[key] = (timings[key], peaks.get(key), arrays[key])
+
+    timings, _, arrays = run_cerebro(df, next_cases, False)
+    for case in next_cases:
+        key = case[0]
+        peak = run_cerebro(df, [case], False, trace=True)[1][key] if memory else None
+        results[key] = (timings[key], peak, arrays[key])
+    return {key: (seconds, peak / 1024 / 1024 if peak is not None else None, output)
+            for key, (seconds, peak, output) in results.items()}
+
+
+def _run_stream(stream_cls, high, low, close, lines):
+    stream = stream_cls()
+    n = len(close)
+    out = {name: np.empty(n) for name in lines}
+    push = stream.push
+    if stream_cls is WaveTrendStream:
+        wt1_out, wt2_out, signal_out = out['wt1'], out['wt2'], out['wt_signal']
+        for i, (h, l, c) in enumerate(zip(high.tolist(), low.tolist(), close.tolist())):
+            wt1, wt2, _ = push(h, l, c)
+            wt1_out[i] = wt1
+            wt2_out[i] = wt2
+            signal_out[i] = float(wt1 > wt2) if wt2 == wt2 else float('nan')
+    else:
+        for i, (h, l, c) in enumerate(zip(high.tolist(), low.tolist(), close.tolist())):
+            result = push(h, l, c)
+            for name in lines:
+                out[name][i] = result[name]
+    return out
+
+
+def make_runner(indicator, impl, df):
+    """数组/流式实现：返回无参函数，调用后得到 {line: array}"""
+    spec = INDICATORS[indicator]
+    lines = spec['lines']
+    high, low, close = (df[col].to_numpy(dtype=np.float64) for col in ('high', 'low', 'close'))
+    if impl == 'incremental':
+        return lambda: _run_stream(spec['stream'], high, low, close, lines)
+
+    def run_arrays():
+        previous = kernels.get_backend()
+        kernels.set_backend(impl)
+        try:
+            result = spec['arrays'](high, low, close)
+        finally:
+            kernels.set_backend(previous)
+        return {name: result[name] for name in lines}
+    return run_arrays
+
+
+def available_impls():
+    return [impl for impl in CEREBRO_IMPLS + ARRAY_IMPLS if impl != 'numba' or kernels.HAS_NUMBA]
+
+
+# ---------------------------------------------------------------------------
+# 测量
+# ---------------------------------------------------------------------------
+
+def measure_time(fn, repeat):
+    """best-of-N 耗时，返回 (秒, 最后一次输出)"""
+    best = float('inf')
+    output = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        output = fn()
+        best = min(best, time.perf_counter() - start_time)
+    return best, output
+
+
+def measure_peak_memory(fn):
+    """tracemalloc 峰值（MB）"""
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024 / 1024
+
+
+def compare_lines(candidate, reference, lines):
+    """
+    Returns:
+        {line: {'max_abs_diff', 'mismatches', 'warmup_diff'}} - 两边都有值的bar上，
+        信号线逐位比较、连续值按 REL_TOL 判定；warmup_diff 为NaN位置不一致的bar数
+    """
+    report = {}
+    for name in lines:
+        a, b = candidate[name], reference[name]
+        both = ~np.isnan(a) & ~np.isnan(b)
+        nan_mismatch = int((np.isnan(a) != np.isnan(b)).sum())
+        diff = np.abs(a[both] - b[both])
+        max_abs = float(diff.max()) if len(diff) else 0.0
+        if name in SIGNAL_LINES:
+            mismatches = int((a[both] != b[both]).sum())
+        else:
+            scale = np.maximum(np.abs(b[both]), 1.0)
+            mismatches = int((diff / scale > REL_TOL).sum())
+        report[name] = {'max_abs_diff': max_abs, 'mismatches': mismatches, 'warmup_diff': nan_mismatch}
+    return report
+
+
+# ---------------------------------------------------------------------------
+# TA-Lib / pandas_ta 对照
+# ---------------------------------------------------------------------------
+
+def _library_diff(candidate, reference, close):
+    """外部库对照：最大绝对误差 + close>值 的信号不一致数（NaN位置不一致也计入）"""
+    reference = np.asarray(reference, dtype=np.float64)
+    both = ~np.isnan(candidate) & ~np.isnan(reference)
+    diff = np.abs(candidate[both] - reference[both])
+    signal_mismatch = int(((close[both] > candidate[both]) != (close[both] > reference[both])).sum())
+    return {
+        'max_abs_diff': float(diff.max()) if len(diff) else 0.0,
+        'mismatches': signal_mismatch + int((np.isnan(candidate) != np.isnan(reference)).sum()),
+    }
+
+
+def _talib_wavetrend(high, low, close, n1=10, n2=21):
+    ap = (high + low + close) / 3.0
+    esa = talib.EMA(ap, timeperiod=n1)
+    d = talib.EMA(np.abs(ap - esa), timeperiod=n1)
+    ci = (ap - esa) / np.maximum(0.015 * d, 1e-10)
+    wt1 = talib.EMA(ci, timeperiod=n2)
+    wt2 = talib.SMA(wt1, timeperiod=4)
+    return {'wt1': wt1, 'wt2': wt2, 'wt_signal': np.where(np.isnan(wt2), np.nan, (wt1 > wt2).astype(float))}
+
+
+def library_parity(df, period=20):
+    """kernels 基础算子及 SQZMOM/WaveTrend vs TA-Lib / pandas_ta，返回结果列表"""
+    high, low, close = (df[col].to_numpy(dtype=np.float64) for col in ('high', 'low', 'close'))
+    ours = {
+        'sma': kernels.sma(close, period),
+        'ema': kernels.ema(close, period),
+        'stddev': kernels.stddev(close, period),
+        'atr': kernels.atr(high, low, close, period),
+    }
+    rows = []
+    if HAS_TALIB:
+        theirs = {
+            'sma': talib.SMA(close, timeperiod=period),
+            'ema': talib.EMA(close, timeperiod=period),
+            'stddev': talib.STDDEV(close, timeperiod=period, nbdev=1),
+            'atr': talib.ATR(high, low, close, timeperiod=period),
+        }
+        for name, values in theirs.items():
+            rows.append(dict(library='talib', target=name, **_library_diff(ours[name], values, close)))
+        wavetrend = compare_lines(wavetrend_arrays(high, low, close), _talib_wavetrend(high, low, close),
+                                  INDICATORS['WAVETREND']['lines'])
+        for line, stats in wavetrend.items():
+            rows.append(dict(library='talib', target=f'WAVETREND.{line}', **stats))
+    if HAS_PANDAS_TA:
+        theirs = {
+            'sma': pandas_ta.sma(df['close'], length=period),
+            'ema': pandas_ta.ema(df['close'], length=period),
+            'stddev': pandas_ta.stdev(df['close'], length=period, ddof=0),
+            'atr': pandas_ta.atr(df['high'], df['low'], df['close'], length=period),
+        }
+        for name, values in theirs.items():
+            rows.append(dict(library='pandas_ta', target=name, **_library_diff(ours[name], values, close)))
+        squeeze = pandas_ta.squeeze(df['high'], df['low'], df['close'], bb_length=20, bb_std=2.0,
+                                    kc_length=20, kc_scalar=1.5, mamode='sma', use_tr=True, lazybear=True)
+        sqzmom = squeeze_momentum_arrays(high, low, close)
+        for line, column in (('squeeze_on', 'SQZ_ON'), ('squeeze_off', 'SQZ_OFF')):
+            theirs_line = squeeze[column].to_numpy(dtype=np.float64)
+            theirs_line = np.where(np.isnan(sqzmom[line]), np.nan, theirs_line)
+            stats = compare_lines({line: sqzmom[line]}, {line: theirs_line}, (line,))[line]
+            rows.append(dict(library='pandas_ta', target=f'SQZMOM.{line}', **stats))
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# 历史记录
+# ---------------------------------------------------------------------------
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path=HISTORY_FILE):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_history(record, path=HISTORY_FILE):
+    history = load_history(path)
+    history.append(record)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(history, f, ensure_ascii=False, indent=2, default=str)
+    return len(history)
+
+
+def previous_throughput(history):
+    """上一次运行的 {(指标, 实现, 数据集): bars/秒}"""
+    if not history:
+        return {}
+    return {(row['indicator'], row['impl'], row['dataset']): row['bars_per_sec']
+            for row in history[-1]['throughput']}
+
+
+# ---------------------------------------------------------------------------
+# 主流程
+# ---------------------------------------------------------------------------
+
+def run_benchmark(sizes=SYNTHETIC_SIZES, symbols=SYMBOLS, intervals=REAL_INTERVALS, repeat=3,
+                  max_cerebro_bars=100_000, memory=True, history_file=HISTORY_FILE):
+    impls = available_impls()
+    print(f"\n[START] Indicator benchmark - impls: {', '.join(impls)}")
+    print(f"   TA-Lib: {'yes' if HAS_TALIB else 'not installed'}, "
+          f"pandas_ta: {'yes' if HAS_PANDAS_TA else 'not installed'}")
+
+    # numba 首次调用的JIT编译不计入
+    warmup = synthetic_ohlc(1000)
+    for indicator in INDICATORS:
+        for impl in ARRAY_IMPLS:
+            if impl in impls:
+                make_runner(indicator, impl, warmup)()
+
+    previous = previous_throughput(load_history(history_file))
+    throughput, parity, library = [], [], []
+    all_passed = True
+
+    for dataset, df in iter_datasets(sizes, symbols, intervals):
+        bars = len(df)
+        print(f"\n[DATASET] {dataset}: {bars} bars")
+        measured = {}
+        if bars <= max_cerebro_bars:
+            measured.update(benchmark_cerebro(df, memory))
+        for indicator in INDICATORS:
+            for impl in impls:
+                if impl in ARRAY_IMPLS:
+                    runner = make_runner(indicator, impl, df)
+                    seconds, output = measure_time(runner, repeat)
+                    peak_mb = measure_peak_memory(runner) if memory else None
+                    measured[(indicator, impl)] = (seconds, peak_mb, output)
+
+        for indicator, spec in INDICATORS.items():
+            outputs = {}
+            for impl in impls:
+                if (indicator, impl) not in measured:
+                    continue
+                seconds, peak_mb, outputs[impl] = measured[(indicator, impl)]
+                row = dict(indicator=indicator, impl=impl, dataset=dataset, bars=bars, seconds=seconds,
+                           bars_per_sec=bars / seconds, peak_mb=peak_mb)
+                throughput.append(row)
+
+                last = previous.get((indicator, impl, dataset))
+                change = f"  ({row['bars_per_sec'] / last:5.2f}x vs last)" if last else ""
+                memory_text = f"{peak_mb:9.2f}MB" if peak_mb is not None else ""
+                print(f"   {indicator:9s} {impl:11s} {row['bars_per_sec']:14,.0f} bars/s "
+                      f"{seconds * 1000:10.2f}ms {memory_text}{change}")
+
+            reference_impl = 'bt_lines' if 'bt_lines' in outputs else 'numpy'
+            for impl, output in outputs.items():
+                if impl == reference_impl:
+                    continue
+                for line, stats in compare_lines(output, outputs[reference_impl], spec['lines']).items():
+                    parity.append(dict(indicator=indicator, impl=impl, reference=reference_impl,
+                                       dataset=dataset, line=line, **stats))
+                    if stats['mismatches']:
+                        all_passed = False
+                        print(f"   [FAIL] {indicator} {impl} vs {reference_impl} {line}: "
+                              f"{stats['mismatches']} mismatched bars (max abs {stats['max_abs_diff']:.3e})")
+
+        for row in library_parity(df):
+            row['dataset'] = dataset
+            library.append(row)
+            print(f"   [LIB] {row['library']:9s} {row['target']:22s} max abs {row['max_abs_diff']:.3e}  "
+                  f"mismatches {row['mismatches']}")
+
+    worst = {}
+    for row in parity:
+        key = (row['indicator'], row['impl'])
+        worst[key] = max(worst.get(key, 0.0), row['max_abs_diff'])
+    print("\n[PARITY] max abs diff vs reference (all datasets)")
+    for (indicator, impl), value in worst.items():
+        print(f"   {indicator:9s} {impl:11s} {value:.3e}")
+
+    record = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': _git_commit(),
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'backtrader': bt.__version__,
+            'numba': kernels.HAS_NUMBA,
+            'talib': HAS_TALIB,
+            'pandas_ta': HAS_PANDAS_TA,
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+        },
+        'settings': dict(sizes=list(sizes), symbols=list(symbols), intervals=list(intervals), repeat=repeat,
+                         max_cerebro_bars=max_cerebro_bars, memory=memory),
+        'throughput': throughput,
+        'parity': parity,
+        'library_parity': library,
+        'parity_passed': all_passed,
+    }
+    count = save_history(record, history_file)
+    print(f"\n[RESULTS] Appended run #{count} to: {history_file}")
+    print(f"\n[SUMMARY] Benchmark parity {'PASSED' if all_passed else 'FAILED'}")
+    return all_passed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="指标吞吐与一致性基准")
+    parser.add_argument("--symbol", help="只测单个币种（默认9个币种全部）")
+    parser.add_argument("--interval", action='append', help="真实数据时间框架，可重复 (默认: 2h 4h)")
+    parser.add_argument("--sizes", type=int, nargs='*', default=list(SYNTHETIC_SIZES),
+                        help="合成数据bar数 (默认: 10000 100000 1000000)")
+    parser.add_argument("--repeat", type=int, default=3, help="数组实现 best-of-N 次数 (默认: 3)")
+    parser.add_argument("--max-cerebro-bars", type=int, default=100_000,
+                        help="超过此bar数的数据集跳过Cerebro实现 (默认: 100000)")
+    parser.add_argument("--no-memory", action='store_true', help="跳过tracemalloc峰值内存测量")
+    parser.add_argument("--history", default=HISTORY_FILE, help="JSON历史文件路径")
+
+    args = parser.parse_args()
+
+    symbols = [args.symbol] if args.symbol else SYMBOLS
+    passed = run_benchmark(args.sizes, symbols, args.interval or list(REAL_INTERVALS), args.repeat,
+                           args.max_cerebro_bars, not args.no_memory, args.history)
+    sys.exit(0 if passed else 1)
@@ -3,12 +3,64 @@ Safe Indicators Package
 安全指标包 - 提供分母防护的技术指标实现
 """
 
-from .wavetrend_safe import WaveTrendSafe, WaveTrendIndicator
-from .sqzmom_safe import SqueezeMomentumSafe, SqueezeMomentumIndicator
+from .wavetrend_safe import WaveTrendSafe, WaveTrendIndicator, WaveTrendStream
+from .sqzmom_safe import SqueezeMomentumSafe, SqueezeMomentumIndicator, SqueezeMomentumStream
+from .kernel_indicators import KernelSMA, KernelEMA, KernelATR, KernelMABank
+from .registry import IndicatorRegistry, shared_indicator, get_registry
+from .dependencies import IndicatorPlan
+from .grid import squeeze_momentum_grid, wavetrend_grid
+from .parallel import compute_many
+from .feature_store import FeatureStore
+from .panel import SymbolPanel, load_panel
+from .lorentzian_classification import LorentzianClassification, LorentzianClassificationStream
+from .adaptive_supertrend import AdaptiveSuperTrend, AdaptiveSuperTrendStream
+from .smart_money_concepts import SmartMoneyConcepts, SmartMoneyEngine
+from .divergence import Divergences, DivergenceStream
+from .mtf_levels import MTFLevels, MTFLevelStream
+from .mtf_trend import MTFTrendScore, MTFTrendStream
+from .weis_wave import WeisWaveVolume, WeisWaveStream
+from .cyclic_rsi import CyclicSmoothedRSI, CyclicRSIStream
+from .key_levels import PeriodKeyLevels, PeriodLevelStream, KeyLevelZones, KeyLevelZoneStream
 
 __all__ = [
     'WaveTrendSafe',
+    'WaveTrendStream',
     'WaveTrendIndicator', 
     'SqueezeMomentumSafe',
-    'SqueezeMomentumIndicator'
+    'SqueezeMomentumStream',
+    'SqueezeMomentumIndicator',
+    'KernelSMA',
+    'KernelEMA',
+    'KernelATR',
+    'KernelMABank',
+    'IndicatorRegistry',
+    'shared_indicator',
+    'get_registry',
+    'IndicatorPlan',
+    'squeeze_momentum_grid',
+    'wavetrend_grid',
+    'compute_many',
+    'FeatureStore',
+    'SymbolPanel',
+    'load_panel',
+    'LorentzianClassification',
+    'LorentzianClassificationStream',
+    'AdaptiveSuperTrend',
+    'AdaptiveSuperTrendStream',
+    'SmartMoneyConcepts',
+    'SmartMoneyEngine',
+    'Divergences',
+    'DivergenceStream',
+    'MTFLevels',
+    'MTFLevelStream',
+    'MTFTrendScore',
+    'MTFTrendStream',
+    'WeisWaveVolume',
+    'WeisWaveStream',
+    'CyclicSmoothedRSI',
+    'CyclicRSIStream',
+    'PeriodKeyLevels',
+    'PeriodLevelStream',
+    'KeyLevelZones',
+    'KeyLevelZoneStream'
 ]
\ No newline at end of file
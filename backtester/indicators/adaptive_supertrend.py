@@ -0,0 +1,151 @@
+"""
+Adaptive SuperTrend Indicator
+机器学习自适应SuperTrend - pinescript/indicators/ml/ML_Adaptive_SuperTrend.pine 的Python移植
+
+- volatility = ta.atr(atr_length)（首根bar的TR为 high - low，Wilder平滑以首个完整窗口均值为种子）
+- 最近 training_period 根ATR做3质心k-means（高/中/低波动），当前ATR归入最近的簇
+- 以所属簇的质心作为SuperTrend带宽：upper/lower = hl2 ± factor * 质心
+
+k-means与带宽棘轮见 kernels.supertrend：滑动有序窗口 + 前缀和，簇边界二分查找，
+每轮迭代 O(log 窗口)；原版每bar对整个窗口做 O(窗口 × 迭代次数) 的遍历。
+
+- adaptive_supertrend_arrays(): 全序列批量计算（回测/参数扫描，已注册到 indicators.parallel）
+- AdaptiveSuperTrendStream: 逐bar流式版本
+- AdaptiveSuperTrend: Backtrader指标，输出 supertrend / direction / cluster
+"""
+import numpy as np
+import backtrader as bt
+try:
+    import kernels
+    from kernels import StreamingState, ExponentialMean, pine_atr
+    from kernels.supertrend import (DEFAULT_FRACTIONS, VolatilityKMeans, volatility_kmeans, supertrend,
+                                    _supertrend_step)
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+    import kernels
+    from kernels import StreamingState, ExponentialMean, pine_atr
+    from kernels.supertrend import (DEFAULT_FRACTIONS, VolatilityKMeans, volatility_kmeans, supertrend,
+                                    _supertrend_step)
+
+from .cache import data_arrays, fill_from_batch
+
+
+def adaptive_supertrend_arrays(high, low, close, atr_length=10, factor=3.0, training_period=100,
+                               fractions=DEFAULT_FRACTIONS, warm_start=False):
+    """
+    自适应SuperTrend全序列计算
+
+    Args:
+        high, low, close: 一维float数组
+        atr_length: ATR Length
+        factor: SuperTrend Factor
+        training_period: Training Data Length
+        fractions: 高/中/低初始质心分位（highvol / midvol / lowvol）
+        warm_start: k-means以上一根bar的质心为初值（更快，但不保证与Pine一致）
+
+    Returns:
+        dict: supertrend, direction（1 空头 / -1 多头）, cluster（0高 1中 2低，-1无）,
+              centroid（所属簇质心）, volatility（ATR），及诊断用的 centroids / iterations
+    """
+    volatility = pine_atr(high, low, close, atr_length)
+    clusters = volatility_kmeans(volatility, training_period, fractions, warm_start)
+    cluster = clusters['cluster']
+    centroid = np.where(cluster >= 0, clusters['centroids'][np.arange(len(cluster)), np.maximum(cluster, 0)],
+                        np.nan)
+    trend, direction = supertrend(high, low, close, centroid, factor)
+    return {
+        'supertrend': trend,
+        'direction': direction,
+        'cluster': cluster.astype(np.float64),
+        'centroid': centroid,
+        'volatility': volatility,
+        'centroids': clusters['centroids'],
+        'iterations': clusters['iterations'],
+    }
+
+
+class AdaptiveSuperTrendStream(StreamingState):
+    """
+    自适应SuperTrend逐bar状态（与 adaptive_supertrend_arrays() 一致，浮点误差内）
+
+    to_state() 导出JSON兼容的状态，from_state() 恢复后继续推进结果逐位一致。
+    """
+    __slots__ = ('factor', 'atr', 'kmeans', 'prev_close', 'prev_centroid', 'upper', 'lower', 'trend')
+
+    def __init__(self, atr_length=10, factor=3.0, training_period=100, fractions=DEFAULT_FRACTIONS,
+                 warm_start=False):
+        self.factor = factor
+        self.atr = ExponentialMean(atr_length, 1.0 / atr_length)
+        self.kmeans = VolatilityKMeans(training_period, fractions, warm_start)
+        self.prev_close = float('nan')
+        self.prev_centroid = float('nan')
+        self.upper = float('nan')
+        self.lower = float('nan')
+        self.trend = float('nan')
+
+    def push(self, high, low, close):
+        """
+        推进一根bar
+
+        Returns:
+            (supertrend, direction, cluster)
+        """
+        prev_close = self.prev_close
+        tr = high - low
+        if prev_close == prev_close:
+            tr = max(tr, abs(high - prev_close), abs(low - prev_close))
+        volatility = self.atr.update(tr)
+        centroids, cluster = self.kmeans.update(volatility)
+        centroid = centroids[cluster] if cluster >= 0 else float('nan')
+
+        src = (high + low) / 2
+        self.upper, self.lower, self.trend, direction = _supertrend_step(
+            src + self.factor * centroid, src - self.factor * centroid, close, centroid,
+            self.upper, self.lower, self.trend, prev_close, self.prev_centroid)
+        self.prev_close = close
+        self.prev_centroid = centroid
+        return self.trend, direction, float(cluster)
+
+    def update(self, bar):
+        """推进一根已收盘bar，bar 为含 high/low/close 键的映射，返回 {'supertrend', 'direction', 'cluster'}"""
+        trend, direction, cluster = self.push(bar['high'], bar['low'], bar['close'])
+        return {'supertrend': trend, 'direction': direction, 'cluster': cluster}
+
+
+class AdaptiveSuperTrend(bt.Indicator):
+    """
+    Machine Learning Adaptive SuperTrend（Pine原版移植）
+
+    direction: 1 = 空头（SuperTrend在价格上方），-1 = 多头；由1变为-1即原版的 Bullish Trend 信号。
+    """
+    alias = ('MLAdaptiveSuperTrend',)
+    lines = ('supertrend', 'direction', 'cluster')
+
+    params = (
+        ('atr_length', 10),  # ATR Length
+        ('factor', 3.0),  # SuperTrend Factor
+        ('training_period', 100),  # Training Data Length
+        ('fractions', DEFAULT_FRACTIONS),  # 高/中/低初始质心分位
+        ('warm_start', False),  # k-means以上一根bar的质心为初值
+    )
+
+    plotinfo = dict(subplot=False, plotname='Adaptive SuperTrend')
+    plotlines = dict(direction=dict(_plotskip=True), cluster=dict(_plotskip=True))
+
+    def __init__(self):
+        self._stream = AdaptiveSuperTrendStream(self.p.atr_length, self.p.factor, self.p.training_period,
+                                                self.p.fractions, self.p.warm_start)
+
+    def once(self, start, end):
+        fill_from_batch(self, start, end, data_arrays(self.data, end, 'high', 'low', 'close'),
+                        lambda high, low, close: adaptive_supertrend_arrays(
+                            high, low, close, self.p.atr_length, self.p.factor, self.p.training_period,
+                            self.p.fractions, self.p.warm_start))
+
+    def next(self):
+        trend, direction, cluster = self._stream.push(self.data.high[0], self.data.low[0], self.data.close[0])
+        self.lines.supertrend[0] = trend
+        self.lines.direction[0] = direction
+        self.lines.cluster[0] = cluster
@@ -0,0 +1,307 @@
+"""
+Persistent Indicator Cache
+指标磁盘缓存 - 参数扫描中相同数据、相同参数的指标只计算一次
+
+缓存键: (输入数组内容哈希, 指标类, 参数, 代码版本)
+- 输入数组: 指标实际读取的 high/low/close 等数组内容（与文件名、时间戳无关）
+- 参数: 指标完整参数表（不含只影响日志的 debug）
+- 代码版本: 指标模块、其（递归）导入的本仓库模块（如 utils/safe_math.py）与 kernels 包全部源码的哈希
+  + 当前内核后端，计算路径上任一源码改动后自动失效
+
+存储布局: <cache_dir>/<key>/<line>.npy + meta.json
+- 读取时 np.load(mmap_mode='r') 内存映射，只按需从磁盘读页
+- 写入先落到临时目录再原子重命名，多进程并发写同一键时保留先完成者
+- 每次命中刷新 meta.json 的mtime，超出磁盘预算时按mtime做LRU淘汰
+
+默认关闭，通过 configure(cache_dir, max_bytes) 开启（见 run_four_swords_v1_7_4.py --indicator-cache）。
+仅缓存 runonce 模式下的全序列计算；逐bar模式仍实时递推。
+指标的 once() 通过 fill_from_batch() 接入：全序列时经缓存取批量结果，写入各输出line。
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import inspect
+
+import numpy as np
+try:
+    import kernels
+except ImportError:
+    sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+    import kernels
+
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 1 GiB
+META_FILE = 'meta.json'
+# 不影响输出数值的参数，不参与缓存键
+IGNORED_PARAMS = ('debug',)
+
+_code_versions = {}
+_active_cache = None
+# 本仓库源码根目录（backtester/），其下的模块计入代码版本
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def hash_arrays(*arrays):
+    """输入数组内容哈希（dtype与长度一并计入）"""
+    digest = hashlib.blake2b(digest_size=16)
+    for values in arrays:
+        values = np.ascontiguousarray(values, dtype=np.float64)
+        digest.update(str(values.shape).encode())
+        digest.update(values.tobytes())
+    return digest.hexdigest()
+
+
+def _project_file(module):
+    path = getattr(module, '__file__', None)
+    if path and os.path.abspath(path).startswith(_PROJECT_DIR + os.sep):
+        return os.path.abspath(path)
+    return None
+
+
+def project_sources(module):
+    """
+    模块及其递归引用的本仓库模块的源码路径（按模块全局名字解析，含 from x import f 引入的函数/类）
+
+    第三方包（numpy / backtrader 等）不计入
+    """
+    seen, pending = {}, [module]
+    while pending:
+        current = pending.pop()
+        path = _project_file(current)
+        if path is None or path in seen:
+            continue
+        seen[path] = current
+        for value in vars(current).values():
+            owner = value if inspect.ismodule(value) else inspect.getmodule(value)
+            if owner is not None and _project_file(owner) not in seen:
+                pending.append(owner)
+    return sorted(seen)
+
+
+def code_version(cls):
+    """指标模块及其导入的本仓库模块 + kernels 包源码哈希，附带当前内核后端"""
+    backend = kernels.get_backend()
+    cached = _code_versions.get((cls, backend))
+    if cached is not None:
+        return cached
+
+    digest = hashlib.blake2b(digest_size=16)
+    kernel_dir = os.path.dirname(os.path.abspath(inspect.getsourcefile(kernels)))
+    sources = project_sources(sys.modules[cls.__module__])
+    sources += [os.path.join(kernel_dir, name) for name in sorted(os.listdir(kernel_dir))
+                if name.endswith('.py') and os.path.join(kernel_dir, name) not in sources]
+    for path in sources:
+        with open(path, 'rb') as source:
+            digest.update(source.read())
+    digest.update(backend.encode())
+    version = digest.hexdigest()
+    _code_versions[(cls, backend)] = version
+    return version
+
+
+def indicator_params(indicator):
+    """指标参数表（去掉不影响输出的参数）"""
+    return {name: value for name, value in indicator.params._getkwargs().items()
+            if name not in IGNORED_PARAMS}
+
+
+class IndicatorDiskCache:
+    """按磁盘预算做LRU淘汰的指标数组缓存"""
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(data_hash, cls, params, version):
+        payload = json.dumps({
+            'data': data_hash,
+            'indicator': f"{cls.__module__}.{cls.__qualname__}",
+            'params': sorted((name, repr(value)) for name, value in params.items()),
+            'code': version,
+        }, sort_keys=True)
+        return hashlib.blake2b(payload.encode(), digest_size=20).hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key, names):
+        """
+        读取缓存条目
+
+        Returns:
+            {line名: 只读memmap数组}，缺失或不完整时返回None
+        """
+        entry = self._entry_dir(key)
+        meta_path = os.path.join(entry, META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            arrays = {name: np.load(os.path.join(entry, f'{name}.npy'), mmap_mode='r')
+                      for name in names}
+        except (OSError, ValueError):
+            return None
+        os.utime(meta_path)  # LRU访问时间
+        return arrays
+
+    def store(self, key, arrays, meta=None):
+        """写入缓存条目（原子重命名），随后按预算淘汰"""
+        entry = self._entry_dir(key)
+        if os.path.exists(entry):
+            return
+        tmp_dir = os.path.join(self.cache_dir, f'.tmp-{key}-{os.getpid()}')
+        os.makedirs(tmp_dir, exist_ok=True)
+        try:
+            for name, values in arrays.items():
+                np.save(os.path.join(tmp_dir, f'{name}.npy'), np.asarray(values, dtype=np.float64))
+            meta = dict(meta or {}, lines=sorted(arrays), created=time.time())
+            with open(os.path.join(tmp_dir, META_FILE), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2, default=str)
+            os.rename(tmp_dir, entry)
+        except OSError:
+            # 其他进程已写入同一键，或磁盘错误：放弃本次写入
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+        self.evict()
+
+    def entries(self):
+        """[(key, 字节数, 最近访问时间)]"""
+        result = []
+        for key in os.listdir(self.cache_dir):
+            entry = self._entry_dir(key)
+            meta_path = os.path.join(entry, META_FILE)
+            if key.startswith('.') or not os.path.exists(meta_path):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry, name)) for name in os.listdir(entry))
+            result.append((key, size, os.path.getmtime(meta_path)))
+        return result
+
+    def total_bytes(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """超出 max_bytes 时删除最久未访问的条目"""
+        entries = sorted(self.entries(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in entries)
+        for key, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            total -= size
+            self.evictions += 1
+
+    def clear(self):
+        for key, _, _ in self.entries():
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def fetch(self, indicator, inputs, compute):
+        """
+        取指标全序列结果：命中时返回memmap数组，未命中时调用 compute() 并写入缓存
+
+        Args:
+            indicator: 指标实例（提供类与参数）
+            inputs: 指标读取的输入数组序列
+            compute: 无参函数，返回 {name: array}，需包含全部输出line
+
+        Returns:
+            {name: array}；命中时只包含输出line
+        """
+        cls = type(indicator)
+        params = indicator_params(indicator)
+        data_hash = hash_arrays(*inputs)
+        key = self.make_key(data_hash, cls, params, code_version(cls))
+        names = indicator.lines.getlinealiases()
+
+        arrays = self.load(key, names)
+        if arrays is not None:
+            self.hits += 1
+            return arrays
+
+        self.misses += 1
+        result = compute()
+        self.store(key, {name: result[name] for name in names}, meta={
+            'indicator': f"{cls.__module__}.{cls.__qualname__}",
+            'params': params,
+            'data_hash': data_hash,
+            'bars': len(inputs[0]),
+            'backend': kernels.get_backend(),
+        })
+        return result
+
+    def summary(self):
+        entries = self.entries()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+        }
+
+
+def configure(cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+    """开启进程级指标缓存"""
+    global _active_cache
+    _active_cache = IndicatorDiskCache(cache_dir, max_bytes)
+    return _active_cache
+
+
+def disable():
+    """关闭进程级指标缓存"""
+    global _active_cache
+    _active_cache = None
+
+
+def get_cache():
+    """当前进程级指标缓存，未开启时为None"""
+    return _active_cache
+
+
+def data_arrays(data, end, *fields):
+    """数据源各字段line前 end 根的float64视图（不复制），如 data_arrays(self.data, end, 'high', 'low', 'close')"""
+    return tuple(np.frombuffer(getattr(data, field).array, dtype=np.float64)[:end] for field in fields)
+
+
+def fill_from_batch(indicator, start, end, inputs, compute, use_cache=True):
+    """
+    runonce 批量填充：把 compute(*inputs) 的结果写入指标各输出line的 [start, end) 区间
+
+    全序列计算（end == 数据长度）且已开启进程级缓存时经缓存读取/写入，否则直接计算。
+    Backtrader在 once(minperiod, 数据长度) 之前先调用 oncestart(minperiod - 1, minperiod)，
+    这类未到数据末尾的区间只记下起点，并入随后的全序列调用一次计算（缓存命中时不再计算）。
+
+    Args:
+        indicator: 指标实例（提供类、参数与输出line）
+        start, end: once() 的区间
+        inputs: 输入数组序列，参与缓存键
+        compute: compute(*inputs) → {name: array}，需包含全部输出line
+        use_cache: False时总是直接计算（如debug需要诊断数组）
+
+    Returns:
+        {name: array}（命中缓存时只含输出line）；end <= start 或区间并入后续调用时为None
+    """
+    if end <= start:
+        return None
+    buflen = indicator.data.buflen()
+    pending = getattr(indicator, '_batch_start', None)
+    if end < buflen:
+        indicator._batch_start = start if pending is None else min(start, pending)
+        return None
+    if pending is not None:
+        start = min(start, pending)
+        indicator._batch_start = None
+    cache = _active_cache
+    if use_cache and cache is not None:
+        result = cache.fetch(indicator, inputs, lambda: compute(*inputs))
+    else:
+        result = compute(*inputs)
+    for name in indicator.lines.getlinealiases():
+        np.frombuffer(getattr(indicator.lines, name).array, dtype=np.float64)[start:end] = result[name][start:end]
+    return result
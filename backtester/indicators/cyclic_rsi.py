@@ -0,0 +1,191 @@
+"""
+Cyclic Smoothed RSI Indicator
+周期平滑RSI - pinescript/indicators/oscillator/RSI_Cyclic_Smoothed(_v6).pine (whentotrade / Lars von Thienen)
+
+- rsi = Wilder RSI(cycle // 2)
+- crsi = torque * (2 * rsi - rsi[lag]) + (1 - torque) * nz(crsi[1])，torque = 2 / (vibration + 1)，
+  lag = int((vibration - 1) / 2)（Pine 的 rsi[4.5] 按整数4取历史值）
+- 动态带（cyclic memory = 2 × cycle 根）: 窗口极差100等分，自下而上第一个使
+  低于该值的占比 >= leveling% 的测试值为下带，自上而下第一个使不低于该值的占比 >= leveling% 的为上带；
+  无满足的测试值时沿用上一根的带（v6 的 var 语义；ratio 为浮点除法）
+
+原版每bar对窗口做 101 × 2 × 窗口 次比较；这里:
+- 批量: 窗口排序一次得到顺序统计量（lmin / lmax / 第k小 / 第k大），步进由 kernels.cycles.band_steps 直接求解
+- 流式: 滑动有序表（kernels.cycles.SortedWindow，二分插入/删除）取同样的顺序统计量
+
+- cyclic_rsi(): 全序列批量计算
+- CyclicRSIStream: 逐bar流式版本（与批量计算逐位一致）
+- CyclicSmoothedRSI: Backtrader指标，输出 CRSI 与上下动态带
+"""
+from collections import deque
+
+import numpy as np
+import pandas as pd
+import backtrader as bt
+from numpy.lib.stride_tricks import sliding_window_view
+try:
+    from kernels import StreamingState
+    from kernels.cycles import SortedWindow, band_rank, band_step, band_steps, cyclic_rsi_core
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+    from kernels import StreamingState
+    from kernels.cycles import SortedWindow, band_rank, band_step, band_steps, cyclic_rsi_core
+
+from .cache import data_arrays, fill_from_batch
+
+
+CYCLIC_RSI_NAMES = ('crsi', 'lower_band', 'upper_band')
+
+
+def _check_params(cycle, vibration, leveling):
+    if cycle < 2 or vibration < 1 or not 0 < leveling <= 100:
+        raise ValueError(f"cycle >= 2、vibration >= 1、0 < leveling <= 100: {cycle}, {vibration}, {leveling}")
+
+
+def _settings(cycle, vibration):
+    """(RSI周期, 相位滞后, torque)"""
+    return cycle // 2, int((vibration - 1) / 2.0), 2.0 / (vibration + 1)
+
+
+def cyclic_rsi(close, cycle=20, vibration=10, leveling=10.0):
+    """
+    周期平滑RSI与动态带
+
+    Args:
+        close: 一维float数组
+        cycle: Dominant Cycle Length
+        vibration: 平滑参数（原版固定为10）
+        leveling: 动态带百分位（原版固定为10.0）
+
+    Returns:
+        dict: crsi / lower_band / upper_band / rsi（预热期为NaN）
+    """
+    _check_params(cycle, vibration, leveling)
+    period, lag, torque = _settings(cycle, vibration)
+    rsi, crsi = cyclic_rsi_core(close, period, lag, torque)
+    n = len(crsi)
+    memory = cycle * 2
+    rank = band_rank(memory, leveling)
+    lower = np.full(n, np.nan)
+    upper = np.full(n, np.nan)
+
+    windows = np.sort(sliding_window_view(np.r_[np.full(memory - 1, np.nan), crsi], memory), axis=1)
+    valid = memory - np.isnan(windows).sum(axis=1)
+    rows = np.flatnonzero(valid >= rank)
+    if len(rows):
+        ordered, count = windows[rows], valid[rows]
+        index = np.arange(len(rows))
+        lmin, lmax = ordered[:, 0], ordered[index, count - 1]
+        mstep = (lmax - lmin) / 100
+        found, value = band_steps(lmin, mstep, ordered[:, rank - 1], True)
+        lower[rows[found]] = value[found]
+        found, value = band_steps(lmax, mstep, ordered[index, count - rank], False)
+        upper[rows[found]] = value[found]
+    return {'crsi': crsi,
+            'lower_band': pd.Series(lower).ffill().to_numpy(),
+            'upper_band': pd.Series(upper).ffill().to_numpy(),
+            'rsi': rsi}
+
+
+class CyclicRSIStream(StreamingState):
+    """
+    逐bar周期平滑RSI（与 cyclic_rsi() 逐位一致）
+
+    update(close) 返回 (crsi, lower_band, upper_band)
+    """
+    __slots__ = ('period', 'lag', 'torque', 'rank', 'previous_close', 'seeded', 'up', 'down', 'rsi',
+                 'crsi', 'window', 'lower', 'upper')
+
+    def __init__(self, cycle=20, vibration=10, leveling=10.0):
+        _check_params(cycle, vibration, leveling)
+        self.period, self.lag, self.torque = _settings(cycle, vibration)
+        self.rank = band_rank(cycle * 2, leveling)
+        self.previous_close = None
+        self.seeded = 0
+        self.up = self.down = 0.0
+        self.rsi = deque([float('nan')] * (self.lag + 1), maxlen=self.lag + 1)
+        self.crsi = 0.0  # nz(crsi[1])
+        self.window = SortedWindow(cycle * 2)
+        self.lower = self.upper = float('nan')
+
+    def _update_rsi(self, close):
+        """Wilder RSI（与 kernels.cycles 的编译循环相同的运算顺序）"""
+        previous, self.previous_close = self.previous_close, close
+        if previous is None:
+            return float('nan')
+        change = close - previous
+        gain = change if change > 0.0 else 0.0
+        loss = -change if change < 0.0 else 0.0
+        period = self.period
+        if self.seeded < period:
+            self.up += gain
+            self.down += loss
+            self.seeded += 1
+            if self.seeded < period:
+                return float('nan')
+            self.up = self.up / period
+            self.down = self.down / period
+        else:
+            alpha = 1.0 / period
+            alpha1 = 1.0 - alpha
+            self.up = self.up * alpha1 + gain * alpha
+            self.down = self.down * alpha1 + loss * alpha
+        if self.down == 0.0:
+            return 100.0
+        if self.up == 0.0:
+            return 0.0
+        return 100.0 - 100.0 / (1.0 + self.up / self.down)
+
+    def update(self, close):
+        rsi = self._update_rsi(close)
+        self.rsi.append(rsi)
+        lagged = self.rsi[0]
+        crsi = float('nan')
+        if rsi == rsi and lagged == lagged:
+            self.crsi = self.torque * (2.0 * rsi - lagged) + (1.0 - self.torque) * self.crsi
+            crsi = self.crsi
+
+        values = self.window.update(crsi)
+        rank = self.rank
+        if len(values) >= rank:
+            lmin, lmax = values[0], values[-1]
+            mstep = (lmax - lmin) / 100
+            lower = band_step(lmin, mstep, values[rank - 1], True)
+            if lower is not None:
+                self.lower = lower
+            upper = band_step(lmax, mstep, values[-rank], False)
+            if upper is not None:
+                self.upper = upper
+        return crsi, self.lower, self.upper
+
+
+class CyclicSmoothedRSI(bt.Indicator):
+    """
+    周期平滑RSI（cRSI）与动态上下带
+
+    用法: crsi = CyclicSmoothedRSI(self.data, cycle=20)；crsi.crsi[0] 低于 crsi.lower_band[0] 为超卖
+    """
+    alias = ('CRSI',)
+    lines = CYCLIC_RSI_NAMES
+
+    params = (
+        ('cycle', 20),  # Dominant Cycle Length
+        ('vibration', 10),
+        ('leveling', 10.0),
+    )
+
+    plotinfo = dict(subplot=True, plotname='cRSI')
+
+    def __init__(self):
+        self._stream = CyclicRSIStream(self.p.cycle, self.p.vibration, self.p.leveling)
+
+    def once(self, start, end):
+        fill_from_batch(self, start, end, data_arrays(self.data, end, 'close'),
+                        lambda close: cyclic_rsi(close, self.p.cycle, self.p.vibration, self.p.leveling))
+
+    def next(self):
+        values = self._stream.update(self.data.close[0])
+        for line, value in zip(self.lines, values):
+            line[0] = value
@@ -0,0 +1,125 @@
+"""
+Indicator Dependency Plan
+指标依赖裁剪 - 策略声明每个启用逻辑需要的line，只实例化可达的指标
+
+用法（策略 __init__ 内）:
+    plan = IndicatorPlan(self, prune=self.p.prune_indicators)
+    plan.add('ema_fast', lambda: btind.EMA(self.data.close, period=10), warmup=(self.data, 10))
+    plan.add('ema_slow', lambda: btind.EMA(self.data.close, period=20), warmup=(self.data, 20))
+    plan.add('ema_trend', lambda: self.ema_fast > self.ema_slow, requires=('ema_fast', 'ema_slow'))
+    plan.require('ema_trend', when=self.p.use_ema_filter)
+    plan.build()   # 可达节点赋值到 self.<name>，被裁剪的节点为 None
+
+预热保持:
+Backtrader 的策略minperiod由其全部指标推导，未使用的指标同样会推迟首个 next()。
+为保证裁剪前后交易结果一致，被裁剪节点声明的 warmup=(data, bars) 若超过同一
+数据源上已构建节点的预热，则挂一个不计算的占位指标保留该预热。
+"""
+import backtrader as bt
+
+
+class _WarmupRef(bt.Indicator):
+    """被裁剪指标的预热占位：只提供minperiod与时钟，不做计算"""
+    lines = ('ref',)
+    params = (('period', 1),)
+    plotinfo = dict(plot=False)
+
+    def __init__(self):
+        self.addminperiod(self.p.period)
+
+    def next(self):
+        pass
+
+    def once(self, start, end):
+        pass
+
+
+class _Node:
+    __slots__ = ('name', 'build', 'requires', 'warmup')
+
+    def __init__(self, name, build, requires, warmup):
+        self.name = name
+        self.build = build
+        self.requires = tuple(requires)
+        self.warmup = warmup
+
+
+class IndicatorPlan:
+    """单个策略实例的指标依赖图"""
+
+    def __init__(self, owner, prune=True):
+        self.owner = owner
+        self.prune = prune
+        self._nodes = {}
+        self._roots = []
+        self.built = []
+        self.pruned = []
+
+    def add(self, name, build, requires=(), warmup=None):
+        """
+        声明一个指标节点
+
+        Args:
+            name: 构建结果赋值到 owner 的属性名
+            build: 无参函数，返回指标或line运算（依赖节点已构建，可直接读取 owner 属性）
+            requires: 依赖的节点名（须先声明）
+            warmup: (数据源, bar数) - 该节点在该数据源上需要的预热，用于裁剪后保持minperiod
+        """
+        if name in self._nodes:
+            raise ValueError(f"指标节点重复声明: {name}")
+        for dependency in requires:
+            if dependency not in self._nodes:
+                raise ValueError(f"指标节点 {name} 依赖未声明的节点: {dependency}")
+        self._nodes[name] = _Node(name, build, requires, warmup)
+        return self
+
+    def require(self, *names, when=True):
+        """标记启用逻辑直接读取的节点"""
+        if when:
+            for name in names:
+                if name not in self._nodes:
+                    raise ValueError(f"未声明的指标节点: {name}")
+                self._roots.append(name)
+        return self
+
+    def reachable(self):
+        """启用逻辑可达的节点名集合（prune关闭时为全部节点）"""
+        if not self.prune:
+            return set(self._nodes)
+        needed = set()
+        stack = list(self._roots)
+        while stack:
+            name = stack.pop()
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self._nodes[name].requires)
+        return needed
+
+    def build(self):
+        """按声明顺序构建可达节点，其余节点置为None并保留预热"""
+        needed = self.reachable()
+        built_warmup = {}
+        pruned_warmup = {}
+        for name, node in self._nodes.items():
+            if name in needed:
+                setattr(self.owner, name, node.build())
+                self.built.append(name)
+                target = built_warmup
+            else:
+                setattr(self.owner, name, None)
+                self.pruned.append(name)
+                target = pruned_warmup
+            if node.warmup is not None:
+                data, bars = node.warmup
+                entry = target.get(id(data))
+                if entry is None or bars > entry[1]:
+                    target[id(data)] = (data, bars)
+
+        for key, (data, bars) in pruned_warmup.items():
+            kept = built_warmup.get(key, (data, 1))[1]
+            if bars > kept:
+                _WarmupRef(data, period=bars)
+        return self
+
+    def summary(self):
+        return {'built': list(self.built), 'pruned': list(self.pruned)}
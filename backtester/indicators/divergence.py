@@ -0,0 +1,437 @@
+"""
+Divergence Scanner
+多指标背离扫描 - pinescript/indicators/structure/Divergence_Many_Indicators.pine 的Python移植
+
+振荡器（与原版参数一致，一次向量化计算）:
+    MACD(12, 26, 9) 及柱、RSI(14)、Stoch(14) 的3周期SMA、CCI(10)、Momentum(10)、OBV、
+    VWMACD(12, 26)、CMF(21)、MFI(close, 14)
+
+背离判定（原版逐bar搜索）:
+- 价格枢轴: ta.pivotlow / ta.pivothigh(源, prd, prd)，源为 close 或 low / high；确认后压入最近枢轴数组
+- 每根bar在 startpoint（默认1，即上一根已收盘bar；confirm=False 时为当前bar）与最近 maxpp 个枢轴逐个比较，
+  枢轴距当前bar超过 maxbars 根即停止；距离须 > 5
+    regular bullish: 振荡器抬高、价格低于枢轴低点      hidden bullish: 振荡器降低、价格高于枢轴低点
+    regular bearish: 振荡器降低、价格高于枢轴高点      hidden bearish: 振荡器抬高、价格低于枢轴高点
+- 前置条件: 看涨须 src > src[1] 或 close > close[1]（看跌反之）；confirm=False 时不检查
+- 两点间振荡器与收盘价的虚拟直线不被中间bar越过（kernels.divergence），第一个成立的枢轴即该振荡器的背离
+
+原版每bar对每个振荡器回溯枢轴数组并逐bar画线检查；这里:
+- 枢轴: kernels.pivot_bars 以左右窗口的滚动极值一次求出，中心值严格大于（小于）两侧即为枢轴
+- 候选: 每bar最近 maxpp 个已确认枢轴按序号展开为 (bar数, maxpp) 下标矩阵（枢轴确认bar的 searchsorted），
+  价格/振荡器比较、距离与前置条件全部为矩阵运算
+- 只有通过比较的候选进入编译的视线检查，每bar取第一个通过者
+
+- oscillator_bank(): 全部振荡器
+- scan_divergences(): 背离事件（结构化数组）与逐bar计数
+- DivergenceStream: 逐bar流式版本（振荡器递推 + 最近 maxbars 根历史 + 最近 maxpp 个枢轴）
+- Divergences: Backtrader指标，四类背离的逐bar振荡器个数
+"""
+import math
+from collections import deque
+
+import numpy as np
+import backtrader as bt
+try:
+    import kernels
+    from kernels import RollingMean, RollingMax, RollingMin, ExponentialMean
+    from kernels.divergence import divergence_lengths, sight_line_clear
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+    import kernels
+    from kernels import RollingMean, RollingMax, RollingMin, ExponentialMean
+    from kernels.divergence import divergence_lengths, sight_line_clear
+
+from .cache import data_arrays, fill_from_batch
+
+
+OSCILLATOR_NAMES = ('macd', 'hist', 'rsi', 'stoch', 'cci', 'mom', 'obv', 'vwmacd', 'cmf', 'mfi')
+
+REGULAR_BULLISH = 0
+REGULAR_BEARISH = 1
+HIDDEN_BULLISH = 2
+HIDDEN_BEARISH = 3
+DIVERGENCE_NAMES = ('regular_bullish', 'regular_bearish', 'hidden_bullish', 'hidden_bearish')
+
+# 原版要求枢轴距当前bar超过该根数（len > 5）
+MIN_LENGTH = 5
+
+# bar: 检出bar；point: 背离终点（bar - startpoint）；pivot: 枢轴bar（bar - length）
+# price / value 为终点的价格与振荡器值，pivot_price / pivot_value 为枢轴处的值
+DIVERGENCE_DTYPE = np.dtype([('bar', np.int64), ('kind', np.int8), ('oscillator', np.int8),
+                             ('point', np.int64), ('pivot', np.int64), ('length', np.int64),
+                             ('price', np.float64), ('pivot_price', np.float64),
+                             ('value', np.float64), ('pivot_value', np.float64)])
+
+
+# === 振荡器 ===
+
+def oscillator_bank(high, low, close, volume):
+    """
+    Many Indicators 原版的全部振荡器
+
+    Returns:
+        (振荡器数, bar数) float64数组，行顺序同 OSCILLATOR_NAMES
+    """
+    high, low, close, volume = (np.ascontiguousarray(x, dtype=np.float64) for x in (high, low, close, volume))
+    macd = kernels.ema(close, 12) - kernels.ema(close, 26)
+    hist = macd - kernels.ema(macd, 9)
+    lowest, highest = kernels.lowest(low, 14), kernels.highest(high, 14)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        stoch = kernels.sma(100.0 * (close - lowest) / (highest - lowest), 3)
+        vwmacd = (kernels.sma(close * volume, 12) / kernels.sma(volume, 12) -
+                  kernels.sma(close * volume, 26) / kernels.sma(volume, 26))
+        multiplier = ((close - low) - (high - close)) / (high - low)
+        cmf = kernels.sma(multiplier * volume, 21) / kernels.sma(volume, 21)
+    direction = np.sign(np.nan_to_num(kernels.change(close)))
+    obv = np.cumsum(direction * volume)
+    return np.vstack([macd, hist, kernels.rsi(close, 14), stoch, kernels.cci(close, 10), kernels.change(close, 10),
+                      obv, vwmacd, cmf, kernels.mfi(close, volume, 14)])
+
+
+# === 枢轴与背离 ===
+
+def recent_pivots(pivots, period, n, maxpp, maxbars):
+    """
+    每bar最近 maxpp 个已确认枢轴（原版 array.unshift 维护的枢轴数组，按由近到远）
+
+    Returns:
+        (pivot, length): (bar数, maxpp) 的枢轴bar下标与距当前bar的根数；
+        尚无该序号的枢轴、或距离超过 maxbars（原版 break）处 pivot 为 -1、length 为0
+    """
+    bars = np.arange(n)
+    confirmed = np.searchsorted(pivots + period, bars, side='right')
+    index = confirmed[:, None] - 1 - np.arange(maxpp)[None, :]
+    pivot = np.where(index >= 0, pivots[np.maximum(index, 0)] if len(pivots) else 0, -1)
+    length = bars[:, None] - pivot
+    valid = (pivot >= 0) & (length <= maxbars)
+    return np.where(valid, pivot, -1), np.where(valid, length, 0)
+
+
+def _shift(values, count):
+    """values[count]（Pine历史引用），开头 count 根为NaN"""
+    if count == 0:
+        return values
+    out = np.full(len(values), np.nan)
+    out[count:] = values[:-count]
+    return out
+
+
+def scan_divergences(high, low, close, volume, oscillators=None, period=5, pivot_source='close', maxpp=10,
+                     maxbars=100, hidden=True, confirm=True):
+    """
+    全部振荡器的背离扫描
+
+    Args:
+        high, low, close, volume: 一维float数组
+        oscillators: (K, bar数) 振荡器数组，默认 oscillator_bank()
+        period: Pivot Period（枢轴左右各 period 根）
+        pivot_source: 'close' | 'high_low'（Source for Pivot Points）
+        maxpp: Maximum Pivot Points to Check
+        maxbars: Maximum Bars to Check
+        hidden: 是否同时扫描隐藏背离（False 对应原版 Divergence Type = Regular）
+        confirm: False 对应原版 Don't Wait for Confirmation（startpoint = 0）
+
+    Returns:
+        dict: events（DIVERGENCE_DTYPE，按检出bar、振荡器、类别排序），
+              counts（bar数, 4）每bar各类背离的振荡器个数（列顺序同 DIVERGENCE_NAMES）
+    """
+    if pivot_source not in ('close', 'high_low'):
+        raise ValueError(f"未知枢轴来源: {pivot_source}")
+    high, low, close = (np.ascontiguousarray(x, dtype=np.float64) for x in (high, low, close))
+    if oscillators is None:
+        oscillators = oscillator_bank(high, low, close, volume)
+    oscillators = np.atleast_2d(np.asarray(oscillators, dtype=np.float64))
+    n = len(close)
+    startpoint = 1 if confirm else 0
+    high_price, low_price = (close, close) if pivot_source == 'close' else (high, low)
+    close_change = close - _shift(close, 1)
+
+    sides = []
+    for bullish, price, kinds in ((True, low_price, (REGULAR_BULLISH, HIDDEN_BULLISH)),
+                                  (False, high_price, (REGULAR_BEARISH, HIDDEN_BEARISH))):
+        pivots = kernels.pivot_bars(price, period, period, high=not bullish)
+        pivot, length = recent_pivots(pivots, period, n, maxpp, maxbars)
+        usable = length > MIN_LENGTH
+        safe_pivot = np.maximum(pivot, 0)
+        point_price = _shift(price, startpoint)[:, None]
+        pivot_price = price[safe_pivot]
+        sides.append((bullish, kinds, price, length, usable, safe_pivot, point_price, pivot_price))
+
+    chunks = []
+    for k, values in enumerate(oscillators):
+        values = np.ascontiguousarray(values)
+        point_value = _shift(values, startpoint)[:, None]
+        change = values - _shift(values, 1)
+        for bullish, kinds, price, length, usable, safe_pivot, point_price, pivot_price in sides:
+            pivot_value = values[safe_pivot]
+            if bullish:
+                gate = (change > 0) | (close_change > 0) if confirm else np.ones(n, dtype=bool)
+                regular = (point_value > pivot_value) & (point_price < pivot_price)
+                hidden_mask = (point_value < pivot_value) & (point_price > pivot_price)
+            else:
+                gate = (change < 0) | (close_change < 0) if confirm else np.ones(n, dtype=bool)
+                regular = (point_value < pivot_value) & (point_price > pivot_price)
+                hidden_mask = (point_value > pivot_value) & (point_price < pivot_price)
+            for kind, mask in zip(kinds, (regular, hidden_mask)):
+                if kind in (HIDDEN_BULLISH, HIDDEN_BEARISH) and not hidden:
+                    continue
+                # 行优先展开: bar 升序、同一bar内枢轴由近到远，与原版 for x = 0 to maxpp - 1 的顺序一致
+                bars, slots = np.nonzero(mask & usable & gate[:, None])
+                found = divergence_lengths(values, close, bars, length[bars, slots], startpoint, bullish)
+                hit = np.flatnonzero(found)
+                hit_length = found[hit]
+                chunk = np.empty(len(hit), dtype=DIVERGENCE_DTYPE)
+                chunk['bar'] = hit
+                chunk['kind'] = kind
+                chunk['oscillator'] = k
+                chunk['point'] = hit - startpoint
+                chunk['pivot'] = hit - hit_length
+                chunk['length'] = hit_length
+                chunk['price'] = point_price[hit, 0]
+                chunk['pivot_price'] = price[hit - hit_length]
+                chunk['value'] = point_value[hit, 0]
+                chunk['pivot_value'] = values[hit - hit_length]
+                chunks.append(chunk)
+
+    events = np.concatenate(chunks) if chunks else np.empty(0, dtype=DIVERGENCE_DTYPE)
+    events = events[np.lexsort((events['kind'], events['oscillator'], events['bar']))]
+    counts = np.zeros((n, len(DIVERGENCE_NAMES)), dtype=np.int64)
+    np.add.at(counts, (events['bar'], events['kind']), 1)
+    return {'events': events, 'counts': counts}
+
+
+class _OscillatorStream:
+    """oscillator_bank() 的逐bar递推（浮点误差内一致）"""
+    __slots__ = ('prev_close', 'ema_fast', 'ema_slow', 'ema_signal', 'rsi_up', 'rsi_down', 'lowest', 'highest',
+                 'stoch', 'closes', 'cci_mean', 'obv', 'vw_fast', 'vw_slow', 'volume_fast', 'volume_slow',
+                 'cmf', 'cmf_volume', 'mfi_upper', 'mfi_lower')
+
+    def __init__(self):
+        self.prev_close = float('nan')
+        self.ema_fast = ExponentialMean(12)
+        self.ema_slow = ExponentialMean(26)
+        self.ema_signal = ExponentialMean(9)
+        self.rsi_up = ExponentialMean(14, 1.0 / 14)
+        self.rsi_down = ExponentialMean(14, 1.0 / 14)
+        self.lowest = RollingMin(14)
+        self.highest = RollingMax(14)
+        self.stoch = RollingMean(3)
+        self.closes = deque(maxlen=11)
+        self.cci_mean = RollingMean(10)
+        self.obv = 0.0
+        self.vw_fast, self.vw_slow = RollingMean(12), RollingMean(26)
+        self.volume_fast, self.volume_slow = RollingMean(12), RollingMean(26)
+        self.cmf, self.cmf_volume = RollingMean(21), RollingMean(21)
+        self.mfi_upper, self.mfi_lower = RollingMean(14), RollingMean(14)
+
+    @staticmethod
+    def _divide(x, y):
+        return x / y if y != 0 else float('nan')
+
+    def push(self, high, low, close, volume):
+        """返回当根bar的振荡器值元组（顺序同 OSCILLATOR_NAMES）"""
+        nan = float('nan')
+        change = close - self.prev_close
+        self.prev_close = close
+        self.closes.append(close)
+
+        macd = self.ema_fast.update(close) - self.ema_slow.update(close)
+        hist = macd - self.ema_signal.update(macd)
+
+        up = self.rsi_up.update(max(change, 0.0) if change == change else nan)
+        down = self.rsi_down.update(-min(change, 0.0) if change == change else nan)
+        if down == 0:
+            rsi = 100.0
+        elif up == 0:
+            rsi = 0.0
+        else:
+            rsi = 100.0 - 100.0 / (1.0 + up / down) if up == up and down == down else nan
+
+        lowest, highest = self.lowest.update(low), self.highest.update(high)
+        stoch = self.stoch.update(self._divide(100.0 * (close - lowest), highest - lowest))
+
+        mean = self.cci_mean.update(close)
+        window = list(self.closes)[-10:]
+        dev = math.fsum(abs(x - mean) for x in window) / 10 if mean == mean else nan
+        cci = (close - mean) / (0.015 * dev) if dev == dev and dev != 0 else nan
+
+        mom = close - self.closes[0] if len(self.closes) == 11 else nan
+        if change == change:
+            self.obv += math.copysign(1.0, change) * volume if change != 0 else 0.0
+
+        vwmacd = (self._divide(self.vw_fast.update(close * volume), self.volume_fast.update(volume)) -
+                  self._divide(self.vw_slow.update(close * volume), self.volume_slow.update(volume)))
+        multiplier = self._divide((close - low) - (high - close), high - low)
+        cmf = self._divide(self.cmf.update(multiplier * volume), self.cmf_volume.update(volume))
+
+        flow = volume * close
+        upper = self.mfi_upper.update(0.0 if change <= 0 else flow) * 14
+        lower = self.mfi_lower.update(0.0 if change >= 0 else flow) * 14
+        if lower != 0:
+            mfi = 100.0 - 100.0 / (1.0 + upper / lower)
+        else:
+            mfi = 100.0 if upper > 0 else nan
+        return macd, hist, rsi, stoch, cci, mom, self.obv, vwmacd, cmf, mfi
+
+
+def _window_pivot(window, left, high):
+    """窗口中心（下标 left）是否为严格枢轴"""
+    center = window[left]
+    if center != center:
+        return False
+    for k, value in enumerate(window):
+        if k != left and not (value < center if high else value > center):
+            return False
+    return True
+
+
+class _History:
+    """最近 size 根的定长历史（末尾为当前bar），供视线检查按下标回看"""
+    __slots__ = ('values', 'count', 'size')
+
+    def __init__(self, rows, size):
+        self.size = size
+        self.values = np.full((rows, 2 * size), np.nan)
+        self.count = 0
+
+    def append(self, row):
+        if self.count == self.values.shape[1]:
+            self.values[:, :self.size - 1] = self.values[:, self.count - self.size + 1:]
+            self.count = self.size - 1
+        self.values[:, self.count] = row
+        self.count += 1
+
+
+class DivergenceStream:
+    """
+    逐bar背离扫描（与 scan_divergences() 一致）
+
+    push() 返回当根bar四类背离的振荡器个数（顺序同 DIVERGENCE_NAMES）
+    """
+    __slots__ = ('period', 'pivot_source', 'maxpp', 'maxbars', 'hidden', 'startpoint', 'oscillators',
+                 'history', 'highs', 'lows', 'closes', 'pivots', 'previous', 'bar')
+
+    def __init__(self, period=5, pivot_source='close', maxpp=10, maxbars=100, hidden=True, confirm=True):
+        if pivot_source not in ('close', 'high_low'):
+            raise ValueError(f"未知枢轴来源: {pivot_source}")
+        self.period = period
+        self.pivot_source = pivot_source
+        self.maxpp = maxpp
+        self.maxbars = maxbars
+        self.hidden = hidden
+        self.startpoint = 1 if confirm else 0
+        self.oscillators = _OscillatorStream()
+        # 第0行收盘价，其后为各振荡器；回看最远到 maxbars 根之前
+        self.history = _History(len(OSCILLATOR_NAMES) + 1, maxbars + 1)
+        size = 2 * period + 1
+        self.highs = deque(maxlen=size)
+        self.lows = deque(maxlen=size)
+        self.closes = deque(maxlen=size)
+        # 看涨 / 看跌各自最近 maxpp 个枢轴 (枢轴bar, 价格)，由近到远
+        self.pivots = {True: deque(maxlen=maxpp), False: deque(maxlen=maxpp)}
+        self.previous = None
+        self.bar = -1
+
+    @property
+    def values(self):
+        """当根bar的振荡器值（顺序同 OSCILLATOR_NAMES）"""
+        return self.history.values[1:, self.history.count - 1]
+
+    def push(self, high, low, close, volume):
+        counts = [0, 0, 0, 0]
+        row = (close,) + self.oscillators.push(high, low, close, volume)
+        self.history.append(row)
+        self.highs.append(high)
+        self.lows.append(low)
+        self.closes.append(close)
+        self.bar += 1
+        previous, self.previous = self.previous, row
+
+        if self.pivot_source == 'close':
+            high_window, low_window = self.closes, self.closes
+        else:
+            high_window, low_window = self.highs, self.lows
+        if len(self.closes) == self.closes.maxlen:
+            for bullish, window in ((True, low_window), (False, high_window)):
+                if _window_pivot(window, self.period, not bullish):
+                    self.pivots[bullish].appendleft((self.bar - self.period, window[self.period]))
+
+        history = self.history.values
+        end = self.history.count - 1
+        startpoint = self.startpoint
+        point = self.bar - startpoint
+        if point < 0:
+            return tuple(counts)
+        prices = {True: low_window, False: high_window}
+        for bullish, kinds in ((True, (REGULAR_BULLISH, HIDDEN_BULLISH)), (False, (REGULAR_BEARISH, HIDDEN_BEARISH))):
+            point_price = prices[bullish][-1 - startpoint]
+            for k in range(len(OSCILLATOR_NAMES)):
+                src = history[k + 1, :end + 1]
+                if startpoint:
+                    change, close_change = (row[k + 1] - previous[k + 1], close - previous[0]) if previous else (0, 0)
+                    if not ((change > 0 or close_change > 0) if bullish else (change < 0 or close_change < 0)):
+                        continue
+                point_value = src[end - startpoint]
+                for kind, is_regular in zip(kinds, (True, False)):
+                    if not is_regular and not self.hidden:
+                        continue
+                    for pivot, pivot_price in self.pivots[bullish]:
+                        length = self.bar - pivot
+                        if length > self.maxbars:
+                            break
+                        if length <= MIN_LENGTH:
+                            continue
+                        pivot_value = src[end - length]
+                        if bullish == is_regular:
+                            match = point_value > pivot_value and point_price < pivot_price
+                        else:
+                            match = point_value < pivot_value and point_price > pivot_price
+                        if match and sight_line_clear(src, history[0, :end + 1], end, length, startpoint, bullish):
+                            counts[kind] += 1
+                            break
+        return tuple(counts)
+
+
+class Divergences(bt.Indicator):
+    """
+    多指标背离计数（每根bar上检出该类背离的振荡器个数，需 volume 列）
+
+    min_count 对应原版 Minimum Number of Divergence：四类合计少于该数时当根计数全部置0。
+    """
+    alias = ('DivergenceScanner',)
+    lines = DIVERGENCE_NAMES
+
+    params = (
+        ('period', 5),  # Pivot Period
+        ('pivot_source', 'close'),  # Source for Pivot Points: 'close' | 'high_low'
+        ('maxpp', 10),  # Maximum Pivot Points to Check
+        ('maxbars', 100),  # Maximum Bars to Check
+        ('hidden', True),
+        ('confirm', True),  # False: Don't Wait for Confirmation
+        ('min_count', 1),  # Minimum Number of Divergence
+    )
+
+    plotinfo = dict(subplot=True, plotname='Divergences')
+
+    def __init__(self):
+        self._stream = DivergenceStream(self.p.period, self.p.pivot_source, self.p.maxpp, self.p.maxbars,
+                                        self.p.hidden, self.p.confirm)
+
+    def once(self, start, end):
+        fill_from_batch(self, start, end, data_arrays(self.data, end, 'high', 'low', 'close', 'volume'), self._batch)
+
+    def _batch(self, high, low, close, volume):
+        counts = scan_divergences(high, low, close, volume, period=self.p.period, pivot_source=self.p.pivot_source,
+                                  maxpp=self.p.maxpp, maxbars=self.p.maxbars, hidden=self.p.hidden,
+                                  confirm=self.p.confirm)['counts'].astype(np.float64)
+        counts[counts.sum(axis=1) < self.p.min_count] = 0.0
+        return {name: counts[:, k] for k, name in enumerate(DIVERGENCE_NAMES)}
+
+    def next(self):
+        counts = self._stream.push(self.data.high[0], self.data.low[0], self.data.close[0], self.data.volume[0])
+        if sum(counts) < self.p.min_count:
+            counts = (0, 0, 0, 0)
+        for line, count in zip(self.lines, counts):
+            line[0] = float(count)
@@ -0,0 +1,449 @@
+"""
+Four Swords Feature Store
+Four Swords 特征库 - 按 (币种, 时间框架, 参数集) 物化策略特征，增量追加，按时间区间查询
+
+特征（与 FourSwordsSwingStrategyV174 的指标同参数、同语义）:
+- squeeze_on / squeeze_off / signal_bar / momentum: SqueezeMomentumSafe
+- wt1 / wt2 / wt_signal:                            WaveTrendSafe
+- ema_fast / ema_slow / ema_bull_trend / ema_bear_trend
+- volume_ratio (volume / SMA(volume, 20)) / volume_confirm (volume > avg * volume_multiplier)
+- atr:                                              ATR(atr_periods)
+
+列类型: open_time 为 int64毫秒；信号列为 int8（1/0，预热期为 SIGNAL_MISSING=-1）；其余为 float64（预热期NaN）
+
+计算方式:
+- 首次物化: batch_features() 以 squeeze_momentum_arrays / wavetrend_arrays / kernels 一次算出全部列，
+  并由批量结果给出末根bar之后的 FourSwordsFeatureStream 状态（seed_stream()）
+- 增量追加: 从保存的状态 from_state() 恢复流式状态，只逐bar推进新bar
+流式状态随特征一起保存；追加的值与全量批量构建一致（信号列相同，连续值误差<1e-9）。
+
+存储布局: <root>/<symbol>/<interval>/<参数哈希>/
+- <列名>.bin: 定长二进制列，只追加；读取时 np.memmap，按 open_time 二分定位区间
+- meta.json:  参数、行数、最后 open_time、代码版本，以及与该行数对应的流式状态（StreamingState.to_state()）；
+  行数与状态在同一个文件里最后原子替换，不会出现状态已推进而行数未提交的情况，
+  写入中断时多出的列尾部在下次 update() 时截断
+代码版本（特征模块/指标模块/kernels源码哈希）变化时自动全量重建。
+"""
+import os
+import sys
+import json
+import shutil
+import hashlib
+import inspect
+
+import numpy as np
+import pandas as pd
+try:
+    import kernels
+    from kernels import StreamingState, RollingMean, ExponentialMean
+except ImportError:
+    sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+    import kernels
+    from kernels import StreamingState, RollingMean, ExponentialMean
+
+from .sqzmom_safe import SqueezeMomentumStream, squeeze_momentum_arrays
+from .wavetrend_safe import WaveTrendStream, wavetrend_arrays
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'feature_store')
+META_FILE = 'meta.json'
+SIGNAL_MISSING = -1
+
+# 参数集默认值与 FourSwordsSwingStrategyV174 一致（成交量均线周期在策略中固定为20）
+FEATURE_PARAMS = {
+    'bb_length': 20,
+    'bb_mult': 2.0,
+    'kc_length': 20,
+    'kc_mult': 1.5,
+    'use_true_range': True,
+    'wt_n1': 10,
+    'wt_n2': 21,
+    'ema_fast': 10,
+    'ema_slow': 20,
+    'volume_period': 20,
+    'volume_multiplier': 1.05,
+    'atr_periods': 14,
+}
+
+FEATURE_COLUMNS = (
+    ('open_time', np.int64),
+    ('squeeze_on', np.int8),
+    ('squeeze_off', np.int8),
+    ('signal_bar', np.int8),
+    ('momentum', np.float64),
+    ('wt1', np.float64),
+    ('wt2', np.float64),
+    ('wt_signal', np.int8),
+    ('ema_fast', np.float64),
+    ('ema_slow', np.float64),
+    ('ema_bull_trend', np.int8),
+    ('ema_bear_trend', np.int8),
+    ('volume_ratio', np.float64),
+    ('volume_confirm', np.int8),
+    ('atr', np.float64),
+)
+COLUMN_TYPES = dict(FEATURE_COLUMNS)
+
+_code_version = None
+
+
+def _signal(value):
+    return SIGNAL_MISSING if value != value else int(value)
+
+
+def _compare(condition, a, b):
+    return SIGNAL_MISSING if a != a or b != b else int(condition)
+
+
+class FourSwordsFeatureStream(StreamingState):
+    """逐bar计算一行特征（不含open_time），顺序同 FEATURE_COLUMNS[1:]"""
+    __slots__ = ('volume_multiplier', 'sqzmom', 'wavetrend', 'ema_fast', 'ema_slow',
+                 'avg_volume', 'atr', 'prev_close')
+
+    def __init__(self, bb_length=20, bb_mult=2.0, kc_length=20, kc_mult=1.5, use_true_range=True,
+                 wt_n1=10, wt_n2=21, ema_fast=10, ema_slow=20, volume_period=20,
+                 volume_multiplier=1.05, atr_periods=14):
+        self.volume_multiplier = volume_multiplier
+        self.sqzmom = SqueezeMomentumStream(bb_length=bb_length, bb_mult=bb_mult, kc_length=kc_length,
+                                            kc_mult=kc_mult, use_true_range=use_true_range)
+        self.wavetrend = WaveTrendStream(n1=wt_n1, n2=wt_n2)
+        self.ema_fast = ExponentialMean(ema_fast)
+        self.ema_slow = ExponentialMean(ema_slow)
+        self.avg_volume = RollingMean(volume_period)
+        self.atr = ExponentialMean(atr_periods, alpha=1.0 / atr_periods)
+        self.prev_close = float('nan')
+
+    def push(self, high, low, close, volume):
+        """推进一根bar"""
+        sqz = self.sqzmom.push(high, low, close)
+        wt1, wt2, _ = self.wavetrend.push(high, low, close)
+        ema_fast = self.ema_fast.update(close)
+        ema_slow = self.ema_slow.update(close)
+        avg_volume = self.avg_volume.update(volume)
+
+        # 与 kernels.true_range 一致：首根为NaN
+        prev_close = self.prev_close
+        true_range = max(high, prev_close) - min(low, prev_close) if prev_close == prev_close else prev_close
+        self.prev_close = close
+        atr = self.atr.update(true_range)
+
+        volume_ratio = volume / avg_volume if avg_volume > 0 else float('nan')
+        return (
+            _signal(sqz['squeeze_on']),
+            _signal(sqz['squeeze_off']),
+            _signal(sqz['signal_bar']),
+            sqz['momentum'],
+            wt1,
+            wt2,
+            _compare(wt1 > wt2, wt1, wt2),
+            ema_fast,
+            ema_slow,
+            _compare(ema_fast > ema_slow, ema_fast, ema_slow),
+            _compare(ema_fast < ema_slow, ema_fast, ema_slow),
+            volume_ratio,
+            _compare(volume > avg_volume * self.volume_multiplier, avg_volume, volume),
+            atr,
+        )
+
+
+def _signal_column(values):
+    return np.where(np.isnan(values), SIGNAL_MISSING, values).astype(np.int8)
+
+
+def _compare_column(condition, a, b):
+    return np.where(np.isnan(a) | np.isnan(b), SIGNAL_MISSING, condition).astype(np.int8)
+
+
+def _replay(state, values):
+    """逐值推进流式统计（窗口类状态只需窗口长度的尾部）"""
+    for x in values.tolist():
+        state.update(x)
+    return state
+
+
+def _seed_mean(mean, values, batch):
+    """ExponentialMean 取批量结果末值为递推值；尚未完成预热（末值为NaN）时逐值推进"""
+    if batch[-1] == batch[-1]:
+        mean.value = float(batch[-1])
+        mean.seed = []
+    else:
+        _replay(mean, values)
+
+
+def seed_stream(params, high, low, close, volume, batch):
+    """
+    由批量结果构造处理完全部bar之后的 FourSwordsFeatureStream
+
+    - SQZMOM 只含窗口统计: 新流式状态推进最后 lookback + 1 根，计数置为总bar数
+    - WaveTrend / EMA / ATR 的递推值取批量结果末值（WaveTrend未完成预热时逐bar推进全部bar）
+    - 成交量均线推进最后 volume_period 根
+    """
+    stream = FourSwordsFeatureStream(**params)
+    n = len(close)
+
+    sqzmom = stream.sqzmom
+    tail = max(n - sqzmom.lookback - 1, 0)
+    for h, l, c in zip(high[tail:].tolist(), low[tail:].tolist(), close[tail:].tolist()):
+        sqzmom.push(h, l, c)
+    sqzmom.count = n
+
+    wavetrend = stream.wavetrend
+    wt1 = batch['wt1']
+    if n >= 4 and not np.isnan(batch['wt2'][-1]):
+        wavetrend.esa = float(kernels.ema((high + low + close) / 3.0, params['wt_n1'])[-1])
+        wavetrend.d = float(batch['d'][-1])
+        wavetrend.tci = float(wt1[-1])
+        wavetrend.esa_seed, wavetrend.d_seed, wavetrend.tci_seed = [], [], []
+        wavetrend.wt1_window.extend(wt1[-4:].tolist())
+    else:
+        for h, l, c in zip(high.tolist(), low.tolist(), close.tolist()):
+            wavetrend.push(h, l, c)
+
+    _seed_mean(stream.ema_fast, close, batch['ema_fast'])
+    _seed_mean(stream.ema_slow, close, batch['ema_slow'])
+    _seed_mean(stream.atr, kernels.true_range(high, low, close), batch['atr'])
+    _replay(stream.avg_volume, volume[-params['volume_period']:])
+    if n:
+        stream.prev_close = float(close[-1])
+    return stream
+
+
+def batch_features(high, low, close, volume, params):
+    """
+    全序列批量计算特征（首次物化）
+
+    Returns:
+        ({列名: 数组}（不含open_time，类型同 FEATURE_COLUMNS）, 处理完全部bar之后的 FourSwordsFeatureStream)
+    """
+    sqz = squeeze_momentum_arrays(high, low, close, bb_length=params['bb_length'], bb_mult=params['bb_mult'],
+                                  kc_length=params['kc_length'], kc_mult=params['kc_mult'],
+                                  use_true_range=params['use_true_range'])
+    wt = wavetrend_arrays(high, low, close, n1=params['wt_n1'], n2=params['wt_n2'])
+    ema_fast = kernels.ema(close, params['ema_fast'])
+    ema_slow = kernels.ema(close, params['ema_slow'])
+    avg_volume = kernels.sma(volume, params['volume_period'])
+    atr = kernels.atr(high, low, close, params['atr_periods'])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        volume_ratio = np.where(avg_volume > 0, volume / avg_volume, np.nan)
+        columns = {
+            'squeeze_on': _signal_column(sqz['squeeze_on']),
+            'squeeze_off': _signal_column(sqz['squeeze_off']),
+            'signal_bar': _signal_column(sqz['signal_bar']),
+            'momentum': sqz['momentum'],
+            'wt1': wt['wt1'],
+            'wt2': wt['wt2'],
+            'wt_signal': _compare_column(wt['wt1'] > wt['wt2'], wt['wt1'], wt['wt2']),
+            'ema_fast': ema_fast,
+            'ema_slow': ema_slow,
+            'ema_bull_trend': _compare_column(ema_fast > ema_slow, ema_fast, ema_slow),
+            'ema_bear_trend': _compare_column(ema_fast < ema_slow, ema_fast, ema_slow),
+            'volume_ratio': volume_ratio,
+            'volume_confirm': _compare_column(volume > avg_volume * params['volume_multiplier'],
+                                              avg_volume, volume),
+            'atr': atr,
+        }
+    batch = dict(wt, ema_fast=ema_fast, ema_slow=ema_slow, atr=atr)
+    return columns, seed_stream(params, high, low, close, volume, batch)
+
+
+def feature_code_version():
+    """特征计算相关源码哈希，变化后已物化的特征自动重建"""
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.blake2b(digest_size=16)
+        for module in (sys.modules[__name__], sys.modules[SqueezeMomentumStream.__module__],
+                       sys.modules[WaveTrendStream.__module__], sys.modules[RollingMean.__module__],
+                       sys.modules[kernels.sma.__module__]):
+            with open(inspect.getsourcefile(module), 'rb') as source:
+                digest.update(source.read())
+        _code_version = digest.hexdigest()
+    return _code_version
+
+
+def load_source(symbol, interval):
+    """读取 data/<symbol>/<interval>/<symbol>-<interval>-merged.csv"""
+    return pd.read_csv(os.path.join(DATA_DIR, symbol, interval, f'{symbol}-{interval}-merged.csv'))
+
+
+def _open_time_ms(df):
+    if 'open_time' in df:
+        return df['open_time'].to_numpy(dtype=np.int64)
+    return df.index.asi8 // 1_000_000
+
+
+def _to_ms(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return pd.Timestamp(value).value // 1_000_000
+
+
+def _write_json(path, payload):
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+class FeatureStore:
+    """Four Swords 特征的磁盘物化存储"""
+
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def param_set(params=None):
+        """合并默认值后的完整参数集"""
+        resolved = dict(FEATURE_PARAMS)
+        for name, value in (params or {}).items():
+            if name not in FEATURE_PARAMS:
+                raise ValueError(f"未知特征参数: {name}，可选: {tuple(FEATURE_PARAMS)}")
+            resolved[name] = value
+        return resolved
+
+    @staticmethod
+    def param_key(params):
+        payload = json.dumps(sorted((name, repr(value)) for name, value in params.items()))
+        return hashlib.blake2b(payload.encode(), digest_size=8).hexdigest()
+
+    def _entry_dir(self, symbol, interval, params):
+        return os.path.join(self.root, symbol, interval, self.param_key(params))
+
+    @staticmethod
+    def _load_meta(entry):
+        meta_path = os.path.join(entry, META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def update(self, symbol, interval, data=None, params=None, rebuild=False):
+        """
+        物化/增量追加特征
+
+        Args:
+            symbol, interval: 数据集
+            data: 含 open_time(毫秒)/high/low/close/volume 的DataFrame（或以时间为索引），
+                  默认读取 data/ 下的合并CSV
+            params: 参数集（未给出的取 FEATURE_PARAMS 默认值）
+            rebuild: 丢弃已物化的特征全量重建
+
+        Returns:
+            本次追加的行数
+        """
+        params = self.param_set(params)
+        df = load_source(symbol, interval) if data is None else data
+        open_time = _open_time_ms(df)
+        entry = self._entry_dir(symbol, interval, params)
+        version = feature_code_version()
+
+        meta = self._load_meta(entry)
+        if meta is not None and (rebuild or meta['version'] != version):
+            shutil.rmtree(entry)
+            meta = None
+
+        if meta is None:
+            os.makedirs(entry, exist_ok=True)
+            for name, _ in FEATURE_COLUMNS:
+                open(os.path.join(entry, f'{name}.bin'), 'wb').close()
+            stream = None  # 首次物化走批量计算
+            rows, start = 0, 0
+        else:
+            rows = meta['rows']
+            start = int(np.searchsorted(open_time, meta['last_open_time'], side='right'))
+            if rows and (start == 0 or open_time[start - 1] != meta['last_open_time']):
+                raise ValueError(f"{symbol} {interval} 数据源不包含特征库最后一根bar "
+                                 f"(open_time={meta['last_open_time']})，请使用 rebuild=True 重建")
+            stream = FourSwordsFeatureStream.from_state(meta['state'])
+            # 截断上次中断写入时超出 meta 行数的列尾部
+            for name, dtype in FEATURE_COLUMNS:
+                path = os.path.join(entry, f'{name}.bin')
+                expected = rows * np.dtype(dtype).itemsize
+                if os.path.getsize(path) != expected:
+                    with open(path, 'r+b') as f:
+                        f.truncate(expected)
+
+        appended = len(open_time) - start
+        if appended <= 0:
+            return 0
+
+        high, low, close, volume = (df[col].to_numpy(dtype=np.float64)[start:]
+                                    for col in ('high', 'low', 'close', 'volume'))
+        if stream is None:
+            values, stream = batch_features(high, low, close, volume, params)
+        else:
+            columns = [name for name, _ in FEATURE_COLUMNS[1:]]
+            values = {name: [] for name in columns}
+            appenders = [values[name].append for name in columns]
+            push = stream.push
+            for h, l, c, v in zip(high.tolist(), low.tolist(), close.tolist(), volume.tolist()):
+                for append, value in zip(appenders, push(h, l, c, v)):
+                    append(value)
+        values['open_time'] = open_time[start:]
+
+        for name, dtype in FEATURE_COLUMNS:
+            with open(os.path.join(entry, f'{name}.bin'), 'ab') as f:
+                f.write(np.asarray(values[name], dtype=dtype).tobytes())
+        # 提交点: 行数与流式状态一次原子替换，此前中断时下次 update() 从旧行数与旧状态继续
+        _write_json(os.path.join(entry, META_FILE), {
+            'symbol': symbol,
+            'interval': interval,
+            'params': params,
+            'rows': rows + appended,
+            'first_open_time': int(open_time[0]) if rows == 0 else meta['first_open_time'],
+            'last_open_time': int(open_time[-1]),
+            'version': version,
+            'columns': {name: np.dtype(dtype).name for name, dtype in FEATURE_COLUMNS},
+            'state': stream.to_state(),
+        })
+        return appended
+
+    def read(self, symbol, interval, params=None, start=None, end=None, columns=None):
+        """
+        按时间区间读取特征
+
+        Args:
+            start, end: 闭区间，毫秒时间戳或可被 pd.Timestamp 解析的时间（None为不限）
+            columns: 需要的列（默认全部，open_time 总是作为索引返回）
+
+        Returns:
+            以 datetime 为索引的DataFrame（与 load_symbol() 的索引一致）
+        """
+        params = self.param_set(params)
+        entry = self._entry_dir(symbol, interval, params)
+        meta = self._load_meta(entry)
+        if meta is None:
+            raise KeyError(f"特征库中没有 {symbol} {interval} {params}，请先 update()")
+        rows = meta['rows']
+        columns = [name for name, _ in FEATURE_COLUMNS[1:]] if columns is None else list(columns)
+        for name in columns:
+            if name not in COLUMN_TYPES:
+                raise ValueError(f"未知特征列: {name}")
+
+        def column(name):
+            if rows == 0:
+                return np.empty(0, dtype=COLUMN_TYPES[name])
+            return np.memmap(os.path.join(entry, f'{name}.bin'), dtype=COLUMN_TYPES[name], mode='r', shape=(rows,))
+
+        open_time = column('open_time')
+        start_ms, end_ms = _to_ms(start), _to_ms(end)
+        lo = 0 if start_ms is None else int(np.searchsorted(open_time, start_ms, side='left'))
+        hi = rows if end_ms is None else int(np.searchsorted(open_time, end_ms, side='right'))
+
+        frame = pd.DataFrame({name: np.array(column(name)[lo:hi]) for name in columns},
+                             index=pd.to_datetime(np.array(open_time[lo:hi]), unit='ms'))
+        frame.index.name = 'datetime'
+        return frame
+
+    def entries(self):
+        """全部已物化的 (币种, 时间框架, 参数集) 概要"""
+        result = []
+        for dirpath, _, filenames in os.walk(self.root):
+            if META_FILE in filenames:
+                meta = self._load_meta(dirpath)
+                result.append({key: meta[key] for key in
+                               ('symbol', 'interval', 'params', 'rows', 'first_open_time', 'last_open_time')})
+        return sorted(result, key=lambda item: (item['symbol'], item['interval']))
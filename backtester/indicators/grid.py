@@ -0,0 +1,168 @@
+"""
+Indicator Parameter Grid
+指标参数网格批量计算 - 一次计算全部参数组合，替代每组合一个Cerebro
+
+输出为 (参数组合数, bar数) 的二维数组，每一行与对应参数下的
+squeeze_momentum_arrays() / wavetrend_arrays() 逐位一致。
+
+共享计算:
+- SQZMOM: 每个 bb_length 一次 SMA/标准差（所有 bb_mult 共用）；
+  每个 kc_length 一次 SMA/range-MA/highest/lowest/动量（所有 kc_mult 共用）；
+  bb_mult × kc_mult 的squeeze判断为广播运算
+- WaveTrend: 每个 n1 一次 esa → d → ci EMA链（所有 n2 共用），
+  全部 n2 的 tci 由 kernels.ema_bank 一次遍历 ci 计算
+"""
+from itertools import product
+
+import numpy as np
+try:
+    from utils.safe_math import DEFAULT_EPS, safe_div_array, safe_max_eps_array
+    import kernels
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+    from utils.safe_math import DEFAULT_EPS, safe_div_array, safe_max_eps_array
+    import kernels
+
+from .sqzmom_safe import squeeze_momentum_lookback
+
+SQZMOM_LINES = ('squeeze_on', 'squeeze_off', 'signal_bar', 'momentum')
+WAVETREND_LINES = ('wt1', 'wt2', 'wt_signal')
+
+
+def _as_list(values):
+    return list(values) if np.ndim(values) else [values]
+
+
+def squeeze_momentum_grid(high, low, close, bb_length=(20,), bb_mult=(2.0,),
+                          kc_length=(20,), kc_mult=(1.5,), use_true_range=True,
+                          eps=DEFAULT_EPS, lines=SQZMOM_LINES):
+    """
+    SQZMOM 参数网格批量计算
+
+    Args:
+        high, low, close: 一维float数组
+        bb_length, bb_mult, kc_length, kc_mult: 各参数的取值列表（标量视为单值）
+        use_true_range, eps: 全网格共用
+        lines: 需要输出的line
+
+    Returns:
+        dict: 'params' 为参数组合列表（顺序为 bb_length × bb_mult × kc_length × kc_mult 的笛卡尔积），
+              其余键为 lines 中各line的 (组合数, bar数) 数组
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+
+    bb_lengths, kc_lengths = _as_list(bb_length), _as_list(kc_length)
+    bb_mults = np.asarray(_as_list(bb_mult), dtype=np.float64)
+    kc_mults = np.asarray(_as_list(kc_mult), dtype=np.float64)
+    shape = (len(bb_lengths), len(bb_mults), len(kc_lengths), len(kc_mults), n)
+    out = {name: np.empty(shape) for name in lines}
+
+    # 每个 bb_length 一次
+    bb_stats = {}
+    for length in bb_lengths:
+        bb_stats[length] = (kernels.sma(close, length), safe_max_eps_array(kernels.stddev(close, length), eps)[0])
+
+    # 每个 kc_length 一次（kc_ma 与 bb_length 相同时复用 bb_basis）
+    kc_range = kernels.true_range(high, low, close) if use_true_range else high - low
+    kc_stats = {}
+    for length in kc_lengths:
+        kc_ma = bb_stats[length][0] if length in bb_stats else kernels.sma(close, length)
+        kc_rangema, _ = safe_max_eps_array(kernels.sma(kc_range, length), eps)
+
+        avg_hl = (kernels.highest(high, length) + kernels.lowest(low, length)) / 2.0
+        source_diff = close - (avg_hl + kc_ma) / 2.0
+        momentum = np.full(n, np.nan)
+        momentum[length:] = source_diff[length:] - source_diff[:-length]
+        kc_stats[length] = (kc_ma, kc_rangema, momentum)
+
+    for i, bl in enumerate(bb_lengths):
+        bb_basis, bb_std = bb_stats[bl]
+        bb_dev = bb_mults[:, None] * bb_std
+        bb_upper = (bb_basis + bb_dev)[:, None, :]
+        bb_lower = (bb_basis - bb_dev)[:, None, :]
+
+        for j, kl in enumerate(kc_lengths):
+            kc_ma, kc_rangema, momentum = kc_stats[kl]
+            kc_dev = kc_rangema * kc_mults[:, None]
+            kc_upper = (kc_ma + kc_dev)[None, :, :]
+            kc_lower = (kc_ma - kc_dev)[None, :, :]
+
+            # (bb_mult, kc_mult, bar)
+            squeeze_on = (bb_lower > kc_lower) & (bb_upper < kc_upper)
+            block = {}
+            if 'squeeze_on' in out:
+                block['squeeze_on'] = squeeze_on
+            if 'squeeze_off' in out:
+                block['squeeze_off'] = (bb_lower < kc_lower) & (bb_upper > kc_upper)
+            if 'signal_bar' in out:
+                prev_squeeze_on = np.zeros_like(squeeze_on)
+                prev_squeeze_on[..., 1:] = squeeze_on[..., :-1]
+                block['signal_bar'] = prev_squeeze_on & ~squeeze_on
+            if 'momentum' in out:
+                block['momentum'] = momentum
+
+            lookback = squeeze_momentum_lookback(bl, kl, use_true_range)
+            for name, values in block.items():
+                target = out[name][i, :, j, :, :]
+                target[...] = values
+                target[..., :lookback - 1] = np.nan
+
+    result = {name: values.reshape(-1, n) for name, values in out.items()}
+    result['params'] = [
+        dict(bb_length=bl, bb_mult=float(bm), kc_length=kl, kc_mult=float(km))
+        for bl, bm, kl, km in product(bb_lengths, bb_mults, kc_lengths, kc_mults)
+    ]
+    return result
+
+
+def wavetrend_grid(high, low, close, n1=(10,), n2=(21,), eps=DEFAULT_EPS, lines=WAVETREND_LINES):
+    """
+    WaveTrend 参数网格批量计算
+
+    Args:
+        high, low, close: 一维float数组
+        n1, n2: 取值列表（标量视为单值）
+        eps: 分母保护阈值
+        lines: 需要输出的line
+
+    Returns:
+        dict: 'params' 为参数组合列表（顺序为 n1 × n2 的笛卡尔积），
+              其余键为 lines 中各line的 (组合数, bar数) 数组
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+
+    n1_values, n2_values = _as_list(n1), _as_list(n2)
+    out = {name: np.empty((len(n1_values), len(n2_values), n)) for name in lines}
+
+    ap = (high + low + close) / 3.0
+    for i, channel_length in enumerate(n1_values):
+        # 每个 n1 一次 EMA链
+        esa = kernels.ema(ap, channel_length)
+        diff = ap - esa
+        d = kernels.ema(np.abs(diff), channel_length)
+        ci, _ = safe_div_array(diff, 0.015 * d, eps)
+
+        wt1_bank = kernels.ema_bank(ci, n2_values)
+        for j, wt1 in enumerate(wt1_bank):
+            wt2 = kernels.sma(wt1, 4)
+            if 'wt1' in out:
+                out['wt1'][i, j] = wt1
+            if 'wt2' in out:
+                out['wt2'][i, j] = wt2
+            if 'wt_signal' in out:
+                wt_signal = out['wt_signal'][i, j]
+                wt_signal[:] = np.nan
+                valid = ~np.isnan(wt2)
+                wt_signal[valid] = wt1[valid] > wt2[valid]
+
+    result = {name: values.reshape(-1, n) for name, values in out.items()}
+    result['params'] = [dict(n1=a, n2=b) for a, b in product(n1_values, n2_values)]
+    return result
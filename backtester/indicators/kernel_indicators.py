@@ -0,0 +1,200 @@
+"""
+Kernel-backed Filter Indicators
+内核版过滤器指标 - 策略EMA/SMA/ATR过滤器的 kernels 实现
+
+与 btind.SimpleMovingAverage / ExponentialMovingAverage / AverageTrueRange
+的minperiod、种子与递推公式一致：
+- runonce模式: once() 直接调用 kernels 计算全序列（numba可用时为编译内核）
+- next()模式: 与Backtrader相同的逐bar递推
+
+KernelMABank: 同一数据源上K个周期的 SMA/EMA/SMMA 作为一个多line指标，
+runonce 下由 kernels.*_bank 一次遍历计算（20条EMA的网格只遍历一次数据）。
+"""
+import math
+
+import numpy as np
+import backtrader as bt
+try:
+    import kernels
+    from kernels import RollingMean, ExponentialMean
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+    import kernels
+    from kernels import RollingMean, ExponentialMean
+
+
+def _write_line(line, values, start, end):
+    """将全序列结果写入line缓冲区的 [start, end) 区间"""
+    np.frombuffer(line.array, dtype=np.float64)[start:end] = values[start:end]
+
+
+class KernelSMA(bt.Indicator):
+    """Simple Moving Average (kernels)"""
+    alias = ('KSMA',)
+    lines = ('sma',)
+    params = (('period', 30),)
+
+    def __init__(self):
+        self.addminperiod(self.p.period)
+
+    def next(self):
+        self.lines.sma[0] = math.fsum(self.data.get(size=self.p.period)) / self.p.period
+
+    def once(self, start, end):
+        if end <= start:
+            return
+        src = np.frombuffer(self.data.array, dtype=np.float64)[:end]
+        _write_line(self.lines.sma, kernels.sma(src, self.p.period), start, end)
+
+
+class KernelEMA(bt.Indicator):
+    """Exponential Moving Average (kernels)"""
+    alias = ('KEMA',)
+    lines = ('ema',)
+    params = (('period', 30),)
+
+    def __init__(self):
+        self.alpha = 2.0 / (1.0 + self.p.period)
+        self.alpha1 = 1.0 - self.alpha
+        self.addminperiod(self.p.period)
+
+    def nextstart(self):
+        # 种子: 首个完整窗口的算术均值
+        self.lines.ema[0] = math.fsum(self.data.get(size=self.p.period)) / self.p.period
+
+    def next(self):
+        self.lines.ema[0] = self.lines.ema[-1] * self.alpha1 + self.data[0] * self.alpha
+
+    def once(self, start, end):
+        if end <= start:
+            return
+        src = np.frombuffer(self.data.array, dtype=np.float64)[:end]
+        # 数据本身带预热期时（如指标输出），kernels.ema 从首个非NaN位置开始播种
+        src = np.where(np.arange(end) < self.data._minperiod - 1, np.nan, src)
+        _write_line(self.lines.ema, kernels.ema(src, self.p.period), start, end)
+
+
+class KernelATR(bt.Indicator):
+    """Average True Range - Wilder平滑 (kernels)"""
+    alias = ('KATR',)
+    lines = ('atr',)
+    params = (('period', 14),)
+
+    def __init__(self):
+        self.alpha = 1.0 / self.p.period
+        self.alpha1 = 1.0 - self.alpha
+        # TrueRange需要前一根收盘价
+        self.addminperiod(self.p.period + 1)
+
+    def _true_range(self, ago=0):
+        prev_close = self.data.close[ago - 1]
+        true_high = max(self.data.high[ago], prev_close)
+        true_low = min(self.data.low[ago], prev_close)
+        return true_high - true_low
+
+    def nextstart(self):
+        # 种子: 最近 period 根TrueRange的算术均值
+        ranges = [self._true_range(-i) for i in range(self.p.period)]
+        self.lines.atr[0] = math.fsum(ranges) / self.p.period
+
+    def next(self):
+        self.lines.atr[0] = self.lines.atr[-1] * self.alpha1 + self._true_range() * self.alpha
+
+    def once(self, start, end):
+        if end <= start:
+            return
+        values = kernels.atr(
+            np.frombuffer(self.data.high.array, dtype=np.float64)[:end],
+            np.frombuffer(self.data.low.array, dtype=np.float64)[:end],
+            np.frombuffer(self.data.close.array, dtype=np.float64)[:end],
+            self.p.period,
+        )
+        _write_line(self.lines.atr, values, start, end)
+
+
+# 均线类型 → (批量内核, 流式状态工厂)
+_BANK_KINDS = {
+    'sma': (kernels.sma_bank, RollingMean),
+    'ema': (kernels.ema_bank, ExponentialMean),
+    'smma': (kernels.smma_bank, lambda period: ExponentialMean(period, alpha=1.0 / period)),
+}
+_bank_classes = {}
+
+
+class _KernelMABankBase(bt.Indicator):
+    """
+    K条均线的公共实现（line由 KernelMABank() 按周期生成）
+
+    minperiod 取最长周期（与分别实例化K个均线指标时策略的minperiod一致），
+    较短周期的line在此之前同样有值：runonce 下 preonce() 也写入，逐bar模式下 prenext() 同样推进。
+    """
+    params = (('periods', ()), ('kind', 'ema'))
+    plotinfo = dict(subplot=False)
+
+    def __init__(self):
+        self._values = None
+        self._streams = None
+        self.addminperiod(max(self.p.periods))
+
+    def _write(self, start, end):
+        if end <= start:
+            return
+        if self._values is None:
+            size = self.buflen()
+            src = np.frombuffer(self.data.array, dtype=np.float64)[:size]
+            # 数据本身带预热期时（如指标输出），从其首个有效值开始
+            src = np.where(np.arange(size) < self.data._minperiod - 1, np.nan, src)
+            self._values = _BANK_KINDS[self.p.kind][0](src, self.p.periods)
+        for k in range(len(self.p.periods)):
+            _write_line(self.lines[k], self._values[k], start, end)
+
+    def preonce(self, start, end):
+        self._write(start, end)
+
+    def once(self, start, end):
+        self._write(start, end)
+
+    def _push(self):
+        if self._streams is None:
+            factory = _BANK_KINDS[self.p.kind][1]
+            self._streams = [factory(period) for period in self.p.periods]
+        value = self.data[0] if len(self.data) >= self.data._minperiod else float('nan')
+        for k, stream in enumerate(self._streams):
+            self.lines[k][0] = stream.update(value)
+
+    def prenext(self):
+        self._push()
+
+    def next(self):
+        self._push()
+
+
+def KernelMABank(periods, kind='ema'):
+    """
+    生成K条均线的多line指标类，line名为 '<kind>_<周期>'（如 ema_10, ema_20）
+
+    用法:
+        bank = KernelMABank((10, 20, 50))(self.data.close)
+        bank.ema_20[0]，或按顺序 bank.lines[1][0]
+
+    相同 (kind, periods) 返回同一个类，可直接交给 shared_indicator() 共享。
+    """
+    if kind not in _BANK_KINDS:
+        raise ValueError(f"未知均线类型: {kind}，可选: {tuple(_BANK_KINDS)}")
+    periods = tuple(int(period) for period in periods)
+    if not periods or len(set(periods)) != len(periods) or min(periods) < 1:
+        raise ValueError(f"周期列表须非空、不重复且均为正整数: {periods}")
+
+    key = (kind, periods)
+    cls = _bank_classes.get(key)
+    if cls is None:
+        name = f"Kernel{kind.upper()}Bank_{'_'.join(map(str, periods))}"
+        cls = type(_KernelMABankBase)(name, (_KernelMABankBase,), {
+            'lines': tuple(f'{kind}_{period}' for period in periods),
+            'params': (('periods', periods), ('kind', kind)),
+            '__module__': __name__,
+        })
+        _bank_classes[key] = cls
+    return cls
@@ -0,0 +1,337 @@
+"""
+Key Levels Indicator
+关键位 - pinescript/indicators/trend/Bj_Key_Levels.pine 的枢轴区，及日/周/月周期关键位
+
+周期关键位（period_levels）:
+- 按 open_time 一次分组（日/周为UTC整除，周从周一开始；月为日历月），每个周期的OHLC由 reduceat 聚合，
+  再按所属周期序号一次广播到每根bar
+- period_open: 本周期开盘价；prev_high / prev_low / prev_close: 上一周期；
+  pivot = (H + L + C) / 3，r1 = 2P - L，s1 = 2P - H，r2 = P + (H - L)，s2 = P - (H - L)（上一周期的经典枢轴）
+- 只用已收盘周期与当前周期的开盘价，无前视
+
+Bj枢轴区（key_level_zones，Pine默认参数）:
+- 枢轴来源: Heikin Ashi实体高/低（'HA'）、实体高/低（'body'）或 high/low（'high_low'）
+- ta.pivothigh / pivotlow(left=20, right=15)，区 = 枢轴值 ± min(ATR(30) × 0.5, close × 5%)[right] / 2
+- 每组保留最近 n_pivots 个区，重叠区对齐，收盘上穿/下穿翻转多空（状态机见 kernels.levels）
+- 输出: support / resistance（收盘价下方最近区上沿 / 上方最近区下沿），zone（当前bar所在区 1多头 / -1空头 / 0无），
+  bullish / zones（多头区数 / 有效区数），breakout / breakdown（原版 Detect Breakout / Breakdown）
+- 未移植: K线形态、TSI curl、假突破与支撑阻力推动信号（仅绘图/告警用途）
+
+- period_levels() / key_level_zones(): 全序列批量计算
+- PeriodLevelStream / KeyLevelZoneStream: 逐bar流式版本
+- PeriodKeyLevels / KeyLevelZones: Backtrader指标；每bar只读已算好的line，可直接作为策略入场/出场过滤
+"""
+from collections import deque
+
+import numpy as np
+import backtrader as bt
+try:
+    import kernels
+    from kernels import ExponentialMean, RollingMax, RollingMin, pine_atr, pivot_bars
+    from kernels.levels import heikin_ashi, key_zones, _zone_step
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+    import kernels
+    from kernels import ExponentialMean, RollingMax, RollingMin, pine_atr, pivot_bars
+    from kernels.levels import heikin_ashi, key_zones, _zone_step
+
+from .cache import data_arrays, fill_from_batch
+from .divergence import _window_pivot
+from .mtf_levels import bt_datetime_ms, group_periods, period_index
+
+
+PERIOD_LEVEL_NAMES = ('period_open', 'prev_high', 'prev_low', 'prev_close', 'pivot', 'r1', 's1', 'r2', 's2')
+KEY_ZONE_NAMES = ('support', 'resistance', 'zone', 'bullish', 'zones', 'breakout', 'breakdown')
+ZONE_SOURCES = ('HA', 'body', 'high_low')
+
+
+# === 周期关键位 ===
+
+def period_ids(open_time, period='D'):
+    """
+    每根bar所属周期编号
+
+    Args:
+        period: 'D' / 'W' / 'M'（日历月），或 mtf_levels 支持的任意时间框架（如 '4h'）
+    """
+    open_time = np.asarray(open_time, dtype=np.int64)
+    if period in ('M', '1M'):
+        return open_time.astype('datetime64[ms]').astype('datetime64[M]').astype(np.int64)
+    return period_index(open_time, period)
+
+
+def _pivot_levels(prev_high, prev_low, prev_close):
+    pivot = (prev_high + prev_low + prev_close) / 3
+    return (pivot, 2 * pivot - prev_low, 2 * pivot - prev_high, pivot + (prev_high - prev_low),
+            pivot - (prev_high - prev_low))
+
+
+def period_levels(open_time, open_, high, low, close, period='D'):
+    """
+    周期关键位
+
+    Returns:
+        dict: PERIOD_LEVEL_NAMES 各项（每根bar一个值，首个周期的上一周期值为NaN）
+    """
+    bars = group_periods(period_ids(open_time, period), open_, high, low, close)
+    group = bars['group']
+
+    def previous(values):
+        return np.r_[np.nan, values][group]
+
+    prev_high, prev_low, prev_close = previous(bars['high']), previous(bars['low']), previous(bars['close'])
+    levels = (bars['open'][group], prev_high, prev_low, prev_close) + _pivot_levels(prev_high, prev_low, prev_close)
+    return dict(zip(PERIOD_LEVEL_NAMES, levels))
+
+
+class PeriodLevelStream:
+    """
+    逐bar周期关键位（与 period_levels() 一致）
+
+    update(open_time, open, high, low, close) 返回 PERIOD_LEVEL_NAMES 顺序的元组
+    """
+    __slots__ = ('period', 'current', 'period_open', 'period_high', 'period_low', 'period_close', 'levels')
+
+    def __init__(self, period='D'):
+        period_ids(np.zeros(1, dtype=np.int64), period)
+        self.period = period
+        self.current = None
+        self.period_open = self.period_high = self.period_low = self.period_close = float('nan')
+        self.levels = (float('nan'),) * 8
+
+    def update(self, open_time, open_, high, low, close):
+        current = int(period_ids(np.array([open_time]), self.period)[0])
+        if current != self.current:
+            if self.current is not None:
+                prev_high, prev_low, prev_close = self.period_high, self.period_low, self.period_close
+                self.levels = (prev_high, prev_low, prev_close) + _pivot_levels(prev_high, prev_low, prev_close)
+            self.current = current
+            self.period_open, self.period_high, self.period_low = open_, high, low
+        else:
+            self.period_high = max(self.period_high, high)
+            self.period_low = min(self.period_low, low)
+        self.period_close = close
+        return (self.period_open,) + self.levels
+
+
+# === Bj枢轴区 ===
+
+def _check_source(source):
+    if source not in ZONE_SOURCES:
+        raise ValueError(f"未知枢轴来源: {source}，可选: {ZONE_SOURCES}")
+
+
+def _breaks(close, bullish, total, track_high, track_low, right):
+    """原版 breakOut / breakDwn: 区翻转 + 收盘为 right 根最高（最低）+ 全部区为多头（空头）"""
+    move_above = np.r_[False, track_high[1:] > track_high[:-1]]
+    move_below = np.r_[False, track_low[1:] < track_low[:-1]]
+    highest = close == kernels.highest(close, right)
+    lowest = close == kernels.lowest(close, right)
+    breakout = move_above & highest & (bullish == total)
+    breakdown = move_below & lowest & (bullish == 0)
+    return breakout.astype(np.float64), breakdown.astype(np.float64)
+
+
+def key_level_zones(open_, high, low, close, left=20, right=15, n_pivots=4, atr_length=30, mult=0.5,
+                    max_percent=5.0, source='HA', align=True):
+    """
+    Bj_Key_Levels 枢轴区
+
+    Args:
+        open_, high, low, close: 一维float数组
+        left / right: Look Left / Look Right
+        n_pivots: Number of Pivots（每组）
+        atr_length / mult: ATR Length / Zone Width (ATR)
+        max_percent: Max Zone Percent
+        source: 'HA' | 'body' | 'high_low'（Source For Pivots）
+        align: Align Zones
+
+    Returns:
+        dict: KEY_ZONE_NAMES 各项
+    """
+    _check_source(source)
+    open_, high, low, close = (np.ascontiguousarray(x, dtype=np.float64) for x in (open_, high, low, close))
+    n = len(close)
+    if source == 'HA':
+        body_open, body_close = heikin_ashi(open_, high, low, close)
+    else:
+        body_open, body_close = open_, close
+    src_high = high if source == 'high_low' else np.maximum(body_close, body_open)
+    src_low = low if source == 'high_low' else np.minimum(body_close, body_open)
+
+    width = np.minimum(pine_atr(high, low, close, atr_length) * mult, close * (max_percent / 100)) / 2
+    band = np.r_[np.full(min(right, n), np.nan), width[:n - right]]
+    pivots = {}
+    for is_high, values in ((True, src_high), (False, src_low)):
+        found = pivot_bars(values, left, right, is_high)
+        new = np.zeros(n, dtype=bool)
+        level = np.full(n, np.nan)
+        new[found + right] = True
+        level[found + right] = values[found]
+        pivots[is_high] = (new, level)
+
+    bullish, total, zone, support, resistance, track_high, track_low = key_zones(
+        high, low, close, *pivots[True], *pivots[False], band, n_pivots, align)
+    breakout, breakdown = _breaks(close, bullish, total, track_high, track_low, right)
+    return dict(zip(KEY_ZONE_NAMES, (support, resistance, zone, bullish, total, breakout, breakdown)))
+
+
+class KeyLevelZoneStream:
+    """
+    逐bar Bj枢轴区（与 key_level_zones() 一致，区状态推进调用同一个 kernels.levels._zone_step）
+
+    update(open, high, low, close) 返回 KEY_ZONE_NAMES 顺序的元组
+    """
+    __slots__ = ('left', 'right', 'mult', 'max_percent', 'source', 'align', 'atr', 'prev_close', 'ha',
+                 'src_highs', 'src_lows', 'widths', 'highest', 'lowest', 'tops', 'bottoms', 'flags', 'tracks')
+
+    def __init__(self, left=20, right=15, n_pivots=4, atr_length=30, mult=0.5, max_percent=5.0, source='HA',
+                 align=True):
+        _check_source(source)
+        self.left = left
+        self.right = right
+        self.mult = mult
+        self.max_percent = max_percent
+        self.source = source
+        self.align = align
+        self.atr = ExponentialMean(atr_length, 1.0 / atr_length)
+        self.prev_close = None
+        self.ha = None  # 上一根的 (haOpen, haClose)
+        self.src_highs = deque(maxlen=left + right + 1)
+        self.src_lows = deque(maxlen=left + right + 1)
+        self.widths = deque(maxlen=right + 1)
+        self.highest = RollingMax(right)
+        self.lowest = RollingMin(right)
+        self.tops = np.full((2, n_pivots), np.nan)
+        self.bottoms = np.full((2, n_pivots), np.nan)
+        self.flags = np.full((2, n_pivots), -1, dtype=np.int8)
+        self.tracks = np.full(2, n_pivots, dtype=np.int64)
+
+    def _sources(self, open_, high, low, close):
+        if self.source == 'high_low':
+            return high, low
+        if self.source == 'HA':
+            ha_close = (open_ + high + low + close) / 4
+            ha_open = (open_ + close) / 2 if self.ha is None else (self.ha[0] + self.ha[1]) / 2
+            self.ha = (ha_open, ha_close)
+            open_, close = ha_open, ha_close
+        return max(close, open_), min(close, open_)
+
+    def update(self, open_, high, low, close):
+        src_high, src_low = self._sources(open_, high, low, close)
+        tr = high - low
+        if self.prev_close is not None:
+            tr = max(tr, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        atr = self.atr.update(tr)
+        self.widths.append(float('nan') if atr != atr else min(atr * self.mult, close * (self.max_percent / 100)) / 2)
+        self.src_highs.append(src_high)
+        self.src_lows.append(src_low)
+
+        new_high = new_low = False
+        high_level = low_level = band = float('nan')
+        if len(self.src_highs) == self.src_highs.maxlen:
+            new_high = _window_pivot(self.src_highs, self.left, True)
+            new_low = _window_pivot(self.src_lows, self.left, False)
+            high_level, low_level = self.src_highs[self.left], self.src_lows[self.left]
+        if len(self.widths) == self.widths.maxlen:
+            band = self.widths[0]
+
+        previous_tracks = self.tracks.copy()
+        bullish, total, zone, support, resistance = _zone_step(
+            self.tops, self.bottoms, self.flags, self.tracks, new_high, high_level + band, high_level - band,
+            new_low, low_level + band, low_level - band, self.align, high, low, close)
+        highest = close == self.highest.update(close)
+        lowest = close == self.lowest.update(close)
+        breakout = self.tracks[0] > previous_tracks[0] and highest and bullish == total
+        breakdown = self.tracks[1] < previous_tracks[1] and lowest and bullish == 0
+        return (support, resistance, float(zone), float(bullish), float(total), float(breakout), float(breakdown))
+
+
+# === Backtrader指标 ===
+
+class _BatchIndicator(bt.Indicator):
+    """子类给出输入字段 _fields、批量计算 _compute(*输入数组) 与逐bar的 _update()"""
+    _fields = ('open', 'high', 'low', 'close')
+
+    def _compute(self, *inputs):
+        raise NotImplementedError
+
+    def _update(self):
+        raise NotImplementedError
+
+    def once(self, start, end):
+        fill_from_batch(self, start, end, data_arrays(self.data, end, *self._fields), self._compute)
+
+    def next(self):
+        for line, value in zip(self.lines, self._update()):
+            line[0] = value
+
+
+class PeriodKeyLevels(_BatchIndicator):
+    """
+    日/周/月周期关键位（本周期开盘价、上一周期高低收与经典枢轴）
+
+    用法: levels = PeriodKeyLevels(self.data, period='D')；self.data.close[0] > levels.pivot[0]
+    """
+    alias = ('KeyLevels',)
+    lines = PERIOD_LEVEL_NAMES
+
+    params = (
+        ('period', 'D'),  # 'D' | 'W' | 'M'
+    )
+
+    plotinfo = dict(subplot=False, plotname='Key Levels')
+    _fields = ('datetime', 'open', 'high', 'low', 'close')
+
+    def __init__(self):
+        self._stream = PeriodLevelStream(self.p.period)
+
+    def _compute(self, dt, open_, high, low, close):
+        return period_levels(bt_datetime_ms(dt), open_, high, low, close, period=self.p.period)
+
+    def _update(self):
+        data = self.data
+        return self._stream.update(int(bt_datetime_ms(data.datetime[0])), data.open[0], data.high[0], data.low[0],
+                                   data.close[0])
+
+
+class KeyLevelZones(_BatchIndicator):
+    """
+    Bj_Key_Levels 枢轴区
+
+    用法: zones = KeyLevelZones(self.data)；zones.zone[0] == 1 表示当前bar位于多头区，
+    zones.resistance[0] 为上方最近区的下沿
+    """
+    alias = ('BjKeyLevels',)
+    lines = KEY_ZONE_NAMES
+
+    params = (
+        ('left', 20),  # Look Left
+        ('right', 15),  # Look Right
+        ('n_pivots', 4),  # Number of Pivots
+        ('atr_length', 30),  # ATR Length
+        ('mult', 0.5),  # Zone Width (ATR)
+        ('max_percent', 5.0),  # Max Zone Percent
+        ('source', 'HA'),  # Source For Pivots
+        ('align', True),  # Align Zones
+    )
+
+    plotinfo = dict(subplot=False, plotname='Bj Key Levels')
+    plotlines = dict(zone=dict(_plotskip=True), bullish=dict(_plotskip=True), zones=dict(_plotskip=True),
+                     breakout=dict(_plotskip=True), breakdown=dict(_plotskip=True))
+
+    def __init__(self):
+        self._stream = KeyLevelZoneStream(self.p.left, self.p.right, self.p.n_pivots, self.p.atr_length,
+                                          self.p.mult, self.p.max_percent, self.p.source, self.p.align)
+
+    def _compute(self, open_, high, low, close):
+        return key_level_zones(open_, high, low, close, left=self.p.left, right=self.p.right,
+                               n_pivots=self.p.n_pivots, atr_length=self.p.atr_length, mult=self.p.mult,
+                               max_percent=self.p.max_percent, source=self.p.source, align=self.p.align)
+
+    def _update(self):
+        data = self.data
+        return self._stream.update(data.open[0], data.high[0], data.low[0], data.close[0])
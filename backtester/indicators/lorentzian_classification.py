@@ -0,0 +1,317 @@
+"""
+Lorentzian Classification Indicator
+Lorentzian近邻分类 - pinescript/indicators/ml/ML_Lorentzian_Classification.pine 的Python移植
+
+特征（jdehorty MLExtensions，与Pine原版参数一致）:
+- f1 = n_rsi(close, 14, 1)      RSI/100（Wilder平滑，kernels.rsi）
+- f2 = n_wt(hlc3, 10, 11)       WaveTrend wt1 - wt2，按历史最小/最大值归一化
+- f3 = n_cci(close, 20, 1)      CCI（kernels.cci），按历史最小/最大值归一化
+- f4 = n_adx(high, low, close, 20)  ADX/100（nz() 语义：首根bar的前值按0计）
+- f5 = n_rsi(close, 9, 1)
+标签: close[4] < close → -1，close[4] > close → 1，否则0（与原版相同的方向约定）
+
+近邻搜索见 kernels.knn：特征历史为紧凑的 (bar数, 5) float64 数组，
+numba后端编译循环，每bar只访问 max_bars_back/spacing 个候选，总复杂度 O(n · max_bars_back / spacing)。
+
+- lorentzian_classification_arrays(): 全序列批量计算
+- LorentzianClassificationStream: 逐bar流式版本，近邻历史为 max_bars_back 长的环形缓冲（内存有界）
+- LorentzianClassification: Backtrader指标，输出 prediction / signal 两条line
+"""
+import math
+from collections import deque
+
+import numpy as np
+import backtrader as bt
+try:
+    import kernels
+    from kernels import StreamingState, RollingMean, ExponentialMean
+    from kernels.knn import lorentzian_knn, LorentzianNeighbors
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+    import kernels
+    from kernels import StreamingState, RollingMean, ExponentialMean
+    from kernels.knn import lorentzian_knn, LorentzianNeighbors
+
+from .cache import data_arrays, fill_from_batch
+
+
+FEATURE_NAMES = ('rsi14', 'wt', 'cci20', 'adx20', 'rsi9')
+LABEL_HORIZON = 4
+# MLExtensions.normalize() 的历史极值初值与分母下限
+_HISTORIC_MIN = 10e10
+_HISTORIC_MAX = -10e10
+_RANGE_FLOOR = 10e-10
+
+
+# === 批量特征 ===
+
+def _normalize(values):
+    """MLExtensions.normalize(src, 0, 1)：以截至当前bar的历史极值归一化，NaN不更新极值"""
+    historic_min = np.fmin(np.fmin.accumulate(values), _HISTORIC_MIN)
+    historic_max = np.fmax(np.fmax.accumulate(values), _HISTORIC_MAX)
+    return (values - historic_min) / np.maximum(historic_max - historic_min, _RANGE_FLOOR)
+
+
+def _wavetrend(high, low, close, n1, n2):
+    src = (high + low + close) / 3.0
+    ema1 = kernels.ema(src, n1)
+    ema2 = kernels.ema(np.abs(src - ema1), n1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ci = np.where(ema2 == 0, np.nan, (src - ema1) / (0.015 * ema2))
+    wt1 = kernels.ema(ci, n2)
+    return _normalize(wt1 - kernels.sma(wt1, 4))
+
+
+def _adx(high, low, close, period):
+    """MLExtensions.n_adx：DI递推平滑后对DX做Wilder平滑，缩放到0-1"""
+    prev_high = np.concatenate(([0.0], high[:-1]))
+    prev_low = np.concatenate(([0.0], low[:-1]))
+    prev_close = np.concatenate(([0.0], close[:-1]))
+    tr = np.maximum(np.maximum(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+    up_move = high - prev_high
+    down_move = prev_low - low
+    dm_plus = np.where(up_move > down_move, np.maximum(up_move, 0.0), 0.0)
+    dm_minus = np.where(down_move > up_move, np.maximum(down_move, 0.0), 0.0)
+
+    # S = S[1] - S[1] / period + x（递推写法与原版一致，不改写为EMA形式）
+    smoothed = []
+    for x in (tr, dm_plus, dm_minus):
+        total, out = 0.0, []
+        for value in x.tolist():
+            total = total - total / period + value
+            out.append(total)
+        smoothed.append(np.array(out))
+    s_tr, s_plus, s_minus = smoothed
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        di_plus = s_plus / s_tr * 100
+        di_minus = s_minus / s_tr * 100
+        dx = np.abs(di_plus - di_minus) / (di_plus + di_minus) * 100
+    return kernels.smma(dx, period) / 100.0
+
+
+def lorentzian_features(high, low, close):
+    """
+    五个归一化特征
+
+    Returns:
+        (bar数, 5) float64数组，列顺序见 FEATURE_NAMES，预热期为NaN
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    return np.column_stack((
+        kernels.rsi(close, 14) / 100.0,
+        _wavetrend(high, low, close, 10, 11),
+        _normalize(kernels.cci(close, 20)),
+        _adx(high, low, close, 20),
+        kernels.rsi(close, 9) / 100.0,
+    ))
+
+
+def lorentzian_labels(close, horizon=LABEL_HORIZON):
+    """训练标签：close[horizon] < close → -1，> → 1，否则（含前horizon根）0"""
+    close = np.asarray(close, dtype=np.float64)
+    labels = np.zeros(len(close))
+    past, now = close[:-horizon], close[horizon:]
+    labels[horizon:] = np.where(past < now, -1.0, np.where(past > now, 1.0, 0.0))
+    return labels
+
+
+def _hold_signal(prediction):
+    """prediction > 0 → 1，< 0 → -1，为0时沿用上一根的信号"""
+    direction = np.sign(prediction)
+    last = np.where(direction != 0, np.arange(len(direction)), 0)
+    np.maximum.accumulate(last, out=last)
+    return direction[last]
+
+
+def lorentzian_classification_arrays(high, low, close, neighbors=8, max_bars_back=2000, spacing=4):
+    """
+    Lorentzian分类全序列计算
+
+    Args:
+        high, low, close: 一维float数组
+        neighbors: 近邻数
+        max_bars_back: 回看bar数（之前的bar输出0）
+        spacing: 候选抽样间隔
+
+    Returns:
+        dict: prediction（近邻标签之和）, signal（1 / -1 / 0），以及诊断用的 features
+    """
+    features = lorentzian_features(high, low, close)
+    prediction = lorentzian_knn(features, lorentzian_labels(close), neighbors, max_bars_back, spacing)
+    return {'prediction': prediction, 'signal': _hold_signal(prediction), 'features': features}
+
+
+# === 流式版本 ===
+
+class _HistoricNormalizer(StreamingState):
+    """MLExtensions.normalize(src, 0, 1) 的逐bar版本"""
+    __slots__ = ('lo', 'hi')
+
+    def __init__(self):
+        self.lo = _HISTORIC_MIN
+        self.hi = _HISTORIC_MAX
+
+    def update(self, x):
+        if x != x:
+            return float('nan')
+        self.lo = min(x, self.lo)
+        self.hi = max(x, self.hi)
+        return (x - self.lo) / max(self.hi - self.lo, _RANGE_FLOOR)
+
+
+class _RSIState(StreamingState):
+    __slots__ = ('up', 'down')
+
+    def __init__(self, period):
+        self.up = ExponentialMean(period, 1.0 / period)
+        self.down = ExponentialMean(period, 1.0 / period)
+
+    def update(self, change):
+        up = self.up.update(max(change, 0.0) if change == change else change)
+        down = self.down.update(-min(change, 0.0) if change == change else change)
+        if down == 0:
+            return 1.0
+        if up == 0:
+            return 0.0
+        return (100.0 - 100.0 / (1.0 + up / down)) / 100.0
+
+
+class LorentzianFeatureStream(StreamingState):
+    """五个归一化特征的逐bar递推，与 lorentzian_features() 一致（浮点误差内）"""
+    __slots__ = ('rsi14', 'rsi9', 'wt_ema1', 'wt_ema2', 'wt1', 'wt2', 'wt_norm',
+                 'cci_mean', 'cci_window', 'cci_norm', 's_tr', 's_plus', 's_minus', 'adx',
+                 'prev_high', 'prev_low', 'prev_close')
+
+    def __init__(self):
+        self.rsi14 = _RSIState(14)
+        self.rsi9 = _RSIState(9)
+        self.wt_ema1 = ExponentialMean(10)
+        self.wt_ema2 = ExponentialMean(10)
+        self.wt1 = ExponentialMean(11)
+        self.wt2 = RollingMean(4)
+        self.wt_norm = _HistoricNormalizer()
+        self.cci_mean = RollingMean(20)
+        self.cci_window = deque(maxlen=20)
+        self.cci_norm = _HistoricNormalizer()
+        self.s_tr = 0.0
+        self.s_plus = 0.0
+        self.s_minus = 0.0
+        self.adx = ExponentialMean(20, 1.0 / 20)
+        self.prev_high = None
+        self.prev_low = None
+        self.prev_close = None
+
+    def push(self, high, low, close):
+        """推进一根bar，返回5个特征的元组（顺序见 FEATURE_NAMES）"""
+        nan = float('nan')
+        change = close - self.prev_close if self.prev_close is not None else nan
+
+        # n_wt
+        src = (high + low + close) / 3.0
+        ema1 = self.wt_ema1.update(src)
+        ema2 = self.wt_ema2.update(abs(src - ema1))
+        ci = (src - ema1) / (0.015 * ema2) if ema2 != 0 else nan
+        wt1 = self.wt1.update(ci)
+        wt = self.wt_norm.update(wt1 - self.wt2.update(wt1))
+
+        # n_cci
+        mean = self.cci_mean.update(close)
+        self.cci_window.append(close)
+        dev = math.fsum(abs(v - mean) for v in self.cci_window) / 20 if mean == mean else nan
+        cci = self.cci_norm.update((close - mean) / (0.015 * dev) if dev != 0 else nan)
+
+        # n_adx（nz(x[1]) 首根bar按0计）
+        prev_high = self.prev_high if self.prev_high is not None else 0.0
+        prev_low = self.prev_low if self.prev_low is not None else 0.0
+        prev_close = self.prev_close if self.prev_close is not None else 0.0
+        tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        up_move = high - prev_high
+        down_move = prev_low - low
+        self.s_tr = self.s_tr - self.s_tr / 20 + tr
+        self.s_plus = self.s_plus - self.s_plus / 20 + (max(up_move, 0.0) if up_move > down_move else 0.0)
+        self.s_minus = self.s_minus - self.s_minus / 20 + (max(down_move, 0.0) if down_move > up_move else 0.0)
+        di_plus = self.s_plus / self.s_tr * 100 if self.s_tr != 0 else nan
+        di_minus = self.s_minus / self.s_tr * 100 if self.s_tr != 0 else nan
+        di_sum = di_plus + di_minus
+        dx = abs(di_plus - di_minus) / di_sum * 100 if di_sum != 0 else nan
+        adx = self.adx.update(dx) / 100.0
+
+        self.prev_high, self.prev_low, self.prev_close = high, low, close
+        return (self.rsi14.update(change), wt, cci, adx, self.rsi9.update(change))
+
+
+class LorentzianClassificationStream(StreamingState):
+    """
+    Lorentzian分类逐bar状态（实盘收盘信号服务）
+
+    近邻历史为容量 max_bars_back 的环形缓冲，内存与运行时长无关；
+    to_state() 导出JSON兼容的状态，from_state() 恢复后继续推进结果逐位一致。
+    """
+    __slots__ = ('features', 'neighbors', 'closes', 'signal')
+
+    def __init__(self, neighbors=8, max_bars_back=2000, spacing=4):
+        self.features = LorentzianFeatureStream()
+        self.neighbors = LorentzianNeighbors(len(FEATURE_NAMES), neighbors, max_bars_back, spacing)
+        self.closes = deque(maxlen=LABEL_HORIZON + 1)
+        self.signal = 0.0
+
+    def push(self, high, low, close):
+        """
+        推进一根bar
+
+        Returns:
+            (prediction, signal)
+        """
+        features = self.features.push(high, low, close)
+        self.closes.append(close)
+        label = 0.0
+        if len(self.closes) > LABEL_HORIZON:
+            past = self.closes[0]
+            label = -1.0 if past < close else 1.0 if past > close else 0.0
+        prediction = self.neighbors.update(features, label)
+        if prediction > 0:
+            self.signal = 1.0
+        elif prediction < 0:
+            self.signal = -1.0
+        return prediction, self.signal
+
+    def update(self, bar):
+        """推进一根已收盘bar，bar 为含 high/low/close 键的映射，返回 {'prediction', 'signal'}"""
+        prediction, signal = self.push(bar['high'], bar['low'], bar['close'])
+        return {'prediction': prediction, 'signal': signal}
+
+
+class LorentzianClassification(bt.Indicator):
+    """
+    Lorentzian Classification（Pine原版移植）
+
+    max_bars_back 根之前 prediction/signal 为0（与原版一致）。
+    """
+    alias = ('LorentzianKNN',)
+    lines = ('prediction', 'signal')
+
+    params = (
+        ('neighbors', 8),  # Neighbors Count
+        ('max_bars_back', 2000),  # Max Bars Back
+        ('spacing', 4),  # 候选抽样间隔
+    )
+
+    plotinfo = dict(subplot=True, plotname='Lorentzian Classification')
+
+    def __init__(self):
+        self._stream = LorentzianClassificationStream(self.p.neighbors, self.p.max_bars_back, self.p.spacing)
+
+    def once(self, start, end):
+        fill_from_batch(self, start, end, data_arrays(self.data, end, 'high', 'low', 'close'),
+                        lambda high, low, close: lorentzian_classification_arrays(
+                            high, low, close, self.p.neighbors, self.p.max_bars_back, self.p.spacing))
+
+    def next(self):
+        prediction, signal = self._stream.push(self.data.high[0], self.data.low[0], self.data.close[0])
+        self.lines.prediction[0] = prediction
+        self.lines.signal[0] = signal
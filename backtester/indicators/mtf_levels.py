@@ -0,0 +1,371 @@
+"""
+Multi-Timeframe Level Engine
+多周期水平位引擎 - 由基础周期数据直接得到高周期的前高前低与支撑阻力区，无需另外加载4h/1d文件
+
+对应的Pine脚本（仓库根目录 pinescript/）:
+- Breakout Detector (Previous MTF High Low Levels) [LuxAlgo]: 上一个高周期的最高/最低价，
+  以及本周期内收盘价首次突破前高（跌破前低）的信号
+- Support and Resistance Signals MTF [LuxAlgo]: 高周期枢轴的支撑/阻力区
+  （阻力区 [ph × (1 - m × 0.17 × margin), ph]，支撑区 [pl, pl × (1 + m × 0.17 × margin)]，
+   m = (最高 - 最低) / 最高，取确认bar的 length 根窗口）
+
+重采样（向量化，无前视）:
+- 按 open_time 将基础bar分桶（UTC对齐，周线从周一开始），np.maximum.reduceat / np.minimum.reduceat 得到高周期OHLC
+- 高周期bar的结果从下一个高周期的第一根基础bar起生效
+  （即 request.security(..., x[1], lookahead=barmerge.lookahead_on) 的不重绘写法），再前向填充到基础bar
+
+支撑阻力区只移植区间本身与合并规则（新枢轴落在最近两个同向区的容差带内时沿用旧区），
+不含原版的测试/回踩/流动性扫单状态机。
+
+- resample_frame(): 基础周期DataFrame重采样为高周期OHLCV DataFrame（如运行脚本由小时数据得到日线数据源）
+- mtf_levels(): 多个高周期的全部水平位，按数据内容哈希缓存（同一数据集只计算一次）
+- MTFLevelStream: 单个高周期的逐bar流式版本
+- MTFLevels: Backtrader指标（单个高周期）
+"""
+import re
+from collections import OrderedDict, deque
+
+import numpy as np
+import pandas as pd
+import backtrader as bt
+try:
+    from kernels import pivot_bars
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+    from kernels import pivot_bars
+
+from .cache import data_arrays, fill_from_batch, hash_arrays
+
+
+DEFAULT_TIMEFRAMES = ('4h', '1d', '1w')
+LEVEL_NAMES = ('prev_high', 'prev_low', 'break_up', 'break_down',
+               'resistance_top', 'resistance_bottom', 'support_top', 'support_bottom')
+
+_UNIT_MS = {'m': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}
+# 1970-01-01 为周四，周线从周一 00:00 UTC 开始
+_WEEK_OFFSET_MS = 4 * 86_400_000
+# Backtrader日期数值（天）中 1970-01-01 对应的值
+_BT_EPOCH = 719163.0
+_MEMO_SIZE = 32
+_memo = OrderedDict()
+
+
+def timeframe_ms(timeframe):
+    """'15m' / '4h' / '1d' / '1w'（亦接受 Pine 写法 'D' / 'W' / '240'）→ 毫秒"""
+    match = re.fullmatch(r'(\d*)([mhdwMHDW]?)', str(timeframe).strip())
+    if not match or not (match.group(1) or match.group(2)):
+        raise ValueError(f"无法解析的时间框架: {timeframe}")
+    count = int(match.group(1) or 1)
+    unit = match.group(2).lower() or 'm'
+    return count * _UNIT_MS[unit]
+
+
+def period_index(open_time, timeframe):
+    """每根基础bar所属的高周期编号"""
+    open_time = np.asarray(open_time, dtype=np.int64)
+    ms = timeframe_ms(timeframe)
+    offset = _WEEK_OFFSET_MS if ms % _UNIT_MS['w'] == 0 else 0
+    return (open_time - offset) // ms
+
+
+def _check_timeframe(open_time, timeframe):
+    if len(open_time) > 1:
+        base = int(np.median(np.diff(open_time)))
+        if timeframe_ms(timeframe) < base:
+            raise ValueError(f"高周期 {timeframe} 小于数据周期（{base // 60_000} 分钟）")
+
+
+def group_periods(periods, open_, high, low, close):
+    """
+    按周期编号分组聚合（periods 为每根基础bar的周期编号，相邻bar编号相同即同一周期）
+
+    Returns:
+        dict: open / high / low / close（每个周期一项），first / last（每个周期的首末基础bar下标），
+              group（每根基础bar所属周期序号）
+    """
+    periods = np.asarray(periods)
+    new_period = np.empty(len(periods), dtype=bool)
+    new_period[:1] = True
+    new_period[1:] = periods[1:] != periods[:-1]
+    first = np.flatnonzero(new_period)
+    last = np.r_[first[1:] - 1, len(periods) - 1]
+    high, low = np.asarray(high, dtype=np.float64), np.asarray(low, dtype=np.float64)
+    return {
+        'open': np.asarray(open_, dtype=np.float64)[first],
+        'high': np.maximum.reduceat(high, first) if len(first) else high[:0],
+        'low': np.minimum.reduceat(low, first) if len(first) else low[:0],
+        'close': np.asarray(close, dtype=np.float64)[last],
+        'first': first,
+        'last': last,
+        'group': np.cumsum(new_period) - 1,
+    }
+
+
+def resample_bars(open_time, open_, high, low, close, timeframe):
+    """
+    基础bar → 高周期OHLC（数据中缺失的bar不补齐，首个高周期可能不完整）
+
+    Returns:
+        dict: open_time / open / high / low / close（高周期数组），
+              first / last（每个高周期的首末基础bar下标），group（每根基础bar所属高周期序号）
+    """
+    open_time = np.asarray(open_time, dtype=np.int64)
+    periods = period_index(open_time, timeframe)
+    bars = group_periods(periods, open_, high, low, close)
+    ms = timeframe_ms(timeframe)
+    offset = _WEEK_OFFSET_MS if ms % _UNIT_MS['w'] == 0 else 0
+    bars['open_time'] = periods[bars['first']] * ms + offset
+    return bars
+
+
+def resample_frame(df, timeframe='1d'):
+    """
+    基础周期OHLCV DataFrame → 高周期OHLCV DataFrame（同一数据内容只计算一次）
+
+    索引为高周期开盘时间，与仓库中的高周期数据文件同口径（如 1d 文件的 open_time），
+    可直接作为 bt.feeds.PandasData 的数据源替代单独加载的高周期文件。
+
+    Args:
+        df: DatetimeIndex（UTC，bar开盘时间）+ open / high / low / close 列，volume 可选
+        timeframe: 高周期（须不小于数据周期）
+
+    Returns:
+        DataFrame: open / high / low / close / volume（成交量为周期内求和）
+    """
+    open_time = df.index.values.astype('datetime64[ms]').astype(np.int64)
+    columns = [df[name].to_numpy(dtype=np.float64) for name in ('open', 'high', 'low', 'close')]
+    volume = df['volume'].to_numpy(dtype=np.float64) if 'volume' in df.columns else np.zeros(len(df))
+    key = ('frame', hash_arrays(open_time, volume, *columns), timeframe_ms(timeframe))
+    cached = _memo.get(key)
+    if cached is not None:
+        _memo.move_to_end(key)
+        return cached.copy()
+
+    _check_timeframe(open_time, timeframe)
+    bars = resample_bars(open_time, *columns, timeframe)
+    frame = pd.DataFrame({
+        'open': bars['open'], 'high': bars['high'], 'low': bars['low'], 'close': bars['close'],
+        'volume': np.add.reduceat(volume, bars['first']) if len(volume) else volume,
+    }, index=pd.DatetimeIndex(pd.to_datetime(bars['open_time'], unit='ms'), name=df.index.name))
+    _memo[key] = frame
+    while len(_memo) > _MEMO_SIZE:
+        _memo.popitem(last=False)
+    return frame.copy()
+
+
+def bt_datetime_ms(values):
+    """Backtrader日期数值（天）→ 毫秒时间戳"""
+    return np.round((np.asarray(values) - _BT_EPOCH) * 86_400_000).astype(np.int64)
+
+
+def _first_in_group(condition, group):
+    """每组中条件首次成立的bar"""
+    hits = pd.Series(condition.astype(np.int64)).groupby(group).cumsum().to_numpy()
+    return condition & (hits == 1)
+
+
+def _zone_ratio(high, low, length):
+    """S/R区宽度系数 m = (最高 - 最低) / 最高（length根窗口）"""
+    highest = pd.Series(high).rolling(length).max().to_numpy()
+    lowest = pd.Series(low).rolling(length).min().to_numpy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (highest - lowest) / highest
+
+
+def _in_band(level, zone, margin):
+    top, bottom, ratio = zone
+    return bottom * (1 - ratio * .17 * margin) <= level <= top * (1 + ratio * .17 * margin)
+
+
+def _merge_zone(zones, level, ratio, margin, resistance):
+    """
+    新枢轴 → 是否生成新区：落在最近两个同向区的容差带内时沿用旧区
+
+    zones: 最近两个区 [(top, bottom, ratio), ...]，新区在前
+    """
+    if any(_in_band(level, zone, margin) for zone in zones):
+        return False
+    width = level * ratio * .17 * margin
+    zone = (level, level - width, ratio) if resistance else (level + width, level, ratio)
+    zones.insert(0, zone)
+    del zones[2:]
+    return True
+
+
+def sr_zones(high, low, length=15, margin=2.0):
+    """
+    高周期bar上的支撑/阻力区（截至每根高周期bar收盘时最新的区）
+
+    Returns:
+        dict: resistance_top / resistance_bottom / support_top / support_bottom（高周期数组，未形成前为NaN）
+    """
+    high, low = np.asarray(high, dtype=np.float64), np.asarray(low, dtype=np.float64)
+    n = len(high)
+    ratio = _zone_ratio(high, low, length)
+    out = {name: np.full(n, np.nan) for name in LEVEL_NAMES[4:]}
+    for resistance, values in ((True, high), (False, low)):
+        prefix = 'resistance' if resistance else 'support'
+        zones = []
+        for pivot in pivot_bars(values, length, length, resistance):
+            confirm = pivot + length
+            if ratio[confirm] != ratio[confirm]:
+                continue
+            if _merge_zone(zones, values[pivot], ratio[confirm], margin, resistance):
+                out[f'{prefix}_top'][confirm] = zones[0][0]
+                out[f'{prefix}_bottom'][confirm] = zones[0][1]
+        for name in (f'{prefix}_top', f'{prefix}_bottom'):
+            out[name] = pd.Series(out[name]).ffill().to_numpy()
+    return out
+
+
+def _levels(open_time, high, low, close, timeframe, sr_length, sr_margin):
+    _check_timeframe(open_time, timeframe)
+    htf = resample_bars(open_time, close, high, low, close, timeframe)
+    group = htf['group']
+    # 高周期 j 的结果从第 j+1 个高周期的首根基础bar起可见
+    visible = lambda values: np.r_[np.nan, values][group]  # noqa: E731
+    prev_high, prev_low = visible(htf['high']), visible(htf['low'])
+    out = {'prev_high': prev_high, 'prev_low': prev_low,
+           'break_up': _first_in_group(close > prev_high, group).astype(np.float64),
+           'break_down': _first_in_group(close < prev_low, group).astype(np.float64)}
+    for name, values in sr_zones(htf['high'], htf['low'], sr_length, sr_margin).items():
+        out[name] = visible(values)
+    return out
+
+
+def mtf_levels(open_time, high, low, close, timeframes=DEFAULT_TIMEFRAMES, sr_length=15, sr_margin=2.0):
+    """
+    多个高周期的水平位（同一数据内容 + 参数只计算一次，结果数组只读）
+
+    Args:
+        open_time: 基础bar开盘时间（毫秒）
+        high, low, close: 一维float数组
+        timeframes: 高周期列表（须不小于数据周期）
+        sr_length: S/R枢轴长度（Detection Length，按高周期bar计）
+        sr_margin: Support Resistance Margin
+
+    Returns:
+        {时间框架: {LEVEL_NAMES中的名称: 基础bar数组}}
+            prev_high / prev_low: 上一个高周期的最高/最低价
+            break_up / break_down: 本高周期内收盘价首次高于前高 / 低于前低（1/0）
+            resistance_* / support_*: 最近的阻力区、支撑区上下沿
+    """
+    open_time = np.asarray(open_time, dtype=np.int64)
+    high, low, close = (np.ascontiguousarray(x, dtype=np.float64) for x in (high, low, close))
+    timeframes = tuple(timeframes)
+    key = (hash_arrays(open_time, high, low, close), timeframes, sr_length, sr_margin)
+    cached = _memo.get(key)
+    if cached is not None:
+        _memo.move_to_end(key)
+        return cached
+
+    result = {}
+    for timeframe in timeframes:
+        levels = _levels(open_time, high, low, close, timeframe, sr_length, sr_margin)
+        for values in levels.values():
+            values.flags.writeable = False
+        result[timeframe] = levels
+    _memo[key] = result
+    while len(_memo) > _MEMO_SIZE:
+        _memo.popitem(last=False)
+    return result
+
+
+class MTFLevelStream:
+    """
+    单个高周期的逐bar水平位（与 mtf_levels() 一致）
+
+    update(open_time, high, low, close) 返回 LEVEL_NAMES 顺序的元组
+    """
+    __slots__ = ('timeframe', 'sr_length', 'sr_margin', 'period', 'period_high', 'period_low',
+                 'prev_high', 'prev_low', 'crossed_up', 'crossed_down', 'highs', 'lows',
+                 'resistance', 'support', 'zones')
+
+    def __init__(self, timeframe='1d', sr_length=15, sr_margin=2.0):
+        timeframe_ms(timeframe)
+        self.timeframe = timeframe
+        self.sr_length = sr_length
+        self.sr_margin = sr_margin
+        self.period = None
+        self.period_high = self.period_low = float('nan')
+        self.prev_high = self.prev_low = float('nan')
+        self.crossed_up = self.crossed_down = False
+        self.highs = deque(maxlen=2 * sr_length + 1)
+        self.lows = deque(maxlen=2 * sr_length + 1)
+        self.resistance = []
+        self.support = []
+        self.zones = [float('nan')] * 4
+
+    def _close_period(self):
+        """高周期bar收盘：前高前低与S/R区在下一个高周期生效"""
+        self.prev_high, self.prev_low = self.period_high, self.period_low
+        self.highs.append(self.period_high)
+        self.lows.append(self.period_low)
+        length = self.sr_length
+        if len(self.highs) < 2 * length + 1:
+            return
+        recent_high, recent_low = max(list(self.highs)[-length:]), min(list(self.lows)[-length:])
+        ratio = (recent_high - recent_low) / recent_high if recent_high != 0 else float('nan')
+        if ratio != ratio:
+            return
+        for resistance, window, zones, slot in ((True, self.highs, self.resistance, 0),
+                                                (False, self.lows, self.support, 2)):
+            center = window[length]
+            others = [v for k, v in enumerate(window) if k != length]
+            if center == center and all((v < center) if resistance else (v > center) for v in others):
+                if _merge_zone(zones, center, ratio, self.sr_margin, resistance):
+                    self.zones[slot], self.zones[slot + 1] = zones[0][0], zones[0][1]
+
+    def update(self, open_time, high, low, close):
+        period = int(period_index(np.array([open_time]), self.timeframe)[0])
+        if period != self.period:
+            if self.period is not None:
+                self._close_period()
+            self.period = period
+            self.period_high, self.period_low = high, low
+            self.crossed_up = self.crossed_down = False
+        else:
+            self.period_high = max(self.period_high, high)
+            self.period_low = min(self.period_low, low)
+
+        break_up = close > self.prev_high and not self.crossed_up
+        break_down = close < self.prev_low and not self.crossed_down
+        self.crossed_up |= break_up
+        self.crossed_down |= break_down
+        return (self.prev_high, self.prev_low, float(break_up), float(break_down), *self.zones)
+
+
+class MTFLevels(bt.Indicator):
+    """
+    单个高周期的前高前低、首次突破信号与支撑阻力区（数据周期须不大于 timeframe）
+
+    用法: levels = MTFLevels(self.data, timeframe='1d')；levels.prev_high[0]、levels.break_up[0]
+    """
+    alias = ('PreviousPeriodLevels',)
+    lines = LEVEL_NAMES
+
+    params = (
+        ('timeframe', '1d'),
+        ('sr_length', 15),  # Detection Length（高周期bar数）
+        ('sr_margin', 2.0),  # Support Resistance Margin
+    )
+
+    plotinfo = dict(subplot=False, plotname='MTF Levels')
+    plotlines = dict(break_up=dict(_plotskip=True), break_down=dict(_plotskip=True))
+
+    def __init__(self):
+        self._stream = MTFLevelStream(self.p.timeframe, self.p.sr_length, self.p.sr_margin)
+
+    def once(self, start, end):
+        fill_from_batch(self, start, end, data_arrays(self.data, end, 'datetime', 'high', 'low', 'close'),
+                        lambda dt, high, low, close: mtf_levels(
+                            bt_datetime_ms(dt), high, low, close, (self.p.timeframe,), self.p.sr_length,
+                            self.p.sr_margin)[self.p.timeframe])
+
+    def next(self):
+        open_time = int(bt_datetime_ms(self.data.datetime[0]))
+        values = self._stream.update(open_time, self.data.high[0], self.data.low[0], self.data.close[0])
+        for line, value in zip(self.lines, values):
+            line[0] = value
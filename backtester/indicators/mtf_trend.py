@@ -0,0 +1,231 @@
+"""
+Multi-Timeframe Trend Score
+多周期趋势评分 - Four Swords v2.0 MTF 的 15m / 1h / 4h EMA(20) > EMA(50) 加权评分，由基础周期数据直接得到
+
+对应的Pine脚本: pinescript/strategies/oscillator/Four_Swords_Swing_Strategy_v2_0_MTF.pine
+    float_mtf4h = request.security(syminfo.tickerid, "240", ta.ema(close, 20) > ta.ema(close, 50) ? 1.0 : 0.0) * 0.5
+
+对齐（向量化，严格使用已收盘的高周期bar，无前视）:
+- 按 open_time 将基础bar分桶（同 mtf_levels.period_index），高周期收盘价为桶内最后一根基础bar的收盘价，
+  在高周期收盘价序列上计算 EMA（kernels.ema）
+- 高周期bar在"收盘时刻"所在的基础bar上生效: 基础bar的收盘时间（open_time + 数据周期）到达高周期结束时间时即为该bar，
+  数据缺失导致桶内最后一根bar未到结束时间时，推迟到下一个高周期的首根基础bar；其后前向填充
+- 不大于数据周期的档位（如2h数据上的15m / 1h）即为数据本身的逐bar趋势
+- 慢速EMA未完成预热、或首个高周期bar尚未收盘时，该档趋势为NaN，评分为NaN（不放行）
+
+- mtf_trend_score(): 全部档位的多头 / 空头评分与各档趋势，按数据内容哈希缓存（同一数据集只计算一次）
+- MTFTrendStream: 逐bar流式版本
+- MTFTrendScore: Backtrader指标，输出多头 / 空头评分与各档趋势
+"""
+from collections import OrderedDict
+
+import numpy as np
+import backtrader as bt
+
+from .cache import data_arrays, fill_from_batch, hash_arrays
+from .mtf_levels import _UNIT_MS, _WEEK_OFFSET_MS, bt_datetime_ms, group_periods, period_index, timeframe_ms
+
+try:
+    import kernels
+    from kernels import ExponentialMean
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+    import kernels
+    from kernels import ExponentialMean
+
+
+DEFAULT_TIMEFRAMES = ('15m', '1h', '4h')
+DEFAULT_WEIGHTS = (0.2, 0.3, 0.5)
+SCORE_NAMES = ('score', 'bear_score')
+_MEMO_SIZE = 32
+_memo = OrderedDict()
+
+
+def _period_end(periods, timeframe):
+    ms = timeframe_ms(timeframe)
+    offset = _WEEK_OFFSET_MS if ms % _UNIT_MS['w'] == 0 else 0
+    return (periods + 1) * ms + offset
+
+
+def base_interval_ms(open_time):
+    """数据周期（相邻bar时间差的中位数，毫秒）；不足2根bar时为0（高周期bar只在下一个高周期开始时确认收盘）"""
+    open_time = np.asarray(open_time, dtype=np.int64)
+    return int(np.median(np.diff(open_time))) if len(open_time) > 1 else 0
+
+
+def closed_period_bars(open_time, timeframe, interval_ms):
+    """
+    每个高周期bar收盘时所在的基础bar下标（最后一个未收盘的高周期为 bar数，即不可见）
+
+    Returns:
+        (periods分组结果 dict, closed_at 下标数组)
+    """
+    open_time = np.asarray(open_time, dtype=np.int64)
+    periods = period_index(open_time, timeframe)
+    bars = group_periods(periods, open_time, open_time, open_time, open_time)
+    last = bars['last']
+    complete = open_time[last] + interval_ms >= _period_end(periods[last], timeframe)
+    return bars, np.where(complete, last, last + 1)
+
+
+def htf_trend(open_time, close, timeframe, fast=20, slow=50, interval_ms=None):
+    """
+    单个高周期的EMA趋势，对齐到基础bar
+
+    Returns:
+        (bull, bear): 基础bar数组，1.0 / 0.0 为最近一根已收盘高周期bar上 EMA(fast) 高于 / 低于 EMA(slow)，
+                      未知时为NaN
+    """
+    open_time = np.asarray(open_time, dtype=np.int64)
+    close = np.asarray(close, dtype=np.float64)
+    if interval_ms is None:
+        interval_ms = base_interval_ms(open_time)
+    bars, closed_at = closed_period_bars(open_time, timeframe, interval_ms)
+    htf_close = close[bars['last']]
+    ema_fast, ema_slow = kernels.ema(htf_close, fast), kernels.ema(htf_close, slow)
+    known = ~(np.isnan(ema_fast) | np.isnan(ema_slow))
+    bull = np.where(known, ema_fast > ema_slow, np.nan)
+    bear = np.where(known, ema_fast < ema_slow, np.nan)
+
+    visible = np.searchsorted(closed_at, np.arange(len(close)), side='right') - 1
+    return tuple(np.r_[np.nan, values][visible + 1] for values in (bull, bear))
+
+
+def _check_weights(timeframes, weights):
+    if len(timeframes) != len(weights):
+        raise ValueError(f"时间框架数量（{len(timeframes)}）与权重数量（{len(weights)}）不一致")
+    for timeframe in timeframes:
+        timeframe_ms(timeframe)
+
+
+def mtf_trend_score(open_time, close, timeframes=DEFAULT_TIMEFRAMES, weights=DEFAULT_WEIGHTS, fast=20, slow=50,
+                    interval_ms=None):
+    """
+    多周期加权趋势评分（同一数据内容 + 参数只计算一次，结果数组只读）
+
+    Args:
+        open_time: 基础bar开盘时间（毫秒）
+        close: 一维float数组
+        timeframes: 各档时间框架（小于等于数据周期的档位即数据本身）
+        weights: 各档权重（Pine: 0.2 / 0.3 / 0.5）
+        fast, slow: EMA周期
+        interval_ms: 数据周期，默认取相邻bar时间差的中位数
+
+    Returns:
+        dict: score（多头档位权重和）、bear_score（空头档位权重和），以及每档的 'bull_<tf>' / 'bear_<tf>'
+    """
+    timeframes, weights = tuple(timeframes), tuple(float(w) for w in weights)
+    _check_weights(timeframes, weights)
+    open_time = np.asarray(open_time, dtype=np.int64)
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    if interval_ms is None:
+        interval_ms = base_interval_ms(open_time)
+    key = (hash_arrays(open_time, close), timeframes, weights, fast, slow, interval_ms)
+    cached = _memo.get(key)
+    if cached is not None:
+        _memo.move_to_end(key)
+        return cached
+
+    result = {'score': np.zeros(len(close)), 'bear_score': np.zeros(len(close))}
+    for timeframe, weight in zip(timeframes, weights):
+        bull, bear = htf_trend(open_time, close, timeframe, fast, slow, interval_ms)
+        result[f'bull_{timeframe}'], result[f'bear_{timeframe}'] = bull, bear
+        result['score'] += weight * bull
+        result['bear_score'] += weight * bear
+    for values in result.values():
+        values.flags.writeable = False
+    _memo[key] = result
+    while len(_memo) > _MEMO_SIZE:
+        _memo.popitem(last=False)
+    return result
+
+
+class _TierState:
+    __slots__ = ('timeframe', 'weight', 'period', 'end', 'last_close', 'closed', 'fast', 'slow', 'bull', 'bear')
+
+    def __init__(self, timeframe, weight, fast, slow):
+        self.timeframe = timeframe
+        self.weight = weight
+        self.period = None
+        self.end = None
+        self.last_close = float('nan')
+        self.closed = False
+        self.fast = ExponentialMean(fast)
+        self.slow = ExponentialMean(slow)
+        self.bull = self.bear = float('nan')
+
+    def close_period(self):
+        fast, slow = self.fast.update(self.last_close), self.slow.update(self.last_close)
+        if fast == fast and slow == slow:
+            self.bull, self.bear = float(fast > slow), float(fast < slow)
+        self.closed = True
+
+
+class MTFTrendStream:
+    """
+    逐bar多周期趋势评分（与 mtf_trend_score() 一致）
+
+    update(open_time, close) 返回 (score, bear_score)；interval_ms 未给出时取前两根bar的时间差
+    """
+    __slots__ = ('tiers', 'interval_ms', 'previous_time')
+
+    def __init__(self, timeframes=DEFAULT_TIMEFRAMES, weights=DEFAULT_WEIGHTS, fast=20, slow=50, interval_ms=None):
+        _check_weights(timeframes, weights)
+        self.tiers = [_TierState(tf, float(w), fast, slow) for tf, w in zip(timeframes, weights)]
+        self.interval_ms = interval_ms
+        self.previous_time = None
+
+    def update(self, open_time, close):
+        open_time = int(open_time)
+        if self.interval_ms is None and self.previous_time is not None:
+            self.interval_ms = open_time - self.previous_time
+        self.previous_time = open_time
+
+        score = bear_score = 0.0
+        for tier in self.tiers:
+            period = int(period_index(np.array([open_time]), tier.timeframe)[0])
+            if period != tier.period:
+                if tier.period is not None and not tier.closed:
+                    tier.close_period()  # 上一个高周期最后一根bar未到结束时间（数据缺失）
+                tier.period = period
+                tier.end = int(_period_end(np.array([period]), tier.timeframe)[0])
+                tier.closed = False
+            tier.last_close = close
+            if not tier.closed and self.interval_ms is not None and open_time + self.interval_ms >= tier.end:
+                tier.close_period()
+            score += tier.weight * tier.bull
+            bear_score += tier.weight * tier.bear
+        return score, bear_score
+
+
+class MTFTrendScore(bt.Indicator):
+    """
+    多周期EMA趋势加权评分（高周期由数据本身聚合，只用已收盘的高周期bar）
+
+    用法: mtf = MTFTrendScore(self.data, timeframes=('15m', '1h', '4h'))；mtf.score[0] >= 0.6
+    """
+    alias = ('MTFScore',)
+    lines = SCORE_NAMES
+
+    params = (
+        ('timeframes', DEFAULT_TIMEFRAMES),
+        ('weights', DEFAULT_WEIGHTS),
+        ('fast', 20),
+        ('slow', 50),
+    )
+
+    plotinfo = dict(subplot=True, plotname='MTF Trend Score')
+
+    def __init__(self):
+        self._stream = MTFTrendStream(self.p.timeframes, self.p.weights, self.p.fast, self.p.slow)
+
+    def once(self, start, end):
+        fill_from_batch(self, start, end, data_arrays(self.data, end, 'datetime', 'close'),
+                        lambda dt, close: mtf_trend_score(bt_datetime_ms(dt), close, self.p.timeframes,
+                                                          self.p.weights, self.p.fast, self.p.slow))
+
+    def next(self):
+        open_time = int(bt_datetime_ms(self.data.datetime[0]))
+        self.lines.score[0], self.lines.bear_score[0] = self._stream.update(open_time, self.data.close[0])
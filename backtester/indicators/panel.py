@@ -0,0 +1,177 @@
+"""
+Aligned Multi-Symbol Panel
+多币种对齐面板 - 一次读取N个币种，按 open_time 外连接成宽表（时间 × 币种），附缺失掩码
+
+用途: 批量回测时多个币种共享同一参考序列（如 crypto 模式下 DojiAshiStrategyV5 市场过滤器的 BTCUSDT），
+参考币种只读取一次，各币种回测从面板中取出与自身时间戳对齐的参考数据，而不是每次另外加载并由
+Backtrader 逐bar同步两个数据源。
+
+布局:
+- open_time: 全部币种 open_time 的并集（升序，毫秒）
+- values[field]: (时间, 币种) float64 数组，缺失处为NaN
+- mask: (时间, 币种) bool 数组，该币种在该时间有bar时为True
+
+对齐（aligned_frame）:
+- 按目标时间戳取参考币种的bar；参考币种在该时间缺失时沿用此前最后一根bar的收盘价
+  （open / high / low = 该收盘价，volume = 0），只向前填充，无前视
+- 目标时间早于参考币种首根bar时为NaN
+- load_panel() 按 (币种, 时间框架, 文件修改时间) 缓存，同一进程内重复调用不重复读取文件
+"""
+import os
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+PANEL_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+_MEMO_SIZE = 4
+_memo = OrderedDict()
+
+
+def _source_path(data_dir, symbol, interval):
+    return os.path.join(data_dir, symbol, interval, f'{symbol}-{interval}-merged.csv')
+
+
+def _to_ms(times):
+    """毫秒整数数组 / DatetimeIndex → 毫秒int64数组"""
+    if isinstance(times, (pd.DatetimeIndex, pd.Series)) or np.asarray(times).dtype.kind == 'M':
+        return np.asarray(times, dtype='datetime64[ms]').astype(np.int64)
+    return np.asarray(times, dtype=np.int64)
+
+
+class SymbolPanel:
+    """按 open_time 外连接的多币种OHLCV宽表"""
+    __slots__ = ('symbols', 'interval', 'open_time', 'values', 'mask', '_columns', '_frames')
+
+    def __init__(self, symbols, interval, open_time, values, mask):
+        self.symbols = tuple(symbols)
+        self.interval = interval
+        self.open_time = open_time
+        self.values = values
+        self.mask = mask
+        self._columns = {symbol: k for k, symbol in enumerate(self.symbols)}
+        self._frames = {}
+
+    @classmethod
+    def from_frames(cls, frames, interval=None):
+        """
+        由 {币种: DataFrame（open_time 列，毫秒）} 构建面板
+
+        每个币种的重复 open_time 只保留第一根，乱序时先排序
+        """
+        symbols = tuple(frames)
+        times = []
+        for symbol in symbols:
+            df = frames[symbol]
+            open_time = df['open_time'].to_numpy(dtype=np.int64)
+            order = np.argsort(open_time, kind='stable')
+            open_time = open_time[order]
+            keep = np.r_[True, open_time[1:] != open_time[:-1]]
+            times.append((open_time[keep], order[keep]))
+
+        open_time = np.unique(np.concatenate([t for t, _ in times])) if times else np.empty(0, dtype=np.int64)
+        shape = (len(open_time), len(symbols))
+        mask = np.zeros(shape, dtype=bool)
+        values = {field: np.full(shape, np.nan) for field in PANEL_FIELDS}
+        for k, (symbol, (symbol_time, rows)) in enumerate(zip(symbols, times)):
+            position = np.searchsorted(open_time, symbol_time)
+            mask[position, k] = True
+            df = frames[symbol]
+            for field in PANEL_FIELDS:
+                if field in df.columns:
+                    values[field][position, k] = df[field].to_numpy(dtype=np.float64)[rows]
+        for array in (mask, *values.values()):
+            array.flags.writeable = False
+        return cls(symbols, interval, open_time, values, mask)
+
+    def column(self, symbol):
+        """币种所在列"""
+        try:
+            return self._columns[symbol]
+        except KeyError:
+            raise ValueError(f"面板中没有币种 {symbol}（已加载: {', '.join(self.symbols)}）") from None
+
+    def gaps(self, symbol):
+        """币种首末bar之间缺失的时间点（毫秒）"""
+        present = self.mask[:, self.column(symbol)]
+        bars = np.flatnonzero(present)
+        if not len(bars):
+            return self.open_time[:0]
+        inside = ~present[bars[0]:bars[-1] + 1]
+        return self.open_time[bars[0]:bars[-1] + 1][inside]
+
+    def frame(self, symbol):
+        """币种自身的bar（不含缺失时间点），DatetimeIndex 可直接作为 bt.feeds.PandasData 数据源"""
+        cached = self._frames.get(symbol)
+        if cached is None:
+            k = self.column(symbol)
+            rows = self.mask[:, k]
+            cached = pd.DataFrame({field: self.values[field][rows, k] for field in PANEL_FIELDS},
+                                  index=pd.DatetimeIndex(pd.to_datetime(self.open_time[rows], unit='ms'),
+                                                         name='datetime'))
+            self._frames[symbol] = cached
+        return cached.copy()
+
+    def aligned_frame(self, symbol, times):
+        """
+        参考币种对齐到目标时间戳（如交易币种的索引），缺失处向前填充收盘价
+
+        Args:
+            symbol: 参考币种（如 'BTCUSDT'）
+            times: 目标时间戳，DatetimeIndex 或毫秒数组
+
+        Returns:
+            DataFrame: open / high / low / close / volume，索引与 times 一一对应
+        """
+        k = self.column(symbol)
+        target = _to_ms(times)
+        bars = np.flatnonzero(self.mask[:, k])
+        # 目标时间之前（含）参考币种最后一根bar
+        last = np.searchsorted(self.open_time[bars], target, side='right') - 1
+        known = last >= 0
+        rows = bars[np.maximum(last, 0)]
+        exact = known & (self.open_time[rows] == target)
+
+        close = np.where(known, self.values['close'][rows, k], np.nan)
+        out = {'close': close}
+        for field in ('open', 'high', 'low'):
+            out[field] = np.where(exact, self.values[field][rows, k], close)
+        out['volume'] = np.where(exact, self.values['volume'][rows, k], np.where(known, 0.0, np.nan))
+        index = times if isinstance(times, pd.DatetimeIndex) else pd.DatetimeIndex(
+            pd.to_datetime(target, unit='ms'), name='datetime')
+        return pd.DataFrame({field: out[field] for field in PANEL_FIELDS}, index=index)
+
+
+def load_panel(symbols, interval='2h', data_dir=DATA_DIR):
+    """
+    读取多个币种的合并CSV并对齐为面板（同一组文件在进程内只读取一次）
+
+    Args:
+        symbols: 币种列表（重复项只读取一次）
+        interval: 时间框架
+        data_dir: 数据目录，文件为 <data_dir>/<symbol>/<interval>/<symbol>-<interval>-merged.csv
+
+    Returns:
+        SymbolPanel
+    """
+    symbols = tuple(dict.fromkeys(symbols))
+    paths = [_source_path(data_dir, symbol, interval) for symbol in symbols]
+    missing = [path for path in paths if not os.path.exists(path)]
+    if missing:
+        raise ValueError(f"数据文件不存在: {', '.join(missing)}")
+
+    key = (symbols, interval, tuple((path, os.path.getmtime(path)) for path in paths))
+    cached = _memo.get(key)
+    if cached is not None:
+        _memo.move_to_end(key)
+        return cached
+
+    frames = {symbol: pd.read_csv(path, usecols=lambda name: name in ('open_time',) + PANEL_FIELDS)
+              for symbol, path in zip(symbols, paths)}
+    panel = SymbolPanel.from_frames(frames, interval)
+    _memo[key] = panel
+    while len(_memo) > _MEMO_SIZE:
+        _memo.popitem(last=False)
+    return panel
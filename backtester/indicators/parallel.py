@@ -0,0 +1,123 @@
+"""
+Parallel Indicator Computation
+多数据集指标并行计算 - 线程池共享内存，批量刷新全部币种 × 时间框架
+
+numba 内核以 nogil=True 编译，squeeze_momentum_arrays() / wavetrend_arrays() 等
+全序列函数的主要耗时在内核与NumPy向量运算中，执行期间释放GIL，因此线程池即可
+跨核并行：输入数组由各线程直接读取，无需像进程池那样pickle复制每个数据集。
+
+用法:
+    datasets = {('BTCUSDT', '2h'): df_btc_2h, ('ETHUSDT', '4h'): df_eth_4h}
+    spec = {
+        'sqzmom': 'sqzmom',
+        'wt_fast': ('wavetrend', dict(n1=6, n2=13)),
+        'atr14': ('atr', dict(period=14)),
+    }
+    results = compute_many(datasets, spec)
+    results[('BTCUSDT', '2h')]['sqzmom']['momentum']
+
+注意:
+- kernels 后端为进程级全局设置，compute_many() 执行期间不要调用 kernels.set_backend()
+- numpy 后端的 EMA/SMMA 为Python循环（持有GIL），线程并行收益主要来自 numba 后端
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+try:
+    import kernels
+except ImportError:
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+    import kernels
+
+from .sqzmom_safe import squeeze_momentum_arrays
+from .wavetrend_safe import wavetrend_arrays
+from .grid import squeeze_momentum_grid, wavetrend_grid
+from .adaptive_supertrend import adaptive_supertrend_arrays
+
+
+def _sma(high, low, close, period):
+    return kernels.sma(close, period)
+
+
+def _ema(high, low, close, period):
+    return kernels.ema(close, period)
+
+
+def _stddev(high, low, close, period):
+    return kernels.stddev(close, period)
+
+
+def _atr(high, low, close, period):
+    return kernels.atr(high, low, close, period)
+
+
+# 可按名称引用的全序列函数，签名统一为 (high, low, close, **params)
+INDICATOR_FUNCTIONS = {
+    'sqzmom': squeeze_momentum_arrays,
+    'wavetrend': wavetrend_arrays,
+    'sqzmom_grid': squeeze_momentum_grid,
+    'wavetrend_grid': wavetrend_grid,
+    'sma': _sma,
+    'ema': _ema,
+    'stddev': _stddev,
+    'atr': _atr,
+    'adaptive_supertrend': adaptive_supertrend_arrays,
+}
+
+
+def dataset_arrays(data):
+    """
+    取出 (high, low, close) 连续float64数组
+
+    Args:
+        data: DataFrame 或含 high/low/close 键的映射；已是float64列时不复制
+    """
+    return tuple(np.ascontiguousarray(np.asarray(data[column], dtype=np.float64))
+                 for column in ('high', 'low', 'close'))
+
+
+def _resolve(entry):
+    """spec 条目 → (函数, 参数)"""
+    if isinstance(entry, tuple):
+        function, params = entry
+    else:
+        function, params = entry, {}
+    if not callable(function):
+        if function not in INDICATOR_FUNCTIONS:
+            raise ValueError(f"未知指标: {function}，可选: {tuple(INDICATOR_FUNCTIONS)}")
+        function = INDICATOR_FUNCTIONS[function]
+    return function, dict(params)
+
+
+def compute_many(datasets, spec, max_workers=None):
+    """
+    在线程池上并行计算 数据集 × 指标
+
+    Args:
+        datasets: {数据集名: DataFrame 或含 high/low/close 的映射}
+        spec: {输出名: 指标名 | (指标名或函数, 参数dict)}；
+              指标名见 INDICATOR_FUNCTIONS，函数签名须为 (high, low, close, **params)
+        max_workers: 线程数，默认 os.cpu_count()；为1时在当前线程顺序计算
+
+    Returns:
+        {数据集名: {输出名: 结果}} - 顺序与输入一致，结果与单独调用对应函数逐位相同
+    """
+    tasks = {key: _resolve(entry) for key, entry in spec.items()}
+    inputs = {name: dataset_arrays(data) for name, data in datasets.items()}
+    max_workers = max_workers or os.cpu_count() or 1
+
+    if max_workers == 1:
+        return {name: {key: function(*arrays, **params) for key, (function, params) in tasks.items()}
+                for name, arrays in inputs.items()}
+
+    # 每个 (数据集, 指标) 一个任务，粒度足够细以均衡负载
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {(name, key): pool.submit(function, *arrays, **params)
+                   for name, arrays in inputs.items()
+                   for key, (function, params) in tasks.items()}
+        results = {name: {} for name in inputs}
+        for (name, key), future in futures.items():
+            results[name][key] = future.result()
+    return results
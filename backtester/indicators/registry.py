@@ -0,0 +1,136 @@
+"""
+Shared Indicator Registry
+指标公共子表达式共享 - 同一Cerebro运行内相同计算只实例化一次
+
+键为 (指标类, 源line, 参数)：
+- 指标类: 别名解析后的类对象（btind.SMA 与 SimpleMovingAverage 为同一键）
+- 源line: 传入的数据源/line对象身份（id）
+- 参数: 合并类默认值后的完整参数表
+
+作用域为一次 cerebro.run() 内的全部策略实例（注册表挂在Cerebro上，
+以 cerebro.runningstrats 列表区分不同运行，参数优化的多次运行互不串用）。
+
+Backtrader自带的 MetaIndicator 对象缓存（usecache）已被官方停用，原因是
+第二个使用者修改minperiod会影响第一个使用者。这里的约束：
+- 共享指标只读，使用者不得对其调用 addminperiod / 修改 plotinfo
+- 复用方不是创建方时，由注册表把共享指标的minperiod并入复用方：
+  指标复用方提升自身lines的minperiod；策略复用方挂一个不计算的引用指标，
+  使策略的minperiod与时钟推导包含该共享指标
+- 共享指标由创建方推进（runonce为 _once，逐bar为 _next），Backtrader按创建
+  顺序运行指标与策略，复用方总在创建方之后，读取时数值已就绪
+"""
+import backtrader as bt
+
+
+class _SharedIndicatorRef(bt.Indicator):
+    """跨策略复用时挂在复用方策略上的引用指标：只提供minperiod与时钟，不做计算"""
+    lines = ('ref',)
+    plotinfo = dict(plot=False)
+
+    def next(self):
+        pass
+
+    def once(self, start, end):
+        pass
+
+
+class IndicatorRegistry:
+    """单次Cerebro运行内的共享指标表"""
+
+    def __init__(self):
+        self._cache = {}
+        self._sources = []  # 持有源line引用，保证id在运行期内不被复用
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(cls, datas, params):
+        resolved = dict(cls.params._getpairs())
+        resolved.update(params)
+        return (cls, tuple(id(data) for data in datas), tuple(sorted(resolved.items())))
+
+    def get(self, owner, cls, *datas, **params):
+        """
+        返回共享指标实例，未命中时创建
+
+        Args:
+            owner: 请求方（策略或指标，通常为调用处的 self）
+            cls: 指标类
+            *datas: 数据源或line，未传入时使用 owner.data
+            **params: 指标参数
+        """
+        if not datas:
+            datas = (owner.data,)
+        key = self.make_key(cls, datas, params)
+        try:
+            entry = self._cache.get(key)
+        except TypeError:
+            # 参数不可哈希时不共享
+            return cls(*datas, **params)
+
+        if entry is None:
+            self.misses += 1
+            indicator = cls(*datas, **params)
+            self._cache[key] = (indicator, owner)
+            self._sources.append(datas)
+            return indicator
+
+        self.hits += 1
+        indicator, creator = entry
+        if owner is not creator:
+            _attach_minperiod(owner, indicator)
+        return indicator
+
+    def summary(self):
+        return {'indicators': len(self._cache), 'hits': self.hits, 'misses': self.misses}
+
+
+def _attach_minperiod(owner, indicator):
+    """把共享指标的minperiod并入复用方"""
+    if isinstance(owner, bt.Strategy):
+        _SharedIndicatorRef(indicator)
+    else:
+        for line in owner.lines:
+            line.updateminperiod(indicator._minperiod)
+
+
+def _find_strategy(owner):
+    obj = owner
+    while obj is not None and not isinstance(obj, bt.Strategy):
+        obj = getattr(obj, '_owner', None)
+    return obj
+
+
+def get_registry(owner):
+    """
+    取得请求方所在Cerebro运行的注册表
+
+    Returns:
+        IndicatorRegistry，不在Cerebro运行中时返回None
+    """
+    strategy = _find_strategy(owner)
+    cerebro = getattr(strategy, 'env', None)
+    runstrats = getattr(cerebro, 'runningstrats', None)
+    if runstrats is None:
+        return None
+
+    scope = getattr(cerebro, '_indicator_registry', None)
+    if scope is None or scope[0] is not runstrats:
+        scope = (runstrats, IndicatorRegistry())
+        cerebro._indicator_registry = scope
+    return scope[1]
+
+
+def shared_indicator(owner, cls, *datas, **params):
+    """
+    按 (指标类, 源line, 参数) 共享指标实例
+
+    用法（策略或指标的 __init__ 内）:
+        self.atr = shared_indicator(self, btind.ATR, self.data, period=14)
+
+    不在Cerebro运行中时退化为直接实例化。
+    """
+    registry = get_registry(owner)
+    if registry is None:
+        return cls(*datas, **params)
+    return registry.get(owner, cls, *datas, **params)
@@ -0,0 +1,575 @@
+"""
+Smart Money Concepts Structure Engine
+聪明钱结构引擎 - pinescript/indicators/structure/Smart_Money_Concepts.pine（LuxAlgo）的线性时间移植
+
+一次从左到右的遍历产生与原版相同的事件（执行顺序同原版每bar的调用顺序）:
+1. 已有FVG的回补（deleteFairValueGaps）
+2. 摆动(50) / 内部(5) / 等高等低(3) 三套枢轴（leg() 与 getCurrentStructure()）
+3. 内部结构、摆动结构的 BOS / CHoCH，同时登记订单块（displayStructure + storeOrdeBlock）
+4. 内部、摆动订单块的失效（deleteOrderBlocks）
+5. 新FVG（图表周期，Auto Threshold）
+
+原版的重复扫描改为摊还O(1)的结构:
+- leg(): ta.highest/lowest 由单调双端队列维护（kernels.RollingMax / RollingMin）
+- 订单块: 原版每次结构突破对 parsedHighs/Lows 从枢轴bar到当前bar切片求极值；
+  这里在枢轴确立时由长度为结构周期的滑动窗口极值初始化，之后每bar O(1) 并入
+- 订单块/FVG失效: 原版每bar遍历全部记录；这里按方向分别放入以失效价为键的堆，
+  每根bar只弹出已被穿越的记录（被容量淘汰的记录惰性删除）
+记录为 __slots__ 类，事件输出为结构化数组（bar, kind, scope, bias, top, bottom, anchor），
+可直接做向量化过滤（见 event_signal()）。
+
+与原版的差异:
+- 原版以 for [index, x] in arr 遍历订单块/FVG并 arr.remove(index)，被删记录之后的一条前移到当前下标而在本bar被跳过，
+  这里同一根bar上所有满足条件的记录都会失效（只影响失效事件的bar，差异数量见 test_smart_money_concepts.py）
+- 只移植结构与信号（摆动/内部结构、订单块、EQH/EQL、FVG、强弱高低点），不含绘图与多周期水平线
+- 与 na 的比较（含 !=）一律为False
+"""
+import heapq
+from collections import deque
+
+import numpy as np
+import backtrader as bt
+try:
+    from kernels import RollingMax, RollingMin, ExponentialMean
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+    from kernels import RollingMax, RollingMin, ExponentialMean
+
+from .cache import data_arrays, fill_from_batch
+
+
+BULLISH = 1
+BEARISH = -1
+
+# 事件类型
+PIVOT_HIGH = 0
+PIVOT_LOW = 1
+BOS = 2
+CHOCH = 3
+EQUAL_HIGHS = 4
+EQUAL_LOWS = 5
+ORDER_BLOCK = 6
+ORDER_BLOCK_MITIGATED = 7
+FAIR_VALUE_GAP = 8
+FAIR_VALUE_GAP_MITIGATED = 9
+EVENT_NAMES = ('pivot_high', 'pivot_low', 'bos', 'choch', 'equal_highs', 'equal_lows',
+               'order_block', 'order_block_mitigated', 'fair_value_gap', 'fair_value_gap_mitigated')
+
+# 事件所属结构
+SWING = 0
+INTERNAL = 1
+EQUAL = 2
+CHART = 3  # FVG（图表周期）
+
+# bar: 事件发生的bar；anchor: 事件引用的bar（枢轴bar、订单块K线、FVG中间K线）
+# 价格区间: 枢轴/BOS/CHoCH 为单一价位（top == bottom）；EQH/EQL 为两个枢轴价；订单块/FVG 为区间上下沿
+EVENT_DTYPE = np.dtype([('bar', np.int64), ('kind', np.int8), ('scope', np.int8), ('bias', np.int8),
+                        ('top', np.float64), ('bottom', np.float64), ('anchor', np.int64)])
+
+ATR_FILTER = 'atr'
+RANGE_FILTER = 'range'
+HIGHLOW_MITIGATION = 'highlow'
+CLOSE_MITIGATION = 'close'
+MAX_ORDER_BLOCKS = 100
+
+
+def _pine_ne(x, y):
+    # Pine中与na的比较恒为False
+    return x == x and y == y and x != y
+
+
+class Pivot:
+    """当前枢轴（原版 pivot UDT）"""
+    __slots__ = ('level', 'last_level', 'crossed', 'bar')
+
+    def __init__(self):
+        self.level = float('nan')
+        self.last_level = float('nan')
+        self.crossed = False
+        self.bar = -1
+
+
+class OrderBlock:
+    """订单块（原版 orderBlock UDT）；serial 为登记顺序，active 为False表示已失效或被淘汰"""
+    __slots__ = ('bar', 'high', 'low', 'bias', 'scope', 'serial', 'active')
+
+    def __init__(self, bar, high, low, bias, scope, serial):
+        self.bar = bar
+        self.high = high
+        self.low = low
+        self.bias = bias
+        self.scope = scope
+        self.serial = serial
+        self.active = True
+
+
+class FairValueGap:
+    """FVG（原版 fairValueGap UDT），top/bottom 沿用原版字段含义"""
+    __slots__ = ('bar', 'top', 'bottom', 'bias', 'serial')
+
+    def __init__(self, bar, top, bottom, bias, serial):
+        self.bar = bar
+        self.top = top
+        self.bottom = bottom
+        self.bias = bias
+        self.serial = serial
+
+
+class _WindowExtreme:
+    """最近 period 根bar的极值及其下标（并列取最早者，同 array.indexof）"""
+    __slots__ = ('period', 'sign', 'queue')
+
+    def __init__(self, period, sign):
+        self.period = period
+        self.sign = sign
+        self.queue = deque()
+
+    def push(self, bar, key, high, low):
+        queue = self.queue
+        value = key * self.sign
+        while queue and queue[-1][0] < value:
+            queue.pop()
+        queue.append((value, bar, high, low))
+        while queue[0][1] <= bar - self.period:
+            queue.popleft()
+
+    def get(self):
+        """(下标, parsed high, parsed low)"""
+        _, bar, high, low = self.queue[0]
+        return bar, high, low
+
+
+class _Structure:
+    """一套枢轴（leg() 状态 + 高/低枢轴）及其订单块候选"""
+    __slots__ = ('size', 'leg', 'highs', 'lows', 'rolling_high', 'rolling_low', 'high', 'low',
+                 'window_max', 'window_min', 'since_low_max', 'since_high_min',
+                 'seen_high', 'seen_low', 'trend', 'blocks', 'bearish_heap', 'bullish_heap', 'active_blocks')
+
+    def __init__(self, size, order_blocks):
+        self.size = size
+        self.leg = None
+        self.highs = deque(maxlen=size + 1)
+        self.lows = deque(maxlen=size + 1)
+        self.rolling_high = RollingMax(size)
+        self.rolling_low = RollingMin(size)
+        self.high = Pivot()
+        self.low = Pivot()
+        self.seen_high = float('nan')
+        self.seen_low = float('nan')
+        self.trend = 0
+        if order_blocks:
+            self.window_max = _WindowExtreme(size, 1)
+            self.window_min = _WindowExtreme(size, -1)
+            self.since_low_max = None
+            self.since_high_min = None
+            self.blocks = deque()
+            self.bearish_heap = []
+            self.bullish_heap = []
+            self.active_blocks = 0
+        else:
+            self.window_max = None
+
+
+class SmartMoneyEngine:
+    """
+    逐bar结构引擎，push() 返回当根bar产生的事件元组列表（字段顺序同 EVENT_DTYPE）
+
+    参数与原版输入对应:
+        swing_length: Swing Structure 长度（swingsLengthInput）
+        internal_length: 内部结构长度（原版固定为5）
+        equal_length / equal_threshold: EQH/EQL Bars Confirmation / Threshold（× ATR(200)）
+        order_block_filter: 'atr'（ATR(200)）| 'range'（累计平均真实波幅），高波动K线的高低点互换
+        order_block_mitigation: 'highlow' | 'close'
+        confluence_filter: 内部结构 Confluence Filter
+        fvg_auto_threshold: FVG Auto Threshold
+    """
+    __slots__ = ('equal_threshold', 'order_block_filter', 'close_mitigation', 'confluence_filter',
+                 'fvg_auto_threshold', 'max_order_blocks', 'bar', 'atr', 'prev_close', 'prev_open',
+                 'cum_tr', 'highs', 'lows', 'cum_delta', 'swing', 'internal', 'equal',
+                 'trailing_top', 'trailing_bottom', 'trailing_bar', 'top_bar', 'bottom_bar',
+                 'serial', 'bullish_gaps', 'bearish_gaps')
+
+    def __init__(self, swing_length=50, internal_length=5, equal_length=3, equal_threshold=0.1,
+                 order_block_filter=ATR_FILTER, order_block_mitigation=HIGHLOW_MITIGATION,
+                 confluence_filter=False, fvg_auto_threshold=True, max_order_blocks=MAX_ORDER_BLOCKS):
+        if order_block_filter not in (ATR_FILTER, RANGE_FILTER):
+            raise ValueError(f"未知订单块过滤方式: {order_block_filter}")
+        if order_block_mitigation not in (HIGHLOW_MITIGATION, CLOSE_MITIGATION):
+            raise ValueError(f"未知订单块失效方式: {order_block_mitigation}")
+        self.equal_threshold = equal_threshold
+        self.order_block_filter = order_block_filter
+        self.close_mitigation = order_block_mitigation == CLOSE_MITIGATION
+        self.confluence_filter = confluence_filter
+        self.fvg_auto_threshold = fvg_auto_threshold
+        self.max_order_blocks = max_order_blocks
+
+        self.bar = 0
+        self.atr = ExponentialMean(200, 1.0 / 200)
+        self.prev_close = float('nan')
+        self.prev_open = float('nan')
+        self.cum_tr = 0.0
+        self.highs = deque(maxlen=3)
+        self.lows = deque(maxlen=3)
+        self.cum_delta = 0.0
+        self.swing = _Structure(swing_length, True)
+        self.internal = _Structure(internal_length, True)
+        self.equal = _Structure(equal_length, False)
+        self.trailing_top = float('nan')
+        self.trailing_bottom = float('nan')
+        self.trailing_bar = -1
+        self.top_bar = -1
+        self.bottom_bar = -1
+        self.serial = 0
+        self.bullish_gaps = []
+        self.bearish_gaps = []
+
+    # --- 枢轴 ---
+
+    def _update_pivots(self, structure, scope, high, low, atr, events):
+        t = self.bar
+        size = structure.size
+        structure.highs.append(high)
+        structure.lows.append(low)
+        highest = structure.rolling_high.update(high)
+        lowest = structure.rolling_low.update(low)
+
+        leg = structure.leg if structure.leg is not None else 0
+        if len(structure.highs) > size:
+            if structure.highs[0] > highest:
+                leg = 0  # BEARISH_LEG
+            elif structure.lows[0] < lowest:
+                leg = 1  # BULLISH_LEG
+        previous, structure.leg = structure.leg, leg
+        if previous is None or leg == previous:
+            return
+
+        bar = t - size
+        if leg == 1:
+            pivot, level = structure.low, structure.lows[0]
+            if scope == EQUAL:
+                if abs(pivot.level - level) < self.equal_threshold * atr:
+                    events.append((t, EQUAL_LOWS, EQUAL, BULLISH, max(pivot.level, level), min(pivot.level, level),
+                                   pivot.bar))
+            else:
+                events.append((t, PIVOT_LOW, scope, BULLISH, level, level, bar))
+        else:
+            pivot, level = structure.high, structure.highs[0]
+            if scope == EQUAL:
+                if abs(pivot.level - level) < self.equal_threshold * atr:
+                    events.append((t, EQUAL_HIGHS, EQUAL, BEARISH, max(pivot.level, level), min(pivot.level, level),
+                                   pivot.bar))
+            else:
+                events.append((t, PIVOT_HIGH, scope, BEARISH, level, level, bar))
+
+        pivot.last_level = pivot.level
+        pivot.level = level
+        pivot.crossed = False
+        pivot.bar = bar
+
+        if structure.window_max is not None:
+            # 订单块候选：从枢轴bar到上一根bar的 parsed 极值（当前bar在结构判定之后并入）
+            if leg == 1:
+                structure.since_low_max = structure.window_max.get() if structure.window_max.queue else None
+            else:
+                structure.since_high_min = structure.window_min.get() if structure.window_min.queue else None
+
+        if scope == SWING:
+            if leg == 1:
+                self.trailing_bottom = level
+                self.bottom_bar = bar
+            else:
+                self.trailing_top = level
+                self.top_bar = bar
+            self.trailing_bar = bar
+
+    # --- 结构突破与订单块 ---
+
+    def _store_order_block(self, structure, scope, bias, events):
+        candidate = structure.since_high_min if bias == BULLISH else structure.since_low_max
+        if candidate is None:
+            return
+        bar, high, low = candidate
+        if structure.active_blocks >= self.max_order_blocks:
+            # 淘汰最早登记的有效订单块（原版 orderBlocks.pop()）
+            while structure.blocks:
+                oldest = structure.blocks.popleft()
+                if oldest.active:
+                    oldest.active = False
+                    structure.active_blocks -= 1
+                    break
+        block = OrderBlock(bar, high, low, bias, scope, self.serial)
+        self.serial += 1
+        structure.blocks.append(block)
+        structure.active_blocks += 1
+        if bias == BEARISH:
+            heapq.heappush(structure.bearish_heap, (high, block.serial, block))
+        else:
+            heapq.heappush(structure.bullish_heap, (-low, block.serial, block))
+        events.append((self.bar, ORDER_BLOCK, scope, bias, high, low, bar))
+
+    def _display_structure(self, structure, scope, open_, high, low, close, events):
+        bullish_bar = bearish_bar = True
+        if self.confluence_filter:
+            # 原版写法: math.min(close, open - low)
+            bullish_bar = high - max(close, open_) > min(close, open_ - low)
+            bearish_bar = high - max(close, open_) < min(close, open_ - low)
+
+        pivot = structure.high
+        level, seen = pivot.level, structure.seen_high
+        structure.seen_high = level
+        extra = _pine_ne(pivot.level, self.swing.high.level) and bullish_bar if scope == INTERNAL else True
+        if close > level and self.prev_close <= seen and not pivot.crossed and extra:
+            tag = CHOCH if structure.trend == BEARISH else BOS
+            pivot.crossed = True
+            structure.trend = BULLISH
+            events.append((self.bar, tag, scope, BULLISH, level, level, pivot.bar))
+            self._store_order_block(structure, scope, BULLISH, events)
+
+        pivot = structure.low
+        level, seen = pivot.level, structure.seen_low
+        structure.seen_low = level
+        extra = _pine_ne(pivot.level, self.swing.low.level) and bearish_bar if scope == INTERNAL else True
+        if close < level and self.prev_close >= seen and not pivot.crossed and extra:
+            tag = CHOCH if structure.trend == BULLISH else BOS
+            pivot.crossed = True
+            structure.trend = BEARISH
+            events.append((self.bar, tag, scope, BEARISH, level, level, pivot.bar))
+            self._store_order_block(structure, scope, BEARISH, events)
+
+    def _mitigate_order_blocks(self, structure, scope, high, low, close, events):
+        bearish_source = close if self.close_mitigation else high
+        bullish_source = close if self.close_mitigation else low
+        mitigated = []
+        heap = structure.bearish_heap
+        while heap and bearish_source > heap[0][0]:
+            block = heapq.heappop(heap)[2]
+            if block.active:
+                mitigated.append(block)
+        heap = structure.bullish_heap
+        while heap and bullish_source < -heap[0][0]:
+            block = heapq.heappop(heap)[2]
+            if block.active:
+                mitigated.append(block)
+        # 原版从最新的订单块开始遍历
+        for block in sorted(mitigated, key=lambda b: -b.serial):
+            block.active = False
+            structure.active_blocks -= 1
+            events.append((self.bar, ORDER_BLOCK_MITIGATED, scope, block.bias, block.high, block.low, block.bar))
+
+    # --- FVG ---
+
+    def _mitigate_gaps(self, high, low, events):
+        mitigated = []
+        while self.bullish_gaps and low < -self.bullish_gaps[0][0]:
+            mitigated.append(heapq.heappop(self.bullish_gaps)[2])
+        while self.bearish_gaps and high > self.bearish_gaps[0][0]:
+            mitigated.append(heapq.heappop(self.bearish_gaps)[2])
+        for gap in sorted(mitigated, key=lambda g: -g.serial):
+            events.append((self.bar, FAIR_VALUE_GAP_MITIGATED, CHART, gap.bias, gap.top, gap.bottom, gap.bar))
+
+    def _detect_gaps(self, high, low, events):
+        t = self.bar
+        delta = (self.prev_close - self.prev_open) / (self.prev_open * 100)
+        if delta == delta:
+            self.cum_delta += abs(delta)
+        if not self.fvg_auto_threshold:
+            threshold = 0.0
+        else:
+            threshold = self.cum_delta / t * 2 if t > 0 else float('nan')
+        if len(self.highs) < 3:
+            return
+        last2_high, last2_low = self.highs[0], self.lows[0]
+        if low > last2_high and self.prev_close > last2_high and delta > threshold:
+            gap = FairValueGap(t - 1, low, last2_high, BULLISH, self.serial)
+            self.serial += 1
+            heapq.heappush(self.bullish_gaps, (-gap.bottom, gap.serial, gap))
+            events.append((t, FAIR_VALUE_GAP, CHART, BULLISH, gap.top, gap.bottom, gap.bar))
+        if high < last2_low and self.prev_close < last2_low and -delta > threshold:
+            gap = FairValueGap(t - 1, high, last2_low, BEARISH, self.serial)
+            self.serial += 1
+            heapq.heappush(self.bearish_gaps, (gap.top, gap.serial, gap))
+            events.append((t, FAIR_VALUE_GAP, CHART, BEARISH, gap.top, gap.bottom, gap.bar))
+
+    # --- 主流程 ---
+
+    def push(self, open_, high, low, close):
+        """推进一根bar，返回当根bar的事件列表"""
+        events = []
+        t = self.bar
+        prev_close = self.prev_close
+
+        tr = high - low
+        if prev_close == prev_close:
+            tr = max(tr, abs(high - prev_close), abs(low - prev_close))
+            self.cum_tr += tr
+        atr = self.atr.update(tr)
+        if self.order_block_filter == ATR_FILTER:
+            volatility = atr
+        else:
+            volatility = self.cum_tr / t if t > 0 else float('nan')
+        high_volatility_bar = (high - low) >= 2 * volatility
+        parsed_high = low if high_volatility_bar else high
+        parsed_low = high if high_volatility_bar else low
+
+        # updateTrailingExtremes
+        if self.trailing_top == self.trailing_top:
+            self.trailing_top = max(high, self.trailing_top)
+            if self.trailing_top == high:
+                self.top_bar = t
+        if self.trailing_bottom == self.trailing_bottom:
+            self.trailing_bottom = min(low, self.trailing_bottom)
+            if self.trailing_bottom == low:
+                self.bottom_bar = t
+
+        self._mitigate_gaps(high, low, events)
+
+        self._update_pivots(self.swing, SWING, high, low, atr, events)
+        self._update_pivots(self.internal, INTERNAL, high, low, atr, events)
+        self._update_pivots(self.equal, EQUAL, high, low, atr, events)
+
+        self._display_structure(self.internal, INTERNAL, open_, high, low, close, events)
+        self._display_structure(self.swing, SWING, open_, high, low, close, events)
+
+        self._mitigate_order_blocks(self.internal, INTERNAL, high, low, close, events)
+        self._mitigate_order_blocks(self.swing, SWING, high, low, close, events)
+
+        self.highs.append(high)
+        self.lows.append(low)
+        self._detect_gaps(high, low, events)
+
+        # 当前bar并入订单块候选与滑动窗口
+        for structure in (self.internal, self.swing):
+            if structure.since_low_max is not None and parsed_high > structure.since_low_max[1]:
+                structure.since_low_max = (t, parsed_high, parsed_low)
+            if structure.since_high_min is not None and parsed_low < structure.since_high_min[2]:
+                structure.since_high_min = (t, parsed_high, parsed_low)
+            structure.window_max.push(t, parsed_high, parsed_high, parsed_low)
+            structure.window_min.push(t, parsed_low, parsed_high, parsed_low)
+
+        self.prev_close = close
+        self.prev_open = open_
+        self.bar += 1
+        return events
+
+
+def smart_money_concepts(open_, high, low, close, **params):
+    """
+    全序列结构事件
+
+    Args:
+        open_, high, low, close: 一维float数组
+        **params: 见 SmartMoneyEngine
+
+    Returns:
+        dict: events（EVENT_DTYPE结构化数组，按bar排序）, 以及逐bar的
+              swing_trend / internal_trend（1 / -1 / 0）, trailing_top / trailing_bottom（强弱高低点）
+    """
+    engine = SmartMoneyEngine(**params)
+    n = len(close)
+    events = []
+    swing_trend = np.zeros(n)
+    internal_trend = np.zeros(n)
+    trailing_top = np.empty(n)
+    trailing_bottom = np.empty(n)
+    for t, bar in enumerate(zip(np.asarray(open_, dtype=np.float64).tolist(),
+                                np.asarray(high, dtype=np.float64).tolist(),
+                                np.asarray(low, dtype=np.float64).tolist(),
+                                np.asarray(close, dtype=np.float64).tolist())):
+        events.extend(engine.push(*bar))
+        swing_trend[t] = engine.swing.trend
+        internal_trend[t] = engine.internal.trend
+        trailing_top[t] = engine.trailing_top
+        trailing_bottom[t] = engine.trailing_bottom
+    return {
+        'events': np.array(events, dtype=EVENT_DTYPE),
+        'swing_trend': swing_trend,
+        'internal_trend': internal_trend,
+        'trailing_top': trailing_top,
+        'trailing_bottom': trailing_bottom,
+    }
+
+
+def event_signal(events, n, kind, scope=None):
+    """
+    事件 → 逐bar信号数组（事件bar处为事件方向 1 / -1，其余为0；同bar多个事件时取最后一个）
+
+    Args:
+        events: smart_money_concepts() 的事件数组
+        n: bar数
+        kind: 事件类型（可为元组）
+        scope: 结构（None为不限）
+    """
+    mask = np.isin(events['kind'], np.atleast_1d(kind))
+    if scope is not None:
+        mask &= events['scope'] == scope
+    signal = np.zeros(n)
+    selected = events[mask]
+    signal[selected['bar']] = selected['bias']
+    return signal
+
+
+class SmartMoneyConcepts(bt.Indicator):
+    """
+    Smart Money Concepts 结构信号
+
+    lines:
+        swing_trend / internal_trend: 结构方向（1 多 / -1 空 / 0 未定）
+        swing_bos / swing_choch / internal_bos / internal_choch: 当根bar的突破方向（1 / -1），无突破为0
+        trailing_top / trailing_bottom: 强弱高低点
+    完整事件（订单块、FVG、EQH/EQL）见 self.events（runonce模式为全序列数组，next模式逐bar追加）。
+    """
+    alias = ('SMC',)
+    lines = ('swing_trend', 'internal_trend', 'swing_bos', 'swing_choch', 'internal_bos', 'internal_choch',
+             'trailing_top', 'trailing_bottom')
+
+    params = (
+        ('swing_length', 50),
+        ('internal_length', 5),
+        ('equal_length', 3),
+        ('equal_threshold', 0.1),
+        ('order_block_filter', ATR_FILTER),
+        ('order_block_mitigation', HIGHLOW_MITIGATION),
+        ('confluence_filter', False),
+        ('fvg_auto_threshold', True),
+    )
+
+    plotinfo = dict(subplot=False, plotname='Smart Money Concepts')
+    plotlines = dict(swing_trend=dict(_plotskip=True), internal_trend=dict(_plotskip=True),
+                     swing_bos=dict(_plotskip=True), swing_choch=dict(_plotskip=True),
+                     internal_bos=dict(_plotskip=True), internal_choch=dict(_plotskip=True))
+
+    _SIGNAL_LINES = {'swing_bos': (BOS, SWING), 'swing_choch': (CHOCH, SWING),
+                     'internal_bos': (BOS, INTERNAL), 'internal_choch': (CHOCH, INTERNAL)}
+
+    def __init__(self):
+        self._engine = SmartMoneyEngine(**self.p._getkwargs())
+        self.events = []
+
+    def once(self, start, end):
+        result = fill_from_batch(self, start, end, data_arrays(self.data, end, 'open', 'high', 'low', 'close'),
+                                 self._batch)
+        if result is not None and 'events' in result:
+            self.events = result['events']
+
+    def _batch(self, open_, high, low, close):
+        result = smart_money_concepts(open_, high, low, close, **self.p._getkwargs())
+        for name, (kind, scope) in self._SIGNAL_LINES.items():
+            result[name] = event_signal(result['events'], len(close), kind, scope)
+        return result
+
+    def next(self):
+        events = self._engine.push(self.data.open[0], self.data.high[0], self.data.low[0], self.data.close[0])
+        self.events.extend(events)
+        signals = dict.fromkeys(self._SIGNAL_LINES, 0.0)
+        for _, kind, scope, bias, _, _, _ in events:
+            for name, key in self._SIGNAL_LINES.items():
+                if key == (kind, scope):
+                    signals[name] = float(bias)
+        for name, value in signals.items():
+            getattr(self.lines, name)[0] = value
+        self.lines.swing_trend[0] = self._engine.swing.trend
+        self.lines.internal_trend[0] = self._engine.internal.trend
+        self.lines.trailing_top[0] = self._engine.trailing_top
+        self.lines.trailing_bottom[0] = self._engine.trailing_bottom
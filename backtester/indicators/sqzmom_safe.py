@@ -3,36 +3,239 @@ Squeeze Momentum Safe Indicator
 安全版SQZMOM指标 - 保持原有语义，仅加入分母防护
 
 基于原始实现，对所有可能为零的分母（标准差、ATR均值等）进行夹底保护
+
+性能说明:
+- runonce模式下由 once() 调用 squeeze_momentum_arrays() 一次性计算全序列，
+  滚动算子来自 kernels（numba可用时为编译内核）
+- 不再创建 bb_basis / kc_ma / avg_close / highest / lowest 等中间line缓冲
+- 标准差为Welford滑动更新、highest/lowest为单调队列，每bar摊还O(1)，与窗口长度无关
+- next() 模式（实盘/exactbars）使用 kernels.streaming 的流式状态，prenext() 期间同样推进
+- SqueezeMomentumStream 可脱离Cerebro单独使用（实盘收盘信号服务），支持 to_state()/from_state()
+- 开启 indicators.cache 时，全序列结果按 (数据哈希, 参数, 代码版本) 缓存到磁盘
+- 分母夹底次数由 DenominatorMonitor 聚合计数（不再逐bar打印），debug时由策略在stop()统一报告
 """
+from collections import deque
+
+import numpy as np
 import backtrader as bt
-import backtrader.indicators as btind
 try:
-    from utils.safe_math import safe_max_eps, safe_div_line, DEFAULT_EPS
+    from utils.safe_math import DEFAULT_EPS, DenominatorMonitor, safe_max_eps_array
+    import kernels
+    from kernels import RollingMean, RollingStdDev, RollingMax, RollingMin, StreamingState
 except ImportError:
     import sys
     import os
     sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-    from utils.safe_math import safe_max_eps, safe_div_line, DEFAULT_EPS
+    from utils.safe_math import DEFAULT_EPS, DenominatorMonitor, safe_max_eps_array
+    import kernels
+    from kernels import RollingMean, RollingStdDev, RollingMax, RollingMin, StreamingState
+
+from .cache import data_arrays, fill_from_batch
+
+
+def squeeze_momentum_lookback(bb_length=20, kc_length=20, use_true_range=True):
+    """
+    计算SQZMOM首个有效值所需的bar数（与原line图的minperiod一致）
+
+    - 标准差/BB中轨: bb_length
+    - TrueRange需要前一根收盘价: kc_length + 1
+    - 动量为 source_diff 与 kc_length 根之前的差分: 2 * kc_length
+    """
+    return max(bb_length, kc_length + int(bool(use_true_range)), 2 * kc_length)
+
+
+def squeeze_momentum_minperiod(bb_length=20, kc_length=20, use_true_range=True):
+    """
+    SqueezeMomentumSafe 的minperiod: 用户建议的 max(length, lengthKC)+50，且不小于计算所需的lookback
+
+    策略裁剪掉SQZMOM时用同一数值声明预热期，保证裁剪前后开始交易的bar一致
+    """
+    warmup = max(bb_length, kc_length) + 50
+    return max(warmup, squeeze_momentum_lookback(bb_length, kc_length, use_true_range))
+
+
+def squeeze_momentum_arrays(high, low, close, bb_length=20, bb_mult=2.0,
+                            kc_length=20, kc_mult=1.5, use_true_range=True,
+                            eps=DEFAULT_EPS):
+    """
+    SQZMOM 全序列向量化计算
+
+    与 SqueezeMomentumSafe 原逐bar实现的运算顺序一致：
+    标准差使用 sqrt(|mean(x²) - mean(x)²|)（同 btind.StandardDeviation），
+    分母夹底使用 safe_max_eps 语义（NaN保持NaN，小于eps时取eps）。
+
+    Args:
+        high, low, close: 一维float数组
+        其余参数同 SqueezeMomentumSafe
+
+    Returns:
+        dict: squeeze_on, squeeze_off, signal_bar, momentum 四条输出，
+              以及诊断用的 bb_std、kc_rangema（夹底前原值，供 DenominatorMonitor 统计）。
+              lookback之前的位置均为NaN。
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+
+    # Bollinger Bands
+    bb_basis = kernels.sma(close, bb_length)
+    raw_bb_std = kernels.stddev(close, bb_length)
+    bb_std, _ = safe_max_eps_array(raw_bb_std, eps)
+    bb_dev = bb_mult * bb_std
+    bb_upper = bb_basis + bb_dev
+    bb_lower = bb_basis - bb_dev
+
+    # Keltner Channels
+    kc_ma = bb_basis if kc_length == bb_length else kernels.sma(close, kc_length)
+    if use_true_range:
+        kc_range = kernels.true_range(high, low, close)
+    else:
+        kc_range = high - low
+    raw_kc_rangema = kernels.sma(kc_range, kc_length)
+    kc_rangema, _ = safe_max_eps_array(raw_kc_rangema, eps)
+    kc_upper = kc_ma + kc_rangema * kc_mult
+    kc_lower = kc_ma - kc_rangema * kc_mult
+
+    # Squeeze conditions
+    squeeze_on = (bb_lower > kc_lower) & (bb_upper < kc_upper)
+    squeeze_off = (bb_lower < kc_lower) & (bb_upper > kc_upper)
+    prev_squeeze_on = np.zeros(n, dtype=bool)
+    prev_squeeze_on[1:] = squeeze_on[:-1]
+    signal_bar = prev_squeeze_on & ~squeeze_on
+
+    # Momentum - 差分代替ROC（见 SqueezeMomentumSafe.__init__ 历史说明）
+    highest = kernels.highest(high, kc_length)
+    lowest = kernels.lowest(low, kc_length)
+    avg_hl = (highest + lowest) / 2.0
+    avg_all = (avg_hl + kc_ma) / 2.0
+    source_diff = close - avg_all
+    momentum = np.full(n, np.nan)
+    momentum[kc_length:] = source_diff[kc_length:] - source_diff[:-kc_length]
+
+    lookback = squeeze_momentum_lookback(bb_length, kc_length, use_true_range)
+    result = {
+        'squeeze_on': squeeze_on.astype(np.float64),
+        'squeeze_off': squeeze_off.astype(np.float64),
+        'signal_bar': signal_bar.astype(np.float64),
+        'momentum': momentum,
+        'bb_std': raw_bb_std,
+        'kc_rangema': raw_kc_rangema,
+    }
+    for values in result.values():
+        values[:lookback - 1] = np.nan
+    return result
+
+
+class SqueezeMomentumStream(StreamingState):
+    """
+    SQZMOM 逐bar流式状态
+
+    与 squeeze_momentum_arrays() 逐项一致，所有滚动统计每bar摊还O(1)。
+    update(bar) / push(high, low, close) 返回与批量版本同名的dict，lookback之前的位置为NaN。
+    to_state() 导出JSON兼容的状态，SqueezeMomentumStream.from_state() 恢复后继续推进结果逐位一致。
+    """
+    __slots__ = ('bb_mult', 'kc_mult', 'use_true_range', 'eps', 'lookback', 'count',
+                 'bb_basis', 'bb_std', 'kc_ma', 'kc_rangema', 'highest', 'lowest',
+                 'prev_close', 'prev_squeeze_on', 'source_diff')
+
+    def __init__(self, bb_length=20, bb_mult=2.0, kc_length=20, kc_mult=1.5,
+                 use_true_range=True, eps=DEFAULT_EPS):
+        self.bb_mult = bb_mult
+        self.kc_mult = kc_mult
+        self.use_true_range = use_true_range
+        self.eps = eps
+        self.lookback = squeeze_momentum_lookback(bb_length, kc_length, use_true_range)
+        self.count = 0
+
+        self.bb_basis = RollingMean(bb_length)
+        self.bb_std = RollingStdDev(bb_length)
+        self.kc_ma = None if kc_length == bb_length else RollingMean(kc_length)
+        self.kc_rangema = RollingMean(kc_length)
+        self.highest = RollingMax(kc_length)
+        self.lowest = RollingMin(kc_length)
+
+        self.prev_close = float('nan')
+        self.prev_squeeze_on = False
+        self.source_diff = deque(maxlen=kc_length + 1)
+
+    def update(self, bar):
+        """推进一根已收盘bar，bar 为含 high/low/close 键的映射（dict、pandas行等）"""
+        return self.push(bar['high'], bar['low'], bar['close'])
+
+    def push(self, high, low, close):
+        """推进一根bar"""
+        self.count += 1
+        eps = self.eps
+
+        # Bollinger Bands
+        bb_basis = self.bb_basis.update(close)
+        raw_bb_std = self.bb_std.update(close)
+        bb_std = eps if eps > raw_bb_std else raw_bb_std
+        bb_dev = self.bb_mult * bb_std
+        bb_upper = bb_basis + bb_dev
+        bb_lower = bb_basis - bb_dev
+
+        # Keltner Channels
+        kc_ma = bb_basis if self.kc_ma is None else self.kc_ma.update(close)
+        if self.use_true_range:
+            prev_close = self.prev_close
+            kc_range = max(high, prev_close) - min(low, prev_close) if prev_close == prev_close else prev_close
+        else:
+            kc_range = high - low
+        self.prev_close = close
+        raw_kc_rangema = self.kc_rangema.update(kc_range)
+        kc_rangema = eps if eps > raw_kc_rangema else raw_kc_rangema
+        kc_upper = kc_ma + kc_rangema * self.kc_mult
+        kc_lower = kc_ma - kc_rangema * self.kc_mult
+
+        # Squeeze conditions
+        squeeze_on = bb_lower > kc_lower and bb_upper < kc_upper
+        squeeze_off = bb_lower < kc_lower and bb_upper > kc_upper
+        signal_bar = self.prev_squeeze_on and not squeeze_on
+        self.prev_squeeze_on = squeeze_on
+
+        # Momentum
+        avg_hl = (self.highest.update(high) + self.lowest.update(low)) / 2.0
+        avg_all = (avg_hl + kc_ma) / 2.0
+        self.source_diff.append(close - avg_all)
+        if len(self.source_diff) == self.source_diff.maxlen:
+            momentum = self.source_diff[-1] - self.source_diff[0]
+        else:
+            momentum = float('nan')
+
+        if self.count < self.lookback:
+            nan = float('nan')
+            return {'squeeze_on': nan, 'squeeze_off': nan, 'signal_bar': nan,
+                    'momentum': nan, 'bb_std': nan, 'kc_rangema': nan}
+        return {
+            'squeeze_on': float(squeeze_on),
+            'squeeze_off': float(squeeze_off),
+            'signal_bar': float(signal_bar),
+            'momentum': momentum,
+            'bb_std': raw_bb_std,
+            'kc_rangema': raw_kc_rangema,
+        }
 
 
 class SqueezeMomentumSafe(bt.Indicator):
     """
     Squeeze Momentum Oscillator (SQZMOM) - Safe Version
-    
+
     与原版完全相同的语义和参数，仅在分母计算中加入EPS保护
     """
     lines = ('squeeze_on', 'squeeze_off', 'signal_bar', 'momentum')
-    
+
     params = (
         ('bb_length', 20),
         ('bb_mult', 2.0),
-        ('kc_length', 20), 
+        ('kc_length', 20),
         ('kc_mult', 1.5),
         ('use_true_range', True),
         ('eps', DEFAULT_EPS),  # 分母保护阈值
         ('debug', False),  # 调试日志开关
     )
-    
+
     plotinfo = dict(subplot=True, plotname='Squeeze Momentum Safe')
     plotlines = dict(
         momentum=dict(color='blue'),
@@ -40,102 +243,84 @@ class SqueezeMomentumSafe(bt.Indicator):
         squeeze_off=dict(color='green', _method='bar'),
         signal_bar=dict(color='yellow', _method='bar')
     )
-    
+
     def __init__(self):
-        # Bollinger Bands calculation - 与原版相同
-        self.bb_basis = btind.SimpleMovingAverage(self.data.close, period=self.params.bb_length)
-        
-        # 关键改进：标准差作为分母时进行安全保护
-        raw_bb_dev = btind.StandardDeviation(self.data.close, period=self.params.bb_length)
-        safe_bb_dev = safe_max_eps(raw_bb_dev, self.params.eps)
-        self.bb_dev = self.params.bb_mult * safe_bb_dev
-        
-        self.bb_upper = self.bb_basis + self.bb_dev
-        self.bb_lower = self.bb_basis - self.bb_dev
-        
-        # Keltner Channels calculation - 与原版相同结构，但对range均值进行保护
-        self.kc_ma = btind.SimpleMovingAverage(self.data.close, period=self.params.kc_length)
-        
-        if self.params.use_true_range:
-            self.kc_range = btind.TrueRange(self.data)
-        else:
-            self.kc_range = self.data.high - self.data.low
-        
-        # 关键改进：range均值作为分母时进行安全保护
-        raw_kc_rangema = btind.SimpleMovingAverage(self.kc_range, period=self.params.kc_length)
-        self.kc_rangema = safe_max_eps(raw_kc_rangema, self.params.eps)
-        
-        self.kc_upper = self.kc_ma + self.kc_rangema * self.params.kc_mult
-        self.kc_lower = self.kc_ma - self.kc_rangema * self.params.kc_mult
-        
-        # Squeeze conditions - 与原版相同
-        self.squeeze_on_cond1 = self.bb_lower > self.kc_lower
-        self.squeeze_on_cond2 = self.bb_upper < self.kc_upper
-        self.squeeze_off_cond1 = self.bb_lower < self.kc_lower
-        self.squeeze_off_cond2 = self.bb_upper > self.kc_upper
-        
-        # Momentum calculation - 与原版相同，但对可能的分母进行保护
-        highest = btind.Highest(self.data.high, period=self.params.kc_length)
-        lowest = btind.Lowest(self.data.low, period=self.params.kc_length)
-        avg_hl = (highest + lowest) / 2.0
-        avg_close = btind.SimpleMovingAverage(self.data.close, period=self.params.kc_length)
-        avg_all = (avg_hl + avg_close) / 2.0
-        source_diff = self.data.close - avg_all
-        
-        # ROC calculation (Rate of Change) - 使用差分代替避免除零错误
-        # 原版 ROC 在 source_diff 接近0时容易除零错误
-        # 使用简单差分 (current - previous) 作为动量，保持方向性但避免除法
-        # 这在语义上等价于 ROC 的分子部分，保持策略逻辑的一致性
-        self._mom = source_diff - source_diff(-self.params.kc_length)
-        
+        self._lookback = squeeze_momentum_lookback(
+            self.params.bb_length, self.params.kc_length, self.params.use_true_range)
+        # 逐bar模式使用的流式状态
+        self._recursion = SqueezeMomentumStream(
+            bb_length=self.params.bb_length,
+            bb_mult=self.params.bb_mult,
+            kc_length=self.params.kc_length,
+            kc_mult=self.params.kc_mult,
+            use_true_range=self.params.use_true_range,
+            eps=self.params.eps,
+        )
+
+        # 分母健康度计数（夹底前原值 < eps 即一次替换）
+        self.denominator_monitors = {
+            name: DenominatorMonitor(f"SQZMOM {name}", self.params.eps, signed=False)
+            for name in ('bb_std', 'kc_rangema')
+        }
+        self._monitored = 0
+
         # 设置合理的warmup期 - 用户建议的max(length, lengthKC)+50
-        warmup = max(self.params.bb_length, self.params.kc_length) + 50
+        # 与原line图一致：最终minperiod不小于计算本身所需的lookback
+        warmup = squeeze_momentum_minperiod(
+            self.params.bb_length, self.params.kc_length, self.params.use_true_range)
         self.addminperiod(warmup)
-        
+
         if self.params.debug:
             print(f"SQZMOM Safe initialized: bb_len={self.params.bb_length}, kc_len={self.params.kc_length}, "
                   f"eps={self.params.eps}, warmup={warmup}")
 
+    def _compute(self, high, low, close):
+        return squeeze_momentum_arrays(
+            high, low, close,
+            bb_length=self.params.bb_length,
+            bb_mult=self.params.bb_mult,
+            kc_length=self.params.kc_length,
+            kc_mult=self.params.kc_mult,
+            use_true_range=self.params.use_true_range,
+            eps=self.params.eps,
+        )
+
+    def once(self, start, end):
+        # runonce模式: 整段数组一次性计算（debug需要诊断数组，不走磁盘缓存）
+        result = fill_from_batch(self, start, end, data_arrays(self.data, end, 'high', 'low', 'close'),
+                                 self._compute, use_cache=not self.params.debug)
+
+        # 从上次统计位置起计数（含minperiod之前的预热段，与逐bar模式一致）
+        # 缓存命中时只有输出line，没有诊断数组
+        if result is not None and 'bb_std' in result:
+            for name, monitor in self.denominator_monitors.items():
+                monitor.observe(result[name][self._monitored:end], bar_offset=self._monitored)
+            self._monitored = end
+
+    def _update(self):
+        result = self._recursion.push(self.data.high[0], self.data.low[0], self.data.close[0])
+        bar = len(self)
+        for name, monitor in self.denominator_monitors.items():
+            monitor.record(result[name], bar)
+        return result
+
+    def prenext(self):
+        # 预热期同样推进流式状态
+        self._update()
+
     def next(self):
-        # 与原版相同的逻辑
-        try:
-            # Calculate squeeze conditions manually
-            squeeze_on = (self.squeeze_on_cond1[0] and self.squeeze_on_cond2[0])
-            squeeze_off = (self.squeeze_off_cond1[0] and self.squeeze_off_cond2[0])
-            
-            # Signal bar: squeeze was on last bar but not current bar
-            prev_squeeze_on = False
-            if len(self) > 1:
-                prev_squeeze_on = (self.squeeze_on_cond1[-1] and self.squeeze_on_cond2[-1])
-            signal_bar = prev_squeeze_on and not squeeze_on
-            
-            # Get momentum safely
-            momentum = self._mom[0]
-            
-            self.lines.squeeze_on[0] = float(squeeze_on)
-            self.lines.squeeze_off[0] = float(squeeze_off) 
-            self.lines.signal_bar[0] = float(signal_bar)
-            self.lines.momentum[0] = momentum
-            
-            # 可选的SMOKE日志
-            if self.params.debug and len(self) > self.params.kc_length + 10:
-                bb_dev_val = self.bb_dev[0] / self.params.bb_mult  # 原始标准差
-                kc_range_val = self.kc_rangema[0]
-                
-                if abs(bb_dev_val) < self.params.eps * 10:
-                    print(f"SMOKE: SQZMOM bb_dev={bb_dev_val:.2e} at bar {len(self)}")
-                if abs(kc_range_val) < self.params.eps * 10:
-                    print(f"SMOKE: SQZMOM kc_range={kc_range_val:.2e} at bar {len(self)}")
-            
-        except Exception as e:
-            if self.params.debug:
-                print(f"SQZMOM Safe error at bar {len(self)}: {e}")
-            # Fallback values
-            self.lines.squeeze_on[0] = 0.0
-            self.lines.squeeze_off[0] = 0.0
-            self.lines.signal_bar[0] = 0.0
-            self.lines.momentum[0] = 0.0
+        result = self._update()
+        self.lines.squeeze_on[0] = result['squeeze_on']
+        self.lines.squeeze_off[0] = result['squeeze_off']
+        self.lines.signal_bar[0] = result['signal_bar']
+        self.lines.momentum[0] = result['momentum']
+
+    def report_denominators(self):
+        """debug时输出分母健康度聚合报告（由策略在stop()中调用）"""
+        if self.params.debug:
+            for monitor in self.denominator_monitors.values():
+                print(monitor.report())
 
 
 # 兼容性别名
-SqueezeMomentumIndicator = SqueezeMomentumSafe
\ No newline at end of file
+SqueezeMomentumIndicator = SqueezeMomentumSafe
@@ -3,89 +3,236 @@ WaveTrend Safe Indicator
 安全版WaveTrend指标 - 保持原有语义，仅加入分母防护
 
 基于原始实现，只在计算ci时对0.015*d进行夹底保护
+
+性能说明:
+- 不再创建 ap/esa/bt.If/bt.Max/ci 等中间line缓冲
+- runonce模式下 once() 用 kernels 的EMA/SMA内核一次性填充 wt1/wt2/wt_signal，
+  无逐bar拷贝
+- next() 模式使用融合递推状态（esa → d → ci → tci → wt2），prenext() 期间同样推进
+- WaveTrendStream 可脱离Cerebro单独使用（实盘收盘信号服务），支持 to_state()/from_state()
+- 开启 indicators.cache 时，全序列结果按 (数据哈希, 参数, 代码版本) 缓存到磁盘
+- 分母夹底次数由 DenominatorMonitor 聚合计数（不再逐bar打印），debug时由策略在stop()统一报告
 """
+import math
+from collections import deque
+
+import numpy as np
 import backtrader as bt
-import backtrader.indicators as btind
 try:
-    from utils.safe_math import safe_div_line, DEFAULT_EPS
+    from utils.safe_math import DEFAULT_EPS, DenominatorMonitor, safe_div_array
+    import kernels
+    from kernels import StreamingState
 except ImportError:
     import sys
     import os
     sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-    from utils.safe_math import safe_div_line, DEFAULT_EPS
+    from utils.safe_math import DEFAULT_EPS, DenominatorMonitor, safe_div_array
+    import kernels
+    from kernels import StreamingState
+
+from .cache import data_arrays, fill_from_batch
+
+
+class WaveTrendStream(StreamingState):
+    """
+    WaveTrend 融合递推状态
+
+    与原line图逐项一致：
+    - EMA 以首个完整窗口的算术均值（math.fsum）为种子，alpha = 2 / (1 + period)
+    - ci = (ap - esa) / Max(0.015 * d, eps)，NaN保持NaN
+    - wt2 = SMA(wt1, 4)
+    to_state() 导出JSON兼容的状态，WaveTrendStream.from_state() 恢复后继续推进结果逐位一致。
+    """
+    __slots__ = ('n1', 'n2', 'eps', 'alpha_n1', 'alpha1_n1', 'alpha_n2', 'alpha1_n2',
+                 'esa', 'd', 'tci', 'esa_seed', 'd_seed', 'tci_seed', 'wt1_window')
+
+    def __init__(self, n1=10, n2=21, eps=DEFAULT_EPS):
+        self.n1 = n1
+        self.n2 = n2
+        self.eps = eps
+        self.alpha_n1 = 2.0 / (1.0 + n1)
+        self.alpha1_n1 = 1.0 - self.alpha_n1
+        self.alpha_n2 = 2.0 / (1.0 + n2)
+        self.alpha1_n2 = 1.0 - self.alpha_n2
+
+        self.esa = None
+        self.d = None
+        self.tci = None
+        self.esa_seed = []
+        self.d_seed = []
+        self.tci_seed = []
+        self.wt1_window = deque(maxlen=4)
+
+    def update(self, bar):
+        """
+        推进一根已收盘bar，bar 为含 high/low/close 键的映射（dict、pandas行等）
+
+        Returns:
+            {'wt1', 'wt2', 'wt_signal'} - 与 wavetrend_arrays() 同名，尚未完成预热的值为NaN
+        """
+        wt1, wt2, _ = self.push(bar['high'], bar['low'], bar['close'])
+        wt_signal = float(wt1 > wt2) if wt2 == wt2 else float('nan')
+        return {'wt1': wt1, 'wt2': wt2, 'wt_signal': wt_signal}
+
+    def push(self, high, low, close):
+        """
+        推进一根bar
+
+        Returns:
+            (wt1, wt2, d) - 尚未完成预热的值为NaN
+        """
+        nan = float('nan')
+        ap = (high + low + close) / 3.0
+
+        # esa = EMA(ap, n1)
+        if self.esa is None:
+            self.esa_seed.append(ap)
+            if len(self.esa_seed) < self.n1:
+                return nan, nan, nan
+            self.esa = math.fsum(self.esa_seed) / self.n1
+        else:
+            self.esa = self.esa * self.alpha1_n1 + ap * self.alpha_n1
+
+        diff = ap - self.esa
+        abs_diff = diff if diff >= 0 else -diff
+
+        # d = EMA(|ap - esa|, n1)
+        if self.d is None:
+            self.d_seed.append(abs_diff)
+            if len(self.d_seed) < self.n1:
+                return nan, nan, nan
+            self.d = math.fsum(self.d_seed) / self.n1
+        else:
+            self.d = self.d * self.alpha1_n1 + abs_diff * self.alpha_n1
+
+        # 关键改进：CI计算时对分母进行安全保护（同 safe_div_line）
+        denominator = 0.015 * self.d
+        if self.eps > denominator:
+            denominator = self.eps
+        ci = diff / denominator
+
+        # tci = EMA(ci, n2)
+        if self.tci is None:
+            self.tci_seed.append(ci)
+            if len(self.tci_seed) < self.n2:
+                return nan, nan, self.d
+            self.tci = math.fsum(self.tci_seed) / self.n2
+        else:
+            self.tci = self.tci * self.alpha1_n2 + ci * self.alpha_n2
+
+        self.wt1_window.append(self.tci)
+        if len(self.wt1_window) < 4:
+            return self.tci, nan, self.d
+        return self.tci, math.fsum(self.wt1_window) / 4, self.d
+
+
+def wavetrend_arrays(high, low, close, n1=10, n2=21, eps=DEFAULT_EPS):
+    """
+    WaveTrend 全序列计算
+
+    与 WaveTrendStream 逐bar递推语义一致，EMA/SMA 由 kernels 计算。
+
+    Args:
+        high, low, close: 一维float数组
+        n1: Channel Length
+        n2: Average Length
+        eps: 分母保护阈值
+
+    Returns:
+        dict: wt1, wt2, wt_signal 三条输出及诊断用的 d；未完成预热的位置为NaN
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+
+    ap = (high + low + close) / 3.0
+    esa = kernels.ema(ap, n1)
+    diff = ap - esa
+    d = kernels.ema(np.abs(diff), n1)
+
+    # 关键改进：CI计算时对分母进行安全保护（同 safe_div_line）
+    ci, _ = safe_div_array(diff, 0.015 * d, eps)
+
+    wt1 = kernels.ema(ci, n2)
+    wt2 = kernels.sma(wt1, 4)
+
+    valid = ~np.isnan(wt2)
+    wt_signal = np.full(len(close), np.nan)
+    wt_signal[valid] = wt1[valid] > wt2[valid]
+    return {'wt1': wt1, 'wt2': wt2, 'wt_signal': wt_signal, 'd': d}
 
 
 class WaveTrendSafe(bt.Indicator):
     """
     WaveTrend Oscillator - Safe Version
-    
+
     与原版完全相同的语义和参数，仅在分母计算中加入EPS保护
     """
     lines = ('wt1', 'wt2', 'wt_signal')
-    
+
     params = (
         ('n1', 10),  # Channel Length
         ('n2', 21),  # Average Length
         ('eps', DEFAULT_EPS),  # 分母保护阈值
         ('debug', False),  # 调试日志开关
     )
-    
+
     plotinfo = dict(subplot=True, plotname='WaveTrend Safe')
     plotlines = dict(
         wt1=dict(color='blue'),
-        wt2=dict(color='red'), 
+        wt2=dict(color='red'),
         wt_signal=dict(color='green', _method='bar')
     )
-    
+
     def __init__(self):
-        # Typical price - 与原版相同
-        self.ap = (self.data.high + self.data.low + self.data.close) / 3.0
-        
-        # EMA calculations - 与原版相同
-        self.esa = btind.ExponentialMovingAverage(self.ap, period=self.params.n1)
-        
-        # Custom absolute value calculation - 与原版相同
-        diff = self.ap - self.esa
-        abs_diff = bt.If(diff >= 0, diff, -diff)
-        self.d = btind.ExponentialMovingAverage(abs_diff, period=self.params.n1)
-        
-        # 关键改进：CI计算时对分母进行安全保护
-        # 原版: self.ci = (self.ap - self.esa) / (0.015 * self.d)
-        # 安全版: 使用safe_div_line对分母夹底
-        numerator = self.ap - self.esa
-        denominator = 0.015 * self.d
-        self.ci = safe_div_line(numerator, denominator, self.params.eps)
-        
-        # TCI (True Commodity Index) - 与原版相同
-        self.tci = btind.ExponentialMovingAverage(self.ci, period=self.params.n2)
-        
-        # WaveTrend lines - 与原版相同
-        self.wt1 = self.tci
-        self.wt2 = btind.SimpleMovingAverage(self.wt1, period=4)
-        
-        # WaveTrend signal (wt1 > wt2) - 与原版相同
-        self.wt_signal = self.wt1 > self.wt2
-        
-        # 设置合理的warmup期 - 用户建议的n1*2+n2+5
+        # 逐bar模式使用的递推状态
+        self._recursion = WaveTrendStream(self.params.n1, self.params.n2, self.params.eps)
+
+        # 分母健康度计数（0.015 * d < eps 即一次替换）
+        self.denominator_monitor = DenominatorMonitor("WaveTrend 0.015*d", self.params.eps, signed=False)
+        self._monitored = 0
+
+        # 设置合理的warmup期 - 用户建议的n1*2+n2+5（大于wt2所需的2*n1+n2+1）
         warmup = self.params.n1 * 2 + self.params.n2 + 5
         self.addminperiod(warmup)
-        
+
         if self.params.debug:
             print(f"WaveTrend Safe initialized: n1={self.params.n1}, n2={self.params.n2}, "
                   f"eps={self.params.eps}, warmup={warmup}")
-    
+
+    def once(self, start, end):
+        # 全序列计算优先走磁盘缓存（debug需要诊断数组，不走缓存）
+        result = fill_from_batch(self, start, end, data_arrays(self.data, end, 'high', 'low', 'close'),
+                                 lambda high, low, close: wavetrend_arrays(high, low, close, n1=self.params.n1,
+                                                                           n2=self.params.n2, eps=self.params.eps),
+                                 use_cache=not self.params.debug)
+
+        # 从上次统计位置起计数（含minperiod之前的预热段，与逐bar模式一致）
+        # 缓存命中时只有输出line，没有诊断数组
+        if result is not None and 'd' in result:
+            self.denominator_monitor.observe(0.015 * result['d'][self._monitored:end], bar_offset=self._monitored)
+            self._monitored = end
+
+    def _update(self):
+        wt1, wt2, d = self._recursion.push(self.data.high[0], self.data.low[0], self.data.close[0])
+        self.denominator_monitor.record(0.015 * d, len(self))
+        return wt1, wt2, d
+
+    def prenext(self):
+        # 预热期同样推进递推状态
+        self._update()
+
     def next(self):
-        # 与原版相同的逻辑，只是使用安全计算的结果
-        self.lines.wt1[0] = self.wt1[0]
-        self.lines.wt2[0] = self.wt2[0]
-        self.lines.wt_signal[0] = float(self.wt_signal[0])
-        
-        # 可选的SMOKE日志
-        if self.params.debug and len(self) > self.params.n1 + 5:
-            d_value = self.d[0]
-            if abs(d_value) < self.params.eps * 10:  # 接近阈值时记录
-                print(f"SMOKE: WaveTrend d={d_value:.2e} at bar {len(self)}")
+        wt1, wt2, d = self._update()
+        self.lines.wt1[0] = wt1
+        self.lines.wt2[0] = wt2
+        self.lines.wt_signal[0] = float(wt1 > wt2)
+
+    def report_denominators(self):
+        """debug时输出分母健康度聚合报告（由策略在stop()中调用）"""
+        if self.params.debug:
+            print(self.denominator_monitor.report())
 
 
 # 兼容性别名
-WaveTrendIndicator = WaveTrendSafe
\ No newline at end of file
+WaveTrendIndicator = WaveTrendSafe
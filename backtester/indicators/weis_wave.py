@@ -0,0 +1,140 @@
+"""
+Weis Wave Volume Indicator
+Weis波量 - pinescript/indicators/volume/Weis_Wave_Volume.pine (LazyBear) 的Python移植
+
+- trend: 最近一次非零的收盘价变动方向
+- 收盘价高于（低于）之前 length 根的全部收盘价时（ta.rising / ta.falling），wave 切换为当前 trend
+- 同一 wave 内成交量累加，wave 改变时重新计数；上涨波计入 up，其余计入 down
+  （distribution_below_zero=True 时下跌波为负值）
+
+- weis_wave(): 全序列批量计算（方向为向量运算，段内累加为编译循环）
+- WeisWaveStream: 逐bar流式版本，状态只有上一根收盘价、最近 length 根收盘价与当前波的方向和累计量
+- WeisWaveVolume: Backtrader指标（需 volume 列）
+"""
+from collections import deque
+
+import numpy as np
+import pandas as pd
+import backtrader as bt
+try:
+    import kernels
+    from kernels import StreamingState
+    from kernels.cycles import segment_sum
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+    import kernels
+    from kernels import StreamingState
+    from kernels.cycles import segment_sum
+
+from .cache import data_arrays, fill_from_batch
+
+
+WEIS_WAVE_NAMES = ('up', 'down', 'wave')
+
+
+def weis_wave(close, volume, length=2, distribution_below_zero=False):
+    """
+    Weis波量
+
+    Args:
+        close, volume: 一维float数组
+        length: Trend Detection Length
+        distribution_below_zero: 下跌波画在零轴下方
+
+    Returns:
+        dict: up / down 柱值，wave 当前波方向（1 / -1，首次确认前为0），volume 当前波累计成交量
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    volume = np.ascontiguousarray(volume, dtype=np.float64)
+    n = len(close)
+    change = np.r_[np.nan, np.diff(close)]
+    mov = np.where(change > 0, 1.0, np.where(change < 0, -1.0, 0.0))
+    trend = pd.Series(np.where(mov != 0, mov, np.nan)).ffill().fillna(0.0).to_numpy()
+
+    previous_high = np.r_[np.nan, kernels.highest(close, length)[:-1]] if n else close
+    previous_low = np.r_[np.nan, kernels.lowest(close, length)[:-1]] if n else close
+    trending = (close > previous_high) | (close < previous_low)
+    wave = pd.Series(np.where(trending, trend, np.nan)).ffill().fillna(0.0).to_numpy()
+
+    starts = np.ones(n, dtype=bool)
+    starts[1:] = wave[1:] != wave[:-1]
+    wave_volume = segment_sum(volume, starts)
+    up = np.where(wave == 1, wave_volume, 0.0)
+    if distribution_below_zero:
+        down = np.where(wave == 1, 0.0, np.where(wave == -1, -wave_volume, wave_volume))
+    else:
+        down = np.where(wave == 1, 0.0, wave_volume)
+    return {'up': up, 'down': down, 'wave': wave, 'volume': wave_volume}
+
+
+class WeisWaveStream(StreamingState):
+    """
+    逐bar Weis波量（与 weis_wave() 逐位一致）
+
+    update(close, volume) 返回 (up, down, wave)
+    """
+    __slots__ = ('length', 'distribution_below_zero', 'closes', 'trend', 'wave', 'volume', 'bars')
+
+    def __init__(self, length=2, distribution_below_zero=False):
+        self.length = length
+        self.distribution_below_zero = distribution_below_zero
+        self.closes = deque(maxlen=length)
+        self.trend = 0.0
+        self.wave = 0.0
+        self.volume = 0.0
+        self.bars = 0
+
+    def update(self, close, volume):
+        if self.closes:
+            previous = self.closes[-1]
+            if close > previous:
+                self.trend = 1.0
+            elif close < previous:
+                self.trend = -1.0
+        if len(self.closes) == self.length and (close > max(self.closes) or close < min(self.closes)):
+            wave = self.trend
+        else:
+            wave = self.wave
+        self.closes.append(close)
+
+        self.volume = self.volume + volume if self.bars and wave == self.wave else volume
+        self.wave = wave
+        self.bars += 1
+        if wave == 1:
+            return self.volume, 0.0, wave
+        down = -self.volume if self.distribution_below_zero and wave == -1 else self.volume
+        return 0.0, down, wave
+
+
+class WeisWaveVolume(bt.Indicator):
+    """
+    Weis波量（需 volume 列）
+
+    up / down 为当前上涨波 / 下跌波的累计成交量，wave 为当前波方向
+    """
+    alias = ('WWV',)
+    lines = WEIS_WAVE_NAMES
+
+    params = (
+        ('length', 2),  # Trend Detection Length
+        ('distribution_below_zero', False),  # showDistributionBelowZero
+    )
+
+    plotinfo = dict(subplot=True, plotname='Weis Wave Volume')
+    plotlines = dict(up=dict(_method='bar', color='green'), down=dict(_method='bar', color='red'),
+                     wave=dict(_plotskip=True))
+
+    def __init__(self):
+        self._stream = WeisWaveStream(self.p.length, self.p.distribution_below_zero)
+
+    def once(self, start, end):
+        fill_from_batch(self, start, end, data_arrays(self.data, end, 'close', 'volume'),
+                        lambda close, volume: weis_wave(close, volume, length=self.p.length,
+                                                        distribution_below_zero=self.p.distribution_below_zero))
+
+    def next(self):
+        values = self._stream.update(self.data.close[0], self.data.volume[0])
+        for line, value in zip(self.lines, values):
+            line[0] = value
@@ -0,0 +1,81 @@
+"""
+Kernels Package
+计算内核包 - numba编译（可选）/纯NumPy回退的滚动窗口算子，及其逐bar流式版本；Lorentzian近邻投票（kernels.knn）、
+自适应SuperTrend的滑动窗口k-means与带宽棘轮（kernels.supertrend）、
+Weis波量分段累加与cRSI动态带（kernels.cycles）、关键位枢轴区状态机（kernels.levels）、
+多指标背离的视线检查（kernels.divergence）、
+移植指标与 pine.runtime 共用的 ta.rsi / ta.cci / ta.mfi / ta.atr / ta.pivothigh 等（kernels.pine_ta）
+"""
+
+from .rolling import (
+    HAS_NUMBA,
+    set_backend,
+    get_backend,
+    sma,
+    ema,
+    smma,
+    stddev,
+    highest,
+    lowest,
+    true_range,
+    atr,
+    sma_bank,
+    ema_bank,
+    smma_bank,
+)
+from .streaming import (
+    StreamingState,
+    RollingMean,
+    RollingStdDev,
+    RollingMax,
+    RollingMin,
+    ExponentialMean,
+)
+from .knn import lorentzian_knn, LorentzianNeighbors
+from .supertrend import volatility_kmeans, supertrend, VolatilityKMeans
+from .cycles import segment_sum, cyclic_rsi_core, SortedWindow
+from .levels import heikin_ashi, key_zones
+from .divergence import divergence_lengths
+from .pine_ta import change, rolling_sum, rsi, cci, mfi, pine_atr, pivot_bars, pivot_values
+
+__all__ = [
+    'HAS_NUMBA',
+    'set_backend',
+    'get_backend',
+    'sma',
+    'ema',
+    'smma',
+    'stddev',
+    'highest',
+    'lowest',
+    'true_range',
+    'atr',
+    'sma_bank',
+    'ema_bank',
+    'smma_bank',
+    'StreamingState',
+    'RollingMean',
+    'RollingStdDev',
+    'RollingMax',
+    'RollingMin',
+    'ExponentialMean',
+    'lorentzian_knn',
+    'LorentzianNeighbors',
+    'volatility_kmeans',
+    'supertrend',
+    'VolatilityKMeans',
+    'segment_sum',
+    'cyclic_rsi_core',
+    'SortedWindow',
+    'heikin_ashi',
+    'key_zones',
+    'divergence_lengths',
+    'change',
+    'rolling_sum',
+    'rsi',
+    'cci',
+    'mfi',
+    'pine_atr',
+    'pivot_bars',
+    'pivot_values',
+]
@@ -0,0 +1,187 @@
+"""
+Wave / Cycle Kernels
+波段与周期内核 - Weis_Wave_Volume 的分段累计成交量，RSI_Cyclic_Smoothed 的cRSI递推与动态百分位带
+
+- segment_sum(): 分段累加（段首重新计数），与逐bar nz(vol[1]) + volume 的加法顺序一致
+- cyclic_rsi_core(): Wilder RSI（ta.rma，首个完整窗口均值作种子）与 cRSI 递推
+  crsi = torque * (2 * rsi - rsi[lag]) + (1 - torque) * nz(crsi[1])
+- band_steps() / band_step(): 动态带的步进求解。原版对 0..100 每一步数窗口内低于（不低于）测试值的个数，
+  等价于: 下带 = 第一个 lmin + mstep * s 大于第k小值的步，上带 = 第一个 lmax - mstep * s 不大于第k大值的步；
+  由估计值出发用与原版相同的浮点表达式校正，结果与逐步扫描逐位一致
+- SortedWindow: 滑动窗口有序表（二分插入/删除，NaN不入表），流式版本的顺序统计量
+
+流式版本与批量版本执行同样的浮点运算，结果逐位一致。
+"""
+import bisect
+import math
+from collections import deque
+
+import numpy as np
+
+from . import rolling
+from .rolling import _jit
+from .streaming import StreamingState
+
+
+@_jit
+def _segment_sum_loop(values, starts):
+    n = values.shape[0]
+    out = np.empty(n)
+    total = 0.0
+    for i in range(n):
+        total = values[i] if starts[i] else total + values[i]
+        out[i] = total
+    return out
+
+
+@_jit
+def _cyclic_rsi_loop(close, period, lag, torque):
+    n = close.shape[0]
+    rsi = np.full(n, np.nan)
+    crsi = np.full(n, np.nan)
+    alpha = 1.0 / period
+    alpha1 = 1.0 - alpha
+    decay = 1.0 - torque
+    up = down = 0.0
+    seeded = 0
+    previous = 0.0  # nz(crsi[1])
+    for t in range(1, n):
+        change = close[t] - close[t - 1]
+        gain = change if change > 0.0 else 0.0
+        loss = -change if change < 0.0 else 0.0
+        if seeded < period:
+            up += gain
+            down += loss
+            seeded += 1
+            if seeded < period:
+                continue
+            up = up / period
+            down = down / period
+        else:
+            up = up * alpha1 + gain * alpha
+            down = down * alpha1 + loss * alpha
+        if down == 0.0:
+            rsi[t] = 100.0
+        elif up == 0.0:
+            rsi[t] = 0.0
+        else:
+            rsi[t] = 100.0 - 100.0 / (1.0 + up / down)
+        if t >= lag and rsi[t - lag] == rsi[t - lag]:
+            previous = torque * (2.0 * rsi[t] - rsi[t - lag]) + decay * previous
+            crsi[t] = previous
+    return rsi, crsi
+
+
+def segment_sum(values, starts):
+    """分段累加: starts 为真的位置重新开始计数"""
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    starts = np.ascontiguousarray(starts, dtype=np.bool_)
+    loop = _segment_sum_loop if rolling.get_backend() == 'numba' else getattr(_segment_sum_loop, 'py_func',
+                                                                               _segment_sum_loop)
+    return loop(values, starts)
+
+
+def cyclic_rsi_core(close, period, lag, torque):
+    """
+    Wilder RSI 与 cRSI 递推
+
+    Returns:
+        (rsi, crsi): 预热期为NaN
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    loop = _cyclic_rsi_loop if rolling.get_backend() == 'numba' else getattr(_cyclic_rsi_loop, 'py_func',
+                                                                              _cyclic_rsi_loop)
+    return loop(close, int(period), int(lag), float(torque))
+
+
+def band_rank(memory, leveling):
+    """原版 ratio = count / memory >= leveling / 100 成立所需的最少个数k（不可能成立时为 memory + 1）"""
+    aperc = leveling / 100
+    for count in range(1, memory + 1):
+        if count / memory >= aperc:
+            return count
+    return memory + 1
+
+
+def band_steps(base, mstep, target, lower, steps=100):
+    """
+    动态带步进求解（向量化，逐元素）
+
+    Args:
+        base: 下带为 lmin，上带为 lmax
+        mstep: (lmax - lmin) / 100
+        target: 下带为窗口第k小值，上带为第k大值
+        lower: True 求下带（base + mstep * s > target），False 求上带（base - mstep * s <= target）
+
+    Returns:
+        (found, value): 0..steps 中是否有满足条件的步，以及第一个满足条件的测试值
+    """
+    base, mstep, target = (np.asarray(x, dtype=np.float64) for x in (base, mstep, target))
+
+    def test_value(s):
+        return base + mstep * s if lower else base - mstep * s
+
+    def satisfied(s):
+        return test_value(s) > target if lower else test_value(s) <= target
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        estimate = np.floor((target - base) / mstep) + 1 if lower else np.ceil((base - target) / mstep)
+    estimate = np.where(mstep > 0, estimate, np.where(satisfied(0.0), 0.0, steps + 1.0))
+    s = np.clip(np.nan_to_num(estimate, nan=steps + 1.0), 0.0, steps + 1.0)
+    # 条件对 s 单调，估计值向两侧校正到第一个满足条件的步
+    while True:
+        back = (s > 0) & satisfied(s - 1)
+        if not back.any():
+            break
+        s = np.where(back, s - 1, s)
+    while True:
+        forward = (s <= steps) & ~satisfied(s)
+        if not forward.any():
+            break
+        s = np.where(forward, s + 1, s)
+    found = (s <= steps) & satisfied(s)
+    return found, test_value(s)
+
+
+def band_step(base, mstep, target, lower, steps=100):
+    """band_steps() 的标量版本（流式逐bar调用），无满足条件的步时返回None"""
+    def test_value(s):
+        return base + mstep * s if lower else base - mstep * s
+
+    def satisfied(s):
+        return test_value(s) > target if lower else test_value(s) <= target
+
+    if mstep > 0:
+        ratio = min(max((target - base) / mstep if lower else (base - target) / mstep, -1.0), steps + 1.0)
+        s = min(max(math.floor(ratio) + 1 if lower else math.ceil(ratio), 0), steps + 1)
+    else:
+        s = 0 if satisfied(0) else steps + 1
+    while s > 0 and satisfied(s - 1):
+        s -= 1
+    while s <= steps and not satisfied(s):
+        s += 1
+    return test_value(s) if s <= steps and satisfied(s) else None
+
+
+class SortedWindow(StreamingState):
+    """
+    滑动窗口有序表: 最近 period 个值（NaN占位但不参与排序），二分插入/删除
+
+    update(x) 推进一格；values 为窗口内有效值的升序列表
+    """
+    __slots__ = ('period', 'recent', 'values')
+
+    def __init__(self, period):
+        self.period = period
+        self.recent = deque(maxlen=period)
+        self.values = []
+
+    def update(self, x):
+        if len(self.recent) == self.period:
+            old = self.recent[0]
+            if old == old:
+                del self.values[bisect.bisect_left(self.values, old)]
+        self.recent.append(x)
+        if x == x:
+            bisect.insort(self.values, x)
+        return self.values
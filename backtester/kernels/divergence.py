@@ -0,0 +1,65 @@
+"""
+Divergence Kernels
+背离内核 - Divergence_Many_Indicators 的"视线"检查（positive_regular_positive_hidden_divergence /
+negative_regular_negative_hidden_divergence 内层循环）
+
+当前点（end - startpoint）与 length 根之前的枢轴bar之间连两条虚拟直线（振荡器、收盘价），
+中间每根bar的振荡器值与 nz(收盘价) 都不越过直线（看涨: 不低于；看跌: 不高于）时背离成立。
+直线按原版逐步减去斜率（virtual_line := virtual_line - slope），浮点结果与原版逐位一致。
+
+- sight_line_clear(): 单个候选的检查（流式版本逐bar调用）
+- divergence_lengths(): 按 (bar, 枢轴序号) 排好序的候选，每bar取第一个通过检查的枢轴距离（原版 divlen）
+"""
+import numpy as np
+
+from .rolling import _jit
+
+
+@_jit
+def sight_line_clear(src, close, end, length, startpoint, bullish):
+    """
+    src / close 中 end - startpoint 与 end - length 两点间的虚拟直线检查
+
+    Args:
+        src, close: 一维float数组（振荡器 / 收盘价），end 为当前bar下标
+        length: 枢轴距当前bar的根数（原版 len）
+        startpoint: 0（Don't Wait for Confirmation）或 1
+        bullish: True 为看涨（低点）检查，False 为看跌（高点）检查
+    """
+    first = src[end - startpoint]
+    slope1 = (first - src[end - length]) / (length - startpoint)
+    line1 = first - slope1
+    last_close = close[end - length]
+    if not bullish and last_close != last_close:
+        last_close = 0.0  # 看跌分支原版为 nz(close[len])
+    slope2 = (close[end - startpoint] - last_close) / (length - startpoint)
+    line2 = close[end - startpoint] - slope2
+    for y in range(1 + startpoint, length):
+        value = src[end - y]
+        price = close[end - y]
+        if price != price:
+            price = 0.0
+        if bullish:
+            if value < line1 or price < line2:
+                return False
+        elif value > line1 or price > line2:
+            return False
+        line1 -= slope1
+        line2 -= slope2
+    return True
+
+
+@_jit
+def divergence_lengths(src, close, bars, lengths, startpoint, bullish):
+    """
+    每bar第一个通过视线检查的候选的枢轴距离，无则为0
+
+    Args:
+        bars, lengths: 候选的当前bar下标与枢轴距离，按 bar 升序、同一bar内按枢轴由近到远排列
+    """
+    out = np.zeros(src.shape[0], dtype=np.int64)
+    for i in range(bars.shape[0]):
+        t = bars[i]
+        if out[t] == 0 and sight_line_clear(src, close, t, lengths[i], startpoint, bullish):
+            out[t] = lengths[i]
+    return out
@@ -0,0 +1,175 @@
+"""
+Lorentzian Nearest-Neighbour Kernels
+Lorentzian距离近邻投票内核 - ML_Lorentzian_Classification 的近邻搜索
+
+Pine原版语义（逐项复现）:
+- 距离 d(i) = Σ_f log(1 + |f[t] - f[t-i]|)，i = 0, spacing, 2*spacing, ... ≤ max_bars_back - 1
+  （按时间从新到旧、等间隔抽样，i=0 即当前bar本身）
+- bar_index >= max_bars_back 时才搜索；d >= last_dist 的候选插入近邻表表头，
+  表长超过 neighbors 时 last_dist 取表中第 int(neighbors*3/4) 项并丢弃表尾
+- 近邻表（distances / predictions）为Pine的 var 数组，跨bar保留；last_dist 每bar重置为-1
+- prediction = 近邻表中标签之和；NaN距离的比较恒为False（与Pine的na比较一致）
+
+实现:
+- 特征历史为预分配的 (容量, 特征数) float64 数组，近邻表为 neighbors+1 长的定长缓冲
+- lorentzian_knn(): 全序列批量计算（numba后端为编译循环，numpy后端逐bar向量化求距离）
+- LorentzianNeighbors: 逐bar流式版本，特征/标签历史为容量 max_bars_back 的环形缓冲，
+  内存与序列长度无关（Pine原版数组随bar数无限增长）
+"""
+import math
+
+import numpy as np
+
+from . import rolling
+from .rolling import _jit
+from .streaming import StreamingState
+
+
+@_jit
+def _knn_step(features, labels, head, capacity, size, spacing, distances, votes, count, neighbors, vote_index):
+    """
+    一根bar的近邻搜索，features/labels 为环形缓冲（head 为当前bar所在行）
+
+    Returns:
+        近邻表长度（distances/votes 的前 count 项有效）
+    """
+    n_features = features.shape[1]
+    last_dist = -1.0
+    for i in range(0, size + 1, spacing):
+        row = head - i
+        if row < 0:
+            row += capacity
+        d = 0.0
+        for f in range(n_features):
+            d += math.log(1.0 + abs(features[head, f] - features[row, f]))
+        if d >= last_dist:
+            for m in range(count, 0, -1):
+                distances[m] = distances[m - 1]
+                votes[m] = votes[m - 1]
+            distances[0] = d
+            votes[0] = labels[row]
+            count += 1
+            if count > neighbors:
+                last_dist = distances[vote_index]
+                count -= 1
+    return count
+
+
+@_jit
+def _knn_loop(features, labels, neighbors, max_bars_back, spacing):
+    n = features.shape[0]
+    prediction = np.zeros(n)
+    distances = np.empty(neighbors + 1)
+    votes = np.zeros(neighbors + 1)
+    vote_index = neighbors * 3 // 4
+    count = 0
+    for t in range(max_bars_back, n):
+        count = _knn_step(features, labels, t, n, max_bars_back - 1, spacing,
+                          distances, votes, count, neighbors, vote_index)
+        total = 0.0
+        for m in range(count):
+            total += votes[m]
+        prediction[t] = total
+    return prediction
+
+
+def _knn_numpy(features, labels, neighbors, max_bars_back, spacing):
+    """逐bar向量化求全部候选距离，再按时间顺序做插入扫描"""
+    n, n_features = features.shape
+    prediction = np.zeros(n)
+    lags = np.arange(0, max_bars_back, spacing)
+    vote_index = neighbors * 3 // 4
+    distances, votes = [], []
+    for t in range(max_bars_back, n):
+        rows = t - lags
+        candidate = np.zeros(len(rows))
+        for f in range(n_features):
+            candidate += np.log(1.0 + np.abs(features[t, f] - features[rows, f]))
+        last_dist = -1.0
+        for d, row in zip(candidate.tolist(), rows.tolist()):
+            if d >= last_dist:
+                distances.insert(0, d)
+                votes.insert(0, labels[row])
+                if len(votes) > neighbors:
+                    last_dist = distances[vote_index]
+                    distances.pop()
+                    votes.pop()
+        prediction[t] = math.fsum(votes)
+    return prediction
+
+
+def _check_params(neighbors, max_bars_back, spacing):
+    if neighbors < 1 or max_bars_back < 1 or spacing < 1:
+        raise ValueError(f"neighbors/max_bars_back/spacing 必须为正整数: "
+                         f"{neighbors}, {max_bars_back}, {spacing}")
+
+
+def lorentzian_knn(features, labels, neighbors=8, max_bars_back=2000, spacing=4):
+    """
+    Lorentzian近邻投票全序列计算
+
+    Args:
+        features: (bar数, 特征数) float数组，NaN表示特征尚未完成预热
+        labels: 每根bar的训练标签（-1 / 0 / 1）
+        neighbors: 近邻数
+        max_bars_back: 回看bar数（同时是开始搜索的bar序号）
+        spacing: 候选抽样间隔（Pine原版为4）
+
+    Returns:
+        prediction: float64数组，近邻标签之和；max_bars_back 之前为0
+    """
+    _check_params(neighbors, max_bars_back, spacing)
+    features = np.ascontiguousarray(features, dtype=np.float64)
+    labels = np.ascontiguousarray(labels, dtype=np.float64)
+    if features.ndim != 2 or len(labels) != features.shape[0]:
+        raise ValueError(f"features 应为 (bar数, 特征数)，labels 等长: {features.shape}, {labels.shape}")
+    if rolling.get_backend() == 'numba':
+        return _knn_loop(features, labels, int(neighbors), int(max_bars_back), int(spacing))
+    return _knn_numpy(features, labels, int(neighbors), int(max_bars_back), int(spacing))
+
+
+class LorentzianNeighbors(StreamingState):
+    """
+    逐bar近邻投票，特征与标签历史为容量 max_bars_back 的环形缓冲
+
+    与 lorentzian_knn() 同一内核（numba可用时为编译函数），逐bar结果逐位一致。
+    """
+    __slots__ = ('neighbors', 'max_bars_back', 'spacing', 'features', 'labels',
+                 'head', 'bars', 'count', 'distances', 'votes')
+
+    def __init__(self, n_features, neighbors=8, max_bars_back=2000, spacing=4):
+        _check_params(neighbors, max_bars_back, spacing)
+        self.neighbors = neighbors
+        self.max_bars_back = max_bars_back
+        self.spacing = spacing
+        self.features = np.full((max_bars_back, n_features), np.nan)
+        self.labels = np.zeros(max_bars_back)
+        self.head = -1
+        self.bars = 0
+        self.count = 0
+        self.distances = np.empty(neighbors + 1)
+        self.votes = np.zeros(neighbors + 1)
+
+    def update(self, features, label):
+        """
+        推进一根bar
+
+        Args:
+            features: 当前bar的特征向量
+            label: 当前bar的训练标签
+
+        Returns:
+            prediction（近邻标签之和）
+        """
+        self.head = (self.head + 1) % self.max_bars_back
+        self.features[self.head] = features
+        self.labels[self.head] = label
+        self.bars += 1
+        if self.bars > self.max_bars_back:
+            self.count = _knn_step(self.features, self.labels, self.head, self.max_bars_back,
+                                   self.max_bars_back - 1, self.spacing, self.distances, self.votes,
+                                   self.count, self.neighbors, self.neighbors * 3 // 4)
+        total = 0.0
+        for m in range(self.count):
+            total += self.votes[m]
+        return total
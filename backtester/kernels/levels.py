@@ -0,0 +1,163 @@
+"""
+Key Level Zone Kernels
+关键位区间内核 - Bj_Key_Levels 的枢轴区数组（高点区 / 低点区各 n_pivots 个）逐bar状态机
+
+每根bar（与Pine原版顺序一致）:
+1. 新确认的枢轴高点（低点）区插入数组头部，超出 n_pivots 时丢弃最旧的（_arrayBox）；
+   高点区初始为空头区，低点区初始为多头区
+2. align=True 时用 _align 规则把每组最新的区对齐到与之重叠的区（H←H、L←H、L←L、H←L）
+3. 收盘价上穿空头区上沿转为多头区（track + 1），下穿多头区下沿转为空头区（track - 1）（_color）
+4. 统计多头区数与有效区数（_numLevel），查找当前bar所在的区（_detect，高点区优先）
+
+区数组以 (2, n_pivots) 数组保存: 第0行高点区，第1行低点区；flags 为 -1(na) / 0(空头) / 1(多头)。
+批量循环与流式版本调用同一个 _zone_step，结果逐位一致。
+"""
+import numpy as np
+
+from . import rolling
+from .rolling import _jit
+
+
+@_jit
+def _heikin_ashi_loop(open_, high, low, close):
+    n = close.shape[0]
+    ha_open = np.empty(n)
+    ha_close = (open_ + high + low + close) / 4
+    for t in range(n):
+        ha_open[t] = (open_[t] + close[t]) / 2 if t == 0 else (ha_open[t - 1] + ha_close[t - 1]) / 2
+    return ha_open, ha_close
+
+
+@_jit
+def _unshift(tops, bottoms, flags, side, top, bottom, flag):
+    for i in range(tops.shape[1] - 1, 0, -1):
+        tops[side, i] = tops[side, i - 1]
+        bottoms[side, i] = bottoms[side, i - 1]
+        flags[side, i] = flags[side, i - 1]
+    tops[side, 0] = top
+    bottoms[side, 0] = bottom
+    flags[side, 0] = flag
+
+
+@_jit
+def _align(tops, bottoms, source, target):
+    """_align(_x, _y): target组最新区与source组任一区重叠时取该区的上下沿"""
+    for i in range(tops.shape[1]):
+        top, bottom = tops[target, 0], bottoms[target, 0]
+        t, b = tops[source, i], bottoms[source, i]
+        if (top > b and top < t) or (bottom < t and bottom > b) or (top > t and bottom < b) or \
+                (bottom > b and top < t):
+            tops[target, 0] = t
+            bottoms[target, 0] = b
+
+
+@_jit
+def _zone_step(tops, bottoms, flags, tracks, new_high, high_top, high_bottom, new_low, low_top, low_bottom,
+               align, high, low, close):
+    """
+    推进一根bar
+
+    Returns:
+        (多头区数, 有效区数, 所在区 1多头 / -1空头 / 0无, 下方最近区上沿, 上方最近区下沿)
+    """
+    if new_high:
+        _unshift(tops, bottoms, flags, 0, high_top, high_bottom, 0)
+    if new_low:
+        _unshift(tops, bottoms, flags, 1, low_top, low_bottom, 1)
+    if align:
+        _align(tops, bottoms, 0, 0)
+        _align(tops, bottoms, 0, 1)
+        _align(tops, bottoms, 1, 1)
+        _align(tops, bottoms, 1, 0)
+
+    n_pivots = tops.shape[1]
+    for side in range(2):
+        for i in range(n_pivots):
+            flag = flags[side, i]
+            if close > tops[side, i] and flag == 0:
+                flags[side, i] = 1
+                tracks[side] += 1
+            if close < bottoms[side, i] and flag == 1:
+                flags[side, i] = 0
+                tracks[side] -= 1
+
+    bullish = 0
+    total = 0
+    zone = 0
+    found_bull = False
+    support = np.nan
+    resistance = np.nan
+    for side in range(2):
+        found = False
+        for i in range(n_pivots):
+            flag = flags[side, i]
+            top, bottom = tops[side, i], bottoms[side, i]
+            if flag == 1:
+                bullish += 1
+            if flag >= 0:
+                total += 1
+            if not found and low < top and high > bottom:
+                found = True
+                zone = -1
+                found_bull = found_bull or flag == 1
+            if top < close and not top <= support:
+                support = top
+            if bottom > close and not bottom >= resistance:
+                resistance = bottom
+    if zone != 0 and found_bull:
+        zone = 1
+    return bullish, total, zone, support, resistance
+
+
+@_jit
+def _key_zone_loop(high, low, close, new_high, high_level, new_low, low_level, band, n_pivots, align):
+    n = close.shape[0]
+    tops = np.full((2, n_pivots), np.nan)
+    bottoms = np.full((2, n_pivots), np.nan)
+    flags = np.full((2, n_pivots), -1, dtype=np.int8)
+    tracks = np.full(2, n_pivots, dtype=np.int64)
+    out = np.empty((7, n))
+    for t in range(n):
+        bullish, total, zone, support, resistance = _zone_step(
+            tops, bottoms, flags, tracks, new_high[t], high_level[t] + band[t], high_level[t] - band[t],
+            new_low[t], low_level[t] + band[t], low_level[t] - band[t], align, high[t], low[t], close[t])
+        out[0, t] = bullish
+        out[1, t] = total
+        out[2, t] = zone
+        out[3, t] = support
+        out[4, t] = resistance
+        out[5, t] = tracks[0]
+        out[6, t] = tracks[1]
+    return out
+
+
+def heikin_ashi(open_, high, low, close):
+    """Heikin Ashi (开, 收)：首根开盘为 (open + close) / 2"""
+    arrays = tuple(np.ascontiguousarray(x, dtype=np.float64) for x in (open_, high, low, close))
+    loop = _heikin_ashi_loop if rolling.get_backend() == 'numba' else getattr(_heikin_ashi_loop, 'py_func',
+                                                                               _heikin_ashi_loop)
+    return loop(*arrays)
+
+
+def key_zones(high, low, close, new_high, high_level, new_low, low_level, band, n_pivots=4, align=True):
+    """
+    枢轴区状态机全序列推进
+
+    Args:
+        high, low, close: 一维float数组
+        new_high / new_low: 每根bar是否确认了新的枢轴高点 / 低点（在确认bar上为真）
+        high_level / low_level: 确认bar上对应的枢轴值
+        band: 确认bar上的区半宽（区 = 枢轴值 ± band）
+        n_pivots: 每组保留的区数
+        align: 是否对齐重叠区
+
+    Returns:
+        (7, bar数): 多头区数、有效区数、所在区、下方最近区上沿、上方最近区下沿、高点组track、低点组track
+    """
+    high, low, close, high_level, low_level, band = (np.ascontiguousarray(x, dtype=np.float64) for x in
+                                                     (high, low, close, high_level, low_level, band))
+    new_high = np.ascontiguousarray(new_high, dtype=np.bool_)
+    new_low = np.ascontiguousarray(new_low, dtype=np.bool_)
+    loop = _key_zone_loop if rolling.get_backend() == 'numba' else getattr(_key_zone_loop, 'py_func',
+                                                                            _key_zone_loop)
+    return loop(high, low, close, new_high, high_level, new_low, low_level, band, int(n_pivots), bool(align))
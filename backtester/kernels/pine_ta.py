@@ -0,0 +1,99 @@
+"""
+Pine ta.* Kernels
+Pine内置函数内核 - 多个移植指标（Lorentzian、多指标背离、自适应SuperTrend、关键位）与 pine.runtime 共用的
+ta.change / ta.rsi / ta.cci / ta.mfi / ta.atr / ta.pivothigh / ta.pivotlow 批量实现
+
+- 平滑与滚动和均走 rolling 的 smma / sma，流式版本（RollingMean、ExponentialMean）按同一定义递推
+- 首根bar的变化量为NaN（ta.change），ta.atr 的首根TR为 high - low（Backtrader的TrueRange首根为NaN）
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from . import rolling
+
+
+def change(values, length=1):
+    """ta.change：values - values[length]，前 length 根为NaN"""
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    out[length:] = values[length:] - values[:-length]
+    return out
+
+
+def rolling_sum(values, period):
+    """math.sum：以 sma * period 计算，与流式 RollingMean * period 同一口径"""
+    return rolling.sma(values, period) * period
+
+
+def rsi(close, period):
+    """ta.rsi：涨跌幅的Wilder平滑（首根bar无变化量）"""
+    delta = change(close)
+    up = rolling.smma(np.maximum(delta, 0.0), period)
+    down = rolling.smma(-np.minimum(delta, 0.0), period)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(down == 0, 100.0, np.where(up == 0, 0.0, 100.0 - 100.0 / (1.0 + up / down)))
+
+
+def cci(values, period):
+    """ta.cci：(src - SMA) / (0.015 * 平均绝对偏差)，偏差为0时为NaN"""
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    mean = rolling.sma(values, period)
+    dev = np.full(len(values), np.nan)
+    if len(values) >= period:
+        windows = sliding_window_view(values, period)
+        dev[period - 1:] = np.abs(windows - mean[period - 1:, None]).sum(axis=1) / period
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(dev == 0, np.nan, (values - mean) / (0.015 * dev))
+
+
+def mfi(src, volume, period):
+    """ta.mfi(src, length)：首根bar的变化量为na，按上涨计入"""
+    src = np.asarray(src, dtype=np.float64)
+    delta = change(src)
+    flow = volume * src
+    with np.errstate(invalid='ignore'):
+        upper = rolling_sum(np.where(delta <= 0, 0.0, flow), period)
+        lower = rolling_sum(np.where(delta >= 0, 0.0, flow), period)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 100.0 - 100.0 / (1.0 + upper / lower)
+
+
+def pine_atr(high, low, close, period):
+    """ta.atr：首根bar的TR为 high - low（Backtrader的TrueRange首根为NaN）"""
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    tr = high - low
+    prev_close = close[:-1]
+    tr[1:] = np.maximum(np.maximum(tr[1:], np.abs(high[1:] - prev_close)), np.abs(low[1:] - prev_close))
+    return rolling.smma(tr, period)
+
+
+def pivot_bars(values, left, right, high=True):
+    """
+    ta.pivothigh / ta.pivotlow 的枢轴bar下标（中心值严格大于/小于左右各 left / right 根，窗口含NaN不成立）
+
+    Returns:
+        升序int64数组；枢轴在 下标 + right 处确认
+    """
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    n = len(values)
+    sign = 1.0 if high else -1.0
+    signed = values * sign
+    if n < left + right + 1:
+        return np.empty(0, dtype=np.int64)
+    left_max = rolling.highest(signed, left) if left > 0 else np.full(n, -np.inf)
+    right_max = rolling.highest(signed, right) if right > 0 else np.full(n, -np.inf)
+    center = signed[left:n - right]
+    before = left_max[left - 1:n - right - 1] if left > 0 else left_max[left:n - right]
+    after = right_max[left + right:] if right > 0 else right_max[left:n - right]
+    return np.flatnonzero((center > before) & (center > after)) + left
+
+
+def pivot_values(values, left, right, high=True):
+    """ta.pivothigh / ta.pivotlow 的序列形式：确认bar（枢轴 + right）上为枢轴值，其余为NaN"""
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    bars = pivot_bars(values, left, right, high)
+    out[bars + right] = values[bars]
+    return out
@@ -0,0 +1,497 @@
+"""
+Rolling Primitive Kernels
+滚动窗口基础算子 - 供安全指标与策略过滤器共用的全序列计算内核
+
+所有函数接收一维float数组，返回等长float64数组，预热期为NaN。
+数值语义与Backtrader内置指标一致：
+- sma:        btind.SimpleMovingAverage
+- ema / smma: btind.ExponentialMovingAverage / SmoothedMovingAverage（首个完整窗口均值作种子；
+              种子和按 math.fsum 正确舍入，两个后端逐位一致）
+- stddev:     btind.StandardDeviation（总体标准差；numba后端用Welford更新，数值上更稳定）
+- true_range: btind.TrueRange（首根为NaN）
+- atr:        btind.AverageTrueRange (Wilder平滑)
+- highest / lowest: btind.Highest / btind.Lowest
+- sma_bank / ema_bank / smma_bank: 同一序列的K个周期一次遍历，返回 (K, bar数)，
+  每行与对应周期的单独调用逐位一致
+
+后端:
+- 'numba': numba.njit(cache=True, nogil=True) 编译的循环内核（需安装numba）；
+  sma/stddev 为滑动累加与Welford更新（定期重新锚定），highest/lowest 为单调队列，
+  每bar摊还O(1)，与窗口长度无关；执行期间释放GIL，可由线程池并行（见 indicators.parallel）
+- 'numpy': 纯NumPy实现（滑动窗口视图；递推类算子为Python循环，持有GIL）
+
+逐bar流式版本见 kernels.streaming。
+"""
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# --- Performance (optional) ---
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except Exception:
+    njit = None
+    HAS_NUMBA = False
+
+
+BACKENDS = ('numba', 'numpy')
+_backend = 'numba' if HAS_NUMBA else 'numpy'
+
+# 滑动累加/Welford 状态每隔多少根从窗口重新计算（至少为一个完整窗口，摊还O(1)）
+REANCHOR_INTERVAL = 1024
+
+
+def _reanchor_interval(period):
+    return max(period, REANCHOR_INTERVAL)
+
+
+def set_backend(name):
+    """
+    切换内核后端
+
+    Args:
+        name: 'numba' | 'numpy' | 'auto'（numba可用时使用numba）
+    """
+    global _backend
+    if name == 'auto':
+        name = 'numba' if HAS_NUMBA else 'numpy'
+    if name not in BACKENDS:
+        raise ValueError(f"未知内核后端: {name}，可选: {BACKENDS + ('auto',)}")
+    if name == 'numba' and not HAS_NUMBA:
+        raise ImportError("numba未安装，无法使用numba后端: pip install numba")
+    _backend = name
+
+
+def get_backend():
+    """当前内核后端名称"""
+    return _backend
+
+
+def _jit(func):
+    """numba可用时编译为机器码（cache=True 避免每次进程启动重新编译；nogil=True 允许多线程并行执行）"""
+    if HAS_NUMBA:
+        return njit(cache=True, nogil=True)(func)
+    return func
+
+
+def _as_float_array(values):
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+# ---------------------------------------------------------------------------
+# numba 循环内核
+# ---------------------------------------------------------------------------
+
+@_jit
+def _sma_loop(values, period, reanchor):
+    # 滑动累加和，窗口内含NaN时输出NaN；每 reanchor 根从窗口重新求和以消除累积误差
+    n = values.shape[0]
+    out = np.full(n, np.nan)
+    total = 0.0
+    nan_count = 0
+    since_anchor = 0
+    for i in range(n):
+        x = values[i]
+        if np.isnan(x):
+            nan_count += 1
+        else:
+            total += x
+        if i >= period:
+            old = values[i - period]
+            if np.isnan(old):
+                nan_count -= 1
+            else:
+                total -= old
+        if i < period - 1:
+            continue
+
+        since_anchor += 1
+        if since_anchor >= reanchor:
+            since_anchor = 0
+            total = 0.0
+            for j in range(i - period + 1, i + 1):
+                if not np.isnan(values[j]):
+                    total += values[j]
+        if nan_count == 0:
+            out[i] = total / period
+    return out
+
+
+@_jit
+def _stddev_loop(values, period, reanchor):
+    # Welford滑动窗口方差：替换最旧值时同步更新均值与M2，
+    # 每 reanchor 根用两遍法从窗口重新计算（re-anchoring）
+    n = values.shape[0]
+    out = np.full(n, np.nan)
+    mean = 0.0
+    m2 = 0.0
+    nan_count = 0
+    since_anchor = reanchor
+    for i in range(n):
+        if np.isnan(values[i]):
+            nan_count += 1
+        if i >= period and np.isnan(values[i - period]):
+            nan_count -= 1
+        if i < period - 1:
+            continue
+        if nan_count > 0:
+            # 窗口含NaN：离开NaN后需要重新锚定
+            since_anchor = reanchor
+            continue
+
+        since_anchor += 1
+        if since_anchor >= reanchor:
+            since_anchor = 0
+            total = 0.0
+            for j in range(i - period + 1, i + 1):
+                total += values[j]
+            mean = total / period
+            m2 = 0.0
+            for j in range(i - period + 1, i + 1):
+                m2 += (values[j] - mean) * (values[j] - mean)
+        else:
+            x_new = values[i]
+            x_old = values[i - period]
+            delta = x_new - x_old
+            new_mean = mean + delta / period
+            m2 += delta * (x_new - new_mean + x_old - mean)
+            mean = new_mean
+        out[i] = abs(m2 / period) ** 0.5
+    return out
+
+
+@_jit
+def _extreme_loop(values, period, sign):
+    # 单调双端队列（数组+首尾指针），每个下标至多入队出队一次
+    # sign=1.0 为滚动最大值，sign=-1.0 为滚动最小值
+    n = values.shape[0]
+    out = np.full(n, np.nan)
+    queue = np.empty(n, dtype=np.int64)
+    head = 0
+    tail = 0
+    nan_count = 0
+    for i in range(n):
+        x = values[i]
+        if np.isnan(x):
+            nan_count += 1
+        else:
+            while tail > head and sign * values[queue[tail - 1]] <= sign * x:
+                tail -= 1
+            queue[tail] = i
+            tail += 1
+        if i >= period and np.isnan(values[i - period]):
+            nan_count -= 1
+        while tail > head and queue[head] <= i - period:
+            head += 1
+        if i >= period - 1 and nan_count == 0:
+            out[i] = values[queue[head]]
+    return out
+
+
+@_jit
+def _partials_add(partials, count, x):
+    # math.fsum 的 Shewchuk 无重叠部分和：把 x 并入 partials[:count]，返回新的个数
+    i = 0
+    for j in range(count):
+        y = partials[j]
+        if abs(x) < abs(y):
+            x, y = y, x
+        hi = x + y
+        lo = y - (hi - x)
+        if lo != 0.0:
+            partials[i] = lo
+            i += 1
+        x = hi
+    if x != 0.0:
+        partials[i] = x
+        i += 1
+    return i
+
+
+@_jit
+def _partials_sum(partials, count):
+    # 与 CPython math.fsum 相同的最终舍入（含半数进位修正），不修改 partials
+    hi = 0.0
+    if count > 0:
+        count -= 1
+        hi = partials[count]
+        lo = 0.0
+        while count > 0:
+            x = hi
+            count -= 1
+            y = partials[count]
+            hi = x + y
+            lo = y - (hi - x)
+            if lo != 0.0:
+                break
+        if count > 0 and ((lo < 0.0 and partials[count - 1] < 0.0) or
+                          (lo > 0.0 and partials[count - 1] > 0.0)):
+            y = lo * 2.0
+            x = hi + y
+            if y == x - hi:
+                hi = x
+    return hi
+
+
+@_jit
+def _seed_sum(partials, count, total):
+    # 种子和与 numpy 后端的 math.fsum 逐位一致；含 inf/NaN 时 fsum 语义退化为普通累加结果
+    if not np.isfinite(total):
+        return total
+    return _partials_sum(partials, count)
+
+
+@_jit
+def _ema_loop(values, period, alpha):
+    n = values.shape[0]
+    out = np.full(n, np.nan)
+
+    # 种子：首个非NaN位置起的 period 个值的算术均值
+    start = 0
+    while start < n and np.isnan(values[start]):
+        start += 1
+    seed_end = start + period
+    if seed_end > n:
+        return out
+
+    partials = np.empty(period + 1)
+    count = 0
+    total = 0.0
+    for j in range(start, seed_end):
+        count = _partials_add(partials, count, values[j])
+        total += values[j]
+    prev = _seed_sum(partials, count, total) / period
+    out[seed_end - 1] = prev
+
+    alpha1 = 1.0 - alpha
+    for i in range(seed_end, n):
+        prev = prev * alpha1 + values[i] * alpha
+        out[i] = prev
+    return out
+
+
+@_jit
+def _sma_bank_loop(values, periods, reanchors):
+    # 与 _sma_loop 相同的滑动累加/重新锚定，K个窗口共用一次对输入的遍历
+    n = values.shape[0]
+    k_count = periods.shape[0]
+    out = np.full((k_count, n), np.nan)
+    totals = np.zeros(k_count)
+    nan_counts = np.zeros(k_count, dtype=np.int64)
+    since_anchor = np.zeros(k_count, dtype=np.int64)
+    running_nan = 0
+    for i in range(n):
+        x = values[i]
+        x_nan = np.isnan(x)
+        if x_nan:
+            running_nan += 1
+        for k in range(k_count):
+            period = periods[k]
+            if x_nan:
+                nan_counts[k] += 1
+            else:
+                totals[k] += x
+            if i >= period:
+                old = values[i - period]
+                if np.isnan(old):
+                    nan_counts[k] -= 1
+                else:
+                    totals[k] -= old
+            if i < period - 1:
+                continue
+
+            since_anchor[k] += 1
+            if since_anchor[k] >= reanchors[k]:
+                since_anchor[k] = 0
+                total = 0.0
+                for j in range(i - period + 1, i + 1):
+                    if not np.isnan(values[j]):
+                        total += values[j]
+                totals[k] = total
+            if nan_counts[k] == 0:
+                out[k, i] = totals[k] / period
+    return out
+
+
+@_jit
+def _ema_bank_loop(values, periods, alphas):
+    # 与 _ema_loop 相同的播种与递推；种子和为从首个非NaN位置起的前缀精确和，K个EMA共用
+    n = values.shape[0]
+    k_count = periods.shape[0]
+    # 输出为 K×n，写入是主要开销：只对各行预热段填NaN，不做整块预填充
+    out = np.empty((k_count, n))
+
+    start = 0
+    while start < n and np.isnan(values[start]):
+        start += 1
+    for k in range(k_count):
+        out[k, :min(n, start + periods[k] - 1)] = np.nan
+
+    prev = np.zeros(k_count)
+    max_period = periods.max()
+    partials = np.empty(max_period + 1)
+    partial_count = 0
+    prefix = 0.0
+    for i in range(start, n):
+        x = values[i]
+        count = i - start + 1
+        if count <= max_period:
+            partial_count = _partials_add(partials, partial_count, x)
+            prefix += x
+        for k in range(k_count):
+            period = periods[k]
+            if count == period:
+                prev[k] = _seed_sum(partials, partial_count, prefix) / period
+                out[k, i] = prev[k]
+            elif count > period:
+                prev[k] = prev[k] * (1.0 - alphas[k]) + x * alphas[k]
+                out[k, i] = prev[k]
+    return out
+
+
+# ---------------------------------------------------------------------------
+# NumPy 实现
+# ---------------------------------------------------------------------------
+
+def _window_reduce(values, period, reducer):
+    out = np.full(len(values), np.nan)
+    if len(values) >= period:
+        out[period - 1:] = reducer(sliding_window_view(values, period), axis=1)
+    return out
+
+
+def _stddev_numpy(values, period):
+    mean = _window_reduce(values, period, np.sum) / period
+    meansq = _window_reduce(values ** 2, period, np.sum) / period
+    return np.abs(meansq - mean ** 2) ** 0.5
+
+
+def _ema_python(values, period, alpha):
+    n = len(values)
+    out = np.full(n, np.nan)
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid) == 0 or valid[0] + period > n:
+        return out
+
+    start = int(valid[0])
+    seed_end = start + period
+    prev = math.fsum(values[start:seed_end].tolist()) / period
+    out[seed_end - 1] = prev
+
+    alpha1 = 1.0 - alpha
+    result = []
+    append = result.append
+    for value in values[seed_end:].tolist():
+        prev = prev * alpha1 + value * alpha
+        append(prev)
+    out[seed_end:] = result
+    return out
+
+
+# ---------------------------------------------------------------------------
+# 公共接口
+# ---------------------------------------------------------------------------
+
+def sma(values, period):
+    """简单移动平均"""
+    values = _as_float_array(values)
+    if _backend == 'numba':
+        return _sma_loop(values, period, _reanchor_interval(period))
+    return _window_reduce(values, period, np.sum) / period
+
+
+def ema(values, period, alpha=None):
+    """指数移动平均，alpha 默认 2 / (1 + period)"""
+    values = _as_float_array(values)
+    if alpha is None:
+        alpha = 2.0 / (1.0 + period)
+    if _backend == 'numba':
+        return _ema_loop(values, period, alpha)
+    return _ema_python(values, period, alpha)
+
+
+def smma(values, period):
+    """Wilder平滑移动平均（alpha = 1 / period）"""
+    return ema(values, period, alpha=1.0 / period)
+
+
+def stddev(values, period):
+    """总体标准差（numpy后端与btind.StandardDeviation同一公式，numba后端为Welford）"""
+    values = _as_float_array(values)
+    if _backend == 'numba':
+        return _stddev_loop(values, period, _reanchor_interval(period))
+    return _stddev_numpy(values, period)
+
+
+def highest(values, period):
+    """滚动最大值"""
+    values = _as_float_array(values)
+    if _backend == 'numba':
+        return _extreme_loop(values, period, 1.0)
+    return _window_reduce(values, period, np.max)
+
+
+def lowest(values, period):
+    """滚动最小值"""
+    values = _as_float_array(values)
+    if _backend == 'numba':
+        return _extreme_loop(values, period, -1.0)
+    return _window_reduce(values, period, np.min)
+
+
+def true_range(high, low, close):
+    """真实波幅 max(high, prev_close) - min(low, prev_close)，首根为NaN"""
+    high = _as_float_array(high)
+    low = _as_float_array(low)
+    close = _as_float_array(close)
+
+    prev_close = np.empty(len(close))
+    prev_close[:1] = np.nan
+    prev_close[1:] = close[:-1]
+    true_high = np.where(prev_close > high, prev_close, high)
+    true_low = np.where(prev_close < low, prev_close, low)
+    tr = true_high - true_low
+    tr[:1] = np.nan
+    return tr
+
+
+def atr(high, low, close, period):
+    """平均真实波幅（TrueRange的Wilder平滑）"""
+    return smma(true_range(high, low, close), period)
+
+
+def _as_periods(periods):
+    periods = np.asarray(periods, dtype=np.int64).reshape(-1)
+    if len(periods) == 0 or periods.min() < 1:
+        raise ValueError(f"周期列表须非空且均为正整数: {periods.tolist()}")
+    return periods
+
+
+def sma_bank(values, periods):
+    """K个周期的简单移动平均，返回 (K, bar数)，第k行等于 sma(values, periods[k])"""
+    values = _as_float_array(values)
+    periods = _as_periods(periods)
+    if _backend == 'numba':
+        reanchors = np.array([_reanchor_interval(int(p)) for p in periods], dtype=np.int64)
+        return _sma_bank_loop(values, periods, reanchors)
+    return np.vstack([sma(values, int(p)) for p in periods])
+
+
+def ema_bank(values, periods, alphas=None):
+    """K个周期的指数移动平均，返回 (K, bar数)，第k行等于 ema(values, periods[k], alphas[k])"""
+    values = _as_float_array(values)
+    periods = _as_periods(periods)
+    if alphas is None:
+        alphas = 2.0 / (1.0 + periods)
+    alphas = np.asarray(alphas, dtype=np.float64).reshape(-1)
+    if _backend == 'numba':
+        return _ema_bank_loop(values, periods, alphas)
+    return np.vstack([ema(values, int(p), float(a)) for p, a in zip(periods, alphas)])
+
+
+def smma_bank(values, periods):
+    """K个周期的Wilder平滑移动平均，返回 (K, bar数)"""
+    periods = _as_periods(periods)
+    return ema_bank(values, periods, alphas=1.0 / periods)
@@ -0,0 +1,251 @@
+"""
+Streaming Rolling Statistics
+逐bar流式滚动统计 - kernels.rolling 批量算子的O(1)摊还版本
+
+每个类通过 update(x) 推进一根bar，返回当前窗口的统计值；窗口未满或
+窗口内含NaN时返回NaN（与批量算子一致）。
+- RollingMean:   滑动累加和，定期从窗口重新求和
+- RollingStdDev: Welford滑动窗口方差，定期两遍法重新锚定（总体标准差）
+- RollingMax / RollingMin: 单调双端队列
+- ExponentialMean: EMA/SMMA递推（同 kernels.ema：跳过开头NaN，首个完整窗口均值作种子）
+
+所有流式状态类继承 StreamingState，可 to_state() 导出为JSON兼容的dict，
+并由 StreamingState.from_state() 原样恢复（继续推进的结果逐位一致）。
+"""
+import math
+from collections import deque
+
+import numpy as np
+
+from .rolling import _reanchor_interval
+
+
+class StreamingState:
+    """
+    基于 __slots__ 的流式状态序列化
+
+    - deque 保存为 {'deque': [...], 'maxlen': n}
+    - numpy数组保存为 {'ndarray': [...], 'dtype': 类型名}
+    - 嵌套的 StreamingState 保存为 {'type': 类名, 'state': {...}}
+    子类按类名自动注册，from_state() 可恢复任意已注册类型。
+    """
+    __slots__ = ()
+    _types = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        StreamingState._types[cls.__name__] = cls
+
+    @classmethod
+    def _slot_names(cls):
+        names = []
+        for klass in reversed(cls.__mro__):
+            for name in getattr(klass, '__slots__', ()):
+                if name not in names:
+                    names.append(name)
+        return names
+
+    def to_state(self):
+        """导出状态（JSON兼容，NaN保持为float('nan')）"""
+        return {'type': type(self).__name__,
+                'state': {name: _encode(getattr(self, name)) for name in self._slot_names()}}
+
+    @classmethod
+    def from_state(cls, state):
+        """由 to_state() 的结果恢复实例"""
+        klass = StreamingState._types[state['type']]
+        if not issubclass(klass, cls):
+            raise TypeError(f"状态类型 {state['type']} 不是 {cls.__name__}")
+        obj = klass.__new__(klass)
+        for name, value in state['state'].items():
+            setattr(obj, name, _decode(value))
+        return obj
+
+
+def _encode(value):
+    if isinstance(value, StreamingState):
+        return value.to_state()
+    if isinstance(value, deque):
+        return {'deque': [_encode(item) for item in value], 'maxlen': value.maxlen}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return {'ndarray': value.tolist(), 'dtype': value.dtype.name}
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict):
+        if 'deque' in value:
+            return deque((_decode(item) for item in value['deque']), maxlen=value['maxlen'])
+        if 'ndarray' in value:
+            return np.array(value['ndarray'], dtype=value['dtype'])
+        if 'type' in value and 'state' in value:
+            return StreamingState.from_state(value)
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    return value
+
+
+class RollingMean(StreamingState):
+    """滑动窗口均值"""
+    __slots__ = ('period', 'reanchor', 'window', 'total', 'nan_count', 'since_anchor')
+
+    def __init__(self, period):
+        self.period = period
+        self.reanchor = _reanchor_interval(period)
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        self.nan_count = 0
+        self.since_anchor = 0
+
+    def update(self, x):
+        window = self.window
+        if len(window) == self.period:
+            old = window[0]
+            if old != old:
+                self.nan_count -= 1
+            else:
+                self.total -= old
+        window.append(x)
+        if x != x:
+            self.nan_count += 1
+        else:
+            self.total += x
+
+        if len(window) < self.period:
+            return float('nan')
+
+        self.since_anchor += 1
+        if self.since_anchor >= self.reanchor:
+            self.since_anchor = 0
+            self.total = math.fsum(v for v in window if v == v)
+        if self.nan_count:
+            return float('nan')
+        return self.total / self.period
+
+
+class RollingStdDev(StreamingState):
+    """滑动窗口总体标准差（Welford）"""
+    __slots__ = ('period', 'reanchor', 'window', 'mean', 'm2', 'nan_count', 'since_anchor')
+
+    def __init__(self, period):
+        self.period = period
+        self.reanchor = _reanchor_interval(period)
+        self.window = deque(maxlen=period)
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.nan_count = 0
+        self.since_anchor = self.reanchor
+
+    def _anchor(self):
+        self.since_anchor = 0
+        self.mean = math.fsum(self.window) / self.period
+        self.m2 = math.fsum((v - self.mean) * (v - self.mean) for v in self.window)
+
+    def update(self, x):
+        window = self.window
+        full = len(window) == self.period
+        old = window[0] if full else None
+        if full and old != old:
+            self.nan_count -= 1
+        window.append(x)
+        if x != x:
+            self.nan_count += 1
+
+        if len(window) < self.period:
+            return float('nan')
+        if self.nan_count:
+            # 窗口含NaN：离开NaN后需要重新锚定
+            self.since_anchor = self.reanchor
+            return float('nan')
+
+        self.since_anchor += 1
+        if not full or self.since_anchor >= self.reanchor:
+            self._anchor()
+        else:
+            delta = x - old
+            new_mean = self.mean + delta / self.period
+            self.m2 += delta * (x - new_mean + old - self.mean)
+            self.mean = new_mean
+        return abs(self.m2 / self.period) ** 0.5
+
+
+class _RollingExtreme(StreamingState):
+    """单调双端队列滚动极值，队列中保存 (下标, 值)"""
+    __slots__ = ('period', 'queue', 'count', 'nan_count', 'nan_window')
+
+    def __init__(self, period):
+        self.period = period
+        self.queue = deque()
+        self.count = 0
+        self.nan_count = 0
+        self.nan_window = deque(maxlen=period)
+
+    def _dominates(self, a, b):
+        raise NotImplementedError
+
+    def update(self, x):
+        i = self.count
+        self.count += 1
+
+        if len(self.nan_window) == self.period and self.nan_window[0]:
+            self.nan_count -= 1
+        is_nan = x != x
+        self.nan_window.append(is_nan)
+
+        queue = self.queue
+        if is_nan:
+            self.nan_count += 1
+        else:
+            while queue and self._dominates(x, queue[-1][1]):
+                queue.pop()
+            queue.append((i, x))
+        while queue and queue[0][0] <= i - self.period:
+            queue.popleft()
+
+        if self.count < self.period or self.nan_count:
+            return float('nan')
+        return queue[0][1]
+
+
+class RollingMax(_RollingExtreme):
+    """滚动最大值"""
+    __slots__ = ()
+
+    def _dominates(self, a, b):
+        return a >= b
+
+
+class RollingMin(_RollingExtreme):
+    """滚动最小值"""
+    __slots__ = ()
+
+    def _dominates(self, a, b):
+        return a <= b
+
+
+class ExponentialMean(StreamingState):
+    """指数移动平均，alpha 默认 2 / (1 + period)；alpha = 1 / period 即Wilder平滑"""
+    __slots__ = ('period', 'alpha', 'value', 'seed')
+
+    def __init__(self, period, alpha=None):
+        self.period = period
+        self.alpha = 2.0 / (1.0 + period) if alpha is None else alpha
+        self.value = None
+        self.seed = []
+
+    def update(self, x):
+        if self.value is None:
+            if x != x and not self.seed:
+                return float('nan')
+            self.seed.append(x)
+            if len(self.seed) < self.period:
+                return float('nan')
+            self.value = math.fsum(self.seed) / self.period
+            self.seed = []
+            return self.value
+        self.value = self.value * (1.0 - self.alpha) + x * self.alpha
+        return self.value
@@ -0,0 +1,303 @@
+"""
+Adaptive SuperTrend Kernels
+自适应SuperTrend内核 - ML_Adaptive_SuperTrend 的滑动窗口k-means波动率聚类与带宽棘轮
+
+k-means（与Pine原版逐项一致）:
+- 每根bar以训练窗口ATR极差的 75% / 50% / 25% 分位作为 高/中/低 初始质心（Pine每bar重新初始化）
+- Lloyd迭代直到三个质心都与上一轮完全相等；点必须严格最近才归入某簇（等距点不归入任何簇），
+  空簇均值为NaN，任一质心为NaN时所有比较为False（下一轮三簇全空）
+- 当前bar归入距离最近的质心（NaN距离忽略，并列取靠前者），三者均为NaN时 cluster = -1
+
+增量实现:
+- 训练窗口为滑动的有序数组（每bar一次插入、一次删除），配合前缀和
+- 一维最近质心划分是有序数组上的连续区间，区间边界用与Pine相同的比较式二分查找，
+  每轮迭代 O(log 窗口) 而非原版的 O(窗口)；簇均值由前缀和相减得到（与逐项求和相差浮点舍入）
+- warm_start=True 时以上一根bar收敛的质心为初值（迭代更少，但可能收敛到与Pine不同的不动点）
+
+SuperTrend: 原始上下轨为向量运算，带宽棘轮与方向为逐bar递推（编译循环）。
+
+VolatilityKMeans 为逐bar流式版本，与 volatility_kmeans() 调用同一组内核，结果逐位一致。
+"""
+import numpy as np
+
+from . import rolling
+from .rolling import _jit
+from .streaming import StreamingState
+
+
+DEFAULT_FRACTIONS = (0.75, 0.5, 0.25)
+DEFAULT_MAX_ITERATIONS = 100
+
+
+@_jit
+def _sorted_insert(window, count, x):
+    pos = np.searchsorted(window[:count], x)
+    for m in range(count, pos, -1):
+        window[m] = window[m - 1]
+    window[pos] = x
+    return count + 1
+
+
+@_jit
+def _sorted_remove(window, count, x):
+    pos = np.searchsorted(window[:count], x)
+    for m in range(pos, count - 1):
+        window[m] = window[m + 1]
+    return count - 1
+
+
+@_jit
+def _first_where(window, count, ck, cj, target):
+    """第一个使 (|v - ck| < |v - cj|) == target 的下标（谓词在有序数组上单调）"""
+    lo, hi = 0, count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        v = window[mid]
+        if (abs(v - ck) < abs(v - cj)) == target:
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+@_jit
+def _clip(window, count, ck, other, lo, hi):
+    """与另一质心比较后收窄簇区间 [lo, hi)"""
+    if other > ck:
+        hi = min(hi, _first_where(window, count, ck, other, False))
+    elif other < ck:
+        lo = max(lo, _first_where(window, count, ck, other, True))
+    else:
+        hi = lo
+    return lo, hi
+
+
+@_jit
+def _cluster_mean(window, count, prefix, ck, cj, cl):
+    """严格最近于 ck 的点的均值与个数；任一质心为NaN时为空簇"""
+    if ck != ck or cj != cj or cl != cl:
+        return np.nan, 0
+    lo, hi = _clip(window, count, ck, cj, 0, count)
+    lo, hi = _clip(window, count, ck, cl, lo, hi)
+    if hi <= lo:
+        return np.nan, 0
+    return (prefix[hi] - prefix[lo]) / (hi - lo), hi - lo
+
+
+@_jit
+def _pine_ne(x, y):
+    # Pine中与na的比较恒为False
+    return x == x and y == y and x != y
+
+
+@_jit
+def _lloyd(window, count, prefix, a, b, c, max_iterations):
+    iterations = 0
+    size_a = size_b = size_c = 0
+    while True:
+        new_a, size_a = _cluster_mean(window, count, prefix, a, b, c)
+        new_b, size_b = _cluster_mean(window, count, prefix, b, a, c)
+        new_c, size_c = _cluster_mean(window, count, prefix, c, a, b)
+        iterations += 1
+        changed = _pine_ne(new_a, a) or _pine_ne(new_b, b) or _pine_ne(new_c, c)
+        a, b, c = new_a, new_b, new_c
+        if not changed or iterations >= max_iterations:
+            break
+    return a, b, c, iterations, size_a, size_b, size_c
+
+
+@_jit
+def _kmeans_update(window, count, prefix, x, old, ready, fractions, warm_start,
+                   prev_a, prev_b, prev_c, max_iterations):
+    """
+    推进一根bar：滑动窗口移出 old、加入 x（NaN不进入窗口），再做聚类
+
+    Returns:
+        (count, a, b, c, iterations, size_a, size_b, size_c)
+    """
+    if old == old:
+        count = _sorted_remove(window, count, old)
+    if x == x:
+        count = _sorted_insert(window, count, x)
+    if not ready or count == 0:
+        return count, np.nan, np.nan, np.nan, 0, 0, 0, 0
+
+    lower = window[0]
+    upper = window[count - 1]
+    a = lower + (upper - lower) * fractions[0]
+    b = lower + (upper - lower) * fractions[1]
+    c = lower + (upper - lower) * fractions[2]
+    if not x > 0:
+        return count, a, b, c, 0, 0, 0, 0
+    if warm_start and prev_a == prev_a and prev_b == prev_b and prev_c == prev_c:
+        a, b, c = prev_a, prev_b, prev_c
+
+    prefix[0] = 0.0
+    for i in range(count):
+        prefix[i + 1] = prefix[i] + window[i]
+    a, b, c, iterations, size_a, size_b, size_c = _lloyd(window, count, prefix, a, b, c, max_iterations)
+    return count, a, b, c, iterations, size_a, size_b, size_c
+
+
+@_jit
+def _nearest(x, a, b, c):
+    """距离最近的质心序号（NaN距离忽略，并列取靠前者），全为NaN时为-1"""
+    best = -1
+    best_dist = 0.0
+    k = 0
+    for centroid in (a, b, c):
+        d = abs(x - centroid)
+        if d == d and (best < 0 or d < best_dist):
+            best = k
+            best_dist = d
+        k += 1
+    return best
+
+
+@_jit
+def _kmeans_loop(volatility, period, fractions, warm_start, max_iterations):
+    n = len(volatility)
+    centroids = np.full((n, 3), np.nan)
+    sizes = np.zeros((n, 3), dtype=np.int64)
+    cluster = np.full(n, -1, dtype=np.int64)
+    iterations = np.zeros(n, dtype=np.int64)
+    window = np.empty(period)
+    prefix = np.empty(period + 1)
+    count = 0
+    a = b = c = np.nan
+    for t in range(n):
+        old = volatility[t - period] if t >= period else np.nan
+        count, a, b, c, it, size_a, size_b, size_c = _kmeans_update(
+            window, count, prefix, volatility[t], old, t >= period - 1, fractions, warm_start,
+            a, b, c, max_iterations)
+        centroids[t, 0] = a
+        centroids[t, 1] = b
+        centroids[t, 2] = c
+        sizes[t, 0] = size_a
+        sizes[t, 1] = size_b
+        sizes[t, 2] = size_c
+        iterations[t] = it
+        cluster[t] = _nearest(volatility[t], a, b, c)
+    return centroids, sizes, cluster, iterations
+
+
+def volatility_kmeans(volatility, period=100, fractions=DEFAULT_FRACTIONS, warm_start=False,
+                      max_iterations=DEFAULT_MAX_ITERATIONS):
+    """
+    滑动窗口3质心k-means（ML_Adaptive_SuperTrend）
+
+    Args:
+        volatility: 一维float数组（原版为ATR）
+        period: 训练窗口长度（training_data_period）
+        fractions: 高/中/低初始质心在窗口极差中的分位
+        warm_start: 以上一根bar的质心为初值
+        max_iterations: 每根bar迭代上限（Pine原版无上限）
+
+    Returns:
+        dict: centroids (bar数, 3) 高/中/低质心，sizes (bar数, 3) 各簇点数，
+              cluster 当前bar所属簇（0高 1中 2低，-1无），iterations 每bar迭代次数
+    """
+    volatility = np.ascontiguousarray(volatility, dtype=np.float64)
+    fractions = np.asarray(fractions, dtype=np.float64)
+    if period < 1 or fractions.shape != (3,):
+        raise ValueError(f"period 必须为正整数、fractions 为3个分位: {period}, {fractions}")
+    loop = _kmeans_loop if rolling.get_backend() == 'numba' else getattr(_kmeans_loop, 'py_func', _kmeans_loop)
+    centroids, sizes, cluster, iterations = loop(volatility, int(period), fractions, bool(warm_start),
+                                                 int(max_iterations))
+    return {'centroids': centroids, 'sizes': sizes, 'cluster': cluster, 'iterations': iterations}
+
+
+@_jit
+def _supertrend_step(upper, lower, close, atr, prev_upper, prev_lower, prev_trend, prev_close, prev_atr):
+    """
+    一根bar的带宽棘轮与方向（pine_supertrend，nz() 语义：首根bar的前轨按0计）
+
+    Returns:
+        (upper, lower, supertrend, direction)
+    """
+    prev_lower = prev_lower if prev_lower == prev_lower else 0.0
+    prev_upper = prev_upper if prev_upper == prev_upper else 0.0
+    if not (lower > prev_lower or prev_close < prev_lower):
+        lower = prev_lower
+    if not (upper < prev_upper or prev_close > prev_upper):
+        upper = prev_upper
+    if prev_atr != prev_atr:
+        direction = 1.0
+    elif prev_trend == prev_upper:
+        direction = -1.0 if close > upper else 1.0
+    else:
+        direction = 1.0 if close < lower else -1.0
+    return upper, lower, (lower if direction == -1.0 else upper), direction
+
+
+@_jit
+def _supertrend_loop(basic_upper, basic_lower, close, atr):
+    n = len(close)
+    supertrend = np.empty(n)
+    direction = np.empty(n)
+    upper = lower = trend = prev_close = prev_atr = np.nan
+    for t in range(n):
+        upper, lower, trend, d = _supertrend_step(basic_upper[t], basic_lower[t], close[t], atr[t],
+                                                  upper, lower, trend, prev_close, prev_atr)
+        supertrend[t] = trend
+        direction[t] = d
+        prev_close = close[t]
+        prev_atr = atr[t]
+    return supertrend, direction
+
+
+def supertrend(high, low, close, atr, factor=3.0):
+    """
+    pine_supertrend(factor, atr)
+
+    Args:
+        high, low, close: 一维float数组
+        atr: 带宽序列（自适应版本为所属簇的质心）
+        factor: 带宽倍数
+
+    Returns:
+        (supertrend, direction) - direction 为 1（空头，线在上方）/ -1（多头，线在下方）
+    """
+    high, low, close, atr = (np.ascontiguousarray(x, dtype=np.float64) for x in (high, low, close, atr))
+    src = (high + low) / 2
+    loop = _supertrend_loop if rolling.get_backend() == 'numba' else getattr(_supertrend_loop, 'py_func',
+                                                                             _supertrend_loop)
+    return loop(src + factor * atr, src - factor * atr, close, atr)
+
+
+class VolatilityKMeans(StreamingState):
+    """
+    逐bar滑动窗口k-means（与 volatility_kmeans() 逐位一致）
+
+    update(x) 返回 (centroids三元组, cluster)
+    """
+    __slots__ = ('period', 'fractions', 'warm_start', 'max_iterations', 'recent', 'window', 'prefix',
+                 'count', 'bars', 'centroids', 'sizes', 'iterations')
+
+    def __init__(self, period=100, fractions=DEFAULT_FRACTIONS, warm_start=False,
+                 max_iterations=DEFAULT_MAX_ITERATIONS):
+        self.period = period
+        self.fractions = np.asarray(fractions, dtype=np.float64)
+        self.warm_start = warm_start
+        self.max_iterations = max_iterations
+        self.recent = np.full(period, np.nan)
+        self.window = np.empty(period)
+        self.prefix = np.empty(period + 1)
+        self.count = 0
+        self.bars = 0
+        self.centroids = (float('nan'),) * 3
+        self.sizes = (0, 0, 0)
+        self.iterations = 0
+
+    def update(self, x):
+        slot = self.bars % self.period
+        old = self.recent[slot]
+        self.recent[slot] = x
+        self.bars += 1
+        count, a, b, c, self.iterations, size_a, size_b, size_c = _kmeans_update(
+            self.window, self.count, self.prefix, x, old, self.bars >= self.period, self.fractions,
+            self.warm_start, *self.centroids, self.max_iterations)
+        self.count = count
+        self.centroids = (a, b, c)
+        self.sizes = (size_a, size_b, size_c)
+        return self.centroids, _nearest(x, a, b, c)
@@ -0,0 +1,26 @@
+"""
+Pine Package
+Pine转译包 - 把Pine Script的表达式子集（序列运算、ta.* / math.*、三元、nz、历史引用 x[n]、用户函数）
+翻译为全序列向量化的NumPy函数（滚动 / 递推算子经 kernels 走numba编译路径）
+
+用法:
+    from pine import transpile_file
+    result = transpile_file('pinescript/indicators/oscillator/SQZMOM_WaveTrend.pine')
+    outputs = result.compile()(open, high, low, close, volume)
+
+命令行: python -m pine <file.pine> [-o out.py] [--strict]
+"""
+
+from .parser import PineSyntaxError, parse, parse_expression
+from .codegen import PineTranspileError, TranspileResult, transpile, transpile_file, compile_pine
+
+__all__ = [
+    'PineSyntaxError',
+    'PineTranspileError',
+    'TranspileResult',
+    'parse',
+    'parse_expression',
+    'transpile',
+    'transpile_file',
+    'compile_pine',
+]
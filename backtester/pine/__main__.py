@@ -0,0 +1,43 @@
+"""
+Pine Transpiler CLI
+Pine转译命令行 - python -m pine <file.pine> [-o out.py] [--strict]
+"""
+import argparse
+import sys
+
+try:
+    from pine.codegen import PineTranspileError, transpile_file
+except ImportError:
+    import os
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from pine.codegen import PineTranspileError, transpile_file
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Pine ta.* 子集 → 向量化NumPy')
+    parser.add_argument('path', help='.pine 文件')
+    parser.add_argument('-o', '--output', help='输出 .py 文件（默认打印到标准输出）')
+    parser.add_argument('--name', help='生成的函数名（默认取文件名）')
+    parser.add_argument('--strict', action='store_true', help='存在不支持的语句时失败')
+    args = parser.parse_args(argv)
+
+    try:
+        result = transpile_file(args.path, args.name, args.strict)
+    except PineTranspileError as exc:
+        print(f"[FAIL] {exc}", file=sys.stderr)
+        return 1
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(result.code)
+    else:
+        sys.stdout.write(result.code)
+    print(f"[PINE] {result.name}: 翻译 {result.translated} 条, 跳过 {result.skipped} 条, "
+          f"不支持 {len(result.unsupported)} 条, 输出 {len(result.outputs)} 个序列", file=sys.stderr)
+    for lineno, text, reason in result.unsupported:
+        print(f"  第{lineno}行 {text[:70]}: {reason}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,765 @@
+"""
+Pine to NumPy Code Generation
+Pine代码生成 - 把 pine.parser 的语句树翻译为一个全序列向量化的Python函数
+
+翻译规则:
+- input.* / input(): 函数关键字参数（默认值取 defval / 第一个位置参数；input.source 参数为列名或数组）
+- 顶层赋值: 一行NumPy表达式；序列为 ndarray（布尔序列为 bool 数组），常量与输入保持为Python标量
+- ta.* / math.* 与 v4 旧名（sma / stdev / iff / avg ...）: pine.runtime 中的向量化实现
+- 用户函数: 在调用处内联展开（每个调用点独立，与Pine每个调用点独立保存历史一致），
+  末尾的 if / else if / else 表达式块转为三元运算，[a, b] 返回值可元组赋值
+- x[n]: 移位（n 须为常量）；三元运算: 常量条件为Python条件表达式（只计算命中分支），序列条件为 np.where
+- plot / plotshape / plotchar / plotarrow: 登记为输出；其余绘图、告警、颜色与文本语句跳过
+
+不在子集内的语句（var 序列状态、:= 重新赋值、循环、数组、request.security、条件块中的副作用等）:
+宽松模式下记录诊断并跳过，依赖它们的语句一并跳过；strict=True 时抛出 PineTranspileError。
+"""
+import ast
+import keyword
+import os
+import re
+
+from .parser import (
+    Assign, Call, ColorLiteral, ExprStatement, FunctionDef, If, Name, Reassign, Str, Unparsed, parse,
+)
+
+
+class PineTranspileError(ValueError):
+    """strict 模式下脚本含有不支持的语句"""
+
+
+class _Unsupported(Exception):
+    pass
+
+
+class Value:
+    """
+    翻译后的表达式
+
+    kind: 'series'（ndarray）/ 'simple'（Python标量）/ 'na' / 'string' / 'presentation'（颜色、文本等绘图值，不生成代码）
+          / 'tuple'（code 为 Value 列表）/ 'void'
+    dtype: 'float' 或 'bool'
+    """
+    __slots__ = ('code', 'kind', 'dtype')
+
+    def __init__(self, code, kind, dtype='float'):
+        self.code = code
+        self.kind = kind
+        self.dtype = dtype
+
+    @property
+    def inert(self):
+        return self.kind in ('presentation', 'void')
+
+
+_PRESENTATION = Value(None, 'presentation')
+_NA = Value('np.nan', 'na')
+
+_BAR_SERIES = {
+    'open': 'open', 'high': 'high', 'low': 'low', 'close': 'close', 'volume': 'volume',
+    'hl2': 'rt.hl2(high, low)', 'hlc3': 'rt.hlc3(high, low, close)',
+    'ohlc4': 'rt.ohlc4(open, high, low, close)', 'hlcc4': 'rt.hlcc4(high, low, close)',
+    'bar_index': 'rt.bar_index(close)', 'tr': 'rt.tr(high, low, close)', 'ta.tr': 'rt.tr(high, low, close)',
+    'obv': 'rt.obv(close, volume)', 'ta.obv': 'rt.obv(close, volume)',
+}
+_SOURCES = ('open', 'high', 'low', 'close', 'volume', 'hl2', 'hlc3', 'ohlc4', 'hlcc4')
+_SIMPLE_BUILTINS = {
+    'barstate.isconfirmed': Value('True', 'simple', 'bool'),
+    'barstate.ishistory': Value('True', 'simple', 'bool'),
+    'last_bar_index': Value('(len(close) - 1)', 'simple'),
+    'math.pi': Value('np.pi', 'simple'),
+    'math.e': Value('np.e', 'simple'),
+}
+
+_PRESENTATION_NAMESPACES = {
+    'color', 'size', 'shape', 'location', 'plot', 'label', 'line', 'box', 'table', 'extend', 'position',
+    'text', 'xloc', 'yloc', 'display', 'format', 'hline', 'str', 'alert', 'linefill', 'polyline', 'font',
+    'dividends', 'earnings', 'splits', 'currency', 'scale', 'order', 'adjustment', 'barmerge', 'log',
+}
+_PRESENTATION_FUNCTIONS = {
+    'plot', 'plotshape', 'plotchar', 'plotarrow', 'plotcandle', 'plotbar', 'hline', 'fill', 'bgcolor', 'barcolor',
+    'alertcondition', 'alert', 'indicator', 'study', 'library', 'tostring', 'max_bars_back',
+}
+_V4_COLORS = {
+    'aqua', 'black', 'blue', 'fuchsia', 'gray', 'green', 'lime', 'maroon', 'navy', 'olive', 'orange', 'purple',
+    'red', 'silver', 'teal', 'white', 'yellow',
+}
+_UNSUPPORTED_NAMESPACES = {'request', 'array', 'matrix', 'map', 'strategy', 'ticker', 'timeframe', 'runtime',
+                           'chart', 'syminfo', 'session', 'time'}
+_RESERVED = ('np', 'rt', 'len', 'None', 'True', 'False')
+_OUTPUT_PLOTS = ('plot', 'plotshape', 'plotchar', 'plotarrow')
+_INPUTS = {'input', 'input.int', 'input.float', 'input.bool', 'input.string', 'input.source', 'input.color',
+           'input.timeframe', 'input.session', 'input.symbol', 'input.price', 'input.text_area', 'input.time',
+           'input.enum'}
+
+# ta函数: (运行时函数, 参数（:s 序列 / :c 常量 / :x 任意）, 默认值, 隐含的K线参数（volume 紧跟数据源，其余在最前）,
+#          结果dtype（3 为三元组）)
+_TA = {
+    'sma': ('rt.sma', ('source:s', 'length:c'), {}, '', 'float'),
+    'ema': ('rt.ema', ('source:s', 'length:c'), {}, '', 'float'),
+    'rma': ('rt.rma', ('source:s', 'length:c'), {}, '', 'float'),
+    'wma': ('rt.wma', ('source:s', 'length:c'), {}, '', 'float'),
+    'vwma': ('rt.vwma', ('source:s', 'length:c'), {}, 'volume', 'float'),
+    'stdev': ('rt.stdev', ('source:s', 'length:c', 'biased:c'), {'biased': 'True'}, '', 'float'),
+    'variance': ('rt.variance', ('source:s', 'length:c', 'biased:c'), {'biased': 'True'}, '', 'float'),
+    'dev': ('rt.dev', ('source:s', 'length:c'), {}, '', 'float'),
+    'highest': ('rt.highest', ('source:s', 'length:c'), {}, '', 'float'),
+    'lowest': ('rt.lowest', ('source:s', 'length:c'), {}, '', 'float'),
+    'linreg': ('rt.linreg', ('source:s', 'length:c', 'offset:c'), {'offset': '0'}, '', 'float'),
+    'change': ('rt.change', ('source:s', 'length:c'), {'length': '1'}, '', None),
+    'mom': ('rt.mom', ('source:s', 'length:c'), {}, '', 'float'),
+    'roc': ('rt.roc', ('source:s', 'length:c'), {}, '', 'float'),
+    'crossover': ('rt.crossover', ('source1:s', 'source2:x'), {}, '', 'bool'),
+    'crossunder': ('rt.crossunder', ('source1:s', 'source2:x'), {}, '', 'bool'),
+    'cross': ('rt.cross', ('source1:s', 'source2:x'), {}, '', 'bool'),
+    'rising': ('rt.rising', ('source:s', 'length:c'), {}, '', 'bool'),
+    'falling': ('rt.falling', ('source:s', 'length:c'), {}, '', 'bool'),
+    'valuewhen': ('rt.valuewhen', ('condition:s', 'source:x', 'occurrence:c'), {'occurrence': '0'}, '', 'float'),
+    'barssince': ('rt.barssince', ('condition:s',), {}, '', 'float'),
+    'cum': ('rt.cum', ('source:s',), {}, '', 'float'),
+    'sum': ('rt.sum_', ('source:s', 'length:c'), {}, '', 'float'),
+    'tr': ('rt.tr', ('handle_na:c',), {'handle_na': 'False'}, 'high, low, close', 'float'),
+    'atr': ('rt.atr', ('length:c',), {}, 'high, low, close', 'float'),
+    'rsi': ('rt.rsi', ('source:s', 'length:c'), {}, '', 'float'),
+    'cci': ('rt.cci', ('source:s', 'length:c'), {}, '', 'float'),
+    'stoch': ('rt.stoch', ('source:s', 'high:s', 'low:s', 'length:c'), {}, '', 'float'),
+    'tsi': ('rt.tsi', ('source:s', 'short_length:c', 'long_length:c'), {}, '', 'float'),
+    'pivothigh': ('rt.pivothigh', ('source:s', 'leftbars:c', 'rightbars:c'), {}, '', 'float'),
+    'pivotlow': ('rt.pivotlow', ('source:s', 'leftbars:c', 'rightbars:c'), {}, '', 'float'),
+    'fixnan': ('rt.fixnan', ('source:s',), {}, '', 'float'),
+    'mfi': ('rt.mfi', ('series:s', 'length:c'), {}, 'volume', 'float'),
+    'dmi': ('rt.dmi', ('diLength:c', 'adxSmoothing:c'), {}, 'high, low, close', 3),
+    'bb': ('rt.bb', ('series:s', 'length:c', 'mult:c'), {}, '', 3),
+    'macd': ('rt.macd', ('source:s', 'fastlen:c', 'slowlen:c', 'siglen:c'), {}, '', 3),
+}
+# 省略数据源的旧写法: highest(length) / pivothigh(left, right)
+_IMPLICIT_SOURCE = {'highest': ('high', 1), 'lowest': ('low', 1), 'pivothigh': ('high', 2), 'pivotlow': ('low', 2)}
+
+# math函数（标量与数组通用）
+_MATH = {
+    'abs': 'np.abs', 'max': 'rt.maximum', 'min': 'rt.minimum', 'sqrt': 'np.sqrt', 'log': 'np.log',
+    'log10': 'np.log10', 'exp': 'np.exp', 'pow': 'np.power', 'round': 'rt.round_', 'sign': 'rt.sign',
+    'floor': 'np.floor', 'ceil': 'np.ceil', 'avg': 'rt.avg', 'sin': 'np.sin', 'cos': 'np.cos', 'tan': 'np.tan',
+    'asin': 'np.arcsin', 'acos': 'np.arccos', 'atan': 'np.arctan', 'todegrees': 'np.degrees',
+    'toradians': 'np.radians',
+}
+
+_LITERAL = re.compile(r"^(?:\(?-?\d+(?:\.\d*)?(?:e[+-]?\d+)?\)?|'[^']*'|True|False)$")
+_ATOMIC = re.compile(r"^(?:[A-Za-z_]\w*|-?\d+(?:\.\d*)?(?:e[+-]?\d+)?|np\.nan|'[^']*')$")
+
+
+class TranspileResult:
+    """
+    翻译结果
+
+    code: 生成的Python模块源码；name: 生成的函数名；params: 参数默认值；inputs: 参数 → 输入标题；
+    outputs: 返回的顶层序列变量；plots: 绘图标题 → 变量；unsupported: (行号, 源码, 原因) 列表；
+    translated / skipped: 已翻译 / 跳过的绘图类语句数
+    """
+    __slots__ = ('name', 'title', 'code', 'params', 'inputs', 'outputs', 'plots', 'unsupported',
+                 'translated', 'skipped')
+
+    def __init__(self, name, title):
+        self.name = name
+        self.title = title
+        self.code = ''
+        self.params = {}
+        self.inputs = {}
+        self.outputs = []
+        self.plots = {}
+        self.unsupported = []
+        self.translated = 0
+        self.skipped = 0
+
+    def compile(self):
+        """执行生成的代码，返回计算函数"""
+        namespace = {'__name__': f'pine_generated.{self.name}', '__file__': os.path.abspath(__file__)}
+        exec(compile(self.code, f'<pine:{self.name}>', 'exec'), namespace)
+        return namespace[self.name]
+
+
+class _Symbol:
+    __slots__ = ('value', 'reason')
+
+    def __init__(self, value, reason=None):
+        self.value = value
+        self.reason = reason
+
+
+class _Generator:
+    def __init__(self, result):
+        self.result = result
+        self.lines = []
+        self.used = {'open', 'high', 'low', 'close', 'volume', 'np', 'rt'}
+        self.globals = {}
+        self.literals = {}
+        self.functions = {}
+        self.scopes = []
+        self.inline_counts = {}
+        self.inline_stack = []
+
+    # --- 名字与作用域 ---
+
+    def unique(self, name):
+        base = name + '_' if keyword.iskeyword(name) or name in _RESERVED else name
+        while base in self.used:
+            base += '_'
+        self.used.add(base)
+        return base
+
+    def lookup(self, name):
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        return self.globals.get(name)
+
+    def emit(self, target, value):
+        self.lines.append(f"{target} = {value.code}")
+
+    # --- 表达式 ---
+
+    def expr(self, node):
+        method = getattr(self, f'_expr_{type(node).__name__}')
+        return method(node)
+
+    def _expr_Num(self, node):
+        return Value(repr(node.value), 'simple')
+
+    def _expr_Str(self, node):
+        return Value(repr(node.value), 'string')
+
+    def _expr_Bool(self, node):
+        return Value(repr(node.value), 'simple', 'bool')
+
+    def _expr_Na(self, node):
+        return _NA
+
+    def _expr_ColorLiteral(self, node):
+        return _PRESENTATION
+
+    def _expr_TupleLiteral(self, node):
+        return Value([self.expr(item) for item in node.items], 'tuple')
+
+    def _expr_Name(self, node):
+        symbol = self.lookup(node.id)
+        if symbol is not None:
+            if symbol.reason is not None:
+                raise _Unsupported(f"依赖不支持的 '{node.id}'")
+            return symbol.value
+        if node.id in _BAR_SERIES:
+            return Value(_BAR_SERIES[node.id], 'series')
+        if node.id in _SIMPLE_BUILTINS:
+            return _SIMPLE_BUILTINS[node.id]
+        if node.id == 'barstate.islast':
+            return Value('(rt.bar_index(close) == len(close) - 1)', 'series', 'bool')
+        namespace = node.id.split('.')[0]
+        if namespace in _PRESENTATION_NAMESPACES or node.id in _V4_COLORS:
+            return _PRESENTATION
+        raise _Unsupported(f"未知或不支持的标识符 '{node.id}'")
+
+    def _expr_Index(self, node):
+        target = self.expr(node.target)
+        offset = self.expr(node.offset)
+        if offset.kind != 'simple':
+            raise _Unsupported("历史引用偏移须为常量")
+        if target.inert:
+            return target
+        if target.kind != 'series':
+            return target
+        return Value(f"rt.shift({target.code}, {offset.code})", 'series', target.dtype)
+
+    def _expr_Unary(self, node):
+        operand = self.expr(node.operand)
+        if operand.inert:
+            return operand
+        if node.op == 'not':
+            if operand.kind == 'series':
+                return Value(f"~rt.truth({operand.code})", 'series', 'bool')
+            return Value(f"(not rt.truth({operand.code}))", 'simple', 'bool')
+        if node.op == '+':
+            return operand
+        return Value(f"(-{operand.code})", operand.kind if operand.kind != 'na' else 'na')
+
+    def _expr_Binary(self, node):
+        left, right = self.expr(node.left), self.expr(node.right)
+        if left.inert or right.inert or 'tuple' in (left.kind, right.kind):
+            return _PRESENTATION
+        series = 'series' in (left.kind, right.kind)
+        if 'string' in (left.kind, right.kind):
+            if series:
+                return _PRESENTATION
+            if node.op in ('==', '!='):
+                return Value(f"({left.code} {node.op} {right.code})", 'simple', 'bool')
+            return Value(f"({left.code} {node.op} {right.code})", 'string')
+        kind = 'series' if series else 'simple'
+        if node.op in ('and', 'or'):
+            if not series:
+                return Value(f"(rt.truth({left.code}) {node.op} rt.truth({right.code}))", 'simple', 'bool')
+            op = '&' if node.op == 'and' else '|'
+            return Value(f"(rt.truth({left.code}) {op} rt.truth({right.code}))", 'series', 'bool')
+        if node.op in ('==', '!=', '<', '>', '<=', '>='):
+            return Value(f"({left.code} {node.op} {right.code})", kind, 'bool')
+        if node.op == '%':
+            return Value(f"rt.mod({left.code}, {right.code})", kind)
+        return Value(f"({left.code} {node.op} {right.code})", kind)
+
+    def _ternary(self, cond, then, orelse):
+        if cond.inert or then.inert or orelse.inert:
+            return _PRESENTATION
+        if cond.kind == 'tuple':
+            raise _Unsupported("元组不能作为条件")
+        if then.kind == 'tuple' or orelse.kind == 'tuple':
+            if then.kind != 'tuple' or orelse.kind != 'tuple' or len(then.code) != len(orelse.code):
+                raise _Unsupported("条件分支返回的元组长度不一致")
+            return Value([self._ternary(cond, a, b) for a, b in zip(then.code, orelse.code)], 'tuple')
+        strings = 'string' in (then.kind, orelse.kind)
+        dtype = 'bool' if then.dtype == orelse.dtype == 'bool' and 'na' not in (then.kind, orelse.kind) \
+            else 'float'
+        if cond.kind == 'series':
+            if strings:
+                return _PRESENTATION
+            return Value(f"rt.where({cond.code}, {then.code}, {orelse.code})", 'series', dtype)
+        if strings:
+            return Value(f"({then.code} if rt.truth({cond.code}) else {orelse.code})", 'string')
+        if 'series' in (then.kind, orelse.kind):
+            then, orelse = (v if v.kind == 'series' else Value(f"rt.series({v.code}, close)", 'series', v.dtype)
+                            for v in (then, orelse))
+            kind = 'series'
+        else:
+            kind = 'na' if then.kind == orelse.kind == 'na' else 'simple'
+        return Value(f"({then.code} if rt.truth({cond.code}) else {orelse.code})", kind, dtype)
+
+    def _expr_Ternary(self, node):
+        return self._ternary(self.expr(node.cond), self.expr(node.then), self.expr(node.orelse))
+
+    def _expr_Call(self, node):
+        func = node.func
+        if func in self.functions:
+            return self.inline(self.functions[func], node)
+        if func in _INPUTS:
+            raise _Unsupported("input() 只能直接赋值给变量")
+        namespace, _, short = func.rpartition('.')
+        if func in _PRESENTATION_FUNCTIONS or namespace in _PRESENTATION_NAMESPACES:
+            return _PRESENTATION
+        if namespace in _UNSUPPORTED_NAMESPACES or func == 'security':
+            raise _Unsupported(f"不支持 {func}()")
+        if func in ('nz', 'na', 'fixnan', 'iff', 'int', 'float', 'bool') or namespace == '' and func in _TA or \
+                namespace == 'ta' and short in _TA or namespace == 'math' and short == 'sum':
+            return self._builtin(short if namespace in ('ta', 'math') else func, node)
+        if namespace in ('', 'math') and short in _MATH:
+            args = self._args(node)
+            if any(a.inert or a.kind in ('string', 'tuple') for a in args):
+                raise _Unsupported(f"{func}() 参数类型不支持")
+            kind = 'series' if any(a.kind == 'series' for a in args) else 'simple'
+            return Value(f"{_MATH[short]}({', '.join(a.code for a in args)})", kind)
+        raise _Unsupported(f"不支持的函数 {func}()")
+
+    def _args(self, node):
+        if node.kwargs:
+            raise _Unsupported(f"{node.func}() 不支持关键字参数")
+        return [self.expr(arg) for arg in node.args]
+
+    def _builtin(self, func, node):
+        if func in ('nz', 'na', 'fixnan', 'iff', 'int', 'float', 'bool'):
+            args = self._args(node)
+            if any(a.inert or a.kind == 'tuple' for a in args):
+                return _PRESENTATION
+            if func == 'iff':
+                return self._ternary(*args)
+            first = args[0]
+            if func == 'nz':
+                rest = f", {args[1].code}" if len(args) > 1 else ''
+                return Value(f"rt.nz({first.code}{rest})", 'simple' if first.kind == 'na' else first.kind,
+                             first.dtype)
+            if func == 'na':
+                return Value(f"rt.isna({first.code})", 'series' if first.kind == 'series' else 'simple', 'bool')
+            if func == 'fixnan':
+                return Value(f"rt.fixnan({first.code})", 'series')
+            if func == 'bool':
+                return Value(f"rt.truth({first.code})", first.kind, 'bool')
+            return Value(f"rt.to_{func}({first.code})", first.kind)
+
+        runtime, params, defaults, implicit, dtype = _TA[func]
+        args = list(node.args)
+        if func in _IMPLICIT_SOURCE and len(args) + len(node.kwargs) == _IMPLICIT_SOURCE[func][1]:
+            args.insert(0, Name(_IMPLICIT_SOURCE[func][0]))
+        names = [p.split(':')[0] for p in params]
+        if len(args) > len(names):
+            raise _Unsupported(f"{func}() 参数过多")
+        bound = dict(zip(names, args))
+        for key, arg in node.kwargs.items():
+            if key not in names:
+                raise _Unsupported(f"{func}() 未知参数 {key}")
+            bound[key] = arg
+        codes = []
+        any_series = False
+        for param in params:
+            name, mode = param.split(':')
+            if name not in bound:
+                if name not in defaults:
+                    raise _Unsupported(f"{func}() 缺少参数 {name}")
+                codes.append(defaults[name])
+                continue
+            value = self.expr(bound[name])
+            if value.inert or value.kind in ('tuple', 'string'):
+                raise _Unsupported(f"{func}() 参数 {name} 类型不支持")
+            if mode == 'c' and value.kind == 'series':
+                raise _Unsupported(f"{func}() 参数 {name} 须为常量")
+            if mode == 's' and value.kind != 'series':
+                codes.append(f"rt.series({value.code}, close)")
+            else:
+                codes.append(value.code)
+            any_series = any_series or value.kind == 'series'
+            if func == 'change' and name == 'source':
+                dtype = value.dtype
+        if implicit == 'volume':
+            codes.insert(1, implicit)
+        elif implicit:
+            codes.insert(0, implicit)
+        call = f"{runtime}({', '.join(codes)})"
+        if dtype == 3:
+            temp = self.unique(f"_{func}")
+            self.lines.append(f"{temp} = {call}")
+            return Value([Value(f"{temp}[{k}]", 'series') for k in range(3)], 'tuple')
+        return Value(call, 'series', dtype)
+
+    # --- 用户函数内联 ---
+
+    def inline(self, function, node):
+        if function.name in self.inline_stack:
+            raise _Unsupported(f"递归调用 {function.name}()")
+        params = function.params
+        if len(node.args) > len(params):
+            raise _Unsupported(f"{function.name}() 参数过多")
+        count = self.inline_counts.get(function.name, 0) + 1
+        self.inline_counts[function.name] = count
+        prefix = f"_{function.name.lstrip('_')}{count}_"
+        scope = {}
+        bound = dict(zip([p for p, _ in params], node.args))
+        bound.update(node.kwargs)
+        for name, default in params:
+            arg = bound.get(name, default)
+            if arg is None:
+                raise _Unsupported(f"{function.name}() 缺少参数 {name}")
+            value = self.expr(arg)
+            if value.kind not in ('tuple',) and not value.inert and not _ATOMIC.match(value.code):
+                temp = self.unique(prefix + name.lstrip('_'))
+                self.emit(temp, value)
+                value = Value(temp, value.kind, value.dtype)
+            scope[name] = _Symbol(value)
+
+        self.scopes.append(scope)
+        self.inline_stack.append(function.name)
+        try:
+            return self.block_value(function.body, prefix)
+        finally:
+            self.scopes.pop()
+            self.inline_stack.pop()
+
+    def block_value(self, body, prefix):
+        """函数体（或分支块）: 局部赋值 + 末尾表达式 / if表达式"""
+        result = Value(None, 'void')
+        for index, stmt in enumerate(body):
+            last = index == len(body) - 1
+            if isinstance(stmt, Assign):
+                self.local_assign(stmt, prefix)
+            elif isinstance(stmt, ExprStatement):
+                value = self.expr(stmt.expr)
+                if last:
+                    result = value
+            elif isinstance(stmt, If) and last:
+                result = self.if_value(stmt, prefix)
+            elif isinstance(stmt, If) and self.presentation_only(stmt):
+                continue
+            elif isinstance(stmt, Unparsed):
+                raise _Unsupported(stmt.reason)
+            else:
+                raise _Unsupported(f"函数体中的 {type(stmt).__name__} 语句")
+        return result
+
+    def local_assign(self, stmt, prefix):
+        if 'var' in stmt.modifiers or 'varip' in stmt.modifiers:
+            raise _Unsupported("函数中的 var 状态")
+        value = self.if_value(stmt.block[0], prefix) if stmt.block else self.expr(stmt.expr)
+        scope = self.scopes[-1]
+        if len(stmt.targets) > 1:
+            if value.kind != 'tuple' or len(value.code) != len(stmt.targets):
+                raise _Unsupported("元组赋值的右侧不是等长元组")
+            values = value.code
+        else:
+            values = [value]
+        for target, item in zip(stmt.targets, values):
+            if item.inert or item.kind == 'tuple' or _ATOMIC.match(item.code or ''):
+                scope[target] = _Symbol(item)
+                continue
+            temp = self.unique(prefix + target.lstrip('_'))
+            self.emit(temp, item)
+            scope[target] = _Symbol(Value(temp, item.kind, item.dtype))
+
+    def if_value(self, stmt, prefix):
+        """if / else if / else 表达式块 → 三元运算（缺 else 时为 na）"""
+        cond = self.expr(stmt.cond)
+        then = self.block_value(stmt.body, prefix)
+        orelse = self.block_value(stmt.orelse, prefix) if stmt.orelse else _NA
+        if then.kind == 'void' or orelse.kind == 'void':
+            if then.kind == orelse.kind == 'void' or then.inert and orelse.inert:
+                return Value(None, 'void')
+            raise _Unsupported("if 块的分支没有返回值")
+        return self._ternary(cond, then, orelse)
+
+    def presentation_only(self, stmt):
+        """条件块内只有绘图 / 告警调用（可整体跳过）"""
+        for child in stmt.body + stmt.orelse:
+            if isinstance(child, If):
+                if not self.presentation_only(child):
+                    return False
+            elif not (isinstance(child, ExprStatement) and isinstance(child.expr, Call) and
+                      child.expr.func not in self.functions and
+                      (child.expr.func in _PRESENTATION_FUNCTIONS or
+                       child.expr.func.rpartition('.')[0] in _PRESENTATION_NAMESPACES)):
+                return False
+        return True
+
+    # --- 顶层语句 ---
+
+    def statement(self, stmt):
+        if isinstance(stmt, Unparsed):
+            raise _Unsupported(stmt.reason)
+        if isinstance(stmt, FunctionDef):
+            self.functions[stmt.name] = stmt
+            return 'skipped'
+        if isinstance(stmt, Reassign):
+            raise _Unsupported("不支持 := 重新赋值（逐bar状态）")
+        if isinstance(stmt, If):
+            if self.presentation_only(stmt):
+                return 'skipped'
+            raise _Unsupported("条件块中的语句（逐bar副作用）")
+        if isinstance(stmt, ExprStatement):
+            return self.expression_statement(stmt)
+        return self.assign(stmt)
+
+    def expression_statement(self, stmt):
+        node = stmt.expr
+        if not isinstance(node, Call):
+            return 'skipped'
+        if node.func in _OUTPUT_PLOTS:
+            return self.plot(node)
+        value = self.expr(node)
+        if not value.inert:
+            raise _Unsupported("表达式语句没有被使用")
+        return 'skipped'
+
+    def plot(self, node):
+        series = node.kwargs.get('series', node.args[0] if node.args else None)
+        title = node.kwargs.get('title', node.args[1] if len(node.args) > 1 else None)
+        title = title.value if isinstance(title, Str) else f"{node.func}_{len(self.result.plots) + 1}"
+        if series is None:
+            return 'skipped'
+        value = self.expr(series)
+        if value.kind != 'series':
+            return 'skipped'
+        if isinstance(series, Name) and self.lookup(series.id) is not None:
+            target = series.id
+        else:
+            target = self.unique(re.sub(r'\W', '_', f"{node.func}_{len(self.result.plots) + 1}"))
+            self.emit(target, value)
+            self.globals[target] = _Symbol(Value(target, 'series', value.dtype))
+            self.result.outputs.append((target, target))
+        self.result.plots[title] = target
+        return 'translated'
+
+    def input(self, name, node):
+        default = node.kwargs.get('defval', node.args[0] if node.args else None)
+        title = node.kwargs.get('title', node.args[1] if len(node.args) > 1 else None)
+        if node.func == 'input.color' or default is None or isinstance(default, ColorLiteral) or \
+                isinstance(default, Name) and default.id.split('.')[0] == 'color':
+            return _PRESENTATION
+        if isinstance(default, Name) and default.id in _SOURCES:
+            target = self.unique(name)
+            self.result.params[target] = default.id
+            self.lines.append(f"{target} = rt.source({target}, open, high, low, close, volume)")
+            value = Value(target, 'series')
+        else:
+            literal = self.expr(default)
+            if literal.inert:
+                return _PRESENTATION
+            try:
+                code = self.literals.get(literal.code, literal.code)
+                literal_value = ast.literal_eval(code) if literal.kind in ('simple', 'string') else None
+            except (ValueError, SyntaxError):
+                literal_value = None
+            if literal_value is None:
+                raise _Unsupported("input 默认值须为字面量、常量或数据源")
+            target = self.unique(name)
+            self.result.params[target] = literal_value
+            value = Value(target, literal.kind, literal.dtype)
+        self.result.inputs[target] = title.value if isinstance(title, Str) else name
+        return value
+
+    def assign(self, stmt):
+        if stmt.block:
+            value = self.if_value(stmt.block[0], f"_{stmt.targets[0]}_")
+        elif isinstance(stmt.expr, Call) and stmt.expr.func in _INPUTS:
+            value = self.input(stmt.targets[0], stmt.expr)
+            if value.inert:
+                self.globals[stmt.targets[0]] = _Symbol(value)
+                return 'skipped'
+            self.globals[stmt.targets[0]] = _Symbol(value)
+            return 'translated'
+        else:
+            value = self.expr(stmt.expr)
+        if any(m in ('var', 'varip') for m in stmt.modifiers) and value.kind == 'series':
+            raise _Unsupported("var 序列状态（只在首根bar初始化）")
+
+        if len(stmt.targets) > 1:
+            if value.kind != 'tuple' or len(value.code) != len(stmt.targets):
+                raise _Unsupported("元组赋值的右侧不是等长元组")
+            values = value.code
+        else:
+            if value.kind == 'tuple':
+                raise _Unsupported("元组须用 [a, b] = ... 赋值")
+            values = [value]
+
+        translated = False
+        for target, item in zip(stmt.targets, values):
+            if target == '_':
+                continue
+            if item.inert:
+                self.globals[target] = _Symbol(item)
+                continue
+            name = self.unique(target)
+            self.emit(name, item)
+            if item.kind in ('simple', 'string') and _LITERAL.match(item.code):
+                self.literals[name] = item.code
+            self.globals[target] = _Symbol(Value(name, item.kind, item.dtype))
+            if item.kind == 'series':
+                self.result.outputs.append((target, name))
+            translated = True
+        return 'translated' if translated else 'skipped'
+
+    def run(self, statements):
+        for stmt in statements:
+            mark = len(self.lines)
+            try:
+                status = self.statement(stmt)
+            except _Unsupported as exc:
+                del self.lines[mark:]
+                self.result.unsupported.append((stmt.lineno, stmt.text, str(exc)))
+                for target in getattr(stmt, 'targets', ()):
+                    self.globals[target] = _Symbol(None, str(exc))
+                if isinstance(stmt, Reassign):
+                    self.globals[stmt.target] = _Symbol(None, str(exc))
+                continue
+            if status == 'translated':
+                self.result.translated += 1
+            else:
+                self.result.skipped += 1
+
+
+def _title(statements):
+    for stmt in statements:
+        if isinstance(stmt, ExprStatement) and isinstance(stmt.expr, Call) and \
+                stmt.expr.func in ('indicator', 'study', 'strategy', 'library'):
+            title = stmt.expr.kwargs.get('title', stmt.expr.args[0] if stmt.expr.args else None)
+            if isinstance(title, Str):
+                return title.value
+    return None
+
+
+def _function_name(name):
+    name = re.sub(r'\W+', '_', name).strip('_').lower()
+    if not name or name[0].isdigit():
+        name = f"pine_{name}".rstrip('_')
+    return name + '_' if keyword.iskeyword(name) else name
+
+
+def _render(result, lines, path):
+    summary = (f"{result.translated} 条语句已翻译，跳过 {result.skipped} 条函数定义 / 绘图语句，"
+               f"{len(result.unsupported)} 条不支持")
+    header = [f'"""', result.title or result.name,
+              f"由 pine.transpile 从 {path} 生成 - {summary}" if path else f"由 pine.transpile 生成 - {summary}"]
+    if result.unsupported:
+        header += ['', '不支持的语句（需手工移植）:']
+        header += [f"- 第{lineno}行 {text[:80]}: {reason}" for lineno, text, reason in result.unsupported]
+    header += ['"""']
+
+    signature = ['open', 'high', 'low', 'close', 'volume=None']
+    if result.params:
+        signature.append('*')
+        signature += [f"{name}={value!r}" for name, value in result.params.items()]
+    doc_args = ['        open, high, low, close, volume: 一维float数组（volume 仅在脚本用到时需要）']
+    doc_args += [f"        {name}: {title}" for name, title in result.inputs.items()]
+    outputs = ', '.join(f"{key!r}: {name}" for key, name in result.outputs)
+    body = [
+        f"def {result.name}({', '.join(signature)}):",
+        '    """',
+        f"    {result.title or result.name}",
+        '',
+        '    Args:',
+        *doc_args,
+        '',
+        '    Returns:',
+        '        dict: 顶层序列变量（Pine变量名 → ndarray）',
+        '    """',
+        '    open, high, low, close = (np.asarray(x, dtype=np.float64) for x in (open, high, low, close))',
+        '    if volume is not None:',
+        '        volume = np.asarray(volume, dtype=np.float64)',
+        "    with np.errstate(divide='ignore', invalid='ignore'):",
+        *(f"        {line}" for line in lines or ['pass']),
+        f"    return {{{outputs}}}",
+    ]
+    module = header + [
+        'import numpy as np',
+        'try:',
+        '    from pine import runtime as rt',
+        'except ImportError:',
+        '    import sys',
+        '    import os',
+        '    sys.path.append(os.path.dirname(os.path.dirname(__file__)))',
+        '    from pine import runtime as rt',
+        '',
+        '',
+        f"PARAMS = {result.params!r}",
+        f"PLOTS = {result.plots!r}",
+        '',
+        '',
+    ] + body
+    return '\n'.join(module) + '\n'
+
+
+def transpile(source, name=None, strict=False, path=None):
+    """
+    翻译一段Pine源码
+
+    Args:
+        source: .pine 源码
+        name: 生成的函数名（默认取 indicator() 标题）
+        strict: True 时脚本含不支持的语句即抛出 PineTranspileError
+        path: 仅用于生成代码的说明
+
+    Returns:
+        TranspileResult
+    """
+    statements = parse(source)
+    title = _title(statements)
+    result = TranspileResult(_function_name(name or title or 'pine_indicator'), title)
+    generator = _Generator(result)
+    generator.run(statements)
+    if strict and result.unsupported:
+        details = '\n'.join(f"  第{lineno}行 {text}: {reason}" for lineno, text, reason in result.unsupported)
+        raise PineTranspileError(f"{result.name}: {len(result.unsupported)} 条语句不支持\n{details}")
+    result.code = _render(result, generator.lines, path)
+    return result
+
+
+def transpile_file(path, name=None, strict=False):
+    """翻译 .pine 文件，函数名默认取文件名"""
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return transpile(source, name or stem, strict, path=path)
+
+
+def compile_pine(source, name=None, strict=False):
+    """翻译并执行Pine源码，返回计算函数"""
+    return transpile(source, name, strict).compile()
@@ -0,0 +1,542 @@
+"""
+Pine Script Parser
+Pine脚本解析 - 把 .pine 源码切分为逻辑行、语句树与表达式AST（指标表达式子集）
+
+- 逻辑行: 去掉 // 注释，按括号深度、行尾运算符、非4倍数缩进（Pine续行规则）合并续行；制表符按4空格计
+- 语句: 赋值（可带 var / const / 类型修饰）、元组赋值、:= 重新赋值、单行 / 多行函数定义、
+  if / else if / else 块、表达式语句；for / while / switch / type / import / method 等整体识别为块，
+  由代码生成阶段报告为不支持
+- 表达式: 数字 / 字符串 / 颜色字面量、true / false / na、标识符（含 ta.sma 这样的点号名）、
+  函数调用（含关键字参数）、历史引用 x[n]、一元 - / + / not、四则与取余、比较、and / or、三元 ?:，
+  优先级与Pine一致（[] > 一元 > * / % > + - > 比较 > == != > and > or > ?:）
+"""
+import re
+
+
+class PineSyntaxError(ValueError):
+    """语句或表达式不在可解析的子集内"""
+
+
+# === 表达式AST ===
+
+class Node:
+    __slots__ = ()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(repr(getattr(self, s)) for s in self.__slots__)})"
+
+
+class Num(Node):
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class Str(Node):
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class Bool(Node):
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class Na(Node):
+    __slots__ = ()
+
+
+class ColorLiteral(Node):
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+
+class Name(Node):
+    __slots__ = ('id',)
+
+    def __init__(self, id):
+        self.id = id
+
+
+class Call(Node):
+    __slots__ = ('func', 'args', 'kwargs')
+
+    def __init__(self, func, args, kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+
+class Index(Node):
+    __slots__ = ('target', 'offset')
+
+    def __init__(self, target, offset):
+        self.target = target
+        self.offset = offset
+
+
+class Unary(Node):
+    __slots__ = ('op', 'operand')
+
+    def __init__(self, op, operand):
+        self.op = op
+        self.operand = operand
+
+
+class Binary(Node):
+    __slots__ = ('op', 'left', 'right')
+
+    def __init__(self, op, left, right):
+        self.op = op
+        self.left = left
+        self.right = right
+
+
+class Ternary(Node):
+    __slots__ = ('cond', 'then', 'orelse')
+
+    def __init__(self, cond, then, orelse):
+        self.cond = cond
+        self.then = then
+        self.orelse = orelse
+
+
+class TupleLiteral(Node):
+    __slots__ = ('items',)
+
+    def __init__(self, items):
+        self.items = items
+
+
+# === 语句 ===
+
+class Statement:
+    """lineno / text 用于诊断信息"""
+    __slots__ = ('lineno', 'text')
+
+    def __repr__(self):
+        return f"{type(self).__name__}(line {self.lineno}: {self.text!r})"
+
+
+class Assign(Statement):
+    """name = expr；targets 为元组赋值的多个名字；block 为 x = if ... 形式的子块"""
+    __slots__ = ('targets', 'modifiers', 'expr', 'block')
+
+    def __init__(self, lineno, text, targets, modifiers, expr, block=None):
+        self.lineno, self.text = lineno, text
+        self.targets = targets
+        self.modifiers = modifiers
+        self.expr = expr
+        self.block = block
+
+
+class Reassign(Statement):
+    __slots__ = ('target', 'op', 'expr')
+
+    def __init__(self, lineno, text, target, op, expr):
+        self.lineno, self.text = lineno, text
+        self.target = target
+        self.op = op
+        self.expr = expr
+
+
+class FunctionDef(Statement):
+    """body: 单行函数为 [ExprStatement]，多行函数为语句列表"""
+    __slots__ = ('name', 'params', 'body')
+
+    def __init__(self, lineno, text, name, params, body):
+        self.lineno, self.text = lineno, text
+        self.name = name
+        self.params = params
+        self.body = body
+
+
+class If(Statement):
+    """orelse: else 块的语句列表（else if 为只含一个 If 的列表）"""
+    __slots__ = ('cond', 'body', 'orelse')
+
+    def __init__(self, lineno, text, cond, body, orelse):
+        self.lineno, self.text = lineno, text
+        self.cond = cond
+        self.body = body
+        self.orelse = orelse
+
+
+class ExprStatement(Statement):
+    __slots__ = ('expr',)
+
+    def __init__(self, lineno, text, expr):
+        self.lineno, self.text = lineno, text
+        self.expr = expr
+
+
+class Unparsed(Statement):
+    """整体不在子集内的语句（循环、类型定义、无法解析的表达式等），reason 为诊断说明"""
+    __slots__ = ('reason',)
+
+    def __init__(self, lineno, text, reason):
+        self.lineno, self.text = lineno, text
+        self.reason = reason
+
+
+# === 词法 ===
+
+_TOKEN = re.compile(r"""
+    (?P<num>(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?)
+  | (?P<str>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | (?P<color>\#[0-9A-Fa-f]{6,8}\b)
+  | (?P<name>[A-Za-z_][A-Za-z_0-9]*(?:\.[A-Za-z_][A-Za-z_0-9]*)*)
+  | (?P<op>:=|==|!=|<=|>=|=>|\+=|-=|\*=|/=|[-+*/%<>?:()\[\],=])
+  | (?P<space>\s+)
+""", re.VERBOSE)
+
+_KEYWORDS = {'and', 'or', 'not', 'true', 'false', 'na'}
+
+
+def tokenize(text):
+    """返回 (类型, 文本) 列表；类型为 num / str / color / name / op / kw"""
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None:
+            raise PineSyntaxError(f"无法识别的字符: {text[pos:pos + 10]!r}")
+        kind = match.lastgroup
+        if kind != 'space':
+            value = match.group()
+            if kind == 'name' and value in _KEYWORDS:
+                kind = 'kw'
+            tokens.append((kind, value))
+        pos = match.end()
+    return tokens
+
+
+def _strip_comment(line):
+    quote = None
+    for i, char in enumerate(line):
+        if quote:
+            if char == quote and line[i - 1] != '\\':
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif line.startswith('//', i):
+            return line[:i]
+    return line
+
+
+def _depth(text):
+    depth = 0
+    quote = None
+    for i, char in enumerate(text):
+        if quote:
+            if char == quote and text[i - 1] != '\\':
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+    return depth
+
+
+_TRAILING_OPERATOR = re.compile(r'(?:\band|\bor|\bnot|[-+*/%?:,<>]|(?<![=!<>:])=)\s*$')
+_LEADING_OPERATOR = re.compile(r'^(?:and\b|or\b|[?:*/%+]|==|!=)')
+_BLOCK_OPENER = re.compile(r'(?:=>\s*$)|^(?:if|else|for|while|switch|type|method|export)\b|=\s*(?:if|switch)\b')
+
+
+def logical_lines(source):
+    """(起始行号, 缩进, 文本) 列表"""
+    raw = []
+    for lineno, line in enumerate(source.splitlines(), 1):
+        line = _strip_comment(line.replace('\t', '    ')).rstrip()
+        if line.strip():
+            raw.append((lineno, len(line) - len(line.lstrip(' ')), line.strip()))
+
+    lines = []
+    i = 0
+    while i < len(raw):
+        lineno, indent, text = raw[i]
+        i += 1
+        while i < len(raw):
+            next_indent, next_text = raw[i][1], raw[i][2]
+            opener = _BLOCK_OPENER.search(text) is not None
+            if not (_depth(text) > 0 or _TRAILING_OPERATOR.search(text) and not text.endswith('=>') or
+                    next_indent > indent and not opener and
+                    ((next_indent - indent) % 4 != 0 or _LEADING_OPERATOR.match(next_text))):
+                break
+            text = f"{text} {next_text}"
+            i += 1
+        lines.append((lineno, indent, text))
+    return lines
+
+
+# === 表达式解析 ===
+
+_COMPARISON = ('<', '>', '<=', '>=')
+
+
+class _ExpressionParser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self, offset=0):
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def accept(self, value):
+        if self.peek()[1] == value and self.peek()[0] in ('op', 'kw'):
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, value):
+        if not self.accept(value):
+            raise PineSyntaxError(f"期望 {value!r}，实际为 {self.peek()[1]!r}")
+
+    def parse(self):
+        node = self.ternary()
+        if self.pos != len(self.tokens):
+            raise PineSyntaxError(f"表达式末尾有多余内容: {' '.join(t for _, t in self.tokens[self.pos:])!r}")
+        return node
+
+    def ternary(self):
+        cond = self.binary(0)
+        if self.accept('?'):
+            then = self.ternary()
+            self.expect(':')
+            return Ternary(cond, then, self.ternary())
+        return cond
+
+    _LEVELS = (('or',), ('and',), ('==', '!='), _COMPARISON, ('+', '-'), ('*', '/', '%'))
+
+    def binary(self, level):
+        if level == len(self._LEVELS):
+            return self.unary()
+        left = self.binary(level + 1)
+        while self.peek()[0] in ('op', 'kw') and self.peek()[1] in self._LEVELS[level]:
+            op = self.tokens[self.pos][1]
+            self.pos += 1
+            left = Binary(op, left, self.binary(level + 1))
+        return left
+
+    def unary(self):
+        for op in ('-', '+', 'not'):
+            if self.accept(op):
+                return Unary(op, self.unary())
+        return self.postfix(self.primary())
+
+    def postfix(self, node):
+        while self.accept('['):
+            offset = self.ternary()
+            self.expect(']')
+            node = Index(node, offset)
+        return node
+
+    def primary(self):
+        kind, value = self.peek()
+        if kind is None:
+            raise PineSyntaxError("表达式不完整")
+        self.pos += 1
+        if kind == 'num':
+            return Num(float(value) if any(c in value for c in '.eE') else int(value))
+        if kind == 'str':
+            return Str(value[1:-1].encode().decode('unicode_escape') if '\\' in value else value[1:-1])
+        if kind == 'color':
+            return ColorLiteral(value)
+        if kind == 'kw':
+            if value in ('true', 'false'):
+                return Bool(value == 'true')
+            if value == 'na':
+                return Na() if self.peek()[1] != '(' else self.call('na')
+        if kind == 'name':
+            if self.peek()[1] == '(':
+                return self.call(value)
+            return Name(value)
+        if value == '(':
+            node = self.ternary()
+            self.expect(')')
+            return node
+        if value == '[':
+            items = [self.ternary()]
+            while self.accept(','):
+                items.append(self.ternary())
+            self.expect(']')
+            return TupleLiteral(items)
+        raise PineSyntaxError(f"意外的符号: {value!r}")
+
+    def call(self, func):
+        self.expect('(')
+        args, kwargs = [], {}
+        if not self.accept(')'):
+            while True:
+                if self.peek()[0] == 'name' and self.peek(1) == ('op', '='):
+                    key = self.tokens[self.pos][1]
+                    self.pos += 2
+                    kwargs[key] = self.ternary()
+                elif kwargs:
+                    raise PineSyntaxError("位置参数出现在关键字参数之后")
+                else:
+                    args.append(self.ternary())
+                if self.accept(')'):
+                    break
+                self.expect(',')
+        return Call(func, args, kwargs)
+
+
+def parse_expression(text):
+    return _ExpressionParser(tokenize(text)).parse()
+
+
+# === 语句解析 ===
+
+_FUNCTION = re.compile(r'^([A-Za-z_]\w*)\s*\(([^()]*)\)\s*=>\s*(.*)$')
+_TUPLE_ASSIGN = re.compile(r'^\[([^\]]*)\]\s*=(?!=)\s*(.*)$')
+_REASSIGN = re.compile(r'^([A-Za-z_][\w.]*(?:\[[^\]]*\])?)\s*(:=|\+=|-=|\*=|/=)\s*(.*)$')
+_DECLARATION = re.compile(r'^((?:[A-Za-z_][\w.]*(?:<[\w\s,.<>]*>)?(?:\[\])?\s+)*)([A-Za-z_]\w*)\s*=(?![=>])\s*(.*)$')
+_BLOCKS = re.compile(r'^(for|while|switch|type|method|import|export|enum)\b')
+
+
+_NEXT_DECLARATION = re.compile(r'^[A-Za-z_]\w*\s*=(?![=>])')
+
+
+def _split_declarations(text):
+    """同一行以逗号分隔的多个声明: a = 1, b = a * 2"""
+    parts = []
+    depth = 0
+    quote = None
+    start = 0
+    for i, char in enumerate(text):
+        if quote:
+            if char == quote and text[i - 1] != '\\':
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            parts.append(text[start:i].strip())
+            start = i + 1
+    parts.append(text[start:].strip())
+    if len(parts) > 1 and all(_NEXT_DECLARATION.match(part) for part in parts[1:]):
+        return parts
+    return [text]
+
+
+def _params(text):
+    params = []
+    for item in (part.strip() for part in text.split(',') if part.strip()):
+        name, _, default = item.partition('=')
+        params.append((name.split()[-1], parse_expression(default) if default.strip() else None))
+    return params
+
+
+class _StatementParser:
+    def __init__(self, lines):
+        self.lines = lines
+        self.pos = 0
+
+    def block(self, indent):
+        """解析缩进为 indent 的连续语句（遇到更浅的缩进结束）"""
+        statements = []
+        while self.pos < len(self.lines) and self.lines[self.pos][1] >= indent:
+            if self.lines[self.pos][1] > indent:
+                lineno, _, text = self.lines[self.pos]
+                statements.append(Unparsed(lineno, text, "缩进不一致"))
+                self.children(self.lines[self.pos][1] - 1)
+                continue
+            statements.extend(self.statement())
+        return statements
+
+    def children(self, indent):
+        if self.pos < len(self.lines) and self.lines[self.pos][1] > indent:
+            return self.block(self.lines[self.pos][1])
+        return []
+
+    def statement(self):
+        """一个逻辑行 → 语句列表（同一行逗号分隔的多个声明拆开）"""
+        lineno, indent, text = self.lines[self.pos]
+        self.pos += 1
+        parts = _split_declarations(text)
+        statements = []
+        for part in parts:
+            try:
+                statements.append(self._statement(lineno, indent, part))
+            except PineSyntaxError as exc:
+                if part is parts[-1]:
+                    self.children(indent)
+                statements.append(Unparsed(lineno, part, str(exc)))
+        return statements
+
+    def _if(self, lineno, indent, text):
+        cond = parse_expression(text[2:].strip())
+        body = self.children(indent)
+        orelse = []
+        if self.pos < len(self.lines) and self.lines[self.pos][1] == indent and \
+                re.match(r'^else\b', self.lines[self.pos][2]):
+            else_lineno, _, else_text = self.lines[self.pos]
+            self.pos += 1
+            rest = else_text[4:].strip()
+            if rest.startswith('if') and re.match(r'^if\b', rest):
+                orelse = [self._if(else_lineno, indent, rest)]
+            else:
+                orelse = self.children(indent)
+        return If(lineno, text, cond, body, orelse)
+
+    def _statement(self, lineno, indent, text):
+        if re.match(r'^if\b', text):
+            return self._if(lineno, indent, text)
+        if re.match(r'^else\b', text):
+            self.children(indent)
+            return Unparsed(lineno, text, "else 缺少对应的 if")
+        match = _BLOCKS.match(text)
+        if match:
+            self.children(indent)
+            return Unparsed(lineno, text, f"不支持 {match.group(1)} 语句")
+        match = _FUNCTION.match(text)
+        if match:
+            name, params, rest = match.groups()
+            if rest:
+                body = [ExprStatement(lineno, rest, parse_expression(rest))]
+            else:
+                body = self.children(indent)
+            return FunctionDef(lineno, text, name, _params(params), body)
+        match = _TUPLE_ASSIGN.match(text)
+        if match:
+            targets = [name.strip() for name in match.group(1).split(',')]
+            return Assign(lineno, text, targets, (), parse_expression(match.group(2)))
+        match = _REASSIGN.match(text)
+        if match:
+            target, op, rest = match.groups()
+            return Reassign(lineno, text, target, op, parse_expression(rest) if rest else None)
+        match = _DECLARATION.match(text)
+        if match:
+            modifiers, name, rest = match.groups()
+            modifiers = tuple(modifiers.split())
+            if re.match(r'^if\b', rest):
+                return Assign(lineno, text, [name], modifiers, None, block=[self._if(lineno, indent, rest)])
+            if re.match(r'^switch\b', rest):
+                self.children(indent)
+                return Unparsed(lineno, text, "不支持 switch 表达式")
+            return Assign(lineno, text, [name], modifiers, parse_expression(rest))
+        return ExprStatement(lineno, text, parse_expression(text))
+
+
+def parse(source):
+    """解析整段 .pine 源码为顶层语句列表"""
+    lines = logical_lines(source)
+    parser = _StatementParser(lines)
+    statements = []
+    while parser.pos < len(lines):
+        statements.extend(parser.block(lines[parser.pos][1]))
+    return statements
@@ -0,0 +1,385 @@
+"""
+Pine Runtime
+Pine运行时 - pine.codegen 生成代码调用的向量化 ta.* / math.* 实现
+
+所有序列函数接收一维数组（或标量，自动广播），返回等长数组；na 以 NaN 表示，布尔序列为 bool 数组（无na）。
+递推与滚动窗口算子直接复用 kernels（numba编译 / NumPy回退），其余为纯NumPy向量化:
+- sma / ema / rma / stdev / highest / lowest: kernels.sma / ema / smma / stddev / highest / lowest
+  （ema / rma 首个完整窗口均值作种子，同 ta.ema / ta.rma；stdev 为总体标准差，同 ta.stdev biased=true）
+- wma / vwma / linreg / dev / sum: 滑动窗口视图一次求值
+- crossover / crossunder / cross / rising / falling / change / mom / roc: 移位比较
+- valuewhen / barssince / cum / fixnan: 累积下标（maximum.accumulate / cumsum）
+- atr / rsi / cci / mfi / pivothigh / pivotlow: kernels.pine_ta（与移植指标共用同一实现）
+- tr / stoch / tsi / dmi / obv / bb / macd: 与Pine文档中的定义式一致
+
+与Pine逐bar执行的差异: 条件分支内调用的 ta.* 在所有bar上计算（Pine只在分支执行的bar上更新历史），
+中途出现的 na 不会让 ema / rma 重新播种。
+"""
+import math
+from functools import reduce
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+try:
+    import kernels
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+    import kernels
+
+
+# === 基础 ===
+
+def series(x, like):
+    """标量广播为与 like 等长的float数组"""
+    if isinstance(x, np.ndarray):
+        return x
+    return np.full(len(like), np.nan if x is None else x, dtype=np.float64)
+
+
+def _float(x):
+    return np.asarray(x, dtype=np.float64)
+
+
+def source(value, open_, high, low, close, volume):
+    """input.source 参数: 列名（'close' / 'hl2' 等）或数组"""
+    if not isinstance(value, str):
+        return _float(value)
+    bars = {'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume,
+            'hl2': hl2(high, low), 'hlc3': hlc3(high, low, close), 'ohlc4': ohlc4(open_, high, low, close),
+            'hlcc4': hlcc4(high, low, close)}
+    if value not in bars or bars[value] is None:
+        raise ValueError(f"未知数据源: {value}，可选: {tuple(k for k, v in bars.items() if v is not None)}")
+    return bars[value]
+
+
+def hl2(high, low):
+    return (high + low) / 2
+
+
+def hlc3(high, low, close):
+    return (high + low + close) / 3
+
+
+def ohlc4(open_, high, low, close):
+    return (open_ + high + low + close) / 4
+
+
+def hlcc4(high, low, close):
+    return (high + low + close + close) / 4
+
+
+def bar_index(like):
+    return np.arange(len(like), dtype=np.float64)
+
+
+def truth(x):
+    """Pine条件真值: bool原样，数值为非零且非na"""
+    if isinstance(x, np.ndarray):
+        return x if x.dtype == np.bool_ else (x != 0) & ~np.isnan(x)
+    return bool(x == x and x)
+
+
+def where(cond, then, orelse):
+    """序列条件的三元运算"""
+    return np.where(truth(cond), then, orelse)
+
+
+def shift(x, offset):
+    """历史引用 x[offset]: 数值序列前补NaN，布尔序列前补False"""
+    offset = int(offset)
+    if not isinstance(x, np.ndarray) or offset == 0:
+        return x
+    out = np.empty_like(x)
+    out[:offset] = False if x.dtype == np.bool_ else np.nan
+    out[offset:] = x[:len(x) - offset]
+    return out
+
+
+def nz(x, replacement=0.0):
+    if isinstance(x, np.ndarray):
+        return x if x.dtype == np.bool_ else np.where(np.isnan(x), replacement, x)
+    return replacement if x != x else x
+
+
+def isna(x):
+    if isinstance(x, np.ndarray):
+        return np.zeros(len(x), dtype=bool) if x.dtype == np.bool_ else np.isnan(x)
+    return x is None or x != x
+
+
+def fixnan(x):
+    """na 用上一个非na值替代"""
+    x = _float(x)
+    index = np.where(np.isnan(x), 0, np.arange(len(x)))
+    np.maximum.accumulate(index, out=index)
+    return x[index]
+
+
+def to_int(x):
+    """int(): 向零截断"""
+    if isinstance(x, np.ndarray):
+        return np.trunc(x)
+    return x if x != x else int(x)
+
+
+def to_float(x):
+    if isinstance(x, np.ndarray):
+        return x.astype(np.float64)
+    return float(x)
+
+
+# === math.* ===
+
+def mod(a, b):
+    return np.fmod(a, b)
+
+
+def maximum(*values):
+    return reduce(np.maximum, values)
+
+
+def minimum(*values):
+    return reduce(np.minimum, values)
+
+
+def avg(*values):
+    return reduce(lambda a, b: a + b, values) / len(values)
+
+
+def round_(x, precision=None):
+    """math.round: 四舍五入（.5远离零），precision 为小数位数"""
+    scale = 1.0 if precision is None else 10.0 ** precision
+    out = np.sign(x) * np.floor(np.abs(x) * scale + 0.5) / scale
+    return out if isinstance(out, np.ndarray) or out != out else float(out)
+
+
+def sign(x):
+    return np.sign(x)
+
+
+# === 移动平均与统计 ===
+
+def sma(x, length):
+    return kernels.sma(_float(x), int(length))
+
+
+def ema(x, length):
+    return kernels.ema(_float(x), int(length))
+
+
+def rma(x, length):
+    return kernels.smma(_float(x), int(length))
+
+
+def _windows(x, length):
+    """(bar数 - length + 1, length) 的滑动窗口视图与输出数组"""
+    x = _float(x)
+    out = np.full(len(x), np.nan)
+    if len(x) < length:
+        return None, out
+    return sliding_window_view(x, length), out
+
+
+def wma(x, length):
+    length = int(length)
+    windows, out = _windows(x, length)
+    if windows is not None:
+        weights = np.arange(1, length + 1, dtype=np.float64)
+        out[length - 1:] = windows @ weights / weights.sum()
+    return out
+
+
+def vwma(x, volume, length):
+    return sma(_float(x) * volume, length) / sma(volume, length)
+
+
+def stdev(x, length, biased=True):
+    out = kernels.stddev(_float(x), int(length))
+    if not biased:
+        out = out * math.sqrt(length / (length - 1))
+    return out
+
+
+def variance(x, length, biased=True):
+    return stdev(x, length, biased) ** 2
+
+
+def dev(x, length):
+    """平均绝对偏差"""
+    length = int(length)
+    windows, out = _windows(x, length)
+    if windows is not None:
+        mean = windows.mean(axis=1, keepdims=True)
+        out[length - 1:] = np.abs(windows - mean).mean(axis=1)
+    return out
+
+
+def sum_(x, length):
+    length = int(length)
+    windows, out = _windows(x, length)
+    if windows is not None:
+        out[length - 1:] = windows.sum(axis=1)
+    return out
+
+
+def cum(x):
+    return np.cumsum(nz(_float(x)))
+
+
+def highest(x, length):
+    return kernels.highest(_float(x), int(length))
+
+
+def lowest(x, length):
+    return kernels.lowest(_float(x), int(length))
+
+
+def linreg(x, length, offset=0):
+    """最小二乘直线在 length - 1 - offset 处的值（窗口最旧bar为0）"""
+    length = int(length)
+    windows, out = _windows(x, length)
+    if windows is not None:
+        centered = np.arange(length, dtype=np.float64) - (length - 1) / 2
+        slope = windows @ centered / (centered @ centered)
+        out[length - 1:] = windows.mean(axis=1) + slope * ((length - 1 - offset) - (length - 1) / 2)
+    return out
+
+
+# === 变化与交叉 ===
+
+def change(x, length=1):
+    if isinstance(x, np.ndarray) and x.dtype == np.bool_:
+        return x != shift(x, length)
+    return x - shift(x, length)
+
+
+def mom(x, length):
+    return change(x, length)
+
+
+def roc(x, length):
+    previous = shift(_float(x), length)
+    return 100 * (x - previous) / previous
+
+
+def crossover(a, b):
+    return (a > b) & (shift(a, 1) <= shift(b, 1))
+
+
+def crossunder(a, b):
+    return (a < b) & (shift(a, 1) >= shift(b, 1))
+
+
+def cross(a, b):
+    return crossover(a, b) | crossunder(a, b)
+
+
+def rising(x, length):
+    return x > highest(shift(_float(x), 1), length)
+
+
+def falling(x, length):
+    return x < lowest(shift(_float(x), 1), length)
+
+
+def valuewhen(cond, x, occurrence=0):
+    """条件第 occurrence 次（0为最近一次）成立时 x 的值"""
+    hits = truth(cond)
+    bars = np.flatnonzero(hits)
+    k = np.cumsum(hits) - 1 - int(occurrence)
+    out = np.full(len(hits), np.nan)
+    found = k >= 0
+    values = x if isinstance(x, np.ndarray) else np.full(len(hits), x, dtype=np.float64)
+    out[found] = values[bars[k[found]]]
+    return out
+
+
+def barssince(cond):
+    hits = truth(cond)
+    index = np.arange(len(hits))
+    last = np.maximum.accumulate(np.where(hits, index, -1))
+    out = (index - last).astype(np.float64)
+    out[last < 0] = np.nan
+    return out
+
+
+# === 波动与振荡 ===
+
+def tr(high, low, close, handle_na=False):
+    """ta.tr: 首根（前收盘为na）handle_na 时为 high - low，否则为na"""
+    out = high - low
+    previous = shift(_float(close), 1)
+    out = np.fmax(np.fmax(out, np.abs(high - previous)), np.abs(low - previous))
+    if not handle_na:
+        out[np.isnan(previous)] = np.nan
+    return out
+
+
+def atr(high, low, close, length):
+    return kernels.pine_atr(high, low, close, int(length))
+
+
+def rsi(x, length):
+    return kernels.rsi(_float(x), int(length))
+
+
+def cci(x, length):
+    return kernels.cci(_float(x), int(length))
+
+
+def stoch(x, high, low, length):
+    lo = lowest(low, length)
+    return 100 * (x - lo) / (highest(high, length) - lo)
+
+
+def tsi(x, short_length, long_length):
+    delta = change(_float(x))
+    return ema(ema(delta, long_length), short_length) / ema(ema(np.abs(delta), long_length), short_length)
+
+
+def dmi(high, low, close, di_length, adx_smoothing):
+    """ta.dmi: (+DI, -DI, ADX)，平滑均为 rma"""
+    up = change(_float(high))
+    down = -change(_float(low))
+    plus_dm = np.where((up > down) & (up > 0), up, 0.0)
+    minus_dm = np.where((down > up) & (down > 0), down, 0.0)
+    plus_dm[0] = minus_dm[0] = np.nan
+    true_range = rma(tr(high, low, close), di_length)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plus = fixnan(100 * rma(plus_dm, di_length) / true_range)
+        minus = fixnan(100 * rma(minus_dm, di_length) / true_range)
+        total = plus + minus
+        adx = 100 * rma(np.abs(plus - minus) / np.where(total == 0, 1.0, total), adx_smoothing)
+    return plus, minus, adx
+
+
+def mfi(x, volume, length):
+    """ta.mfi: 资金流量指数（x 一般为 hlc3）"""
+    return kernels.mfi(_float(x), volume, int(length))
+
+
+def obv(close, volume):
+    """ta.obv: 能量潮（首根为0）"""
+    return np.cumsum(nz(sign(change(_float(close))) * volume))
+
+
+def bb(x, length, mult):
+    basis = sma(x, length)
+    deviation = mult * stdev(x, length)
+    return basis, basis + deviation, basis - deviation
+
+
+def macd(x, fast_length, slow_length, signal_length):
+    line = ema(x, fast_length) - ema(x, slow_length)
+    signal = ema(line, signal_length)
+    return line, signal, line - signal
+
+
+def pivothigh(x, left, right):
+    return kernels.pivot_values(_float(x), int(left), int(right), True)
+
+
+def pivotlow(x, left, right):
+    return kernels.pivot_values(_float(x), int(left), int(right), False)
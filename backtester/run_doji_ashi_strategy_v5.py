@@ -8,10 +8,14 @@ Doji Ashi Strategy v5 运行脚本 - Backtrader原生绘图版本
 - 保留所有策略逻辑优化
 - 更好的执行性能和稳定性
 - 零配置绘图设置
+- 日线趋势过滤器的日线数据由主数据在进程内重采样得到，无需另外加载1d文件
+- 批量模式（--symbols）: 交易币种与市场参考币种一次性读入对齐面板，crypto 模式的 BTCUSDT 只读取一次，
+  对齐到各交易币种的时间戳后作为市场过滤器数据源
 
 使用方法:
 python run_doji_ashi_strategy_v5.py --data data/ETHUSDT/2h/ETHUSDT-2h-merged.csv --market_type crypto
 python run_doji_ashi_strategy_v5.py --data data/AAPL/4h/AAPL-4h.csv --market_type stocks --market_data data/SPY/4h/SPY-4h.csv
+python run_doji_ashi_strategy_v5.py --symbols SUIUSDT DOGEUSDT ETHUSDT --interval 2h --market_type crypto
 """
 
 import backtrader as bt
@@ -23,6 +27,11 @@ import argparse
 import sys
 
 from strategies.doji_ashi_strategy_v5 import DojiAshiStrategyV5
+from indicators.mtf_levels import resample_frame
+from indicators.panel import load_panel
+
+
+DEFAULT_MARKET_SYMBOLS = {'crypto': 'BTCUSDT'}
 
 
 def load_ohlcv_data(file_path, limit=None):
@@ -132,11 +141,16 @@ class PandasData(bt.feeds.PandasData):
     )
 
 
-def run_backtest(args):
-    """运行回测"""
+def run_backtest(args, panel=None, symbol=None):
+    """
+    运行回测
+
+    panel / symbol 给出时（批量模式），主数据取自面板中的 symbol，市场数据为面板中的参考币种
+    对齐到主数据时间戳的序列；否则从 --data / --market_data 文件读取
+    """
     print("=== Doji Ashi Strategy v5 Backtest ===")
     print(f"Strategy: Backtrader Native Plotting Version")
-    print(f"Data: {args.data}")
+    print(f"Data: {args.data if panel is None else f'{symbol} {panel.interval} (panel)'}")
     print(f"Market Type: {args.market_type}")
     print(f"Date Range: {args.start_date} to {args.end_date}")
     print(f"Cash: ${args.cash:,.2f}")
@@ -150,11 +164,16 @@ def run_backtest(args):
     cerebro.broker.setcommission(commission=args.commission)
     
     # 加载主要数据
-    try:
-        df_main = load_ohlcv_data(args.data, limit=args.limit)
-    except Exception as e:
-        print(f"Error loading main data: {e}")
-        return
+    if panel is not None:
+        df_main = panel.frame(symbol)
+        if args.limit:
+            df_main = df_main.tail(args.limit)
+    else:
+        try:
+            df_main = load_ohlcv_data(args.data, limit=args.limit)
+        except Exception as e:
+            print(f"Error loading main data: {e}")
+            return
     
     # 应用日期过滤
     if args.start_date:
@@ -173,8 +192,19 @@ def run_backtest(args):
     data_main = PandasData(dataname=df_main)
     cerebro.adddata(data_main, name='main')
     
+    # 日线数据源（日线趋势过滤器）: 由主数据重采样，按数据内容缓存；主数据本身为日线及以上周期时直接使用主数据
+    if len(df_main) > 1 and df_main.index.to_series().diff().median() < pd.Timedelta(days=1):
+        df_daily = resample_frame(df_main, '1d')
+        cerebro.adddata(PandasData(dataname=df_daily), name='daily')
+        print(f"Daily bars resampled from main data: {len(df_daily):,}")
+    
     # 加载市场数据（可选）
-    if args.market_data and Path(args.market_data).exists():
+    market_symbol = resolve_market_symbol(args)
+    if panel is not None and market_symbol:
+        # 面板中的参考币种按主数据时间戳对齐（缺失处向前填充），两个数据源的bar一一对应
+        cerebro.adddata(PandasData(dataname=panel.aligned_frame(market_symbol, df_main.index)), name='market')
+        print(f"Market data aligned from panel: {market_symbol}")
+    elif args.market_data and Path(args.market_data).exists():
         try:
             df_market = load_ohlcv_data(args.market_data, limit=args.limit)
             if args.start_date:
@@ -207,6 +237,7 @@ def run_backtest(args):
         order_percent=args.order_percent / 100.0,
         leverage=args.leverage,
         cooldown_bars=args.cooldown_bars,
+        use_kernels=args.use_kernels,
         # V5版本：Backtrader原生绘图设置
         enable_backtrader_plot=args.enable_backtrader_plot,
         plot_volume=args.plot_volume,
@@ -229,9 +260,10 @@ def run_backtest(args):
     end_time = dt.datetime.now()
     
     strategy = results[0]
+    runtime = (end_time - start_time).total_seconds()
     
     # 打印结果
-    print(f"\\n=== Backtest Results (Runtime: {(end_time - start_time).total_seconds():.2f}s) ===")
+    print(f"\\n=== Backtest Results (Runtime: {runtime:.2f}s) ===")
     print(f"Starting Portfolio Value: ${args.cash:,.2f}")
     print(f"Final Portfolio Value: ${cerebro.broker.getvalue():,.2f}")
     print(f"Total Return: {((cerebro.broker.getvalue() / args.cash - 1) * 100):+.2f}%")
@@ -311,14 +343,57 @@ def run_backtest(args):
             print("Try installing: pip install backtrader-plotting")
     
     print("\\n=== Backtest Complete ===")
+    
+    trade_total = trade_analyzer.total.closed if trade_analyzer.total and 'closed' in trade_analyzer.total else 0
+    return {
+        'symbol': symbol or Path(args.data).stem,
+        'final_value': cerebro.broker.getvalue(),
+        'return_pct': (cerebro.broker.getvalue() / args.cash - 1) * 100,
+        'trades': trade_total,
+        'runtime': runtime,
+    }
+
+
+def resolve_market_symbol(args):
+    """市场参考币种: --market_symbol，未给出时按市场类型取默认值（crypto: BTCUSDT）"""
+    return args.market_symbol or DEFAULT_MARKET_SYMBOLS.get(args.market_type)
+
+
+def run_batch(args):
+    """批量回测: 交易币种与参考币种一次读入对齐面板，参考币种只读取一次并在各币种回测间共享"""
+    market_symbol = resolve_market_symbol(args)
+    start_time = dt.datetime.now()
+    try:
+        panel = load_panel(list(args.symbols) + ([market_symbol] if market_symbol else []), args.interval)
+    except ValueError as e:
+        print(f"Error loading panel: {e}")
+        return []
+    print(f"Panel loaded: {len(panel.symbols)} symbols x {len(panel.open_time):,} timestamps "
+          f"({(dt.datetime.now() - start_time).total_seconds() * 1000:.0f}ms)")
+    
+    # 批量模式不绘图
+    args.enable_backtrader_plot = False
+    summaries = [run_backtest(args, panel=panel, symbol=symbol) for symbol in args.symbols]
+    summaries = [summary for summary in summaries if summary]
+    
+    print(f"\n=== Batch Summary ({args.interval}, market: {market_symbol or 'none'}) ===")
+    for summary in summaries:
+        print(f"{summary['symbol']:14s} trades={summary['trades']:4d} return={summary['return_pct']:+8.2f}% "
+              f"final=${summary['final_value']:,.2f} ({summary['runtime']:.2f}s)")
+    return summaries
 
 
 def main():
     parser = argparse.ArgumentParser(description='Doji Ashi Strategy v5 - Backtrader Native Plotting')
     
     # 数据参数
-    parser.add_argument('--data', required=True, help='Path to OHLCV CSV file')
+    parser.add_argument('--data', help='Path to OHLCV CSV file')
     parser.add_argument('--market_data', help='Path to market data CSV file (SPY/BTC)')
+    parser.add_argument('--symbols', nargs='+',
+                       help='Batch mode: symbols under data/ loaded once into an aligned panel')
+    parser.add_argument('--interval', default='2h', help='Batch mode timeframe (default: 2h)')
+    parser.add_argument('--market_symbol',
+                       help='Batch mode market filter symbol (default: BTCUSDT in crypto mode)')
     parser.add_argument('--limit', type=int, help='Limit number of rows to load')
     parser.add_argument('--start_date', help='Start date (YYYY-MM-DD)')
     parser.add_argument('--end_date', help='End date (YYYY-MM-DD)')
@@ -356,6 +431,8 @@ def main():
     parser.add_argument('--leverage', type=float, default=4.0, help='Leverage multiplier')
     parser.add_argument('--cooldown_bars', type=int, default=10,
                        help='Cooldown bars between signals')
+    parser.add_argument('--use_kernels', action='store_true',
+                       help='Use kernels (numba/NumPy) implementations for EMA/SMA/ATR')
     
     # 回测参数 (用户默认设置)
     parser.add_argument('--cash', type=float, default=500.0, help='Starting cash (default: 500 USDT)')
@@ -370,9 +447,14 @@ def main():
                        help='Plot technical indicators in Backtrader chart')
     
     args = parser.parse_args()
+    if not args.data and not args.symbols:
+        parser.error('--data or --symbols is required')
     
     # 运行回测
-    run_backtest(args)
+    if args.symbols:
+        run_batch(args)
+    else:
+        run_backtest(args)
 
 
 if __name__ == '__main__':
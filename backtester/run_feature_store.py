@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Four Swords 特征库刷新
+对 data/ 下全部 币种 × 时间框架 物化/增量追加特征（见 indicators/feature_store.py）
+
+用法:
+    python run_feature_store.py                       # 全部币种 1h/2h/4h/1d，默认参数集
+    python run_feature_store.py --symbol SUIUSDT --interval 2h
+    python run_feature_store.py --params '{"ema_fast": 20, "ema_slow": 50}'
+"""
+import sys
+import os
+import json
+import time
+
+# 添加路径
+sys.path.append(os.path.dirname(__file__))
+from indicators.feature_store import FeatureStore, DATA_DIR, DEFAULT_ROOT
+
+
+INTERVALS = ('1h', '2h', '4h', '1d')
+
+
+def available_datasets(symbols=None, intervals=INTERVALS):
+    """data/ 下存在合并CSV的 (币种, 时间框架)"""
+    symbols = symbols or sorted(name for name in os.listdir(DATA_DIR)
+                                if os.path.isdir(os.path.join(DATA_DIR, name)))
+    for symbol in symbols:
+        for interval in intervals:
+            if os.path.exists(os.path.join(DATA_DIR, symbol, interval, f'{symbol}-{interval}-merged.csv')):
+                yield symbol, interval
+
+
+def refresh(store, datasets, params=None, rebuild=False):
+    total = 0
+    for symbol, interval in datasets:
+        start_time = time.perf_counter()
+        appended = store.update(symbol, interval, params=params, rebuild=rebuild)
+        total += appended
+        print(f"   {symbol:14s} {interval:3s} +{appended:6d} bars  ({(time.perf_counter() - start_time) * 1000:.0f}ms)")
+    return total
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Four Swords 特征库刷新")
+    parser.add_argument("--symbol", help="只刷新单个币种（默认全部）")
+    parser.add_argument("--interval", action='append', help="时间框架，可重复 (默认: 1h 2h 4h 1d)")
+    parser.add_argument("--params", help="参数集JSON，未给出的取默认值")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help=f"特征库目录 (默认: {DEFAULT_ROOT})")
+    parser.add_argument("--rebuild", action='store_true', help="丢弃已物化特征全量重建")
+
+    args = parser.parse_args()
+
+    store = FeatureStore(args.root)
+    params = json.loads(args.params) if args.params else None
+    datasets = available_datasets([args.symbol] if args.symbol else None, args.interval or INTERVALS)
+    print(f"[START] Feature store refresh - {store.root}")
+    total = refresh(store, datasets, params, args.rebuild)
+    print(f"[SUMMARY] Appended {total} bars, {len(store.entries())} feature sets in store")
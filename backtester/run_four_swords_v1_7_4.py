@@ -19,6 +19,9 @@ Usage:
 
     # A2 EMA+Volume过滤
     python run_four_swords_v1_7_4.py --data backtester/data/BTCUSDT/4h/BTCUSDT-4h-merged.csv --no_wt_filter
+
+    # v2.0 MTF: 多周期EMA评分过滤（高周期由同一份数据聚合，不另外加载文件）
+    python run_four_swords_v1_7_4.py --data backtester/data/DOGEUSDT/1h/DOGEUSDT-1h-merged.csv --mtf
 """
 
 import sys
@@ -38,6 +41,8 @@ import backtrader as bt
 
 # Import our strategy
 from strategies.four_swords_swing_strategy_v1_7_4 import FourSwordsSwingStrategyV174
+from strategies.four_swords_swing_strategy_v2_0_mtf import FourSwordsSwingStrategyV20MTF
+from indicators import cache as indicator_cache
 
 # Optional plotting with btplotting (modern alternative)
 try:
@@ -247,6 +252,9 @@ def main():
   
   # A3 全过滤 (默认)
   python run_four_swords_v1_7_4_test.py --data data.csv
+  
+  # v2.0 MTF 多周期评分过滤
+  python run_four_swords_v1_7_4_test.py --data data.csv --mtf
         """
     )
     
@@ -278,9 +286,15 @@ def main():
     parser.add_argument('--kc_mult', type=float, default=1.5, help='肯特纳通道倍数')
     parser.add_argument('--wt_n1', type=int, default=10, help='WaveTrend n1参数')
     parser.add_argument('--wt_n2', type=int, default=21, help='WaveTrend n2参数')
-    parser.add_argument('--ema_fast', type=int, default=10, help='快速EMA周期')
-    parser.add_argument('--ema_slow', type=int, default=20, help='慢速EMA周期')
-    parser.add_argument('--volume_mult', type=float, default=1.05, help='成交量倍数阈值')
+    parser.add_argument('--ema_fast', type=int, default=None, help='快速EMA周期 (默认: v1.7.4 10 / v2.0 20)')
+    parser.add_argument('--ema_slow', type=int, default=None, help='慢速EMA周期 (默认: v1.7.4 20 / v2.0 50)')
+    parser.add_argument('--volume_mult', type=float, default=None, help='成交量倍数阈值 (默认: v1.7.4 1.05 / v2.0 1.2)')
+    
+    # v2.0 MTF
+    parser.add_argument('--mtf', action='store_true', help='运行 v2.0 MTF 版本 (多周期EMA趋势加权评分过滤)')
+    parser.add_argument('--mtf_threshold', type=float, default=0.6, help='MTF评分阈值 (默认: 0.6)')
+    parser.add_argument('--mtf_timeframes', default='15m,1h,4h',
+                        help='MTF档位，逗号分隔，权重依次为 0.2/0.3/0.5 (默认: 15m,1h,4h)')
     
     # 过滤器开关 (消融测试核心)
     parser.add_argument('--no_ema_filter', action='store_true', help='禁用EMA趋势过滤')
@@ -297,7 +311,21 @@ def main():
     parser.add_argument('--disable-sqzmom', action='store_true', help='DEBUG: 禁用 SqueezeMomentum 指标')
     parser.add_argument('--disable-wavetrend', action='store_true', help='DEBUG: 禁用 WaveTrend 指标')
     
+    # 性能参数
+    parser.add_argument('--use-kernels', action='store_true', help='EMA/成交量/ATR过滤器使用 kernels 内核实现')
+    parser.add_argument('--indicator-cache', nargs='?', const='results/indicator_cache', default=None,
+                        help='SQZMOM/WaveTrend 磁盘缓存目录 (仅写开关时为 results/indicator_cache)')
+    parser.add_argument('--indicator-cache-mb', type=int, default=1024, help='指标缓存磁盘预算 MB (默认: 1024)')
+    
     args = parser.parse_args()
+    strategy_cls = FourSwordsSwingStrategyV20MTF if args.mtf else FourSwordsSwingStrategyV174
+    for arg, param in (('ema_fast', 'ema_fast'), ('ema_slow', 'ema_slow'), ('volume_mult', 'volume_multiplier')):
+        if getattr(args, arg) is None:
+            setattr(args, arg, getattr(strategy_cls.params, param))
+    
+    # 指标磁盘缓存：参数扫描时相同数据与指标参数只计算一次
+    if args.indicator_cache:
+        indicator_cache.configure(args.indicator_cache, max_bytes=args.indicator_cache_mb * 1024 * 1024)
     
     # 创建输出目录
     if args.html:
@@ -305,7 +333,7 @@ def main():
     os.makedirs(os.path.dirname(args.summary_csv), exist_ok=True)
     
     print("="*70)
-    print("FOUR SWORDS v1.7.4 测试运行器")
+    print(f"FOUR SWORDS {'v2.0 MTF' if args.mtf else 'v1.7.4'} 测试运行器")
     print("="*70)
     print(f"数据文件: {args.data}")
     print(f"初始资金: ${args.initial_cash} USDT")
@@ -316,6 +344,8 @@ def main():
     print(f"  - EMA过滤: {'禁用' if args.no_ema_filter else '启用'}")
     print(f"  - Volume过滤: {'禁用' if args.no_volume_filter else '启用'}")
     print(f"  - WaveTrend过滤: {'禁用' if args.no_wt_filter else '启用'}")
+    if args.mtf:
+        print(f"  - MTF评分过滤: {args.mtf_timeframes} >= {args.mtf_threshold}")
     
     # 初始化Cerebro
     cerebro = bt.Cerebro()
@@ -390,10 +420,16 @@ def main():
         'indicators_only': getattr(args, 'indicators_only', False),
         'disable_sqzmom': getattr(args, 'disable_sqzmom', False),
         'disable_wavetrend': getattr(args, 'disable_wavetrend', False),
+        
+        # 性能
+        'use_kernels': args.use_kernels,
     }
+    if args.mtf:
+        strategy_params['mtf_threshold'] = args.mtf_threshold
+        strategy_params['mtf_timeframes'] = tuple(tf.strip() for tf in args.mtf_timeframes.split(','))
     
     # 添加策略
-    cerebro.addstrategy(FourSwordsSwingStrategyV174, **strategy_params)
+    cerebro.addstrategy(strategy_cls, **strategy_params)
     
     print("\n开始回测...")
     
@@ -407,6 +443,10 @@ def main():
     run_duration = (end_time - start_time).total_seconds()
     
     print(f"回测完成，耗时: {run_duration:.2f}秒")
+    if indicator_cache.get_cache() is not None:
+        cache_summary = indicator_cache.get_cache().summary()
+        print(f"指标缓存: 命中 {cache_summary['hits']} / 未命中 {cache_summary['misses']}，"
+              f"{cache_summary['entries']} 条目 {cache_summary['bytes'] / 1024 / 1024:.1f} MB")
     
     # 提取分析结果
     trades_analysis = strategy.analyzers.trades.get_analysis()
@@ -57,6 +57,10 @@ class DebugSQZMOMStrategy(bt.Strategy):
             traceback.print_exc()
             raise
 
+    def stop(self):
+        """输出分母夹底的聚合统计"""
+        self.sqzmom.report_denominators()
+
 
 def main():
     print("=" * 60)
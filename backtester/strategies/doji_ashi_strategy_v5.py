@@ -84,6 +84,20 @@ except Exception:
     logger = None
     HAS_LOGURU = False
 
+# --- Kernels (numba编译/NumPy回退的指标内核) ---
+try:
+    from indicators.kernel_indicators import KernelSMA, KernelEMA, KernelATR
+    from indicators.registry import shared_indicator
+    from indicators.dependencies import IndicatorPlan
+    from indicators.key_levels import PeriodKeyLevels
+except ImportError:
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+    from indicators.kernel_indicators import KernelSMA, KernelEMA, KernelATR
+    from indicators.registry import shared_indicator
+    from indicators.dependencies import IndicatorPlan
+    from indicators.key_levels import PeriodKeyLevels
+
 
 class DojiAshiStrategyV5(bt.Strategy):
     """
@@ -105,6 +119,7 @@ class DojiAshiStrategyV5(bt.Strategy):
         ("enable_time_filter", False),          # 时间过滤器
         ("enable_vwap_filter_entry", False),    # VWAP入场过滤器
         ("enable_entry_trigger", True),         # 3/8 MA触发器
+        ("enable_key_level_filter", False),     # 周期关键位过滤器（收盘相对上一周期枢轴）
         
         # === TRIGGER SETTINGS === #
         ("trigger_ma_type", "EMA"),            # 'EMA' only for now
@@ -126,6 +141,9 @@ class DojiAshiStrategyV5(bt.Strategy):
         ("volume_ma_len", 20),                 # 成交量MA长度
         ("volume_factor", 1.2),                # 成交量倍数阈值
         
+        # === KEY LEVEL FILTER === #
+        ("key_level_period", "D"),             # 'D' | 'W' | 'M'
+        
         # === RELATIVE STRENGTH FILTER === #
         ("rs_ma_len", 20),                     # 相对强度MA长度
         
@@ -151,6 +169,9 @@ class DojiAshiStrategyV5(bt.Strategy):
         
         # === TECHNICAL SETTINGS === #
         ("use_talib", True),                   # 优先使用TA-Lib
+        ("use_kernels", False),                # 使用kernels内核计算EMA/SMA/ATR（优先于TA-Lib/pandas_ta）
+        ("share_indicators", True),            # 同一Cerebro内相同(指标, 源line, 参数)共享实例
+        ("prune_indicators", True),            # 只构建启用过滤器用到的指标（关闭时构建全部）
         ("warmup_daily", 200),                 # 日线指标预热期
         
         # === V5: BACKTRADER NATIVE PLOTTING === #
@@ -176,21 +197,32 @@ class DojiAshiStrategyV5(bt.Strategy):
         self.data_open = self.datas[0].open
         self.data_volume = getattr(self.datas[0], "volume", None)
         
-        # 多时间框架数据设置
-        self.daily_data = self.datas[1] if len(self.datas) > 1 else self.datas[0]
-        self.market_data = self.datas[2] if len(self.datas) > 2 else None
+        # 多时间框架数据设置 - 优先按名称（运行脚本添加 'daily' / 'market'），未命名时按位置 datas[1] / datas[2]
+        named = {data._name: data for data in self.datas if data._name}
+        if 'daily' in named or 'market' in named:
+            self.daily_data = named.get('daily', self.datas[0])
+            self.market_data = named.get('market')
+        else:
+            self.daily_data = self.datas[1] if len(self.datas) > 1 else self.datas[0]
+            self.market_data = self.datas[2] if len(self.datas) > 2 else None
+        
+        # 指标依赖图 - 只构建启用过滤器可达的指标（预热保持不变）
+        plan = IndicatorPlan(self, prune=self.p.prune_indicators)
         
         # === 日线趋势过滤器 === #
-        self._setup_daily_trend_filter()
+        self._setup_daily_trend_filter(plan)
         
         # === 3/8 MA触发器 === #
-        self._setup_ma_trigger()
-        
-        # === 可选过滤器 === #
-        self._setup_optional_filters()
+        self._setup_ma_trigger(plan)
         
         # === ATR和风险管理 === #
-        self._setup_risk_management()
+        self._setup_risk_management(plan)
+        
+        plan.build()
+        self.indicator_plan = plan
+        
+        # === 可选过滤器（按各自开关创建） === #
+        self._setup_optional_filters()
         
         # === 状态变量 === #
         self._init_state_variables()
@@ -213,60 +245,71 @@ class DojiAshiStrategyV5(bt.Strategy):
             self.enable_market_filter = False
             self.enable_relative_strength = False
 
-    def _setup_daily_trend_filter(self):
-        """设置日线趋势过滤器 - 优先使用pandas_ta"""
-        try:
-            if HAS_PANDAS_TA:
-                # 使用pandas_ta计算，性能更好且无需预热期
-                self.daily_sma20 = btind.SMA(self.daily_data.close, period=self.p.daily_sma_20)
-                self.daily_sma50 = btind.SMA(self.daily_data.close, period=self.p.daily_sma_50) 
-                self.daily_sma200 = btind.SMA(self.daily_data.close, period=self.p.daily_sma_200)
-            else:
-                # 回退到Backtrader内置指标
-                self.daily_sma20 = btind.SMA(self.daily_data.close, period=self.p.daily_sma_20)
-                self.daily_sma50 = btind.SMA(self.daily_data.close, period=self.p.daily_sma_50)
-                self.daily_sma200 = btind.SMA(self.daily_data.close, period=self.p.daily_sma_200)
-        except Exception:
-            # 最终回退
-            self.daily_sma20 = btind.SMA(self.daily_data.close, period=self.p.daily_sma_20)
-            self.daily_sma50 = btind.SMA(self.daily_data.close, period=self.p.daily_sma_50)
-            self.daily_sma200 = btind.SMA(self.daily_data.close, period=self.p.daily_sma_200)
-        
-        self.sma_pass_count = (
+    def _indicator(self, cls, *datas, **kwargs):
+        """创建指标 - share_indicators开启时经注册表共享同一Cerebro内的相同计算"""
+        if self.p.share_indicators:
+            return shared_indicator(self, cls, *datas, **kwargs)
+        return cls(*datas, **kwargs)
+
+    def _setup_daily_trend_filter(self, plan):
+        """设置日线趋势过滤器"""
+        # pandas_ta / Backtrader内置分支均使用btind.SMA，kernels可选
+        sma_cls = KernelSMA if self.p.use_kernels else btind.SMA
+        for name, period in (("daily_sma20", self.p.daily_sma_20),
+                             ("daily_sma50", self.p.daily_sma_50),
+                             ("daily_sma200", self.p.daily_sma_200)):
+            plan.add(name, lambda period=period: self._indicator(sma_cls, self.daily_data.close, period=period),
+                     warmup=(self.daily_data, period))
+        
+        plan.add("sma_pass_count", lambda: (
             (self.daily_data.close > self.daily_sma20) +
             (self.daily_data.close > self.daily_sma50) +
             (self.daily_data.close > self.daily_sma200)
-        )
+        ), requires=("daily_sma20", "daily_sma50", "daily_sma200"))
         
         if self.trend_mode == "strict":
-            self.daily_uptrend = self.sma_pass_count == 3
-            self.daily_downtrend = self.sma_pass_count == 0
+            plan.add("daily_uptrend", lambda: self.sma_pass_count == 3, requires=("sma_pass_count",))
+            plan.add("daily_downtrend", lambda: self.sma_pass_count == 0, requires=("sma_pass_count",))
         else:  # flexible
-            self.daily_uptrend = self.sma_pass_count >= 2
-            self.daily_downtrend = self.sma_pass_count <= 1
+            plan.add("daily_uptrend", lambda: self.sma_pass_count >= 2, requires=("sma_pass_count",))
+            plan.add("daily_downtrend", lambda: self.sma_pass_count <= 1, requires=("sma_pass_count",))
+        
+        plan.require("daily_uptrend", "daily_downtrend", when=self.p.enable_daily_trend_filter)
 
-    def _setup_ma_trigger(self):
-        """设置3/8 MA触发器 - 优先使用pandas_ta"""
+    def _trigger_ema(self, period):
+        """3/8 MA触发器的EMA - 优先使用pandas_ta"""
         try:
-            if HAS_PANDAS_TA:
+            if self.p.use_kernels:
+                return self._indicator(KernelEMA, self.data_close, period=period)
+            elif HAS_PANDAS_TA:
                 # 使用pandas_ta，性能更好
-                self.ma_fast = btind.EMA(self.data_close, period=self.p.fast_ma_len)
-                self.ma_slow = btind.EMA(self.data_close, period=self.p.slow_ma_len)
+                return self._indicator(btind.EMA, self.data_close, period=period)
             elif self.p.use_talib and HAS_TALIB:
-                self.ma_fast = bt.talib.EMA(self.data_close, timeperiod=self.p.fast_ma_len)
-                self.ma_slow = bt.talib.EMA(self.data_close, timeperiod=self.p.slow_ma_len)
+                return bt.talib.EMA(self.data_close, timeperiod=period)
             else:
                 raise AttributeError
         except Exception:
-            self.ma_fast = btind.EMA(self.data_close, period=self.p.fast_ma_len)
-            self.ma_slow = btind.EMA(self.data_close, period=self.p.slow_ma_len)
+            return self._indicator(btind.EMA, self.data_close, period=period)
+
+    def _setup_ma_trigger(self, plan):
+        """设置3/8 MA触发器"""
+        plan.add("ma_fast", lambda: self._trigger_ema(self.p.fast_ma_len),
+                 warmup=(self.datas[0], self.p.fast_ma_len))
+        plan.add("ma_slow", lambda: self._trigger_ema(self.p.slow_ma_len),
+                 warmup=(self.datas[0], self.p.slow_ma_len))
         
         if self.entry_mode == "cross":
-            self.sig_long = btind.CrossUp(self.ma_fast, self.ma_slow)
-            self.sig_short = btind.CrossDown(self.ma_fast, self.ma_slow)
+            # CrossUp/CrossDown 需要前一根的差值，比慢线多1根
+            cross_warmup = (self.datas[0], max(self.p.fast_ma_len, self.p.slow_ma_len) + 1)
+            plan.add("sig_long", lambda: btind.CrossUp(self.ma_fast, self.ma_slow),
+                     requires=("ma_fast", "ma_slow"), warmup=cross_warmup)
+            plan.add("sig_short", lambda: btind.CrossDown(self.ma_fast, self.ma_slow),
+                     requires=("ma_fast", "ma_slow"), warmup=cross_warmup)
         else:  # above_below
-            self.sig_long = self.ma_fast > self.ma_slow
-            self.sig_short = self.ma_fast < self.ma_slow
+            plan.add("sig_long", lambda: self.ma_fast > self.ma_slow, requires=("ma_fast", "ma_slow"))
+            plan.add("sig_short", lambda: self.ma_fast < self.ma_slow, requires=("ma_fast", "ma_slow"))
+        
+        plan.require("sig_long", "sig_short", when=self.p.enable_entry_trigger)
 
     def _setup_optional_filters(self):
         """设置可选过滤器"""
@@ -281,12 +324,19 @@ class DojiAshiStrategyV5(bt.Strategy):
             
         # 成交量过滤器
         if self.p.enable_volume_filter and self.data_volume is not None:
-            self.avg_volume = btind.SMA(self.data_volume, period=self.p.volume_ma_len)
+            sma_cls = KernelSMA if self.p.use_kernels else btind.SMA
+            self.avg_volume = self._indicator(sma_cls, self.data_volume, period=self.p.volume_ma_len)
             self.high_rel_volume = self.data_volume > (self.avg_volume * self.p.volume_factor)
         else:
             self.avg_volume = None
             self.high_rel_volume = None
             
+        # 周期关键位过滤器（基础周期时间戳一次性分组计算，不依赖日线数据源）
+        if self.p.enable_key_level_filter:
+            self.key_levels = self._indicator(PeriodKeyLevels, self.datas[0], period=self.p.key_level_period)
+        else:
+            self.key_levels = None
+            
         # 相对强度过滤器（仅Stocks模式）
         if self.enable_relative_strength and self.market_data is not None:
             self.rel_strength_line = self.data_close / self.market_data.close
@@ -299,7 +349,7 @@ class DojiAshiStrategyV5(bt.Strategy):
             
         # 市场过滤器
         if self.enable_market_filter and self.market_data is not None:
-            self.market_ma = btind.SMA(self.market_data.close, period=20)
+            self.market_ma = self._indicator(btind.SMA, self.market_data.close, period=20)
             self.market_bullish = self.market_data.close > self.market_ma
             self.market_bearish = self.market_data.close < self.market_ma
             self.market_strength = (self.market_data.close - self.market_ma) / self.market_ma * 100
@@ -308,16 +358,23 @@ class DojiAshiStrategyV5(bt.Strategy):
             self.market_bearish = None
             self.market_strength = None
 
-    def _setup_risk_management(self):
-        """设置风险管理"""
+    def _build_atr(self):
+        """ATR - 止损/止盈距离"""
         try:
-            if self.p.use_talib and HAS_TALIB:
-                self.atr = bt.talib.ATR(self.data_high, self.data_low, self.data_close, 
-                                     timeperiod=self.p.atr_length)
+            if self.p.use_kernels:
+                return self._indicator(KernelATR, self.datas[0], period=self.p.atr_length)
+            elif self.p.use_talib and HAS_TALIB:
+                return bt.talib.ATR(self.data_high, self.data_low, self.data_close, 
+                                    timeperiod=self.p.atr_length)
             else:
                 raise AttributeError
         except Exception:
-            self.atr = btind.ATR(self.datas[0], period=self.p.atr_length)
+            return self._indicator(btind.ATR, self.datas[0], period=self.p.atr_length)
+
+    def _setup_risk_management(self, plan):
+        """设置风险管理 - ATR只用于固定止损/止盈，追踪止损模式下不构建"""
+        plan.add("atr", self._build_atr, warmup=(self.datas[0], self.p.atr_length + 1))
+        plan.require("atr", when=not self.p.use_trailing_stop)
 
     def _init_state_variables(self):
         """初始化状态变量"""
@@ -373,6 +430,8 @@ class DojiAshiStrategyV5(bt.Strategy):
             conditions.append(self.data_close[0] > self.vwap[0])
         if self.p.enable_volume_filter and self.high_rel_volume is not None:
             conditions.append(bool(self.high_rel_volume[0]))
+        if self.p.enable_key_level_filter and self.key_levels is not None:
+            conditions.append(self.data_close[0] > self.key_levels.pivot[0])
         conditions.append(self._is_valid_time())
         
         return all(conditions)
@@ -398,6 +457,8 @@ class DojiAshiStrategyV5(bt.Strategy):
             conditions.append(self.data_close[0] < self.vwap[0])
         if self.p.enable_volume_filter and self.high_rel_volume is not None:
             conditions.append(bool(self.high_rel_volume[0]))
+        if self.p.enable_key_level_filter and self.key_levels is not None:
+            conditions.append(self.data_close[0] < self.key_levels.pivot[0])
         conditions.append(self._is_valid_time())
         
         return all(conditions)
@@ -492,7 +553,6 @@ class DojiAshiStrategyV5(bt.Strategy):
         """创建退出订单"""
         executed_price = float(order.executed.price)
         size = float(order.executed.size)
-        atr_value = float(self.atr[0])
         
         if self.p.use_trailing_stop:
             if order.isbuy():
@@ -508,6 +568,7 @@ class DojiAshiStrategyV5(bt.Strategy):
                     size=size
                 )
         else:
+            atr_value = float(self.atr[0])
             if order.isbuy():
                 sl_price = executed_price - atr_value * float(self.p.atr_multiplier)
                 tp_price = executed_price + (executed_price - sl_price) * float(self.p.risk_reward_ratio)
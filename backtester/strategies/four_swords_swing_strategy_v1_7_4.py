@@ -25,15 +25,25 @@ import backtrader.indicators as btind
 
 # --- Safe Indicators (工程级分母防护) ---
 try:
-    from indicators.sqzmom_safe import SqueezeMomentumSafe
+    from indicators.sqzmom_safe import SqueezeMomentumSafe, squeeze_momentum_minperiod
     from indicators.wavetrend_safe import WaveTrendSafe
+    from indicators.kernel_indicators import KernelSMA, KernelEMA, KernelATR
+    from indicators.registry import shared_indicator
+    from indicators.dependencies import IndicatorPlan
+    from indicators.key_levels import PeriodKeyLevels
+    from indicators.mtf_trend import MTFTrendScore
 except ImportError:
     # 兼容性导入
     import sys
     import os
     sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-    from indicators.sqzmom_safe import SqueezeMomentumSafe
+    from indicators.sqzmom_safe import SqueezeMomentumSafe, squeeze_momentum_minperiod
     from indicators.wavetrend_safe import WaveTrendSafe
+    from indicators.kernel_indicators import KernelSMA, KernelEMA, KernelATR
+    from indicators.registry import shared_indicator
+    from indicators.dependencies import IndicatorPlan
+    from indicators.key_levels import PeriodKeyLevels
+    from indicators.mtf_trend import MTFTrendScore
 
 # TA-Lib (optional with capability detection)
 try:
@@ -96,6 +106,14 @@ class FourSwordsSwingStrategyV174(bt.Strategy):
         ('ema_slow', 20),
         ('use_volume_filter', True),
         ('volume_multiplier', 1.05),
+        ('use_key_level_filter', False),  # 多头需收盘在上一周期枢轴之上，空头需在其下
+        ('key_level_period', 'D'),  # 'D' | 'W' | 'M'
+        ('use_mtf_filter', False),  # 多周期EMA趋势加权评分达到阈值才放行（v2.0 MTF）
+        ('mtf_timeframes', ('15m', '1h', '4h')),  # 不大于数据周期的档位即数据本身
+        ('mtf_weights', (0.2, 0.3, 0.5)),
+        ('mtf_threshold', 0.6),
+        ('mtf_ema_fast', 20),
+        ('mtf_ema_slow', 50),
         
         # Strategy Settings
         ('trade_direction', 'long'),  # 'long', 'short', 'both'
@@ -124,56 +142,87 @@ class FourSwordsSwingStrategyV174(bt.Strategy):
         # Safe Math Parameters (工程级防护)
         ('warmup', 300),        # Warmup期数 (约最长窗口2-3倍)
         ('debug', False),       # 调试日志开关
+        
+        # Performance
+        ('use_kernels', False), # EMA/Volume/ATR过滤器使用 kernels 内核实现
+        ('share_indicators', True), # 同一Cerebro内相同(指标, 源line, 参数)共享实例
+        ('prune_indicators', True), # 只构建启用逻辑用到的指标（关闭时构建全部，便于绘图/调试）
     )
     
     def __init__(self):
         """Initialize indicators and state variables"""
         
-        # Core indicators (使用安全版本) - 条件性创建用于调试
-        if not self.params.disable_sqzmom:
-            self.sqzmom = SqueezeMomentumSafe(
-                self.data,
-                bb_length=self.params.bb_length,
-                bb_mult=self.params.bb_mult,
-                kc_length=self.params.kc_length,
-                kc_mult=self.params.kc_mult,
-                use_true_range=self.params.use_true_range,
-                debug=self.params.debug
-            )
-        else:
-            self.sqzmom = None
-        
-        if not self.params.disable_wavetrend:
-            self.wavetrend = WaveTrendSafe(
-                self.data,
-                n1=self.params.wt_n1,
-                n2=self.params.wt_n2,
-                debug=self.params.debug
-            )
+        # 过滤器指标实现: kernels内核 或 Backtrader内置
+        if self.params.use_kernels:
+            ema_cls, sma_cls, atr_cls = KernelEMA, KernelSMA, KernelATR
         else:
-            self.wavetrend = None
+            ema_cls = btind.ExponentialMovingAverage
+            sma_cls = btind.SimpleMovingAverage
+            atr_cls = btind.AverageTrueRange
+        
+        # 指标依赖图 - 只构建启用逻辑可达的指标（未使用的指标不计算，预热保持不变）
+        # warmup 只声明在原先无条件构建的 SQZMOM / WaveTrend / ATR 上；EMA与成交量均线原先只在
+        # 对应过滤器开启时构建，关闭时不应影响首个 next() bar
+        plan = IndicatorPlan(self, prune=self.params.prune_indicators)
+        
+        # Core indicators (使用安全版本)
+        plan.add('sqzmom', lambda: self._indicator(
+            SqueezeMomentumSafe,
+            self.data,
+            bb_length=self.params.bb_length,
+            bb_mult=self.params.bb_mult,
+            kc_length=self.params.kc_length,
+            kc_mult=self.params.kc_mult,
+            use_true_range=self.params.use_true_range,
+            debug=self.params.debug
+        ), warmup=(self.data, squeeze_momentum_minperiod(
+            self.params.bb_length, self.params.kc_length, self.params.use_true_range)))
+        
+        plan.add('wavetrend', lambda: self._indicator(
+            WaveTrendSafe,
+            self.data,
+            n1=self.params.wt_n1,
+            n2=self.params.wt_n2,
+            debug=self.params.debug
+        ), warmup=(self.data, self.params.wt_n1 * 2 + self.params.wt_n2 + 5))
         
         # EMA trend filter
-        if self.params.use_ema_filter:
-            self.ema_fast = btind.ExponentialMovingAverage(self.data.close, period=self.params.ema_fast)
-            self.ema_slow = btind.ExponentialMovingAverage(self.data.close, period=self.params.ema_slow)
-            self.ema_bull_trend = self.ema_fast > self.ema_slow
-            self.ema_bear_trend = self.ema_fast < self.ema_slow
-        else:
-            self.ema_bull_trend = None
-            self.ema_bear_trend = None
-        
-        # Volume filter with simplified logic for plotting compatibility  
-        if self.params.use_volume_filter:
-            self.avg_volume = btind.SimpleMovingAverage(self.data.volume, period=20)
-            # Simplified volume threshold to avoid bt.And plotting issues
-            vol_threshold = self.avg_volume * self.params.volume_multiplier
-            self.volume_confirm = self.data.volume > vol_threshold
-        else:
-            self.volume_confirm = None
-        
-        # ATR for stop loss
-        self.atr = btind.AverageTrueRange(self.data, period=self.params.atr_periods)
+        plan.add('ema_fast', lambda: self._indicator(ema_cls, self.data.close, period=self.params.ema_fast))
+        plan.add('ema_slow', lambda: self._indicator(ema_cls, self.data.close, period=self.params.ema_slow))
+        plan.add('ema_bull_trend', lambda: self.ema_fast > self.ema_slow, requires=('ema_fast', 'ema_slow'))
+        plan.add('ema_bear_trend', lambda: self.ema_fast < self.ema_slow, requires=('ema_fast', 'ema_slow'))
+        
+        # Volume filter with simplified logic for plotting compatibility
+        # Simplified volume threshold to avoid bt.And plotting issues
+        plan.add('avg_volume', lambda: self._indicator(sma_cls, self.data.volume, period=20))
+        plan.add('volume_confirm',
+                 lambda: self.data.volume > self.avg_volume * self.params.volume_multiplier,
+                 requires=('avg_volume',))
+        
+        # 周期关键位（日/周/月开盘价、上一周期高低收与枢轴，按时间戳一次性分组计算）
+        plan.add('key_levels', lambda: self._indicator(PeriodKeyLevels, self.data,
+                                                       period=self.params.key_level_period))
+        
+        # 多周期趋势评分（高周期bar由数据本身聚合，只用已收盘的高周期bar）
+        plan.add('mtf_trend', lambda: self._indicator(MTFTrendScore, self.data,
+                                                      timeframes=tuple(self.params.mtf_timeframes),
+                                                      weights=tuple(self.params.mtf_weights),
+                                                      fast=self.params.mtf_ema_fast,
+                                                      slow=self.params.mtf_ema_slow))
+        
+        # ATR (atr_multiplier 目前未被出场逻辑使用，只在prune关闭时构建)
+        plan.add('atr', lambda: self._indicator(atr_cls, self.data, period=self.params.atr_periods),
+                 warmup=(self.data, self.params.atr_periods + 1))
+        
+        # 启用逻辑 → 所需指标（disable_* 为调试开关）
+        plan.require('sqzmom', when=not self.params.disable_sqzmom)
+        plan.require('wavetrend', when=not (self.params.disable_wavetrend or self.params.use_simplified_signals))
+        plan.require('ema_bull_trend', 'ema_bear_trend', when=self.params.use_ema_filter)
+        plan.require('volume_confirm', when=self.params.use_volume_filter)
+        plan.require('key_levels', when=self.params.use_key_level_filter)
+        plan.require('mtf_trend', when=self.params.use_mtf_filter)
+        plan.build()
+        self.indicator_plan = plan
         
         # State management variables
         self.wait_long_exit_by_squeeze = False
@@ -192,6 +241,10 @@ class FourSwordsSwingStrategyV174(bt.Strategy):
             'ema_passed_short': 0,       # Short signals passed EMA filter
             'volume_passed_long': 0,     # Long signals passed Volume filter
             'volume_passed_short': 0,    # Short signals passed Volume filter
+            'key_level_passed_long': 0,  # Long signals passed Key Level filter
+            'key_level_passed_short': 0, # Short signals passed Key Level filter
+            'mtf_passed_long': 0,        # Long signals passed MTF score filter
+            'mtf_passed_short': 0,       # Short signals passed MTF score filter
             'wt_passed_long': 0,         # Long signals passed WT filter
             'wt_passed_short': 0,        # Short signals passed WT filter
             'actual_entries_long': 0,    # Actual long entries executed
@@ -207,7 +260,13 @@ class FourSwordsSwingStrategyV174(bt.Strategy):
         
         if self.params.debug:
             print(f"Four Swords Safe Strategy initialized: warmup={self.params.warmup} bars")
-        
+
+    def _indicator(self, cls, *datas, **kwargs):
+        """创建指标 - share_indicators开启时经注册表共享同一Cerebro内的相同计算"""
+        if self.params.share_indicators:
+            return shared_indicator(self, cls, *datas, **kwargs)
+        return cls(*datas, **kwargs)
+
     def next(self):
         """Main strategy logic executed on each bar"""
         
@@ -225,26 +284,27 @@ class FourSwordsSwingStrategyV174(bt.Strategy):
                     _ = self.sqzmom.lines.momentum[0]
                 if self.wavetrend is not None:
                     _ = self.wavetrend.lines.wt_signal[0]
-                if self.params.use_ema_filter:
+                if self.ema_fast is not None:
                     _ = self.ema_fast[0]
                     _ = self.ema_slow[0]
-                if self.params.use_volume_filter:
+                if self.volume_confirm is not None:
                     _ = self.volume_confirm[0]
-                _ = self.atr[0]
+                if self.key_levels is not None:
+                    _ = self.key_levels.pivot[0]
+                if self.mtf_trend is not None:
+                    _ = self.mtf_trend.score[0]
+                if self.atr is not None:
+                    _ = self.atr[0]
             except Exception as e:
                 print(f"[INDICATORS_ONLY] Error at bar {len(self)}: {e}")
             return
         
         # Get current signal conditions
-        signal_bar = bool(self.sqzmom.lines.signal_bar[0])
-        momentum = self.sqzmom.lines.momentum[0]
-        wt_signal = bool(self.wavetrend.lines.wt_signal[0])
-        
-        # Apply signal confirmation delay if enabled
-        if self.params.use_confirmed_signal and len(self) > 1:
-            signal_bar = bool(self.sqzmom.lines.signal_bar[-1])
-            momentum = self.sqzmom.lines.momentum[-1]
-            wt_signal = bool(self.wavetrend.lines.wt_signal[-1])
+        # (use_simplified_signals 时不构建WaveTrend，wt_signal不参与过滤)
+        ago = -1 if self.params.use_confirmed_signal and len(self) > 1 else 0
+        signal_bar = bool(self.sqzmom.lines.signal_bar[ago])
+        momentum = self.sqzmom.lines.momentum[ago]
+        wt_signal = bool(self.wavetrend.lines.wt_signal[ago]) if self.wavetrend is not None else False
         
         # SIGNAL FLOW ANALYSIS WITH COUNTERS
         
@@ -285,14 +345,41 @@ class FourSwordsSwingStrategyV174(bt.Strategy):
         if volume_short_passed:
             self.counters['volume_passed_short'] += 1
         
+        # Step 3b: Apply Key Level filter (上一周期枢轴未知时不放行)
+        key_level_long_passed = volume_long_passed
+        key_level_short_passed = volume_short_passed
+        
+        if self.params.use_key_level_filter and self.key_levels is not None:
+            pivot = self.key_levels.pivot[0]
+            key_level_long_passed = volume_long_passed and self.data.close[0] > pivot
+            key_level_short_passed = volume_short_passed and self.data.close[0] < pivot
+        
+        if key_level_long_passed:
+            self.counters['key_level_passed_long'] += 1
+        if key_level_short_passed:
+            self.counters['key_level_passed_short'] += 1
+        
+        # Step 3c: Apply MTF trend score filter (多头看多头评分，空头看空头评分；评分未知时不放行)
+        mtf_long_passed = key_level_long_passed
+        mtf_short_passed = key_level_short_passed
+        
+        if self.params.use_mtf_filter and self.mtf_trend is not None:
+            mtf_long_passed = key_level_long_passed and self.mtf_trend.score[0] >= self.params.mtf_threshold
+            mtf_short_passed = key_level_short_passed and self.mtf_trend.bear_score[0] >= self.params.mtf_threshold
+        
+        if mtf_long_passed:
+            self.counters['mtf_passed_long'] += 1
+        if mtf_short_passed:
+            self.counters['mtf_passed_short'] += 1
+        
         # Step 4: Apply WaveTrend direction filter
-        wt_long_passed = volume_long_passed
-        wt_short_passed = volume_short_passed
+        wt_long_passed = mtf_long_passed
+        wt_short_passed = mtf_short_passed
         
         if not self.params.use_simplified_signals:
             # Standard mode: require WT direction confirmation
-            wt_long_passed = volume_long_passed and wt_signal
-            wt_short_passed = volume_short_passed and not wt_signal
+            wt_long_passed = mtf_long_passed and wt_signal
+            wt_short_passed = mtf_short_passed and not wt_signal
         
         if wt_long_passed:
             self.counters['wt_passed_long'] += 1
@@ -512,7 +599,11 @@ class FourSwordsSwingStrategyV174(bt.Strategy):
         print(f"   Warmup period used:      {self.params.warmup} bars")
         print(f"   Warmup bars skipped:     {self.counters['warmup_skipped']}")
         print(f"   Protection status:       ACTIVE")
-        
+        # 分母夹底聚合计数（debug时输出，替代逐bar的SMOKE日志）
+        for indicator in (self.sqzmom, self.wavetrend):
+            if indicator is not None:
+                indicator.report_denominators()
+
         # Calculate totals
         total_raw = self.counters['raw_signals_long'] + self.counters['raw_signals_short']
         total_ema = self.counters['ema_passed_long'] + self.counters['ema_passed_short']
@@ -543,6 +634,10 @@ class FourSwordsSwingStrategyV174(bt.Strategy):
         print(f"   Raw Long Signals:        {self.counters['raw_signals_long']:3d}")
         print(f"   EMA Passed (Long):       {self.counters['ema_passed_long']:3d}")
         print(f"   Volume Passed (Long):    {self.counters['volume_passed_long']:3d}")
+        if self.params.use_key_level_filter:
+            print(f"   Key Level Passed (Long): {self.counters['key_level_passed_long']:3d}")
+        if self.params.use_mtf_filter:
+            print(f"   MTF Passed (Long):       {self.counters['mtf_passed_long']:3d}")
         print(f"   WT Passed (Long):        {self.counters['wt_passed_long']:3d}")
         print(f"   Actual Long Entries:     {self.counters['actual_entries_long']:3d}")
         
@@ -550,6 +645,10 @@ class FourSwordsSwingStrategyV174(bt.Strategy):
         print(f"   Raw Short Signals:       {self.counters['raw_signals_short']:3d}")
         print(f"   EMA Passed (Short):      {self.counters['ema_passed_short']:3d}")
         print(f"   Volume Passed (Short):   {self.counters['volume_passed_short']:3d}")
+        if self.params.use_key_level_filter:
+            print(f"   Key Level Passed (Short):{self.counters['key_level_passed_short']:3d}")
+        if self.params.use_mtf_filter:
+            print(f"   MTF Passed (Short):      {self.counters['mtf_passed_short']:3d}")
         print(f"   WT Passed (Short):       {self.counters['wt_passed_short']:3d}")
         print(f"   Actual Short Entries:    {self.counters['actual_entries_short']:3d}")
         
@@ -0,0 +1,42 @@
+"""
+Four Swords Swing Strategy v2.0 MTF - Backtrader Implementation
+Based on: pinescript/strategies/oscillator/Four_Swords_Swing_Strategy_v2_0_MTF.pine
+
+⌘ SUMMARY:
+Type: strategy (MTF Multi-Timeframe Version)
+Purpose: v1.7.4 SQZMOM + WaveTrend 信号 + 15m / 1h / 4h EMA(20) > EMA(50) 加权评分（20% / 30% / 50%）
+Key Logic: 只加载最细周期的数据一次，高周期bar与EMA由 MTFTrendScore 向量化聚合，严格只用已收盘的高周期bar
+Status: MTF评分作为 v1.7.4 信号流程中的一步过滤（Step 3c），其余信号、出场与风控沿用 v1.7.4
+
+与Pine原版的差异:
+- 原版 request.security 在历史bar上取的是正在形成的高周期bar（实时会重绘），这里只用已收盘的高周期bar
+- 原版多空共用多头评分，这里空头信号使用空头评分（EMA(20) < EMA(50) 的档位权重和）
+- 数据周期大于某档位时（如2h数据上的15m / 1h），该档位即为数据本身的逐bar趋势
+"""
+try:
+    from strategies.four_swords_swing_strategy_v1_7_4 import FourSwordsSwingStrategyV174
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+    from strategies.four_swords_swing_strategy_v1_7_4 import FourSwordsSwingStrategyV174
+
+
+class FourSwordsSwingStrategyV20MTF(FourSwordsSwingStrategyV174):
+    """
+    Four Swords Swing Strategy v2.0 MTF
+
+    在 v1.7.4 信号流程上默认启用多周期评分过滤，过滤器默认值取 v2.0 Pine 版本
+    （EMA 20 / 50，成交量 1.2 倍均量，多空双向，MTF阈值 0.6）
+    """
+
+    params = (
+        ('ema_fast', 20),
+        ('ema_slow', 50),
+        ('volume_multiplier', 1.2),
+        ('trade_direction', 'both'),
+        ('use_mtf_filter', True),
+        ('mtf_timeframes', ('15m', '1h', '4h')),
+        ('mtf_weights', (0.2, 0.3, 0.5)),
+        ('mtf_threshold', 0.6),
+    )
@@ -0,0 +1,228 @@
+"""
+Adaptive SuperTrend Verification
+自适应SuperTrend验证 - kernels.supertrend / AdaptiveSuperTrend vs Pine原版逐行移植
+
+验收点:
+- 滑动窗口k-means与逐行移植的Pine循环（每bar重新初始化、严格最近、等值收敛）簇分配完全一致，
+  质心最大相对误差 < 1e-9；含默认参数与 training_period=50, fractions=(0.9, 0.5, 0.1)
+- SuperTrend 方向与逐行移植的 pine_supertrend 完全一致
+- AdaptiveSuperTrendStream 与批量计算逐位一致，中途 to_state()/from_state() 恢复后结果不变
+- AdaptiveSuperTrend 指标 runonce / next 两种模式与批量计算一致
+- 报告 warm_start 与Pine簇分配的一致率，以及全部币种 × 时间框架的扫描耗时
+"""
+import os
+import sys
+import json
+import math
+import time
+import numpy as np
+import backtrader as bt
+
+# Add path for imports
+sys.path.append(os.path.dirname(__file__))
+
+import kernels
+from kernels.supertrend import volatility_kmeans
+from indicators.adaptive_supertrend import (
+    AdaptiveSuperTrend, AdaptiveSuperTrendStream, adaptive_supertrend_arrays, pine_atr,
+)
+from indicators.parallel import compute_many
+from test_indicator_parallel import load_universe
+from test_indicator_parity import compare_arrays, load_symbol
+
+
+PARAM_SETS = [dict(period=100, fractions=(0.75, 0.5, 0.25)),
+              dict(period=50, fractions=(0.9, 0.5, 0.1))]
+# 逐行移植的参考实现每bar遍历整个窗口，只验证前若干根
+REFERENCE_BARS = 3000
+
+
+def _pine_ne(x, y):
+    return x == x and y == y and x != y
+
+
+def reference_kmeans(volatility, period=100, fractions=(0.75, 0.5, 0.25)):
+    """ML_Adaptive_SuperTrend.pine k-means部分的逐行移植"""
+    n = len(volatility)
+    centroids = np.full((n, 3), np.nan)
+    cluster = np.full(n, -1)
+    for t in range(n):
+        hv = mv = lv = float('nan')
+        if t >= period - 1:
+            window = [v for v in volatility[t - period + 1:t + 1] if v == v]
+            if window:
+                upper, lower = max(window), min(window)
+                hv = lower + (upper - lower) * fractions[0]
+                mv = lower + (upper - lower) * fractions[1]
+                lv = lower + (upper - lower) * fractions[2]
+        amean, bmean, cmean = [hv], [mv], [lv]
+
+        x = volatility[t]
+        if (x if x == x else 0) > 0 and t >= period - 1:
+            while ((len(amean) == 1 or _pine_ne(amean[0], amean[1])) or
+                   (len(bmean) == 1 or _pine_ne(bmean[0], bmean[1])) or
+                   (len(cmean) == 1 or _pine_ne(cmean[0], cmean[1]))):
+                high_vol, mid_vol, low_vol = [], [], []
+                for i in range(period - 1, -1, -1):
+                    v = volatility[t - i]
+                    d1, d2, d3 = abs(v - amean[0]), abs(v - bmean[0]), abs(v - cmean[0])
+                    if d1 < d2 and d1 < d3:
+                        high_vol.insert(0, v)
+                    if d2 < d1 and d2 < d3:
+                        mid_vol.insert(0, v)
+                    if d3 < d1 and d3 < d2:
+                        low_vol.insert(0, v)
+                for means, members in ((amean, high_vol), (bmean, mid_vol), (cmean, low_vol)):
+                    means.insert(0, math.fsum(members) / len(members) if members else float('nan'))
+
+        current = (amean[0], bmean[0], cmean[0])
+        centroids[t] = current
+        distances = [abs(x - c) for c in current]
+        valid = [d for d in distances if d == d]
+        cluster[t] = distances.index(min(valid)) if valid else -1
+    return centroids, cluster
+
+
+def reference_supertrend(high, low, close, atr, factor=3.0):
+    """pine_supertrend() 的逐行移植（nz() 前值按0计，na比较为False）"""
+    nz = lambda x: x if x == x else 0.0  # noqa: E731
+    trend, direction = [], []
+    upper_prev = lower_prev = trend_prev = float('nan')
+    for t in range(len(close)):
+        src = (high[t] + low[t]) / 2
+        upper, lower = src + factor * atr[t], src - factor * atr[t]
+        prev_lower, prev_upper = nz(lower_prev), nz(upper_prev)
+        prev_close = close[t - 1] if t > 0 else float('nan')
+        lower = lower if (lower > prev_lower or prev_close < prev_lower) else prev_lower
+        upper = upper if (upper < prev_upper or prev_close > prev_upper) else prev_upper
+        if t == 0 or atr[t - 1] != atr[t - 1]:
+            d = 1.0
+        elif trend_prev == prev_upper:
+            d = -1.0 if close[t] > upper else 1.0
+        else:
+            d = 1.0 if close[t] < lower else -1.0
+        trend_prev = lower if d == -1.0 else upper
+        upper_prev, lower_prev = upper, lower
+        trend.append(trend_prev)
+        direction.append(d)
+    return np.array(trend), np.array(direction)
+
+
+def check_reference(high, low, close):
+    problems = []
+    high, low, close = high[:REFERENCE_BARS], low[:REFERENCE_BARS], close[:REFERENCE_BARS]
+    volatility = pine_atr(high, low, close, 10)
+    for params in PARAM_SETS:
+        expected_centroids, expected_cluster = reference_kmeans(volatility, **params)
+        result = volatility_kmeans(volatility, **params)
+        if not np.array_equal(result['cluster'], expected_cluster):
+            problems.append(f"{params}: {int((result['cluster'] != expected_cluster).sum())} cluster "
+                            f"assignments differ from Pine port")
+        for k in range(3):
+            mismatches, max_rel = compare_arrays(result['centroids'][:, k], expected_centroids[:, k], False)
+            if mismatches:
+                problems.append(f"{params}: centroid {k} differs on {mismatches} bars (max rel {max_rel:.2e})")
+
+    # 参考质心驱动的参考SuperTrend
+    centroids, cluster = reference_kmeans(volatility)
+    centroid = np.where(cluster >= 0, centroids[np.arange(len(cluster)), np.maximum(cluster, 0)], np.nan)
+    expected_trend, expected_direction = reference_supertrend(high, low, close, centroid)
+    batch = adaptive_supertrend_arrays(high, low, close)
+    if not np.array_equal(batch['direction'], expected_direction):
+        problems.append(f"direction differs from Pine port on "
+                        f"{int((batch['direction'] != expected_direction).sum())} bars")
+    mismatches, max_rel = compare_arrays(batch['supertrend'], expected_trend, False)
+    if mismatches:
+        problems.append(f"supertrend differs from Pine port on {mismatches} bars (max rel {max_rel:.2e})")
+    return problems
+
+
+def check_stream(high, low, close, batch):
+    problems = []
+    stream = AdaptiveSuperTrendStream()
+    half = len(close) // 2
+    rows = [stream.push(h, l, c) for h, l, c in zip(high[:half], low[:half], close[:half])]
+    stream = AdaptiveSuperTrendStream.from_state(json.loads(json.dumps(stream.to_state())))
+    rows += [stream.push(h, l, c) for h, l, c in zip(high[half:], low[half:], close[half:])]
+    rows = np.array(rows)
+    for k, name in enumerate(('supertrend', 'direction', 'cluster')):
+        if not np.array_equal(rows[:, k], batch[name], equal_nan=True):
+            problems.append(f"stream {name}: {int((rows[:, k] != batch[name]).sum())} bars differ from batch")
+    return problems
+
+
+class SuperTrendStrategy(bt.Strategy):
+    def __init__(self):
+        self.supertrend = AdaptiveSuperTrend(self.data)
+
+
+def check_indicator(df, batch):
+    problems = []
+    for runonce in (True, False):
+        cerebro = bt.Cerebro(runonce=runonce, stdstats=False)
+        cerebro.adddata(bt.feeds.PandasData(dataname=df))
+        cerebro.addstrategy(SuperTrendStrategy)
+        indicator = cerebro.run()[0].supertrend
+        for name in ('supertrend', 'direction', 'cluster'):
+            values = np.array(getattr(indicator.lines, name).array)
+            if not np.array_equal(values, batch[name], equal_nan=True):
+                mode = 'once' if runonce else 'next'
+                problems.append(f"{mode} {name}: bars differ from batch")
+    return problems
+
+
+def report_warm_start(high, low, close, batch):
+    warm = adaptive_supertrend_arrays(high, low, close, warm_start=True)
+    active = batch['iterations'] > 0
+    print(f"   warm_start: cluster agreement {(warm['cluster'] == batch['cluster']).mean():.1%}, "
+          f"direction agreement {(warm['direction'] == batch['direction']).mean():.1%}, "
+          f"mean iterations {batch['iterations'][active].mean():.2f} -> {warm['iterations'][active].mean():.2f}")
+
+
+def report_sweep():
+    """全部币种 × 时间框架：批量计算耗时（逐行移植按前 REFERENCE_BARS 根的速度外推）"""
+    datasets = load_universe()
+    bars = sum(len(df) for df in datasets.values())
+    compute_many(dict(list(datasets.items())[:1]), {'st': 'adaptive_supertrend'}, max_workers=1)
+    start_time = time.perf_counter()
+    compute_many(datasets, {'st': 'adaptive_supertrend'}, max_workers=1)
+    sweep_time = time.perf_counter() - start_time
+
+    volatility = pine_atr(*(next(iter(datasets.values()))[col].to_numpy(dtype=np.float64)
+                            for col in ('high', 'low', 'close')), 10)[:REFERENCE_BARS]
+    start_time = time.perf_counter()
+    reference_kmeans(volatility)
+    reference_rate = REFERENCE_BARS / (time.perf_counter() - start_time)
+    print(f"   sweep: {len(datasets)} datasets, {bars} bars in {sweep_time * 1000:.0f}ms "
+          f"({bars / sweep_time:,.0f} bars/s; Pine port ~{bars / reference_rate:.0f}s)")
+
+
+def run_adaptive_supertrend_check(symbol='SUIUSDT', interval='2h'):
+    df = load_symbol(symbol, interval)
+    high, low, close = (df[col].to_numpy(dtype=np.float64) for col in ('high', 'low', 'close'))
+    print(f"\n[START] Adaptive SuperTrend verification - {symbol} {interval}, {len(df)} bars, "
+          f"backend {kernels.get_backend()}")
+
+    batch = adaptive_supertrend_arrays(high, low, close)
+    problems = check_reference(high, low, close) + check_stream(high, low, close, batch) + check_indicator(df, batch)
+    report_warm_start(high, low, close, batch)
+    report_sweep()
+
+    passed = not problems
+    for problem in problems:
+        print(f"   [FAIL] {problem}")
+    print(f"\n[SUMMARY] Adaptive SuperTrend {'PASSED' if passed else 'FAILED'}")
+    return passed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="自适应SuperTrend一致性与扫描耗时验证")
+    parser.add_argument("--symbol", default='SUIUSDT', help="币种 (默认: SUIUSDT)")
+    parser.add_argument("--interval", default='2h', help="时间框架 (默认: 2h)")
+
+    args = parser.parse_args()
+
+    passed = run_adaptive_supertrend_check(args.symbol, args.interval)
+    sys.exit(0 if passed else 1)
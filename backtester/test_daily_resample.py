@@ -0,0 +1,154 @@
+"""
+Daily Resample Feed Verification
+日线数据源重采样验证 - DojiAshiStrategyV5 日线趋势过滤器的日线数据由主数据在进程内得到
+
+验收点:
+- resample_frame(主数据, '1d') 与仓库中1d数据文件的 OHLC 完全一致（成交量允许文件自身的舍入误差；
+  1d文件覆盖范围较短时只比较重叠区间）
+- 主数据 + 重采样日线 与 主数据 + 1d文件 的回测成交记录、最终资金完全一致（runonce / next），
+  即 _confirmed_daily 仍读取上一根已收盘日线
+- 运行脚本的数据源布局（'main' / 'daily' / 'market' 命名）下，daily_data 为日线、market_data 为市场数据；
+  只有 'main' / 'market' 时日线过滤器回退到主数据，而不是误用市场数据
+- 重采样耗时、缓存命中耗时与读取1d文件的耗时对比
+"""
+import os
+import io
+import sys
+import time
+import contextlib
+import numpy as np
+import pandas as pd
+import backtrader as bt
+
+# Add path for imports
+sys.path.append(os.path.dirname(__file__))
+
+from indicators.mtf_levels import resample_frame
+from strategies.doji_ashi_strategy_v5 import DojiAshiStrategyV5
+from test_indicator_parity import DATA_DIR, load_symbol
+
+
+CASES = [
+    ('strict', dict()),
+    ('flexible, cross', dict(trend_mode='flexible', entry_mode='cross')),
+]
+MARKET_SYMBOL = 'BTCUSDT'
+
+
+def check_frame(symbol, main, daily):
+    problems = []
+    frame = resample_frame(main, '1d')
+    joined = frame.join(daily[['open', 'high', 'low', 'close', 'volume']], rsuffix='_file', how='inner')
+    if len(joined) < len(frame) - 1:
+        problems.append(f"only {len(joined)}/{len(frame)} resampled days found in the 1d file")
+    for name in ('open', 'high', 'low', 'close'):
+        if not np.array_equal(joined[name].to_numpy(), joined[f'{name}_file'].to_numpy()):
+            problems.append(f"resampled daily {name} differs from the 1d file")
+    volume = np.isclose(joined['volume'], joined['volume_file'], rtol=1e-6).mean()
+    if volume < 0.99:
+        problems.append(f"resampled daily volume matches the 1d file on only {volume:.2%} of days")
+    print(f"   {symbol}: {len(frame)} daily bars resampled, {len(joined)} in the 1d file, "
+          f"OHLC identical, volume within 1e-6 on {volume:.2%}")
+    return problems
+
+
+def run_strategy(feeds, runonce, **kwargs):
+    cerebro = bt.Cerebro(runonce=runonce, stdstats=False)
+    for name, df in feeds:
+        cerebro.adddata(bt.feeds.PandasData(dataname=df), name=name)
+    cerebro.broker.set_cash(10000.0)
+    cerebro.addstrategy(DojiAshiStrategyV5, **kwargs)
+    cerebro.addanalyzer(bt.analyzers.Transactions, _name='transactions')
+    with contextlib.redirect_stdout(io.StringIO()):
+        strategy = cerebro.run()[0]
+    transactions = {dt: [tuple(t) for t in items]
+                    for dt, items in strategy.analyzers.transactions.get_analysis().items()}
+    return strategy, transactions, cerebro.broker.getvalue()
+
+
+def check_strategy(main, daily):
+    problems = []
+    derived = resample_frame(main, '1d')
+    for label, kwargs in CASES:
+        for runonce in (True, False):
+            mode = 'once' if runonce else 'next'
+            _, file_trades, file_value = run_strategy([('main', main), ('daily', daily)], runonce, **kwargs)
+            _, trades, value = run_strategy([('main', main), ('daily', derived)], runonce, **kwargs)
+            if trades != file_trades or value != file_value:
+                problems.append(f"{mode} {label}: resampled daily gives {len(trades)} transactions / {value:.6f}, "
+                                f"1d file {len(file_trades)} / {file_value:.6f}")
+            print(f"   {mode:4s} {label:16s} transactions={len(trades):4d} final value {value:.2f} "
+                  f"({'identical to' if trades == file_trades else 'differs from'} the 1d file run)")
+    return problems
+
+
+def check_layout(main):
+    """运行脚本的命名布局: main / daily / market，以及未加日线时的回退"""
+    problems = []
+    path = os.path.join(DATA_DIR, MARKET_SYMBOL, '1d', f'{MARKET_SYMBOL}-1d-merged.csv')
+    market = load_symbol(MARKET_SYMBOL, '1d') if os.path.exists(path) else main
+    short = main.iloc[:400]
+    derived = resample_frame(short, '1d')
+
+    kwargs = dict(enable_daily_trend_filter=False)  # 400根bar不足日线SMA200预热，只检查数据源解析
+    strategy, _, _ = run_strategy([('main', short), ('daily', derived), ('market', market)], True, **kwargs)
+    if strategy.daily_data is not strategy.datas[1] or strategy.market_data is not strategy.datas[2]:
+        problems.append("main/daily/market layout: daily_data / market_data resolved to the wrong feeds")
+
+    strategy, _, _ = run_strategy([('main', short), ('market', market)], True, **kwargs)
+    if strategy.daily_data is not strategy.datas[0] or strategy.market_data is not strategy.datas[1]:
+        problems.append("main/market layout: daily trend filter did not fall back to the main feed")
+    return problems
+
+
+def report_timing(symbol, main):
+    path = os.path.join(DATA_DIR, symbol, '1d', f'{symbol}-1d-merged.csv')
+    start_time = time.perf_counter()
+    load_symbol(symbol, '1d')
+    file_time = time.perf_counter() - start_time
+
+    fresh = main.copy()
+    fresh['close'] = fresh['close'] * 1.0000001  # 不同内容，避免命中前面的缓存
+    start_time = time.perf_counter()
+    resample_frame(fresh, '1d')
+    resample_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    resample_frame(fresh, '1d')
+    cached_time = time.perf_counter() - start_time
+    print(f"   1d file read {file_time * 1000:.1f}ms ({os.path.getsize(path) / 1024:.0f} KiB) vs "
+          f"resample {resample_time * 1000:.1f}ms, cached {cached_time * 1000:.1f}ms")
+
+
+def run_daily_resample_check(symbol='SUIUSDT', interval='1h'):
+    main = load_symbol(symbol, interval)
+    daily = load_symbol(symbol, '1d')
+    print(f"\n[START] Daily resample feed verification - {symbol} {interval}, {len(main)} bars")
+
+    # 1d文件覆盖范围可能短于主数据（如DOGEUSDT），一致性只在两者重叠的区间上比较
+    overlap = main[(main.index >= daily.index[0]) & (main.index < daily.index[-1] + pd.Timedelta(days=1))]
+    daily = daily[(daily.index >= overlap.index[0].normalize()) & (daily.index <= overlap.index[-1])]
+    if len(overlap) < len(main):
+        print(f"   1d file covers {len(overlap)}/{len(main)} {interval} bars, comparing on the overlap; "
+              f"the resampled feed covers all {len(resample_frame(main, '1d'))} days")
+
+    problems = check_frame(symbol, overlap, daily) + check_strategy(overlap, daily) + check_layout(main)
+    report_timing(symbol, main)
+
+    passed = not problems
+    for problem in problems:
+        print(f"   [FAIL] {problem}")
+    print(f"\n[SUMMARY] Daily resample feed {'PASSED' if passed else 'FAILED'}")
+    return passed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="日线数据源重采样一致性验证")
+    parser.add_argument("--symbol", default='SUIUSDT', help="币种 (默认: SUIUSDT)")
+    parser.add_argument("--interval", default='1h', help="时间框架 (默认: 1h)")
+
+    args = parser.parse_args()
+
+    passed = run_daily_resample_check(args.symbol, args.interval)
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,209 @@
+"""
+Aligned Multi-Symbol Panel Verification
+多币种对齐面板验证 - indicators.panel 与逐文件读取、pandas前向填充参考实现对比
+
+验收点:
+- 面板中每个币种的bar与单独读取该币种CSV完全一致，open_time 为全部币种的并集，缺失掩码与文件一致
+- gaps() 与文件中相邻bar间隔异常处的缺失时间点一致
+- aligned_frame(): 参考币种对齐到交易币种时间戳，与 pandas reindex + 前向填充参考实现一致
+  （含随机删除参考币种bar的情形）；不早于目标时间，无前视
+- DojiAshiStrategyV5 crypto 模式: 面板对齐的BTC市场数据源 与 单独读取BTC文件由Backtrader逐bar同步
+  的回测成交记录、最终资金完全一致（runonce / next）
+- 报告批量读取耗时：BTC只读取一次 vs 每个币种各读一次
+"""
+import os
+import io
+import sys
+import time
+import contextlib
+import numpy as np
+import pandas as pd
+import backtrader as bt
+
+# Add path for imports
+sys.path.append(os.path.dirname(__file__))
+
+from indicators.mtf_levels import resample_frame
+from indicators.panel import PANEL_FIELDS, SymbolPanel, load_panel
+from strategies.doji_ashi_strategy_v5 import DojiAshiStrategyV5
+from test_indicator_parity import DATA_DIR, SYMBOLS, load_symbol
+
+
+MARKET_SYMBOL = 'BTCUSDT'
+
+
+def available_symbols(interval):
+    return [symbol for symbol in SYMBOLS
+            if os.path.exists(os.path.join(DATA_DIR, symbol, interval, f'{symbol}-{interval}-merged.csv'))]
+
+
+def _same(a, b):
+    return np.array_equal(np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64), equal_nan=True)
+
+
+def check_panel(panel, files):
+    problems = []
+    union = np.unique(np.concatenate([df['open_time'].to_numpy(dtype=np.int64) for df in files.values()]))
+    if not np.array_equal(panel.open_time, union):
+        problems.append("panel open_time is not the union of all symbols' open_time")
+    for symbol, df in files.items():
+        frame = panel.frame(symbol)
+        if not frame.index.equals(df.index):
+            problems.append(f"{symbol} panel timestamps differ from the file")
+            continue
+        for field in PANEL_FIELDS:
+            if not _same(frame[field], df[field]):
+                problems.append(f"{symbol} panel {field} differs from the file")
+        if int(panel.mask[:, panel.column(symbol)].sum()) != len(df):
+            problems.append(f"{symbol} mask marks {int(panel.mask[:, panel.column(symbol)].sum())} bars, file has {len(df)}")
+
+        open_time = df['open_time'].to_numpy(dtype=np.int64)
+        step = int(np.median(np.diff(open_time)))
+        expected = np.concatenate([np.arange(a + step, b, step) for a, b in zip(open_time[:-1], open_time[1:])
+                                   if b - a != step] or [np.empty(0, dtype=np.int64)])
+        gaps = panel.gaps(symbol)
+        # 并集中没有的时间点不会出现在 gaps() 中，只比较并集内的缺失
+        expected = expected[np.isin(expected, panel.open_time)]
+        if not np.array_equal(gaps, expected):
+            problems.append(f"{symbol} gaps() returned {len(gaps)} timestamps, expected {len(expected)}")
+        elif len(gaps):
+            print(f"   {symbol}: {len(gaps)} missing bars inside its range")
+    return problems
+
+
+def reference_aligned(reference, times):
+    """pandas参考实现: 按目标时间戳前向填充收盘价，缺失bar为平盘、成交量0"""
+    reference = reference[list(PANEL_FIELDS)]
+    exact = reference.reindex(times)
+    close = reference['close'].reindex(reference.index.union(times)).ffill().reindex(times)
+    out = pd.DataFrame({'close': close}, index=times)
+    for field in ('open', 'high', 'low'):
+        out[field] = exact[field].fillna(close)
+    out['volume'] = exact['volume'].where(exact['close'].notna(), np.where(close.notna(), 0.0, np.nan))
+    return out[list(PANEL_FIELDS)]
+
+
+def check_alignment(panel, files, market):
+    problems = []
+    for symbol in files:
+        times = files[symbol].index
+        aligned = panel.aligned_frame(market, times)
+        expected = reference_aligned(files[market], times)
+        if not aligned.index.equals(times):
+            problems.append(f"{market} aligned to {symbol}: index differs from the symbol's timestamps")
+        for field in PANEL_FIELDS:
+            if not _same(aligned[field], expected[field]):
+                problems.append(f"{market} aligned to {symbol}: {field} differs from the pandas reference")
+
+    # 随机删除参考币种约2%的bar
+    rng = np.random.default_rng(11)
+    gapped = files[market][rng.random(len(files[market])) > 0.02]
+    target = next(symbol for symbol in files if symbol != market) if len(files) > 1 else market
+    gapped_panel = SymbolPanel.from_frames({target: files[target], market: gapped})
+    times = files[target].index
+    aligned = gapped_panel.aligned_frame(market, times)
+    expected = reference_aligned(gapped, times)
+    for field in PANEL_FIELDS:
+        if not _same(aligned[field], expected[field]):
+            problems.append(f"gapped {market} aligned to {target}: {field} differs from the pandas reference")
+
+    # 无前视: 每个对齐后的收盘价都来自不晚于目标时间的参考bar
+    source = gapped['close']
+    used = np.searchsorted(gapped.index.values, times.values, side='right') - 1
+    known = used >= 0
+    if not _same(aligned['close'].to_numpy()[known], source.to_numpy()[used[known]]):
+        problems.append("aligned close is not the last reference bar at or before the target time")
+    filled = int((~np.isin(times.values, gapped.index.values) & known).sum())
+    print(f"   {market} aligned to {len(files)} symbols; gapped case forward-fills {filled} bars of {target}")
+    return problems
+
+
+def _run_doji(main, market, runonce):
+    cerebro = bt.Cerebro(runonce=runonce, stdstats=False)
+    cerebro.adddata(bt.feeds.PandasData(dataname=main), name='main')
+    cerebro.adddata(bt.feeds.PandasData(dataname=resample_frame(main, '1d')), name='daily')
+    cerebro.adddata(bt.feeds.PandasData(dataname=market), name='market')
+    cerebro.broker.set_cash(10000.0)
+    cerebro.addstrategy(DojiAshiStrategyV5, market_type='crypto')
+    cerebro.addanalyzer(bt.analyzers.Transactions, _name='transactions')
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        strategy = cerebro.run()[0]
+    duration = time.perf_counter() - start_time
+    transactions = {dt: [tuple(t) for t in items]
+                    for dt, items in strategy.analyzers.transactions.get_analysis().items()}
+    return strategy, transactions, cerebro.broker.getvalue(), duration
+
+
+def check_strategy(panel, files, symbol, market):
+    problems = []
+    main = files[symbol]
+    aligned = panel.aligned_frame(market, main.index)
+    for runonce in (True, False):
+        mode = 'once' if runonce else 'next'
+        _, file_trades, file_value, file_time = _run_doji(main, files[market], runonce)
+        strategy, trades, value, panel_time = _run_doji(main, aligned, runonce)
+        if not strategy.enable_market_filter or strategy.market_bullish is None:
+            problems.append(f"{mode}: crypto market filter was not built on the panel market feed")
+        if trades != file_trades or value != file_value:
+            problems.append(f"{mode}: panel market feed gives {len(trades)} transactions / {value:.6f}, "
+                            f"synchronized {market} file {len(file_trades)} / {file_value:.6f}")
+        print(f"   {mode:4s} DojiAshi crypto {symbol}: transactions={len(trades)} final value {value:.2f} "
+              f"({'identical to' if trades == file_trades else 'differs from'} the synchronized {market} file), "
+              f"{panel_time:.2f}s aligned vs {file_time:.2f}s synchronized")
+    return problems
+
+
+def report_loading(symbols, interval, market):
+    start_time = time.perf_counter()
+    for symbol in symbols:
+        load_symbol(symbol, interval)
+        load_symbol(market, interval)
+    separate = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    panel = load_panel(symbols + [market], interval, DATA_DIR)
+    loaded = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    again = load_panel(symbols + [market], interval, DATA_DIR)
+    cached = time.perf_counter() - start_time
+    print(f"   {len(symbols)} symbols: {2 * len(symbols)} file reads ({market} {len(symbols)}x) {separate * 1000:.0f}ms vs "
+          f"panel {len(panel.symbols)} reads {loaded * 1000:.0f}ms, repeated load {cached * 1000:.2f}ms")
+    return [] if again is panel else ["repeated load_panel() read the files again"]
+
+
+def run_panel_check(symbol='SUIUSDT', interval='2h'):
+    symbols = available_symbols(interval)
+    if symbol not in symbols:
+        symbols.append(symbol)
+    print(f"\n[START] Aligned panel verification - {len(symbols)} symbols {interval}")
+
+    files = {name: load_symbol(name, interval) for name in symbols}
+    start_time = time.perf_counter()
+    panel = load_panel(symbols, interval, DATA_DIR)
+    print(f"   panel {len(panel.symbols)} symbols x {len(panel.open_time)} timestamps "
+          f"in {(time.perf_counter() - start_time) * 1000:.0f}ms")
+
+    market = MARKET_SYMBOL if MARKET_SYMBOL in files else symbol
+    problems = (check_panel(panel, files) + check_alignment(panel, files, market) +
+                check_strategy(panel, files, symbol, market) +
+                report_loading([name for name in symbols if name != market], interval, market))
+
+    passed = not problems
+    for problem in problems:
+        print(f"   [FAIL] {problem}")
+    print(f"\n[SUMMARY] Aligned panel {'PASSED' if passed else 'FAILED'}")
+    return passed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="多币种对齐面板一致性验证")
+    parser.add_argument("--symbol", default='SUIUSDT', help="回测对比的交易币种 (默认: SUIUSDT)")
+    parser.add_argument("--interval", default='2h', help="时间框架 (默认: 2h)")
+
+    args = parser.parse_args()
+
+    passed = run_panel_check(args.symbol, args.interval)
+    sys.exit(0 if passed else 1)
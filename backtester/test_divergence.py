@@ -0,0 +1,236 @@
+"""
+Divergence Scanner Verification
+多指标背离扫描验证 - indicators.divergence vs Pine原版逐bar移植
+
+验收点:
+- 背离计数与逐bar移植的 Divergence_Many_Indicators 循环（ta.pivotlow/pivothigh 窗口判定、长度20的枢轴数组
+  array.unshift / pop、对最近 maxpp 个枢轴的 positive/negative_regular_…_divergence 搜索与虚拟直线检查）完全一致；
+  默认参数、pivot_source='high_low'、period=3 / maxpp=4 / maxbars=40、只扫常规背离、confirm=False 均验证
+- 非相邻枢轴（第2个及更早的枢轴）上的背离被检出
+- DivergenceStream 振荡器与 oscillator_bank() 一致（相对误差 < 1e-9），逐bar计数与批量计算一致
+- Divergences 指标 runonce / next 两种模式与批量计算一致
+- 报告全部币种 × 时间框架扫描耗时与逐bar移植的耗时
+"""
+import os
+import sys
+import time
+import numpy as np
+import backtrader as bt
+
+# Add path for imports
+sys.path.append(os.path.dirname(__file__))
+
+from indicators.divergence import (
+    DIVERGENCE_NAMES, OSCILLATOR_NAMES, Divergences, DivergenceStream, oscillator_bank, scan_divergences,
+)
+from kernels import pivot_bars
+from test_indicator_parallel import load_universe
+from test_indicator_parity import compare_arrays, load_symbol
+
+
+PARAM_SETS = [dict(), dict(pivot_source='high_low'), dict(period=3, maxpp=4, maxbars=40),
+              dict(hidden=False), dict(confirm=False)]
+
+
+def _is_pivot(values, center, left, right, high):
+    if center - left < 0 or center + right >= len(values):
+        return False
+    pivot = values[center]
+    window = values[center - left:center + right + 1]
+    others = [v for k, v in enumerate(window) if k != left]
+    if pivot != pivot:
+        return False
+    return all(v < pivot for v in others) if high else all(v > pivot for v in others)
+
+
+def reference_divergences(high, low, close, oscillators, period=5, pivot_source='close', maxpp=10, maxbars=100,
+                          hidden=True, confirm=True):
+    """Divergence_Many_Indicators.pine 的逐bar移植，返回 (bar数, 4) 计数"""
+    n = len(close)
+    counts = np.zeros((n, 4), dtype=np.int64)
+    close = close.tolist()
+    ph_source = close if pivot_source == 'close' else high.tolist()
+    pl_source = close if pivot_source == 'close' else low.tolist()
+    oscillators = [osc.tolist() for osc in oscillators]
+    startpoint = 1 if confirm else 0
+    maxarraysize = 20
+    ph_positions, pl_positions = [0] * maxarraysize, [0] * maxarraysize
+    ph_vals, pl_vals = [0.0] * maxarraysize, [0.0] * maxarraysize
+
+    def hist(series, t, offset):
+        """series[offset]（Pine历史引用），越界为na"""
+        return series[t - offset] if t - offset >= 0 else float('nan')
+
+    def nz(value):
+        return 0.0 if value != value else value
+
+    def search(src, t, cond, bullish):
+        """positive_regular_positive_hidden_divergence / negative_regular_negative_hidden_divergence"""
+        prsc = pl_source if bullish else ph_source
+        positions, vals = (pl_positions, pl_vals) if bullish else (ph_positions, ph_vals)
+        if bullish:
+            gate = hist(src, t, 0) > hist(src, t, 1) or hist(close, t, 0) > hist(close, t, 1)
+        else:
+            gate = hist(src, t, 0) < hist(src, t, 1) or hist(close, t, 0) < hist(close, t, 1)
+        if not (not confirm or gate):
+            return 0
+        for x in range(maxpp):
+            length = t - positions[x] + period
+            if positions[x] == 0 or length > maxbars:
+                break
+            a, b = hist(src, t, startpoint), hist(src, t, length)
+            price = hist(prsc, t, startpoint)
+            if bullish:
+                match = ((cond == 1 and a > b and price < nz(vals[x])) or
+                         (cond == 2 and a < b and price > nz(vals[x])))
+            else:
+                match = ((cond == 1 and a < b and price > nz(vals[x])) or
+                         (cond == 2 and a > b and price < nz(vals[x])))
+            if length > 5 and match:
+                slope1 = (a - b) / (length - startpoint)
+                virtual_line1 = a - slope1
+                last_close = hist(close, t, length) if bullish else nz(hist(close, t, length))
+                slope2 = (hist(close, t, startpoint) - last_close) / (length - startpoint)
+                virtual_line2 = hist(close, t, startpoint) - slope2
+                arrived = True
+                for y in range(1 + startpoint, length):
+                    value, price_y = hist(src, t, y), nz(hist(close, t, y))
+                    if (value < virtual_line1 or price_y < virtual_line2) if bullish else \
+                            (value > virtual_line1 or price_y > virtual_line2):
+                        arrived = False
+                        break
+                    virtual_line1 = virtual_line1 - slope1
+                    virtual_line2 = virtual_line2 - slope2
+                if arrived:
+                    return length
+        return 0
+
+    for t in range(n):
+        # ta.pivothigh / ta.pivotlow(源, prd, prd)，确认后 unshift 到长度20的数组
+        if _is_pivot(ph_source, t - period, period, period, True):
+            ph_positions.insert(0, t)
+            ph_vals.insert(0, ph_source[t - period])
+            ph_positions.pop()
+            ph_vals.pop()
+        if _is_pivot(pl_source, t - period, period, period, False):
+            pl_positions.insert(0, t)
+            pl_vals.insert(0, pl_source[t - period])
+            pl_positions.pop()
+            pl_vals.pop()
+        for src in oscillators:
+            divs = (search(src, t, 1, True), search(src, t, 1, False),
+                    search(src, t, 2, True) if hidden else 0, search(src, t, 2, False) if hidden else 0)
+            for kind, divlen in enumerate(divs):
+                counts[t, kind] += divlen > 0
+    return counts
+
+
+def check_reference(high, low, close, volume):
+    problems = []
+    oscillators = oscillator_bank(high, low, close, volume)
+    for params in PARAM_SETS:
+        expected = reference_divergences(high, low, close, oscillators, **params)
+        result = scan_divergences(high, low, close, volume, oscillators=oscillators, **params)
+        if not np.array_equal(result['counts'], expected):
+            problems.append(f"{params}: counts differ from Pine port on "
+                            f"{int((result['counts'] != expected).any(axis=1).sum())} bars")
+        events = result['events']
+        if not np.array_equal(np.bincount(events['bar'], minlength=len(close)), result['counts'].sum(axis=1)):
+            problems.append(f"{params}: events do not add up to counts")
+        if not params:
+            # 枢轴数组中比最近枢轴更早的枢轴上检出的背离
+            period = 5
+            pivots = {kind: pivot_bars(close, period, period, high=kind % 2 == 1) for kind in range(4)}
+            older = sum(int(np.searchsorted(pivots[e['kind']] + period, e['bar'], side='right') - 1 >
+                            np.searchsorted(pivots[e['kind']], e['pivot'])) for e in events)
+            print(f"   {len(events)} divergences, {older} against an older pivot than the most recent one")
+            if older == 0:
+                problems.append("no divergence found against pivots beyond the most recent one")
+    return problems
+
+
+def check_stream(high, low, close, volume, batch):
+    problems = []
+    oscillators = oscillator_bank(high, low, close, volume)
+    stream = DivergenceStream()
+    rows, values = [], []
+    for h, l, c, v in zip(high, low, close, volume):
+        rows.append(stream.push(h, l, c, v))
+        values.append(stream.values.copy())
+    values = np.array(values)
+    for k, name in enumerate(OSCILLATOR_NAMES):
+        mismatches, max_rel = compare_arrays(values[:, k], oscillators[k], False)
+        if mismatches:
+            problems.append(f"stream {name}: {mismatches} bars differ (max rel {max_rel:.2e})")
+    rows = np.array(rows)
+    if not np.array_equal(rows, batch['counts']):
+        problems.append(f"stream counts differ from batch on {int((rows != batch['counts']).any(axis=1).sum())} bars")
+    return problems
+
+
+class DivergenceStrategy(bt.Strategy):
+    def __init__(self):
+        self.divergences = Divergences(self.data)
+
+
+def check_indicator(df, batch):
+    problems = []
+    for runonce in (True, False):
+        cerebro = bt.Cerebro(runonce=runonce, stdstats=False)
+        cerebro.adddata(bt.feeds.PandasData(dataname=df))
+        cerebro.addstrategy(DivergenceStrategy)
+        indicator = cerebro.run()[0].divergences
+        for k, name in enumerate(DIVERGENCE_NAMES):
+            values = np.array(getattr(indicator.lines, name).array)
+            if not np.array_equal(values, batch['counts'][:, k]):
+                mode = 'once' if runonce else 'next'
+                problems.append(f"{mode} {name}: {int((values != batch['counts'][:, k]).sum())} bars differ")
+    return problems
+
+
+def report(high, low, close, volume, batch):
+    totals = batch['counts'].sum(axis=0)
+    print("   divergences: " + ", ".join(f"{name} {total}" for name, total in zip(DIVERGENCE_NAMES, totals)))
+    datasets = load_universe()
+    bars = sum(len(df) for df in datasets.values())
+    start_time = time.perf_counter()
+    for df in datasets.values():
+        scan_divergences(*(df[col].to_numpy(dtype=np.float64) for col in ('high', 'low', 'close', 'volume')))
+    sweep_time = time.perf_counter() - start_time
+
+    oscillators = oscillator_bank(high, low, close, volume)
+    start_time = time.perf_counter()
+    reference_divergences(high, low, close, oscillators)
+    reference_time = time.perf_counter() - start_time
+    print(f"   sweep: {len(datasets)} datasets, {bars} bars in {sweep_time:.2f}s; "
+          f"Pine port {reference_time:.2f}s for {len(close)} bars (~{reference_time * bars / len(close):.0f}s sweep)")
+
+
+def run_divergence_check(symbol='SUIUSDT', interval='2h'):
+    df = load_symbol(symbol, interval)
+    high, low, close, volume = (df[col].to_numpy(dtype=np.float64) for col in ('high', 'low', 'close', 'volume'))
+    print(f"\n[START] Divergence scanner verification - {symbol} {interval}, {len(df)} bars")
+
+    batch = scan_divergences(high, low, close, volume)
+    problems = (check_reference(high, low, close, volume) + check_stream(high, low, close, volume, batch) +
+                check_indicator(df, batch))
+    report(high, low, close, volume, batch)
+
+    passed = not problems
+    for problem in problems:
+        print(f"   [FAIL] {problem}")
+    print(f"\n[SUMMARY] Divergence scanner {'PASSED' if passed else 'FAILED'}")
+    return passed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="多指标背离扫描一致性与耗时验证")
+    parser.add_argument("--symbol", default='SUIUSDT', help="币种 (默认: SUIUSDT)")
+    parser.add_argument("--interval", default='2h', help="时间框架 (默认: 2h)")
+
+    args = parser.parse_args()
+
+    passed = run_divergence_check(args.symbol, args.interval)
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,194 @@
+"""
+Feature Store Verification
+特征库验证 - FeatureStore 物化 / 增量追加 / 区间查询
+
+验收点:
+- 特征与批量计算一致：squeeze_momentum_arrays / wavetrend_arrays / kernels.ema / sma / atr，
+  信号列完全一致（预热期为 SIGNAL_MISSING），连续值最大相对误差 < 1e-9
+- 先物化前若干行（批量计算），再分多次 update() 追加新bar（从批量结果给出的状态流式递推），
+  结果与一次性全量构建一致（信号列相同，连续值误差 < 1e-9）；无新bar时追加0行
+- 追加时在列已写入、meta.json（行数 + 流式状态）提交之前中断，下次 update() 截断多出的列尾部并从
+  提交时的状态继续，结果仍与全量构建一致，且与不中断的增量构建逐位一致（不会把回滚的bar再次推入流式状态）
+- 区间查询结果等于全量读取的对应切片，报告查询耗时
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import numpy as np
+
+# Add path for imports
+sys.path.append(os.path.dirname(__file__))
+
+import kernels
+import indicators.feature_store as feature_store
+from indicators.feature_store import FeatureStore, FEATURE_PARAMS, SIGNAL_MISSING, load_source
+from indicators.sqzmom_safe import squeeze_momentum_arrays
+from indicators.wavetrend_safe import wavetrend_arrays
+from test_indicator_parity import SYMBOLS, compare_arrays
+
+
+PARAM_SETS = [{}, dict(bb_length=30, kc_length=14, wt_n1=6, wt_n2=13, ema_fast=20, ema_slow=50)]
+# 增量追加的切分位置（占全序列比例）
+SPLITS = (0.5, 0.8, 0.999)
+
+
+class SimulatedCrash(Exception):
+    pass
+
+
+def batch_features(df, params):
+    """用批量函数计算同一组特征（对照基准）"""
+    p = dict(FEATURE_PARAMS, **params)
+    high, low, close, volume = (df[col].to_numpy(dtype=np.float64) for col in ('high', 'low', 'close', 'volume'))
+    sqz = squeeze_momentum_arrays(high, low, close, bb_length=p['bb_length'], bb_mult=p['bb_mult'],
+                                  kc_length=p['kc_length'], kc_mult=p['kc_mult'],
+                                  use_true_range=p['use_true_range'])
+    wt = wavetrend_arrays(high, low, close, n1=p['wt_n1'], n2=p['wt_n2'])
+    ema_fast, ema_slow = kernels.ema(close, p['ema_fast']), kernels.ema(close, p['ema_slow'])
+    avg_volume = kernels.sma(volume, p['volume_period'])
+    ema_valid = ~np.isnan(ema_fast) & ~np.isnan(ema_slow)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        volume_ratio = np.where(avg_volume > 0, volume / avg_volume, np.nan)
+    return {
+        'squeeze_on': sqz['squeeze_on'],
+        'squeeze_off': sqz['squeeze_off'],
+        'signal_bar': sqz['signal_bar'],
+        'momentum': sqz['momentum'],
+        'wt1': wt['wt1'],
+        'wt2': wt['wt2'],
+        'wt_signal': wt['wt_signal'],
+        'ema_fast': ema_fast,
+        'ema_slow': ema_slow,
+        'ema_bull_trend': np.where(ema_valid, ema_fast > ema_slow, np.nan),
+        'ema_bear_trend': np.where(ema_valid, ema_fast < ema_slow, np.nan),
+        'volume_ratio': volume_ratio,
+        'volume_confirm': np.where(np.isnan(avg_volume), np.nan, volume > avg_volume * p['volume_multiplier']),
+        'atr': kernels.atr(high, low, close, p['atr_periods']),
+    }
+
+
+def same_features(a, b):
+    """索引与列相同，信号列完全一致，连续值最大相对误差 < 1e-9"""
+    if not a.index.equals(b.index) or list(a.columns) != list(b.columns):
+        return False
+    for name in a.columns:
+        x, y = a[name].to_numpy(), b[name].to_numpy()
+        if x.dtype == np.int8:
+            if not np.array_equal(x, y):
+                return False
+        elif compare_arrays(x, y, False)[0]:
+            return False
+    return True
+
+
+def check_dataset(root, symbol, interval, params):
+    problems = []
+    df = load_source(symbol, interval)
+
+    # 一次性全量构建
+    full_store = FeatureStore(os.path.join(root, 'full'))
+    start_time = time.perf_counter()
+    full_store.update(symbol, interval, df, params)
+    build_time = time.perf_counter() - start_time
+    full = full_store.read(symbol, interval, params)
+
+    expected = batch_features(df, params)
+    for name, reference in expected.items():
+        values = full[name].to_numpy()
+        if values.dtype == np.int8:
+            values = np.where(values == SIGNAL_MISSING, np.nan, values.astype(np.float64))
+            mismatches, max_rel = compare_arrays(values, reference, True)
+        else:
+            mismatches, max_rel = compare_arrays(values, reference, False)
+        if mismatches:
+            problems.append(f"{name}: {mismatches} bars differ from batch (max rel {max_rel:.2e})")
+
+    # 分段增量追加
+    incremental_store = FeatureStore(os.path.join(root, 'incremental'))
+    appended = []
+    for fraction in SPLITS:
+        appended.append(incremental_store.update(symbol, interval, df.iloc[:int(len(df) * fraction)], params))
+    appended.append(incremental_store.update(symbol, interval, df, params))
+    if incremental_store.update(symbol, interval, df, params) != 0:
+        problems.append("update() without new bars appended rows")
+    incremental = incremental_store.read(symbol, interval, params)
+    if sum(appended) != len(df) or not same_features(incremental, full):
+        problems.append(f"incremental build differs from full build (appended {appended})")
+
+    # 提交前中断: 列已追加、meta.json 未替换
+    crashed_store = FeatureStore(os.path.join(root, 'crashed'))
+    crashed_store.update(symbol, interval, df.iloc[:int(len(df) * SPLITS[0])], params)
+    write_json = feature_store._write_json
+
+    def crash(path, payload):
+        if os.path.basename(path) == feature_store.META_FILE:
+            raise SimulatedCrash(path)
+        write_json(path, payload)
+
+    feature_store._write_json = crash
+    try:
+        crashed_store.update(symbol, interval, df.iloc[:int(len(df) * SPLITS[1])], params)
+        problems.append("simulated crash before the meta.json commit was not triggered")
+    except SimulatedCrash:
+        pass
+    finally:
+        feature_store._write_json = write_json
+    if len(crashed_store.read(symbol, interval, params)) != int(len(df) * SPLITS[0]):
+        problems.append("interrupted update() became visible before its meta.json commit")
+    # 与不中断的增量构建同样从 SPLITS[0] 处的状态递推
+    resumed_store = FeatureStore(os.path.join(root, 'resumed'))
+    resumed_store.update(symbol, interval, df.iloc[:int(len(df) * SPLITS[0])], params)
+    resumed_store.update(symbol, interval, df, params)
+    crashed_store.update(symbol, interval, df, params)
+    crashed = crashed_store.read(symbol, interval, params)
+    if not same_features(crashed, full) or not crashed.equals(resumed_store.read(symbol, interval, params)):
+        problems.append("update() after an interrupted append differs from full / uninterrupted build")
+
+    # 区间查询
+    index = full.index
+    lo, hi = len(index) // 3, len(index) // 3 + 500
+    start_time = time.perf_counter()
+    window = full_store.read(symbol, interval, params, start=index[lo], end=index[hi],
+                             columns=('squeeze_on', 'momentum', 'wt1'))
+    query_time = time.perf_counter() - start_time
+    if not window.equals(full.iloc[lo:hi + 1][['squeeze_on', 'momentum', 'wt1']]):
+        problems.append("range query differs from full read slice")
+
+    return problems, build_time, query_time, len(df)
+
+
+def run_feature_store_check(symbols=SYMBOLS, interval='2h'):
+    print(f"\n[START] Feature store verification - {len(symbols)} symbols, {interval}")
+    root = tempfile.mkdtemp(prefix='feature_store_')
+    all_passed = True
+    try:
+        for symbol in symbols:
+            for params in PARAM_SETS:
+                problems, build_time, query_time, bars = check_dataset(root, symbol, interval, params)
+                all_passed = all_passed and not problems
+                status = "[PASS]" if not problems else "[FAIL]"
+                print(f"   {status} {symbol} {params or 'default'}: {bars} bars, "
+                      f"build {build_time * 1000:.0f}ms, 500-bar query {query_time * 1000:.2f}ms")
+                for problem in problems:
+                    print(f"      {problem}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print(f"\n[SUMMARY] Feature store {'PASSED' if all_passed else 'FAILED'}")
+    return all_passed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="特征库物化/增量/查询验证")
+    parser.add_argument("--symbol", help="只验证单个币种（默认9个币种全部验证）")
+    parser.add_argument("--interval", default='2h', help="时间框架 (默认: 2h)")
+
+    args = parser.parse_args()
+
+    symbols = [args.symbol] if args.symbol else SYMBOLS
+    passed = run_feature_store_check(symbols, args.interval)
+    sys.exit(0 if passed else 1)
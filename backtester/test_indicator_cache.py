@@ -0,0 +1,218 @@
+"""
+Indicator Disk Cache Verification
+指标磁盘缓存验证 - indicators.cache 的命中、失效与LRU淘汰
+
+验收点:
+- 命中: 第二次运行各输出line与首次运行、未开缓存的运行逐位一致，且不调用批量计算函数
+- 失效: 参数变化、输入数据（源哈希）变化、代码版本（源码哈希）变化各自未命中并重新计算
+- 淘汰: 超出 max_bytes 时按最近访问时间由旧到新删除，命中会刷新访问时间
+- 超预算条目: 单个条目大于 max_bytes 时运行照常完成、输出正确，条目写入后即被淘汰
+"""
+import os
+import sys
+import time
+import tempfile
+import contextlib
+import numpy as np
+import backtrader as bt
+
+# Add path for imports
+sys.path.append(os.path.dirname(__file__))
+
+import kernels
+from indicators import cache as indicator_cache
+from indicators import cyclic_rsi as cyclic_rsi_module
+from indicators.cyclic_rsi import CyclicSmoothedRSI
+from test_indicator_parity import load_symbol
+
+
+class CacheProbe(bt.Strategy):
+    params = (('indicator_kwargs', {}),)
+
+    def __init__(self):
+        self.crsi = CyclicSmoothedRSI(self.data, **self.p.indicator_kwargs)
+
+
+@contextlib.contextmanager
+def count_batches():
+    """统计 once() 中批量计算 cyclic_rsi() 的调用次数"""
+    original = cyclic_rsi_module.cyclic_rsi
+    calls = []
+
+    def counted(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+
+    cyclic_rsi_module.cyclic_rsi = counted
+    try:
+        yield calls
+    finally:
+        cyclic_rsi_module.cyclic_rsi = original
+
+
+def run_indicator(df, **indicator_kwargs):
+    """runonce 模式运行一次，返回 {line名: 数组副本}"""
+    cerebro = bt.Cerebro(runonce=True, stdstats=False)
+    cerebro.adddata(bt.feeds.PandasData(dataname=df))
+    cerebro.addstrategy(CacheProbe, indicator_kwargs=indicator_kwargs)
+    indicator = cerebro.run()[0].crsi
+    return {name: np.asarray(getattr(indicator.lines, name).array, dtype=np.float64).copy()
+            for name in indicator.lines.getlinealiases()}
+
+
+def same_lines(a, b):
+    return a.keys() == b.keys() and all(np.array_equal(a[name], b[name], equal_nan=True) for name in a)
+
+
+def counters(cache):
+    return cache.hits, cache.misses
+
+
+def check_hit(df, cache_dir):
+    problems = []
+    indicator_cache.disable()
+    reference = run_indicator(df)
+    cache = indicator_cache.configure(cache_dir)
+    with count_batches() as calls:
+        first = run_indicator(df)
+        if counters(cache) != (0, 1) or len(calls) != 1:
+            problems.append(f"first run: hits/misses {counters(cache)}, compute calls {len(calls)}")
+        del calls[:]
+        second = run_indicator(df)
+        if counters(cache) != (1, 1):
+            problems.append(f"second run: hits/misses {counters(cache)}, expected (1, 1)")
+        if calls:
+            problems.append(f"cache hit still called compute() {len(calls)} times")
+    if not same_lines(first, reference):
+        problems.append("first cached run differs from the uncached run")
+    if not same_lines(second, reference):
+        problems.append("lines loaded from cache differ from the uncached run")
+    return problems
+
+
+def check_invalidation(df, cache_dir):
+    problems = []
+    cache = indicator_cache.configure(cache_dir)
+    run_indicator(df)
+
+    changed = df.copy()
+    changed.iloc[-1, changed.columns.get_loc('close')] *= 1.001
+    key = (CyclicSmoothedRSI, kernels.get_backend())
+    indicator_cache.code_version(CyclicSmoothedRSI)
+    original_version = indicator_cache._code_versions[key]
+
+    cases = [
+        ('param change', lambda: run_indicator(df, cycle=30)),
+        ('source data change', lambda: run_indicator(changed)),
+    ]
+    for name, run in cases:
+        before = counters(cache)
+        with count_batches() as calls:
+            run()
+        if counters(cache) != (before[0], before[1] + 1) or len(calls) != 1:
+            problems.append(f"{name}: expected a miss, hits/misses {before} -> {counters(cache)}, "
+                            f"compute calls {len(calls)}")
+
+    # 模拟源码改动: 代码版本哈希变化后原条目不可再命中
+    indicator_cache._code_versions[key] = original_version[::-1]
+    try:
+        before = counters(cache)
+        with count_batches() as calls:
+            run_indicator(df)
+        if counters(cache) != (before[0], before[1] + 1) or len(calls) != 1:
+            problems.append(f"source hash change: expected a miss, hits/misses {before} -> {counters(cache)}")
+    finally:
+        indicator_cache._code_versions[key] = original_version
+
+    before = counters(cache)
+    run_indicator(df)
+    if counters(cache) != (before[0] + 1, before[1]):
+        problems.append("original entry no longer hits after restoring the code version")
+    return problems
+
+
+def check_eviction(cache_dir):
+    problems = []
+    values = {'line': np.arange(1000, dtype=np.float64)}
+    cache = indicator_cache.IndicatorDiskCache(cache_dir, max_bytes=indicator_cache.DEFAULT_MAX_BYTES)
+    now = time.time()
+    for age, key in zip((300, 200, 100), ('a', 'b', 'c')):
+        cache.store(key, values)
+        meta_path = os.path.join(cache_dir, key, indicator_cache.META_FILE)
+        os.utime(meta_path, (now - age, now - age))
+    entry_bytes = max(size for _, size, _ in cache.entries())
+    cache.max_bytes = 3 * entry_bytes + entry_bytes // 2
+
+    # 命中刷新访问时间: a 变为最新，b 成为最旧
+    if cache.load('a', ['line']) is None:
+        problems.append("entry 'a' not loadable before eviction")
+    cache.store('d', values)
+    remaining = sorted(key for key, _, _ in cache.entries())
+    if remaining != ['a', 'c', 'd']:
+        problems.append(f"after storing 'd': expected ['a', 'c', 'd'], got {remaining}")
+    cache.store('e', values)
+    remaining = sorted(key for key, _, _ in cache.entries())
+    if remaining != ['a', 'd', 'e']:
+        problems.append(f"after storing 'e': expected ['a', 'd', 'e'], got {remaining}")
+    if cache.evictions != 2:
+        problems.append(f"evictions {cache.evictions}, expected 2")
+    if cache.total_bytes() > cache.max_bytes:
+        problems.append(f"cache holds {cache.total_bytes()} bytes over the {cache.max_bytes} budget")
+    return problems
+
+
+def check_oversized(df, cache_dir):
+    problems = []
+    indicator_cache.disable()
+    reference = run_indicator(df)
+    cache = indicator_cache.configure(cache_dir, max_bytes=1024)
+    for attempt in (1, 2):
+        lines = run_indicator(df)
+        if not same_lines(lines, reference):
+            problems.append(f"run {attempt}: lines differ from the uncached run")
+    if counters(cache) != (0, 2):
+        problems.append(f"hits/misses {counters(cache)}, expected (0, 2)")
+    if cache.entries():
+        problems.append(f"{len(cache.entries())} oversized entries kept over the 1024 byte budget")
+    if cache.evictions != 2:
+        problems.append(f"evictions {cache.evictions}, expected 2")
+    return problems
+
+
+def run_cache_check(symbol='SUIUSDT', interval='2h'):
+    df = load_symbol(symbol, interval)
+    print(f"\n[START] Indicator cache verification - {symbol} {interval} ({len(df)} bars)")
+    checks = [
+        ('hit', lambda cache_dir: check_hit(df, cache_dir)),
+        ('invalidation', lambda cache_dir: check_invalidation(df, cache_dir)),
+        ('eviction', check_eviction),
+        ('oversized entry', lambda cache_dir: check_oversized(df, cache_dir)),
+    ]
+    all_passed = True
+    try:
+        for name, check in checks:
+            with tempfile.TemporaryDirectory(prefix='indicator-cache-') as cache_dir:
+                problems = check(cache_dir)
+            all_passed = all_passed and not problems
+            status = "[PASS]" if not problems else "[FAIL]"
+            print(f"   {status} {name}")
+            for problem in problems:
+                print(f"      {problem}")
+    finally:
+        indicator_cache.disable()
+
+    print(f"\n[SUMMARY] Indicator cache {'PASSED' if all_passed else 'FAILED'}")
+    return all_passed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="指标磁盘缓存验证")
+    parser.add_argument("--symbol", default='SUIUSDT', help="币种 (默认: SUIUSDT)")
+    parser.add_argument("--interval", default='2h', help="时间框架 (默认: 2h)")
+
+    args = parser.parse_args()
+
+    passed = run_cache_check(args.symbol, args.interval)
+    sys.exit(0 if passed else 1)
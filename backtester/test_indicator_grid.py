@@ -0,0 +1,89 @@
+"""
+Indicator Parameter Grid Verification
+参数网格批量计算验证 - 网格结果逐行对比单参数计算
+
+验收点:
+- squeeze_momentum_grid / wavetrend_grid 每一行与对应参数的
+  squeeze_momentum_arrays / wavetrend_arrays 逐位一致（NaN位置相同）
+- 500点网格耗时与单次计算对比
+"""
+import os
+import sys
+import time
+import numpy as np
+
+# Add path for imports
+sys.path.append(os.path.dirname(__file__))
+
+from indicators.grid import squeeze_momentum_grid, wavetrend_grid, SQZMOM_LINES, WAVETREND_LINES
+from indicators.sqzmom_safe import squeeze_momentum_arrays
+from indicators.wavetrend_safe import wavetrend_arrays
+from test_indicator_parity import load_symbol
+
+
+# 5 × 5 × 4 × 5 = 500 组合
+SQZMOM_GRID = dict(
+    bb_length=[10, 15, 20, 25, 30],
+    bb_mult=[1.5, 1.75, 2.0, 2.25, 2.5],
+    kc_length=[10, 14, 20, 30],
+    kc_mult=[1.0, 1.25, 1.5, 1.75, 2.0],
+)
+# 10 × 50 = 500 组合
+WAVETREND_GRID = dict(
+    n1=list(range(6, 16)),
+    n2=list(range(9, 59)),
+)
+
+
+def verify_grid(name, grid_fn, single_fn, line_names, grid, high, low, close):
+    start_time = time.perf_counter()
+    result = grid_fn(high, low, close, **grid)
+    grid_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    single_fn(high, low, close)
+    single_time = time.perf_counter() - start_time
+
+    mismatches = 0
+    for row, params in enumerate(result['params']):
+        expected = single_fn(high, low, close, **params)
+        for line_name in line_names:
+            if not np.array_equal(result[line_name][row], expected[line_name], equal_nan=True):
+                mismatches += 1
+                print(f"      {name} {params} {line_name}: mismatch")
+
+    status = "[PASS]" if mismatches == 0 else "[FAIL]"
+    print(f"   {status} {name:9s} combos={len(result['params'])} grid={grid_time:.3f}s "
+          f"single={single_time * 1000:.1f}ms (grid ≈ {grid_time / single_time:.0f} singles)")
+    return mismatches == 0
+
+
+def run_grid_check(symbol='BTCUSDT', interval='2h'):
+    df = load_symbol(symbol, interval)
+    high, low, close = df['high'].values, df['low'].values, df['close'].values
+    print(f"\n[START] Indicator grid verification - {symbol} {interval} ({len(df)} bars)")
+
+    # 预热（numba编译/缓存加载）
+    squeeze_momentum_arrays(high[:200], low[:200], close[:200])
+    wavetrend_arrays(high[:200], low[:200], close[:200])
+
+    passed = verify_grid('SQZMOM', squeeze_momentum_grid, squeeze_momentum_arrays,
+                         SQZMOM_LINES, SQZMOM_GRID, high, low, close)
+    passed = verify_grid('WAVETREND', wavetrend_grid, wavetrend_arrays,
+                         WAVETREND_LINES, WAVETREND_GRID, high, low, close) and passed
+
+    print(f"\n[SUMMARY] Grid {'PASSED' if passed else 'FAILED'}")
+    return passed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="指标参数网格批量计算验证")
+    parser.add_argument("--symbol", default='BTCUSDT', help="币种 (默认: BTCUSDT)")
+    parser.add_argument("--interval", default='2h', help="时间框架 (默认: 2h)")
+
+    args = parser.parse_args()
+
+    passed = run_grid_check(args.symbol, args.interval)
+    sys.exit(0 if passed else 1)
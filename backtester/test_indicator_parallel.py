@@ -0,0 +1,142 @@
+"""
+Parallel Indicator Verification
+多数据集并行计算验证 - compute_many() 线程池 vs 顺序计算
+
+验收点:
+- numba 内核均以 nogil=True 编译，且执行期间主线程确实能继续运行（GIL已释放）
+- 9个币种 × 全部时间框架，线程池结果与顺序计算逐位一致
+- 报告顺序 / 线程池耗时（加速比取决于CPU核数）
+"""
+import os
+import sys
+import time
+import threading
+import numpy as np
+
+# Add path for imports
+sys.path.append(os.path.dirname(__file__))
+
+import kernels
+from kernels import rolling
+from indicators.parallel import compute_many
+from test_indicator_parity import SYMBOLS, DATA_DIR, load_symbol
+
+
+INTERVALS = ('1h', '2h', '4h', '1d')
+SPEC = {
+    'sqzmom': 'sqzmom',
+    'sqzmom_hl': ('sqzmom', dict(bb_length=30, kc_length=14, use_true_range=False)),
+    'wavetrend': 'wavetrend',
+    'wavetrend_grid': ('wavetrend_grid', dict(n1=(6, 10, 14), n2=(13, 21))),
+    'atr14': ('atr', dict(period=14)),
+}
+NUMBA_KERNELS = ('_sma_loop', '_stddev_loop', '_extreme_loop', '_ema_loop')
+
+
+def load_universe(symbols=SYMBOLS, intervals=INTERVALS):
+    """全部存在的 (币种, 时间框架) 数据集"""
+    datasets = {}
+    for symbol in symbols:
+        for interval in intervals:
+            if os.path.exists(os.path.join(DATA_DIR, symbol, interval, f'{symbol}-{interval}-merged.csv')):
+                datasets[(symbol, interval)] = load_symbol(symbol, interval)
+    return datasets
+
+
+def check_nogil():
+    """编译选项 + 实测：内核运行期间主线程的推进比例"""
+    problems = []
+    for name in NUMBA_KERNELS:
+        if not getattr(rolling, name).targetoptions.get('nogil'):
+            problems.append(f"{name} not compiled with nogil=True")
+
+    values = np.random.default_rng(0).random(5_000_000)
+    kernels.stddev(values[:100], 10)
+    done = threading.Event()
+
+    def work():
+        for _ in range(5):
+            kernels.stddev(values, 50)
+        done.set()
+
+    ticks = 0
+    start_time = time.perf_counter()
+    worker = threading.Thread(target=work)
+    worker.start()
+    while not done.is_set():
+        ticks += 1
+    worker.join()
+    elapsed = time.perf_counter() - start_time
+
+    # 主线程单独运行时的推进速度（同样的循环体，由定时器结束）
+    reference_done = threading.Event()
+    timer = threading.Timer(0.2, reference_done.set)
+    reference_ticks = 0
+    reference_start = time.perf_counter()
+    timer.start()
+    while not reference_done.is_set():
+        reference_ticks += 1
+    rate = reference_ticks / (time.perf_counter() - reference_start)
+    # GIL被持有时主线程只能在首个切换间隔（5ms）内推进；释放时在单核上也能分到约一半时间
+    progress = ticks / (rate * elapsed)
+    print(f"   main thread progress while kernel runs: {progress:.0%} of solo rate ({elapsed * 1000:.0f}ms)")
+    if progress < 0.25:
+        problems.append(f"main thread starved while kernel ran ({progress:.0%}), GIL not released")
+    return problems
+
+
+def results_equal(a, b):
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(results_equal(a[key], b[key]) for key in a)
+    if isinstance(a, np.ndarray):
+        return np.array_equal(a, b, equal_nan=True)
+    return a == b
+
+
+def run_parallel_check(symbols=SYMBOLS, max_workers=4):
+    print(f"\n[START] Parallel indicator verification - backend {kernels.get_backend()}, "
+          f"{os.cpu_count()} CPU(s), {max_workers} threads")
+    problems = []
+    if kernels.HAS_NUMBA:
+        problems.extend(check_nogil())
+    else:
+        print("   [SKIP] numba not installed, nogil check skipped")
+
+    datasets = load_universe(symbols)
+    bars = sum(len(df) for df in datasets.values())
+    print(f"   {len(datasets)} datasets, {bars} bars, {len(SPEC)} outputs each")
+
+    compute_many(dict(list(datasets.items())[:1]), SPEC, max_workers=1)  # JIT预热
+    start_time = time.perf_counter()
+    serial = compute_many(datasets, SPEC, max_workers=1)
+    serial_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    threaded = compute_many(datasets, SPEC, max_workers=max_workers)
+    threaded_time = time.perf_counter() - start_time
+
+    for name in datasets:
+        for key in SPEC:
+            if not results_equal(threaded[name][key], serial[name][key]):
+                problems.append(f"{name} {key}: threaded result differs from serial")
+    print(f"   serial {serial_time * 1000:.0f}ms, threaded {threaded_time * 1000:.0f}ms "
+          f"(speedup {serial_time / threaded_time:.2f}x)")
+
+    passed = not problems
+    for problem in problems:
+        print(f"   [FAIL] {problem}")
+    print(f"\n[SUMMARY] Parallel {'PASSED' if passed else 'FAILED'}")
+    return passed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="多数据集并行指标计算验证")
+    parser.add_argument("--symbol", help="只验证单个币种（默认9个币种全部验证）")
+    parser.add_argument("--workers", type=int, default=4, help="线程数 (默认: 4)")
+
+    args = parser.parse_args()
+
+    symbols = [args.symbol] if args.symbol else SYMBOLS
+    passed = run_parallel_check(symbols, args.workers)
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,229 @@
+"""
+Safe Indicator Parity Verification
+向量化实现一致性验证 - 新 once()/next() 路径 vs 原 line 图逐bar实现
+
+验收点:
+- 9个币种 2h 全历史数据，逐bar对比
+- squeeze_on / squeeze_off / signal_bar / wt_signal 等信号线必须完全一致
+- 连续值（momentum / wt1 / wt2）最大相对误差 < 1e-9
+- runonce=True（once路径）与 runonce=False（next路径）都需通过
+"""
+import os
+import sys
+import numpy as np
+import pandas as pd
+import backtrader as bt
+import backtrader.indicators as btind
+from datetime import datetime
+
+# Add path for imports
+sys.path.append(os.path.dirname(__file__))
+
+from indicators.sqzmom_safe import SqueezeMomentumSafe
+from indicators.wavetrend_safe import WaveTrendSafe
+from utils.safe_math import safe_max_eps, safe_div_line, DEFAULT_EPS
+
+
+SYMBOLS = ['1000PEPEUSDT', 'AAVEUSDT', 'BTCUSDT', 'DOGEUSDT', 'ETHUSDT',
+           'SOLUSDT', 'SUIUSDT', 'WLDUSDT', 'XRPUSDT']
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+SIGNAL_LINES = {'squeeze_on', 'squeeze_off', 'signal_bar', 'wt_signal'}
+REL_TOL = 1e-9
+
+
+class ReferenceSqueezeMomentum(bt.Indicator):
+    """原 SqueezeMomentumSafe 的 line 图实现（作为对照基准，保持不变）"""
+    lines = ('squeeze_on', 'squeeze_off', 'signal_bar', 'momentum')
+    params = (
+        ('bb_length', 20),
+        ('bb_mult', 2.0),
+        ('kc_length', 20),
+        ('kc_mult', 1.5),
+        ('use_true_range', True),
+        ('eps', DEFAULT_EPS),
+    )
+
+    def __init__(self):
+        self.bb_basis = btind.SimpleMovingAverage(self.data.close, period=self.params.bb_length)
+        raw_bb_dev = btind.StandardDeviation(self.data.close, period=self.params.bb_length)
+        self.bb_dev = self.params.bb_mult * safe_max_eps(raw_bb_dev, self.params.eps)
+        self.bb_upper = self.bb_basis + self.bb_dev
+        self.bb_lower = self.bb_basis - self.bb_dev
+
+        self.kc_ma = btind.SimpleMovingAverage(self.data.close, period=self.params.kc_length)
+        if self.params.use_true_range:
+            self.kc_range = btind.TrueRange(self.data)
+        else:
+            self.kc_range = self.data.high - self.data.low
+        raw_kc_rangema = btind.SimpleMovingAverage(self.kc_range, period=self.params.kc_length)
+        self.kc_rangema = safe_max_eps(raw_kc_rangema, self.params.eps)
+        self.kc_upper = self.kc_ma + self.kc_rangema * self.params.kc_mult
+        self.kc_lower = self.kc_ma - self.kc_rangema * self.params.kc_mult
+
+        self.squeeze_on_cond1 = self.bb_lower > self.kc_lower
+        self.squeeze_on_cond2 = self.bb_upper < self.kc_upper
+        self.squeeze_off_cond1 = self.bb_lower < self.kc_lower
+        self.squeeze_off_cond2 = self.bb_upper > self.kc_upper
+
+        highest = btind.Highest(self.data.high, period=self.params.kc_length)
+        lowest = btind.Lowest(self.data.low, period=self.params.kc_length)
+        avg_hl = (highest + lowest) / 2.0
+        avg_close = btind.SimpleMovingAverage(self.data.close, period=self.params.kc_length)
+        avg_all = (avg_hl + avg_close) / 2.0
+        source_diff = self.data.close - avg_all
+        self._mom = source_diff - source_diff(-self.params.kc_length)
+
+        self.addminperiod(max(self.params.bb_length, self.params.kc_length) + 50)
+
+    def next(self):
+        squeeze_on = (self.squeeze_on_cond1[0] and self.squeeze_on_cond2[0])
+        squeeze_off = (self.squeeze_off_cond1[0] and self.squeeze_off_cond2[0])
+        prev_squeeze_on = False
+        if len(self) > 1:
+            prev_squeeze_on = (self.squeeze_on_cond1[-1] and self.squeeze_on_cond2[-1])
+        signal_bar = prev_squeeze_on and not squeeze_on
+
+        self.lines.squeeze_on[0] = float(squeeze_on)
+        self.lines.squeeze_off[0] = float(squeeze_off)
+        self.lines.signal_bar[0] = float(signal_bar)
+        self.lines.momentum[0] = self._mom[0]
+
+
+class ReferenceWaveTrend(bt.Indicator):
+    """原 WaveTrendSafe 的 line 图实现（作为对照基准，保持不变）"""
+    lines = ('wt1', 'wt2', 'wt_signal')
+    params = (
+        ('n1', 10),
+        ('n2', 21),
+        ('eps', DEFAULT_EPS),
+    )
+
+    def __init__(self):
+        self.ap = (self.data.high + self.data.low + self.data.close) / 3.0
+        self.esa = btind.ExponentialMovingAverage(self.ap, period=self.params.n1)
+        diff = self.ap - self.esa
+        abs_diff = bt.If(diff >= 0, diff, -diff)
+        self.d = btind.ExponentialMovingAverage(abs_diff, period=self.params.n1)
+        self.ci = safe_div_line(self.ap - self.esa, 0.015 * self.d, self.params.eps)
+        self.tci = btind.ExponentialMovingAverage(self.ci, period=self.params.n2)
+        self.wt1 = self.tci
+        self.wt2 = btind.SimpleMovingAverage(self.wt1, period=4)
+        self.wt_signal = self.wt1 > self.wt2
+        self.addminperiod(self.params.n1 * 2 + self.params.n2 + 5)
+
+    def next(self):
+        self.lines.wt1[0] = self.wt1[0]
+        self.lines.wt2[0] = self.wt2[0]
+        self.lines.wt_signal[0] = float(self.wt_signal[0])
+
+
+# 对照组: (名称, 新实现, 对照实现, 参数)
+PARITY_CASES = [
+    ('SQZMOM', SqueezeMomentumSafe, ReferenceSqueezeMomentum, {}),
+    ('SQZMOM_HL', SqueezeMomentumSafe, ReferenceSqueezeMomentum,
+     dict(bb_length=30, kc_length=14, use_true_range=False)),
+    ('SQZMOM_LONG', SqueezeMomentumSafe, ReferenceSqueezeMomentum,
+     dict(bb_length=120, kc_length=100)),
+    ('WAVETREND', WaveTrendSafe, ReferenceWaveTrend, {}),
+    ('WAVETREND_FAST', WaveTrendSafe, ReferenceWaveTrend, dict(n1=6, n2=13)),
+]
+
+
+class ParityStrategy(bt.Strategy):
+    """仅实例化指标，不下单"""
+
+    def __init__(self):
+        self.pairs = []
+        for name, candidate_cls, reference_cls, kwargs in PARITY_CASES:
+            self.pairs.append((name, candidate_cls(self.data, **kwargs), reference_cls(self.data, **kwargs)))
+
+    def stop(self):
+        self.arrays = {}
+        for name, candidate, reference in self.pairs:
+            for line_name in candidate.lines.getlinealiases():
+                self.arrays[(name, line_name)] = (
+                    np.array(getattr(candidate.lines, line_name).array),
+                    np.array(getattr(reference.lines, line_name).array),
+                )
+
+
+def compare_arrays(candidate, reference, exact):
+    """
+    逐bar比较两条line
+
+    Returns:
+        (不一致bar数, 最大相对误差)
+    """
+    nan_mismatch = np.isnan(candidate) != np.isnan(reference)
+    both = ~np.isnan(candidate) & ~np.isnan(reference)
+    if exact:
+        mismatches = int(nan_mismatch.sum() + (candidate[both] != reference[both]).sum())
+        return mismatches, 0.0
+
+    diff = np.abs(candidate[both] - reference[both])
+    scale = np.maximum(np.abs(reference[both]), 1.0)
+    rel = diff / scale if len(diff) else np.zeros(0)
+    max_rel = float(rel.max()) if len(rel) else 0.0
+    mismatches = int(nan_mismatch.sum() + (rel > REL_TOL).sum())
+    return mismatches, max_rel
+
+
+def load_symbol(symbol, interval='2h'):
+    data_file = os.path.join(DATA_DIR, symbol, interval, f'{symbol}-{interval}-merged.csv')
+    df = pd.read_csv(data_file)
+    df['datetime'] = pd.to_datetime(df['open_time'], unit='ms')
+    df.set_index('datetime', inplace=True)
+    return df
+
+
+def run_parity_check(symbol, interval='2h', runonce=True):
+    """单币种对比，返回 {(指标, line): (不一致数, 最大相对误差)}"""
+    df = load_symbol(symbol, interval)
+
+    cerebro = bt.Cerebro(runonce=runonce, stdstats=False)
+    cerebro.adddata(bt.feeds.PandasData(dataname=df))
+    cerebro.addstrategy(ParityStrategy)
+    strategy = cerebro.run()[0]
+
+    report = {}
+    for (name, line_name), (candidate, reference) in strategy.arrays.items():
+        report[(name, line_name)] = compare_arrays(candidate, reference, line_name in SIGNAL_LINES)
+    return report, len(df)
+
+
+def run_parity_suite(symbols=SYMBOLS, interval='2h'):
+    """9币种 × (once, next) 对比"""
+    print(f"\n[START] Safe indicator parity verification - {interval}")
+    all_passed = True
+
+    for runonce in (True, False):
+        mode = 'once' if runonce else 'next'
+        for symbol in symbols:
+            start_time = datetime.now()
+            report, bars = run_parity_check(symbol, interval, runonce)
+            duration = (datetime.now() - start_time).total_seconds()
+
+            failed = {key: value for key, value in report.items() if value[0] > 0}
+            status = "[PASS]" if not failed else "[FAIL]"
+            all_passed = all_passed and not failed
+            worst = max(value[1] for value in report.values())
+            print(f"   {status} {mode:4s} {symbol:13s} bars={bars:6d} max_rel={worst:.2e} ({duration:.2f}s)")
+            for (name, line_name), (mismatches, max_rel) in failed.items():
+                print(f"      {name}.{line_name}: {mismatches} mismatched bars, max_rel={max_rel:.2e}")
+
+    print(f"\n[SUMMARY] Parity {'PASSED' if all_passed else 'FAILED'}")
+    return all_passed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Safe指标向量化实现一致性验证")
+    parser.add_argument("--symbol", help="只验证单个币种（默认9个币种全部验证）")
+    parser.add_argument("--interval", default='2h', help="时间框架 (默认: 2h)")
+
+    args = parser.parse_args()
+
+    symbols = [args.symbol] if args.symbol else SYMBOLS
+    passed = run_parity_suite(symbols, args.interval)
+    sys.exit(0 if passed else 1)
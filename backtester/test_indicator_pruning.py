@@ -0,0 +1,140 @@
+"""
+Indicator Pruning Verification
+指标依赖裁剪验证 - prune_indicators=True vs False
+
+验收点:
+- FourSwords / DojiAshi 多种过滤器组合下，裁剪前后成交记录、最终资金、各数据源minperiod完全一致
+- runonce=True / runonce=False 都需通过
+- 报告每种组合构建/裁剪的指标与运行时间（关闭过滤器的组合应明显更少计算）
+- 裁剪模式下，关闭的过滤器的周期参数（如 use_ema_filter=False 时的 ema_slow=400）不改变minperiod与成交，
+  同原先只在过滤器开启时构建这些指标
+"""
+import os
+import sys
+import io
+import time
+import contextlib
+import backtrader as bt
+
+# Add path for imports
+sys.path.append(os.path.dirname(__file__))
+
+from strategies.four_swords_swing_strategy_v1_7_4 import FourSwordsSwingStrategyV174
+from strategies.four_swords_swing_strategy_v2_0_mtf import FourSwordsSwingStrategyV20MTF
+from strategies.doji_ashi_strategy_v5 import DojiAshiStrategyV5
+from test_indicator_parity import load_symbol
+
+
+NO_FILTERS_FOUR_SWORDS = dict(use_ema_filter=False, use_volume_filter=False, use_simplified_signals=True)
+CASES = [
+    ('FourSwords default', FourSwordsSwingStrategyV174, dict()),
+    ('FourSwords simplified', FourSwordsSwingStrategyV174, dict(use_simplified_signals=True)),
+    ('FourSwords no filters', FourSwordsSwingStrategyV174, NO_FILTERS_FOUR_SWORDS),
+    ('FourSwords key levels', FourSwordsSwingStrategyV174, dict(use_key_level_filter=True, key_level_period='W')),
+    ('FourSwords v2.0 MTF', FourSwordsSwingStrategyV20MTF, dict()),
+    # kc_length > 50: SQZMOM的minperiod由 2*kc_length 决定，裁剪后声明的预热期必须与之一致（比较minperiod）
+    ('FourSwords KC 60, no SQZMOM', FourSwordsSwingStrategyV174,
+     dict(kc_length=60, disable_sqzmom=True, indicators_only=True)),
+    ('Doji default', DojiAshiStrategyV5, dict()),
+    ('Doji cross, trailing', DojiAshiStrategyV5, dict(entry_mode='cross', use_trailing_stop=True)),
+    ('Doji no filters', DojiAshiStrategyV5,
+     dict(enable_daily_trend_filter=False, enable_entry_trigger=False, use_trailing_stop=True)),
+    ('Doji key levels', DojiAshiStrategyV5, dict(enable_key_level_filter=True)),
+]
+# (名称, 策略, 基础参数, 关闭的过滤器的参数) - 裁剪模式下加上后者结果不变
+INERT_PARAM_CASES = [
+    ('FourSwords EMA off, ema_slow=400', FourSwordsSwingStrategyV174,
+     dict(use_ema_filter=False), dict(ema_fast=350, ema_slow=400)),
+    ('FourSwords filters off, slow EMAs', FourSwordsSwingStrategyV174,
+     NO_FILTERS_FOUR_SWORDS, dict(ema_fast=350, ema_slow=400)),
+]
+
+
+def run_case(strategy_cls, kwargs, datas, prune, runonce):
+    cerebro = bt.Cerebro(runonce=runonce, stdstats=False)
+    for df in datas:
+        cerebro.adddata(bt.feeds.PandasData(dataname=df))
+    cerebro.broker.set_cash(10000.0)
+    cerebro.addstrategy(strategy_cls, prune_indicators=prune, **kwargs)
+    cerebro.addanalyzer(bt.analyzers.Transactions, _name='transactions')
+
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        strategy = cerebro.run()[0]
+    duration = time.perf_counter() - start_time
+
+    transactions = {dt: [tuple(t) for t in items]
+                    for dt, items in strategy.analyzers.transactions.get_analysis().items()}
+    return {
+        'transactions': transactions,
+        'value': cerebro.broker.getvalue(),
+        'minperiods': list(strategy._minperiods),
+        'plan': strategy.indicator_plan.summary(),
+        'time': duration,
+    }
+
+
+def run_pruning_check(symbol='SUIUSDT', interval='2h'):
+    main = load_symbol(symbol, interval)
+    daily = load_symbol(symbol, '1d')
+    print(f"\n[START] Indicator pruning verification - {symbol} {interval}")
+    all_passed = True
+
+    for name, strategy_cls, kwargs in CASES:
+        datas = [main, daily] if strategy_cls is DojiAshiStrategyV5 else [main]
+        for runonce in (True, False):
+            mode = 'once' if runonce else 'next'
+            full = run_case(strategy_cls, kwargs, datas, False, runonce)
+            pruned = run_case(strategy_cls, kwargs, datas, True, runonce)
+
+            problems = []
+            if pruned['minperiods'] != full['minperiods']:
+                problems.append(f"minperiods {pruned['minperiods']} != {full['minperiods']}")
+            if pruned['transactions'] != full['transactions']:
+                problems.append(f"transactions differ ({len(pruned['transactions'])} vs {len(full['transactions'])})")
+            if pruned['value'] != full['value']:
+                problems.append(f"final value {pruned['value']:.6f} != {full['value']:.6f}")
+
+            all_passed = all_passed and not problems
+            status = "[PASS]" if not problems else "[FAIL]"
+            print(f"   {status} {mode:4s} {name:22s} trades={len(full['transactions']):4d} "
+                  f"built={len(pruned['plan']['built'])}/{len(full['plan']['built'])} "
+                  f"time {pruned['time']:.2f}s vs {full['time']:.2f}s")
+            if runonce and pruned['plan']['pruned']:
+                print(f"      pruned: {', '.join(pruned['plan']['pruned'])}")
+            for problem in problems:
+                print(f"      {problem}")
+
+    for name, strategy_cls, kwargs, inert in INERT_PARAM_CASES:
+        for runonce in (True, False):
+            mode = 'once' if runonce else 'next'
+            base = run_case(strategy_cls, kwargs, [main], True, runonce)
+            changed = run_case(strategy_cls, dict(kwargs, **inert), [main], True, runonce)
+
+            problems = []
+            if changed['minperiods'] != base['minperiods']:
+                problems.append(f"minperiods {changed['minperiods']} != {base['minperiods']}")
+            if changed['transactions'] != base['transactions'] or changed['value'] != base['value']:
+                problems.append("transactions / final value changed")
+
+            all_passed = all_passed and not problems
+            status = "[PASS]" if not problems else "[FAIL]"
+            print(f"   {status} {mode:4s} {name:22s} minperiods={changed['minperiods']}")
+            for problem in problems:
+                print(f"      {problem}")
+
+    print(f"\n[SUMMARY] Pruning {'PASSED' if all_passed else 'FAILED'}")
+    return all_passed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="指标依赖裁剪一致性验证")
+    parser.add_argument("--symbol", default='SUIUSDT', help="币种 (默认: SUIUSDT)")
+    parser.add_argument("--interval", default='2h', help="时间框架 (默认: 2h)")
+
+    args = parser.parse_args()
+
+    passed = run_pruning_check(args.symbol, args.interval)
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,135 @@
+"""
+Shared Indicator Registry Verification
+共享指标注册表验证 - 多策略实例共享 vs 各自独立运行
+
+验收点:
+- 同一Cerebro内多个 FourSwords 实例共享相同(指标, 源line, 参数)的计算
+- 每个实例的指标数值、minperiod、首个next()所在bar与单独运行完全一致
+- runonce=True / runonce=False 都需通过
+"""
+import os
+import sys
+import io
+import time
+import contextlib
+import numpy as np
+import backtrader as bt
+
+# Add path for imports
+sys.path.append(os.path.dirname(__file__))
+
+from strategies.four_swords_swing_strategy_v1_7_4 import FourSwordsSwingStrategyV174
+from indicators.registry import get_registry
+from test_indicator_parity import load_symbol
+
+
+# 共享关系: A为创建方; B与A共享除SQZMOM外全部; C与A共享全部;
+# D关闭依赖裁剪，构建全部指标：SQZMOM/WaveTrend/EMA/成交量来自A，
+# A未构建的ATR由D自建（验证策略复用方的minperiod）
+VARIANTS = [
+    ('A', dict()),
+    ('B', dict(kc_mult=2.0)),
+    ('C', dict(volume_multiplier=1.2)),
+    ('D', dict(prune_indicators=False, use_ema_filter=False, use_volume_filter=False)),
+]
+
+PROBE_LINES = [
+    ('sqzmom', 'momentum'), ('sqzmom', 'signal_bar'),
+    ('wavetrend', 'wt1'), ('wavetrend', 'wt_signal'),
+    ('ema_fast', 0), ('ema_slow', 0), ('avg_volume', 0), ('atr', 0),
+]
+
+
+class ProbeStrategy(FourSwordsSwingStrategyV174):
+    """只计算指标，记录首个next()所在bar与指标数组"""
+
+    def next(self):
+        if not hasattr(self, 'first_next_bar'):
+            self.first_next_bar = len(self)
+        super().next()
+
+    def stop(self):
+        self.arrays = {}
+        for attr, line in PROBE_LINES:
+            indicator = getattr(self, attr, None)
+            if indicator is None:
+                continue
+            buffer = indicator.lines[line] if isinstance(line, int) else getattr(indicator.lines, line)
+            self.arrays[(attr, line)] = np.array(buffer.array[:len(buffer)], dtype=np.float64)
+
+
+def run_cerebro(df, variants, share, runonce):
+    cerebro = bt.Cerebro(runonce=runonce, stdstats=False)
+    cerebro.adddata(bt.feeds.PandasData(dataname=df))
+    for _, kwargs in variants:
+        cerebro.addstrategy(ProbeStrategy, indicators_only=True, warmup=1,
+                            share_indicators=share, **kwargs)
+
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        strategies = cerebro.run()
+    duration = time.perf_counter() - start_time
+
+    registry = get_registry(strategies[0]) if share else None
+    return strategies, duration, registry
+
+
+def compare_strategy(shared, alone):
+    """返回不一致项列表"""
+    problems = []
+    if shared._minperiod != alone._minperiod:
+        problems.append(f"minperiod {shared._minperiod} != {alone._minperiod}")
+    if getattr(shared, 'first_next_bar', None) != getattr(alone, 'first_next_bar', None):
+        problems.append(f"first next() bar {getattr(shared, 'first_next_bar', None)} "
+                        f"!= {getattr(alone, 'first_next_bar', None)}")
+    for key, expected in alone.arrays.items():
+        actual = shared.arrays.get(key)
+        if actual is None or actual.shape != expected.shape:
+            problems.append(f"{key}: missing or shape mismatch")
+            continue
+        same = (actual == expected) | (np.isnan(actual) & np.isnan(expected))
+        if not same.all():
+            problems.append(f"{key}: {int((~same).sum())} mismatched bars")
+    return problems
+
+
+def run_registry_check(symbol='BTCUSDT', interval='2h'):
+    df = load_symbol(symbol, interval)
+    print(f"\n[START] Shared indicator registry verification - {symbol} {interval}")
+    all_passed = True
+
+    for runonce in (True, False):
+        mode = 'once' if runonce else 'next'
+        shared_strats, shared_time, registry = run_cerebro(df, VARIANTS, True, runonce)
+
+        alone_time = 0.0
+        for (name, kwargs), shared in zip(VARIANTS, shared_strats):
+            alone_strats, duration, _ = run_cerebro(df, [(name, kwargs)], False, runonce)
+            alone_time += duration
+            problems = compare_strategy(shared, alone_strats[0])
+            all_passed = all_passed and not problems
+            status = "[PASS]" if not problems else "[FAIL]"
+            print(f"   {status} {mode:4s} strategy {name}: minperiod={shared._minperiod} "
+                  f"first_next={getattr(shared, 'first_next_bar', None)}")
+            for problem in problems:
+                print(f"      {problem}")
+
+        summary = registry.summary()
+        print(f"   [INFO] {mode:4s} shared: {summary['indicators']} indicators, {summary['hits']} reuses, "
+              f"{shared_time:.2f}s (separate runs total {alone_time:.2f}s)")
+
+    print(f"\n[SUMMARY] Registry {'PASSED' if all_passed else 'FAILED'}")
+    return all_passed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="共享指标注册表验证")
+    parser.add_argument("--symbol", default='BTCUSDT', help="币种 (默认: BTCUSDT)")
+    parser.add_argument("--interval", default='2h', help="时间框架 (默认: 2h)")
+
+    args = parser.parse_args()
+
+    passed = run_registry_check(args.symbol, args.interval)
+    sys.exit(0 if passed else 1)
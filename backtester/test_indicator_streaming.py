@@ -0,0 +1,129 @@
+"""
+Streaming Indicator Verification
+流式指标验证 - SqueezeMomentumStream / WaveTrendStream vs 批量全序列计算
+
+验收点:
+- 9个币种 2h 全历史数据，逐bar update(bar) 与 squeeze_momentum_arrays() / wavetrend_arrays() 对比
+- 信号线必须完全一致，连续值最大相对误差 < 1e-9（与 test_indicator_parity.py 同一标准）
+- 任意位置 to_state() → JSON → from_state() 恢复后继续推进，结果与不中断的流逐位一致
+- 报告单次 update() 延迟（中位数 / p99）
+"""
+import os
+import sys
+import json
+import time
+import numpy as np
+
+# Add path for imports
+sys.path.append(os.path.dirname(__file__))
+
+from indicators.sqzmom_safe import SqueezeMomentumStream, squeeze_momentum_arrays
+from indicators.wavetrend_safe import WaveTrendStream, wavetrend_arrays
+from test_indicator_parity import SYMBOLS, SIGNAL_LINES, compare_arrays, load_symbol
+
+
+STREAM_CASES = [
+    ('SQZMOM', SqueezeMomentumStream, squeeze_momentum_arrays, {}),
+    ('SQZMOM_HL', SqueezeMomentumStream, squeeze_momentum_arrays,
+     dict(bb_length=30, kc_length=14, use_true_range=False)),
+    ('SQZMOM_LONG', SqueezeMomentumStream, squeeze_momentum_arrays,
+     dict(bb_length=120, kc_length=100)),
+    ('WAVETREND', WaveTrendStream, wavetrend_arrays, {}),
+    ('WAVETREND_FAST', WaveTrendStream, wavetrend_arrays, dict(n1=6, n2=13)),
+]
+LINES = {
+    SqueezeMomentumStream: ('squeeze_on', 'squeeze_off', 'signal_bar', 'momentum'),
+    WaveTrendStream: ('wt1', 'wt2', 'wt_signal'),
+}
+# 状态快照/恢复位置（占全序列比例）
+CHECKPOINTS = (0.001, 0.25, 0.5, 0.9)
+
+
+def run_stream(stream, bars, names, timings=None):
+    """逐bar推进，返回 {line: array}"""
+    out = {name: np.empty(len(bars)) for name in names}
+    for i, bar in enumerate(bars):
+        if timings is None:
+            result = stream.update(bar)
+        else:
+            start_time = time.perf_counter()
+            result = stream.update(bar)
+            timings.append(time.perf_counter() - start_time)
+        for name in names:
+            out[name][i] = result[name]
+    return out
+
+
+def check_symbol(symbol, interval='2h'):
+    """单币种验证，返回 (是否通过, {用例: 延迟列表})"""
+    df = load_symbol(symbol, interval)
+    high, low, close = (df[col].to_numpy(dtype=np.float64) for col in ('high', 'low', 'close'))
+    # 模拟实盘收盘推送：普通Python dict
+    bars = [dict(high=h, low=l, close=c) for h, l, c in zip(high.tolist(), low.tolist(), close.tolist())]
+
+    passed = True
+    latencies = {}
+    for name, stream_cls, batch_fn, kwargs in STREAM_CASES:
+        names = LINES[stream_cls]
+        batch = batch_fn(high, low, close, **kwargs)
+        timings = []
+        streamed = run_stream(stream_cls(**kwargs), bars, names, timings)
+        latencies[name] = timings
+
+        problems = []
+        for line in names:
+            mismatches, max_rel = compare_arrays(streamed[line], batch[line], line in SIGNAL_LINES)
+            if mismatches:
+                problems.append(f"{line}: {mismatches} mismatched bars (max rel {max_rel:.2e})")
+
+        # 中途快照 → JSON → 恢复，后续输出必须与不中断的流逐位一致
+        for fraction in CHECKPOINTS:
+            cut = max(1, int(len(bars) * fraction))
+            stream = stream_cls(**kwargs)
+            run_stream(stream, bars[:cut], names)
+            restored = stream_cls.from_state(json.loads(json.dumps(stream.to_state())))
+            tail = run_stream(restored, bars[cut:], names)
+            for line in names:
+                if not np.array_equal(tail[line], streamed[line][cut:], equal_nan=True):
+                    problems.append(f"{line}: restore at bar {cut} diverged")
+
+        passed = passed and not problems
+        status = "[PASS]" if not problems else "[FAIL]"
+        print(f"   {status} {symbol} {name}: {len(bars)} bars, {len(CHECKPOINTS)} restore points")
+        for problem in problems:
+            print(f"      {problem}")
+    return passed, latencies
+
+
+def run_streaming_suite(symbols=SYMBOLS, interval='2h'):
+    print(f"\n[START] Streaming indicator verification - {len(symbols)} symbols, {interval}")
+    all_passed = True
+    latencies = {name: [] for name, _, _, _ in STREAM_CASES}
+    for symbol in symbols:
+        passed, symbol_latencies = check_symbol(symbol, interval)
+        all_passed = all_passed and passed
+        for name, timings in symbol_latencies.items():
+            latencies[name].extend(timings)
+
+    print("\n[LATENCY] update() per bar")
+    for name, timings in latencies.items():
+        timings = np.array(timings) * 1e6
+        print(f"   {name:15s} median {np.median(timings):6.1f}us  p99 {np.percentile(timings, 99):6.1f}us  "
+              f"max {timings.max():8.1f}us")
+
+    print(f"\n[SUMMARY] Streaming {'PASSED' if all_passed else 'FAILED'}")
+    return all_passed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="流式指标与批量计算一致性验证")
+    parser.add_argument("--symbol", help="只验证单个币种（默认9个币种全部验证）")
+    parser.add_argument("--interval", default='2h', help="时间框架 (默认: 2h)")
+
+    args = parser.parse_args()
+
+    symbols = [args.symbol] if args.symbol else SYMBOLS
+    passed = run_streaming_suite(symbols, args.interval)
+    sys.exit(0 if passed else 1)
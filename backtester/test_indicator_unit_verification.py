@@ -7,6 +7,8 @@ Four Swords Indicator Unit Verification
 - 输入 previous=0、±1e−14、±常数段；输出无 Inf/NaN，符号与预期一致
 - 预热期内不产出任何信号/数值
 - 全序列统计：分母被替换的bar占比 < 0.5%；给出首末时间戳
+- SafeMathMixin.safe_divide_array 与标量 safe_div 逐元素一致（含负分母、±1e−20、0），
+  监控器计数等于被替换的分母个数
 """
 import os
 import sys
@@ -23,7 +25,8 @@ from indicators.sqzmom_safe import SqueezeMomentumSafe
 from indicators.wavetrend_safe import WaveTrendSafe
 from utils.safe_math import (
     DEBUG_DENOMINATOR_REPLACEMENT, DEBUG_LOG_TRIGGERS, 
-    DenominatorMonitor, SAFE_EPS_STANDARD, SAFE_EPS_RELAXED, SAFE_EPS_STRICT
+    DenominatorMonitor, SafeMathMixin, safe_div,
+    SAFE_EPS_STANDARD, SAFE_EPS_RELAXED, SAFE_EPS_STRICT
 )
 
 
@@ -105,6 +108,12 @@ class IndicatorTestStrategy(bt.Strategy):
         print(f"[STATS] Valid range: {self.first_valid_bar} -> {self.last_valid_bar}")
         
         if self.params.enable_monitoring:
+            # 汇总指标内部的分母计数
+            if hasattr(self, 'sqzmom'):
+                self.sqzmom_monitor.merge(*self.sqzmom.denominator_monitors.values())
+            if hasattr(self, 'wavetrend'):
+                self.wavetrend_monitor.merge(self.wavetrend.denominator_monitor)
+
             if hasattr(self, 'sqzmom_monitor'):
                 summary = self.sqzmom_monitor.get_summary()
                 print(f"\n[MONITOR] SQZMOM Report:")
@@ -177,6 +186,24 @@ def create_synthetic_test_data():
     return df
 
 
+def verify_signed_array_division(eps_value=SAFE_EPS_STANDARD):
+    """数组版安全除法保留分母符号：与标量 safe_div 逐元素一致，监控器计数与替换个数一致"""
+    numerator = np.array([1.0, 1.0, 1.0, 1.0, 1.0, -1.0])
+    denominator = np.array([-2.0, -1e-20, 1e-20, 3.0, 0.0, -1e-20])
+    expected = np.array([safe_div(n, d, eps_value) for n, d in zip(numerator, denominator)])
+
+    mixin = SafeMathMixin(eps=eps_value)
+    result = mixin.safe_divide_array(numerator, denominator)
+    replacements = mixin.denominator_monitor.get_summary()['replacements']
+    expected_replacements = int(np.count_nonzero(np.abs(denominator) < eps_value))
+
+    passed = np.array_equal(result, expected) and replacements == expected_replacements
+    status = "[PASS]" if passed else "[FAIL]"
+    print(f"{status} Signed array division: {result.tolist()} vs safe_div {expected.tolist()}, "
+          f"replacements {replacements}/{expected_replacements}")
+    return passed
+
+
 def run_indicator_verification(data_source="synthetic", eps_value=SAFE_EPS_STANDARD, indicator_type='both'):
     """
     运行指标验证测试
@@ -190,6 +217,9 @@ def run_indicator_verification(data_source="synthetic", eps_value=SAFE_EPS_STAND
     print(f"   Data source: {data_source}")
     print(f"   EPS value: {eps_value}")
     print(f"   Indicator type: {indicator_type}")
+
+    if not verify_signed_array_division(eps_value):
+        return False
     
     # 准备数据
     if data_source == "synthetic":
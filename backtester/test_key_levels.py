@@ -0,0 +1,335 @@
+"""
+Key Levels Verification
+关键位验证 - indicators.key_levels vs Pine原版逐bar移植
+
+验收点:
+- period_levels() 的日/周/月开盘价、上一周期高低收与枢轴位与逐bar按日历日期分组的移植完全一致
+- 日线上一周期最高最低价与仓库中的1d数据文件一致（完整的日）
+- key_level_zones() 与逐bar移植的 Bj_Key_Levels.pine（box数组、_align / _color / _numLevel / _detect、
+  breakOut / breakDwn）完全一致（HA / 实体 / high_low 三种枢轴来源、不对齐区）
+- 无前视: 截断到任意前缀计算的结果与全量计算的对应部分相同
+- PeriodLevelStream / KeyLevelZoneStream（numba / numpy 两种内核后端）及 PeriodKeyLevels / KeyLevelZones
+  指标 runonce / next 与批量计算一致
+- 报告批量、流式与逐bar移植的耗时
+"""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+import backtrader as bt
+
+# Add path for imports
+sys.path.append(os.path.dirname(__file__))
+
+import kernels
+from indicators.key_levels import (
+    KEY_ZONE_NAMES, PERIOD_LEVEL_NAMES, KeyLevelZones, KeyLevelZoneStream, PeriodKeyLevels, PeriodLevelStream,
+    key_level_zones, period_levels,
+)
+from test_indicator_parity import DATA_DIR, load_symbol
+
+
+PERIODS = ('D', 'W', 'M')
+ZONE_PARAMS = [dict(), dict(source='body', n_pivots=3), dict(source='high_low', left=10, right=5, align=False)]
+PREFIXES = (0.3, 0.55, 0.8)
+
+
+def reference_period_levels(open_time, open_, high, low, close, period):
+    """按日历日期逐bar分组的移植，返回 (9, bar数)"""
+    stamps = pd.to_datetime(open_time, unit='ms')
+    if period == 'D':
+        keys = [ts.date() for ts in stamps]
+    elif period == 'W':
+        keys = [ts.isocalendar()[:2] for ts in stamps]
+    else:
+        keys = [(ts.year, ts.month) for ts in stamps]
+    out = np.full((9, len(close)), np.nan)
+    current = previous = None
+    for t, key in enumerate(keys):
+        if key != (current or {}).get('key'):
+            previous = current
+            current = {'key': key, 'open': open_[t], 'high': high[t], 'low': low[t]}
+        current['high'] = max(current['high'], high[t])
+        current['low'] = min(current['low'], low[t])
+        current['close'] = close[t]
+        out[0, t] = current['open']
+        if previous is not None:
+            h, l, c = previous['high'], previous['low'], previous['close']
+            p = (h + l + c) / 3
+            out[1:, t] = (h, l, c, p, 2 * p - l, 2 * p - h, p + (h - l), p - (h - l))
+    return out
+
+
+def _pine_atr(high, low, close, length):
+    """ta.atr: ta.rma(ta.tr(true))，首个完整窗口均值作种子"""
+    out = [float('nan')] * len(close)
+    value = None
+    total = 0.0
+    for t in range(len(close)):
+        tr = high[t] - low[t] if t == 0 else max(high[t] - low[t], abs(high[t] - close[t - 1]),
+                                                abs(low[t] - close[t - 1]))
+        if value is None:
+            total += tr
+            if t == length - 1:
+                value = total / length
+        else:
+            value = (1 - 1.0 / length) * value + tr * (1.0 / length)
+        out[t] = float('nan') if value is None else value
+    return out
+
+
+def _pivot(values, t, left, right, high):
+    """ta.pivothigh / pivotlow 在bar t 的返回值（中心为 t - right，严格大于/小于两侧）"""
+    center = t - right
+    if center - left < 0:
+        return None
+    value = values[center]
+    for k in range(center - left, t + 1):
+        if k != center and not (values[k] < value if high else values[k] > value):
+            return None
+    return value
+
+
+def reference_zones(open_, high, low, close, left=20, right=15, n_pivots=4, atr_length=30, mult=0.5,
+                    max_percent=5.0, source='HA', align=True):
+    """Bj_Key_Levels.pine 区部分的逐bar移植，返回 (7, bar数)，顺序同 KEY_ZONE_NAMES"""
+    n = len(close)
+    ha_open, ha_close = [], []
+    for t in range(n):
+        ha_close.append((open_[t] + high[t] + low[t] + close[t]) / 4)
+        ha_open.append((open_[t] + close[t]) / 2 if t == 0 else (ha_open[t - 1] + ha_close[t - 1]) / 2)
+    if source == 'HA':
+        src_high = [max(c, o) for o, c in zip(ha_open, ha_close)]
+        src_low = [min(c, o) for o, c in zip(ha_open, ha_close)]
+    elif source == 'body':
+        src_high = [max(c, o) for o, c in zip(open_, close)]
+        src_low = [min(c, o) for o, c in zip(open_, close)]
+    else:
+        src_high, src_low = list(high), list(low)
+    atr = _pine_atr(high, low, close, atr_length)
+    width = [min(a * mult, c * (max_percent / 100)) / 2 if a == a else float('nan') for a, c in zip(atr, close)]
+
+    nan = float('nan')
+    boxes = {'high': [[nan, nan] for _ in range(n_pivots)], 'low': [[nan, nan] for _ in range(n_pivots)]}
+    bulls = {'high': [None] * n_pivots, 'low': [None] * n_pivots}
+    tracks = {'high': n_pivots, 'low': n_pivots}
+    out = np.full((7, n), np.nan)
+    previous_tracks = dict(tracks)
+
+    def _align(x, y):
+        for i in range(len(boxes[x])):
+            T, B = boxes[y][0]
+            t_, b_ = boxes[x][i]
+            if T > b_ and T < t_ or B < t_ and B > b_ or T > t_ and B < b_ or B > b_ and T < t_:
+                boxes[y][0] = [t_, b_]
+
+    for t in range(n):
+        band = width[t - right] if t >= right else nan
+        for side, values, is_high in (('high', src_high, True), ('low', src_low, False)):
+            level = _pivot(values, t, left, right, is_high)
+            if level is not None:
+                bulls[side].insert(0, not is_high)
+                bulls[side].pop()
+                boxes[side].insert(0, [level + band, level - band])
+                boxes[side].pop()
+        if align:
+            _align('high', 'high')
+            _align('high', 'low')
+            _align('low', 'low')
+            _align('low', 'high')
+        for side in ('high', 'low'):
+            for i, (top, bottom) in enumerate(boxes[side]):
+                is_bull = bulls[side][i]
+                if close[t] > top and is_bull is False:
+                    bulls[side][i] = True
+                    tracks[side] += 1
+                if close[t] < bottom and is_bull is True:
+                    bulls[side][i] = False
+                    tracks[side] -= 1
+        above = sum(1 for side in bulls for b in bulls[side] if b)
+        total = sum(1 for side in bulls for b in bulls[side] if b is not None)
+        found, found_bull = False, False
+        for side in ('high', 'low'):
+            for i, (top, bottom) in enumerate(boxes[side]):
+                if low[t] < top and high[t] > bottom:
+                    found = True
+                    found_bull = found_bull or bulls[side][i] is True
+                    break
+        tops = [top for side in boxes for top, _ in boxes[side] if top < close[t]]
+        bottoms = [bottom for side in boxes for _, bottom in boxes[side] if bottom > close[t]]
+        window = close[max(0, t - right + 1):t + 1]
+        highest = t >= right - 1 and close[t] == max(window)
+        lowest = t >= right - 1 and close[t] == min(window)
+        breakout = tracks['high'] > previous_tracks['high'] and highest and above == total
+        breakdown = tracks['low'] < previous_tracks['low'] and lowest and above == 0
+        previous_tracks = dict(tracks)
+        out[:, t] = (max(tops) if tops else nan, min(bottoms) if bottoms else nan,
+                     (1 if found_bull else -1) if found else 0, above, total, breakout, breakdown)
+    return out
+
+
+def _same(a, b):
+    return np.array_equal(np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64), equal_nan=True)
+
+
+def check_reference(open_time, open_, high, low, close):
+    problems = []
+    for period in PERIODS:
+        expected = reference_period_levels(open_time, open_, high, low, close, period)
+        result = period_levels(open_time, open_, high, low, close, period)
+        for k, name in enumerate(PERIOD_LEVEL_NAMES):
+            if not _same(result[name], expected[k]):
+                problems.append(f"period_levels {period} {name} differs from calendar port")
+    for params in ZONE_PARAMS:
+        expected = reference_zones(open_, high, low, close, **params)
+        result = key_level_zones(open_, high, low, close, **params)
+        for k, name in enumerate(KEY_ZONE_NAMES):
+            if not _same(result[name], expected[k]):
+                diff = int((~np.isclose(result[name], expected[k], rtol=0, atol=0, equal_nan=True)).sum())
+                problems.append(f"key_level_zones {params} {name}: {diff} bars differ from Pine port")
+    return problems
+
+
+def check_daily_file(symbol, interval, open_time, open_, high, low, close):
+    """日线上一周期最高最低价 vs 仓库中的1d数据文件（仅比较基础数据完整覆盖的日）"""
+    path = os.path.join(DATA_DIR, symbol, '1d', f'{symbol}-1d-merged.csv')
+    if interval == '1d' or not os.path.exists(path):
+        return []
+    problems = []
+    levels = period_levels(open_time, open_, high, low, close, 'D')
+    day = open_time // 86_400_000 * 86_400_000
+    counts = pd.Series(day).value_counts()
+    base_ms = int(np.median(np.diff(open_time)))
+    complete = set(counts.index[counts * base_ms == 86_400_000])
+    stored = pd.read_csv(path).set_index('open_time')
+    prev_day = day - 86_400_000
+    mask = np.array([d in complete for d in prev_day]) & np.isin(prev_day, stored.index.to_numpy())
+    for column in ('high', 'low'):
+        expected = stored.loc[prev_day[mask], column].to_numpy()
+        mismatches = int((~np.isclose(levels[f'prev_{column}'][mask], expected)).sum())
+        if mismatches:
+            problems.append(f"daily prev_{column}: {mismatches}/{int(mask.sum())} bars differ from 1d file")
+    print(f"   daily prev high/low checked against 1d file on {int(mask.sum())} bars")
+    return problems
+
+
+def check_causality(open_time, open_, high, low, close):
+    problems = []
+    full_levels = {period: period_levels(open_time, open_, high, low, close, period) for period in PERIODS}
+    full_zones = key_level_zones(open_, high, low, close)
+    for fraction in PREFIXES:
+        end = int(len(close) * fraction)
+        args = (open_[:end], high[:end], low[:end], close[:end])
+        for period in PERIODS:
+            prefix = period_levels(open_time[:end], *args, period)
+            if any(not _same(prefix[name], full_levels[period][name][:end]) for name in PERIOD_LEVEL_NAMES):
+                problems.append(f"period_levels {period} prefix {fraction:.0%} differs from full run")
+        prefix = key_level_zones(*args)
+        if any(not _same(prefix[name], full_zones[name][:end]) for name in KEY_ZONE_NAMES):
+            problems.append(f"key_level_zones prefix {fraction:.0%} differs from full run")
+    return problems
+
+
+def check_stream(open_time, open_, high, low, close):
+    problems = []
+    for period in PERIODS:
+        stream = PeriodLevelStream(period)
+        rows = np.array([stream.update(*bar) for bar in zip(open_time.tolist(), open_, high, low, close)])
+        batch = period_levels(open_time, open_, high, low, close, period)
+        for k, name in enumerate(PERIOD_LEVEL_NAMES):
+            if not _same(rows[:, k], batch[name]):
+                problems.append(f"PeriodLevelStream {period} {name} differs from batch")
+    original = kernels.get_backend()
+    try:
+        for backend in ('numba', 'numpy') if kernels.HAS_NUMBA else ('numpy',):
+            kernels.set_backend(backend)
+            for params in ZONE_PARAMS:
+                stream = KeyLevelZoneStream(**params)
+                rows = np.array([stream.update(*bar) for bar in zip(open_, high, low, close)])
+                batch = key_level_zones(open_, high, low, close, **params)
+                for k, name in enumerate(KEY_ZONE_NAMES):
+                    if not _same(rows[:, k], batch[name]):
+                        problems.append(f"{backend} KeyLevelZoneStream {params} {name} differs from batch")
+    finally:
+        kernels.set_backend(original)
+    return problems
+
+
+class KeyLevelStrategy(bt.Strategy):
+    def __init__(self):
+        self.levels = PeriodKeyLevels(self.data, period='W')
+        self.zones = KeyLevelZones(self.data)
+
+
+def check_indicator(df, open_time, open_, high, low, close):
+    problems = []
+    expected = {'levels': period_levels(open_time, open_, high, low, close, 'W'),
+                'zones': key_level_zones(open_, high, low, close)}
+    for runonce in (True, False):
+        cerebro = bt.Cerebro(runonce=runonce, stdstats=False)
+        cerebro.adddata(bt.feeds.PandasData(dataname=df))
+        cerebro.addstrategy(KeyLevelStrategy)
+        strategy = cerebro.run()[0]
+        for attr, names in (('levels', PERIOD_LEVEL_NAMES), ('zones', KEY_ZONE_NAMES)):
+            for name in names:
+                values = np.array(getattr(getattr(strategy, attr).lines, name).array)
+                if not _same(values, expected[attr][name]):
+                    problems.append(f"{'once' if runonce else 'next'} {attr} {name} differs from batch")
+    return problems
+
+
+def _timed(func, *args):
+    start_time = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start_time
+
+
+def report(open_time, open_, high, low, close):
+    key_level_zones(open_[:200], high[:200], low[:200], close[:200])  # 预热JIT内核
+    zones = key_level_zones(open_, high, low, close)
+    print(f"   zones: breakouts {int(zones['breakout'].sum())}, breakdowns {int(zones['breakdown'].sum())}, "
+          f"bars inside a zone {int((zones['zone'] != 0).sum())}/{len(close)}")
+
+    def stream_zones():
+        stream = KeyLevelZoneStream()
+        for bar in zip(open_, high, low, close):
+            stream.update(*bar)
+
+    args = (open_time, open_, high, low, close)
+    print(f"   period levels D/W/M: batch {sum(_timed(period_levels, *args, p) for p in PERIODS) * 1000:.1f}ms, "
+          f"calendar port {sum(_timed(reference_period_levels, *args, p) for p in PERIODS):.2f}s")
+    print(f"   key zones: batch {_timed(key_level_zones, open_, high, low, close) * 1000:.1f}ms, "
+          f"stream {_timed(stream_zones) * 1000:.1f}ms, "
+          f"Pine port {_timed(reference_zones, open_.tolist(), high.tolist(), low.tolist(), close.tolist()):.2f}s")
+
+
+def run_key_levels_check(symbol='SUIUSDT', interval='2h'):
+    df = load_symbol(symbol, interval)
+    open_time = df['open_time'].to_numpy(dtype=np.int64)
+    open_, high, low, close = (df[col].to_numpy(dtype=np.float64) for col in ('open', 'high', 'low', 'close'))
+    print(f"\n[START] Key levels verification - {symbol} {interval}, {len(df)} bars")
+
+    bars = (open_time, open_, high, low, close)
+    problems = (check_reference(*bars) + check_daily_file(symbol, interval, *bars) + check_causality(*bars) +
+                check_stream(*bars) + check_indicator(df, *bars))
+    report(*bars)
+
+    passed = not problems
+    for problem in problems:
+        print(f"   [FAIL] {problem}")
+    print(f"\n[SUMMARY] Key levels {'PASSED' if passed else 'FAILED'}")
+    return passed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="关键位一致性与无前视验证")
+    parser.add_argument("--symbol", default='SUIUSDT', help="币种 (默认: SUIUSDT)")
+    parser.add_argument("--interval", default='2h', help="时间框架 (默认: 2h)")
+
+    args = parser.parse_args()
+
+    passed = run_key_levels_check(args.symbol, args.interval)
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,197 @@
+"""
+Lorentzian Classification Verification
+Lorentzian近邻分类验证 - kernels.knn / LorentzianClassification vs Pine原版逐行移植
+
+验收点:
+- 近邻投票与逐行移植的Pine循环（var数组unshift/pop、last_dist、间隔4抽样）逐位一致，
+  numba / numpy 两个后端均验证；含默认参数与 neighbors=5, max_bars_back=300, spacing=3
+- LorentzianClassificationStream 逐bar结果与批量计算一致（特征误差 < 1e-9，prediction/signal 完全一致），
+  中途 to_state()/from_state() 恢复后继续推进结果不变，近邻历史内存不随bar数增长
+- LorentzianClassification 指标 runonce / next 两种模式与批量计算一致
+- 报告 2h 与 1h 数据上各实现的吞吐量（bars/s）
+"""
+import os
+import sys
+import json
+import math
+import time
+import numpy as np
+import backtrader as bt
+
+# Add path for imports
+sys.path.append(os.path.dirname(__file__))
+
+import kernels
+from kernels.knn import lorentzian_knn
+from indicators.lorentzian_classification import (
+    LorentzianClassification, LorentzianClassificationStream, lorentzian_classification_arrays,
+    lorentzian_features, lorentzian_labels,
+)
+from test_indicator_parity import DATA_DIR, compare_arrays, load_symbol
+
+
+PARAM_SETS = [dict(neighbors=8, max_bars_back=2000, spacing=4),
+              dict(neighbors=5, max_bars_back=300, spacing=3)]
+# 逐行移植的参考实现是纯Python循环，默认参数只验证前若干根
+REFERENCE_BARS = 4000
+
+
+def reference_knn(features, labels, neighbors=8, max_bars_back=2000, spacing=4):
+    """ML_Lorentzian_Classification.pine 近邻部分的逐行移植（列表unshift/pop）"""
+    f_arrays = [[] for _ in range(features.shape[1])]
+    train_labels = []
+    distances, predictions = [], []
+    out = []
+    for bar_index in range(len(labels)):
+        current = features[bar_index].tolist()
+        for values, f in zip(f_arrays, current):
+            values.insert(0, f)
+        train_labels.insert(0, labels[bar_index])
+
+        last_dist = -1.0
+        size = min(max_bars_back - 1, len(train_labels) - 1)
+        if bar_index >= max_bars_back:
+            for i in range(0, size + 1, spacing):
+                d = 0.0
+                for values, f in zip(f_arrays, current):
+                    d += math.log(1 + abs(f - values[i]))
+                if d >= last_dist:
+                    distances.insert(0, d)
+                    predictions.insert(0, train_labels[i])
+                    if len(predictions) > neighbors:
+                        last_dist = distances[int(neighbors * 3 / 4)]
+                        distances.pop()
+                        predictions.pop()
+        out.append(float(sum(predictions)))
+    return np.array(out)
+
+
+def check_knn(high, low, close):
+    problems = []
+    features, labels = lorentzian_features(high, low, close), lorentzian_labels(close)
+    backends = ('numba', 'numpy') if kernels.HAS_NUMBA else ('numpy',)
+    previous = kernels.get_backend()
+    try:
+        for params in PARAM_SETS:
+            bars = REFERENCE_BARS if params['max_bars_back'] >= 1000 else len(close)
+            expected = reference_knn(features[:bars], labels[:bars], **params)
+            for backend in backends:
+                kernels.set_backend(backend)
+                prediction = lorentzian_knn(features[:bars], labels[:bars], **params)
+                if not np.array_equal(prediction, expected):
+                    problems.append(f"{backend} {params}: {int((prediction != expected).sum())} bars "
+                                    f"differ from Pine port")
+    finally:
+        kernels.set_backend(previous)
+    return problems
+
+
+def check_stream(high, low, close, batch):
+    problems = []
+    stream = LorentzianClassificationStream()
+    ring_bytes = stream.neighbors.features.nbytes + stream.neighbors.labels.nbytes
+    half = len(close) // 2
+    rows = [stream.push(h, l, c) for h, l, c in zip(high[:half], low[:half], close[:half])]
+    # 中途导出/恢复状态（经JSON往返）
+    stream = LorentzianClassificationStream.from_state(json.loads(json.dumps(stream.to_state())))
+    rows += [stream.push(h, l, c) for h, l, c in zip(high[half:], low[half:], close[half:])]
+    rows = np.array(rows)
+
+    for k, name in enumerate(('prediction', 'signal')):
+        if not np.array_equal(rows[:, k], batch[name]):
+            problems.append(f"stream {name}: {int((rows[:, k] != batch[name]).sum())} bars differ from batch")
+    if stream.neighbors.features.nbytes + stream.neighbors.labels.nbytes != ring_bytes:
+        problems.append("stream history grew with bar count")
+
+    features = stream.features.__class__()
+    streamed = np.array([features.push(h, l, c) for h, l, c in zip(high, low, close)])
+    for k in range(streamed.shape[1]):
+        mismatches, max_rel = compare_arrays(streamed[:, k], batch['features'][:, k], False)
+        if mismatches:
+            problems.append(f"stream feature {k}: {mismatches} bars differ (max rel {max_rel:.2e})")
+    return problems
+
+
+class LorentzianStrategy(bt.Strategy):
+    def __init__(self):
+        self.lorentzian = LorentzianClassification(self.data)
+
+
+def check_indicator(df, batch):
+    problems = []
+    for runonce in (True, False):
+        cerebro = bt.Cerebro(runonce=runonce, stdstats=False)
+        cerebro.adddata(bt.feeds.PandasData(dataname=df))
+        cerebro.addstrategy(LorentzianStrategy)
+        indicator = cerebro.run()[0].lorentzian
+        for name in ('prediction', 'signal'):
+            values = np.array(getattr(indicator.lines, name).array)
+            if not np.array_equal(values, batch[name]):
+                mode = 'once' if runonce else 'next'
+                problems.append(f"{mode} {name}: {int((values != batch[name]).sum())} bars differ from batch")
+    return problems
+
+
+def report_throughput(symbol, interval):
+    """各实现每秒处理的bar数（近邻搜索只计 max_bars_back 之后实际搜索的bar）"""
+    path = os.path.join(DATA_DIR, symbol, interval, f'{symbol}-{interval}-merged.csv')
+    if not os.path.exists(path):
+        print(f"   [SKIP] {symbol} {interval}: no data")
+        return
+    df = load_symbol(symbol, interval)
+    high, low, close = (df[col].to_numpy(dtype=np.float64) for col in ('high', 'low', 'close'))
+    features, labels = lorentzian_features(high, low, close), lorentzian_labels(close)
+    lorentzian_knn(features[:2100], labels[:2100])  # JIT预热
+
+    def rate(func, bars):
+        start_time = time.perf_counter()
+        func()
+        return bars / (time.perf_counter() - start_time)
+
+    rates = {'features': rate(lambda: lorentzian_features(high, low, close), len(close))}
+    searched = REFERENCE_BARS - 2000
+    rates['knn (' + kernels.get_backend() + ')'] = rate(lambda: lorentzian_knn(features, labels), len(close) - 2000)
+    rates['batch total'] = rate(lambda: lorentzian_classification_arrays(high, low, close), len(close))
+    if kernels.get_backend() == 'numba':
+        kernels.set_backend('numpy')
+        try:
+            rates['knn (numpy)'] = rate(lambda: lorentzian_knn(features[:REFERENCE_BARS], labels[:REFERENCE_BARS]),
+                                        searched)
+        finally:
+            kernels.set_backend('numba')
+    stream = LorentzianClassificationStream()
+    rates['stream'] = rate(lambda: [stream.push(h, l, c) for h, l, c in zip(high, low, close)], len(close))
+    rates['pine port knn'] = rate(lambda: reference_knn(features[:REFERENCE_BARS], labels[:REFERENCE_BARS]),
+                                  searched)
+    print(f"   {symbol} {interval} ({len(close)} bars): " +
+          ", ".join(f"{name} {value:,.0f}" for name, value in rates.items()) + " bars/s")
+
+
+def run_lorentzian_check(symbol='SUIUSDT', interval='2h'):
+    df = load_symbol(symbol, interval)
+    high, low, close = (df[col].to_numpy(dtype=np.float64) for col in ('high', 'low', 'close'))
+    print(f"\n[START] Lorentzian classification verification - {symbol} {interval}, {len(df)} bars")
+
+    batch = lorentzian_classification_arrays(high, low, close)
+    problems = check_knn(high, low, close) + check_stream(high, low, close, batch) + check_indicator(df, batch)
+    for bench_interval in ('2h', '1h'):
+        report_throughput(symbol, bench_interval)
+
+    passed = not problems
+    for problem in problems:
+        print(f"   [FAIL] {problem}")
+    print(f"\n[SUMMARY] Lorentzian classification {'PASSED' if passed else 'FAILED'}")
+    return passed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Lorentzian近邻分类一致性与吞吐量验证")
+    parser.add_argument("--symbol", default='SUIUSDT', help="币种 (默认: SUIUSDT)")
+    parser.add_argument("--interval", default='2h', help="时间框架 (默认: 2h)")
+
+    args = parser.parse_args()
+
+    passed = run_lorentzian_check(args.symbol, args.interval)
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,180 @@
+"""
+Moving Average Bank Verification
+多周期均线组验证 - kernels.*_bank 与 KernelMABank vs 逐周期计算
+
+验收点:
+- sma_bank / ema_bank / smma_bank 每一行与对应周期的 sma / ema / smma 逐位一致（numba、numpy 两个后端）
+- ema / smma 及其 bank 在 numba 与 numpy 两个后端之间逐位一致（种子和均为 math.fsum 的正确舍入结果）
+- KernelMABank 各line与逐个 KernelSMA / KernelEMA 一致（runonce 逐位一致，next 误差 < 1e-9），
+  策略首个 next() 位置不变
+- 报告20条EMA网格：一次 ema_bank 遍历 vs 20次 ema 调用；Cerebro中一个 KernelMABank vs 20个 KernelEMA
+"""
+import os
+import sys
+import time
+import numpy as np
+import backtrader as bt
+
+# Add path for imports
+sys.path.append(os.path.dirname(__file__))
+
+import kernels
+from indicators.kernel_indicators import KernelMABank, KernelEMA, KernelSMA
+from test_indicator_parity import compare_arrays, load_symbol
+
+
+PERIOD_SETS = [(5, 10, 20, 50), (8, 13, 21, 34, 55, 89, 144, 233), tuple(range(5, 105, 5))]
+SINGLE = {'sma': kernels.sma, 'ema': kernels.ema, 'smma': kernels.smma}
+BANK = {'sma': kernels.sma_bank, 'ema': kernels.ema_bank, 'smma': kernels.smma_bank}
+REFERENCE_INDICATORS = {'sma': (KernelSMA, 'sma'), 'ema': (KernelEMA, 'ema')}
+GRID_PERIODS = tuple(range(5, 105, 5))
+
+
+def check_kernels(close):
+    problems = []
+    # 开头NaN（上游指标预热）与中途NaN
+    src = close.copy()
+    src[:7] = np.nan
+    src[len(src) // 2] = np.nan
+    backends = ('numba', 'numpy') if kernels.HAS_NUMBA else ('numpy',)
+    previous = kernels.get_backend()
+    outputs = {}
+    try:
+        for backend in backends:
+            kernels.set_backend(backend)
+            for kind, bank_fn in BANK.items():
+                for periods in PERIOD_SETS:
+                    bank = bank_fn(src, periods)
+                    outputs[backend, kind, periods] = bank
+                    for k, period in enumerate(periods):
+                        if not np.array_equal(bank[k], SINGLE[kind](src, period), equal_nan=True):
+                            problems.append(f"{backend} {kind}_bank period {period} differs from {kind}()")
+    finally:
+        kernels.set_backend(previous)
+
+    # 递推类均线的两个后端逐位一致（sma 的滑动累加与窗口求和顺序不同，不要求逐位）
+    if len(backends) > 1:
+        for kind in ('ema', 'smma'):
+            for periods in PERIOD_SETS:
+                if not np.array_equal(outputs['numba', kind, periods], outputs['numpy', kind, periods], equal_nan=True):
+                    problems.append(f"{kind}_bank {periods[:3]}...: numba and numpy backends differ")
+    return problems
+
+
+class BankStrategy(bt.Strategy):
+    params = (('periods', ()), ('kind', 'ema'))
+
+    def __init__(self):
+        self.bank = KernelMABank(self.p.periods, self.p.kind)(self.data.close)
+        cls, line = REFERENCE_INDICATORS[self.p.kind]
+        self.singles = [getattr(cls(self.data.close, period=period).lines, line) for period in self.p.periods]
+        self.first_next = None
+
+    def next(self):
+        if self.first_next is None:
+            self.first_next = len(self)
+
+
+class SinglesStrategy(bt.Strategy):
+    params = (('periods', ()), ('kind', 'ema'))
+
+    def __init__(self):
+        cls, _ = REFERENCE_INDICATORS[self.p.kind]
+        self.singles = [cls(self.data.close, period=period) for period in self.p.periods]
+        self.first_next = None
+
+    def next(self):
+        if self.first_next is None:
+            self.first_next = len(self)
+
+
+class GridBankStrategy(bt.Strategy):
+    def __init__(self):
+        self.bank = KernelMABank(GRID_PERIODS)(self.data.close)
+
+
+def run_strategy(df, strategy_cls, runonce, **kwargs):
+    cerebro = bt.Cerebro(runonce=runonce, stdstats=False)
+    cerebro.adddata(bt.feeds.PandasData(dataname=df))
+    cerebro.addstrategy(strategy_cls, **kwargs)
+    return cerebro.run()[0]
+
+
+def check_indicator(df):
+    problems = []
+    for kind in REFERENCE_INDICATORS:
+        for runonce in (True, False):
+            for periods in PERIOD_SETS[:2]:
+                strategy = run_strategy(df, BankStrategy, runonce, periods=periods, kind=kind)
+                singles = run_strategy(df, SinglesStrategy, runonce, periods=periods, kind=kind)
+                if strategy.first_next != singles.first_next:
+                    problems.append(f"{kind} {periods}: first next() {strategy.first_next} != {singles.first_next}")
+                for k, period in enumerate(periods):
+                    bank_line = np.array(strategy.bank.lines[k].array)
+                    single_line = np.array(strategy.singles[k].array)
+                    if runonce:
+                        ok = np.array_equal(bank_line, single_line, equal_nan=True)
+                    else:
+                        ok = compare_arrays(bank_line, single_line, False)[0] == 0
+                    if not ok:
+                        mode = 'once' if runonce else 'next'
+                        problems.append(f"{mode} {kind}_{period}: KernelMABank line differs from single indicator")
+    return problems
+
+
+def report_grid_timing(df, repeat=20):
+    """20条EMA：一次 ema_bank vs 20次 ema；Cerebro runonce 下 KernelMABank vs 20个 KernelEMA"""
+    close = df['close'].to_numpy(dtype=np.float64)
+    kernels.ema_bank(close[:100], GRID_PERIODS)
+    for period in GRID_PERIODS:
+        kernels.ema(close[:100], period)
+
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        kernels.ema_bank(close, GRID_PERIODS)
+    bank_time = (time.perf_counter() - start_time) / repeat
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        for period in GRID_PERIODS:
+            kernels.ema(close, period)
+    single_time = (time.perf_counter() - start_time) / repeat
+    print(f"   {len(GRID_PERIODS)}-EMA grid ({kernels.get_backend()}): bank {bank_time * 1000:.2f}ms "
+          f"vs singles {single_time * 1000:.2f}ms ({single_time / bank_time:.1f}x)")
+
+    timings = {}
+    for name, strategy_cls, kwargs in (('baseline', bt.Strategy, {}), ('bank', GridBankStrategy, {}),
+                                       ('singles', SinglesStrategy, dict(periods=GRID_PERIODS, kind='ema'))):
+        start_time = time.perf_counter()
+        run_strategy(df, strategy_cls, True, **kwargs)
+        timings[name] = time.perf_counter() - start_time
+    print(f"   Cerebro runonce over empty-strategy baseline ({timings['baseline']:.2f}s): "
+          f"bank +{timings['bank'] - timings['baseline']:.2f}s, "
+          f"{len(GRID_PERIODS)} KernelEMA +{timings['singles'] - timings['baseline']:.2f}s")
+
+
+def run_ma_bank_check(symbol='SUIUSDT', interval='2h'):
+    df = load_symbol(symbol, interval)
+    close = df['close'].to_numpy(dtype=np.float64)
+    print(f"\n[START] Moving average bank verification - {symbol} {interval}, {len(df)} bars")
+
+    problems = check_kernels(close) + check_indicator(df)
+    report_grid_timing(df)
+
+    passed = not problems
+    for problem in problems:
+        print(f"   [FAIL] {problem}")
+    print(f"\n[SUMMARY] MA bank {'PASSED' if passed else 'FAILED'}")
+    return passed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="多周期均线组一致性验证")
+    parser.add_argument("--symbol", default='SUIUSDT', help="币种 (默认: SUIUSDT)")
+    parser.add_argument("--interval", default='2h', help="时间框架 (默认: 2h)")
+
+    args = parser.parse_args()
+
+    passed = run_ma_bank_check(args.symbol, args.interval)
+    sys.exit(0 if passed else 1)
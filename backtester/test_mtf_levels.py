@@ -0,0 +1,228 @@
+"""
+Multi-Timeframe Level Engine Verification
+多周期水平位引擎验证 - indicators.mtf_levels vs Pine原版逐bar移植
+
+验收点:
+- 前高前低与首次突破信号与逐bar移植的 Breakout Detector（timeframe.change 时收尾上一周期，
+  crossph 由 close > prevh 置位）完全一致
+- 支撑阻力区与逐bar移植的高周期枢轴区（request.security(x[1], lookahead_on) 对齐）完全一致
+- 无前视: 截断到任意前缀计算的结果与全量计算的对应部分相同
+- 由基础周期重采样的4h/1d最高最低价与仓库中的4h/1d数据文件一致（完整周期）
+- 同一数据集重复调用命中缓存；MTFLevelStream 及 MTFLevels 指标 runonce / next 与批量计算一致
+"""
+import os
+import sys
+import time
+import numpy as np
+import backtrader as bt
+
+# Add path for imports
+sys.path.append(os.path.dirname(__file__))
+
+from indicators.mtf_levels import (
+    DEFAULT_TIMEFRAMES, LEVEL_NAMES, MTFLevels, MTFLevelStream, mtf_levels, period_index, resample_bars,
+)
+from test_indicator_parity import DATA_DIR, load_symbol
+
+
+PREFIXES = (0.3, 0.55, 0.8)
+
+
+def reference_breakouts(open_time, high, low, close, timeframe):
+    """Breakout Detector 的逐bar移植: 返回 prev_high, prev_low, break_up, break_down"""
+    periods = period_index(open_time, timeframe).tolist()
+    n = len(close)
+    out = np.full((4, n), np.nan)
+    prevh = prevl = None
+    period_max = period_min = None
+    crossph = crosspl = False
+    for t in range(n):
+        if t == 0 or periods[t] != periods[t - 1]:
+            if t > 0:
+                prevh, prevl = period_max, period_min
+            period_max, period_min = high[t], low[t]
+            crossph = crosspl = False
+        else:
+            period_max = max(period_max, high[t])
+            period_min = min(period_min, low[t])
+        was_up, was_down = crossph, crosspl
+        if prevh is not None and close[t] > prevh:
+            crossph = True
+        if prevl is not None and close[t] < prevl:
+            crosspl = True
+        out[0, t] = np.nan if prevh is None else prevh
+        out[1, t] = np.nan if prevl is None else prevl
+        out[2, t] = crossph and not was_up
+        out[3, t] = crosspl and not was_down
+    return out
+
+
+def reference_zones(high, low, length, margin):
+    """高周期枢轴区的逐bar移植（高周期bar收盘时的最新区）"""
+    n = len(high)
+    out = np.full((4, n), np.nan)
+    zones = {True: [], False: []}
+    state = [np.nan] * 4
+    for t in range(2 * length, n):
+        recent = high[t - length + 1:t + 1], low[t - length + 1:t + 1]
+        m = (max(recent[0]) - min(recent[1])) / max(recent[0])
+        for resistance, values, slot in ((True, high, 0), (False, low, 2)):
+            window = values[t - 2 * length:t + 1]
+            level = window[length]
+            others = np.delete(window, length)
+            if not (others < level).all() if resistance else not (others > level).all():
+                continue
+            bands = [(z[1] * (1 - z[2] * .17 * margin), z[0] * (1 + z[2] * .17 * margin))
+                     for z in zones[resistance]]
+            if any(lower <= level <= upper for lower, upper in bands):
+                continue
+            width = level * m * .17 * margin
+            zone = (level, level - width, m) if resistance else (level + width, level, m)
+            zones[resistance] = [zone] + zones[resistance][:1]
+            state[slot:slot + 2] = zone[:2]
+        out[:, t] = state
+    return out
+
+
+def reference_levels(open_time, high, low, close, timeframe, length=15, margin=2.0):
+    out = dict(zip(LEVEL_NAMES[:4], reference_breakouts(open_time, high, low, close, timeframe)))
+    htf = resample_bars(open_time, close, high, low, close, timeframe)
+    zones = reference_zones(htf['high'], htf['low'], length, margin)
+    for name, values in zip(LEVEL_NAMES[4:], zones):
+        out[name] = np.r_[np.nan, values][htf['group']]
+    return out
+
+
+def _same(a, b):
+    return np.array_equal(np.asarray(a), np.asarray(b), equal_nan=True)
+
+
+def check_reference(open_time, high, low, close, levels):
+    problems = []
+    for timeframe in DEFAULT_TIMEFRAMES:
+        expected = reference_levels(open_time, high, low, close, timeframe)
+        for name in LEVEL_NAMES:
+            if not _same(levels[timeframe][name], expected[name]):
+                diff = int((~np.isclose(levels[timeframe][name], expected[name], equal_nan=True)).sum())
+                problems.append(f"{timeframe} {name}: {diff} bars differ from Pine port")
+    return problems
+
+
+def check_causality(open_time, high, low, close, levels):
+    problems = []
+    for fraction in PREFIXES:
+        end = int(len(close) * fraction)
+        partial = mtf_levels(open_time[:end], high[:end], low[:end], close[:end])
+        for timeframe in DEFAULT_TIMEFRAMES:
+            for name in LEVEL_NAMES:
+                if not _same(partial[timeframe][name], levels[timeframe][name][:end]):
+                    problems.append(f"lookahead: {timeframe} {name} changes when truncated to {end} bars")
+    return problems
+
+
+def check_resample(symbol, interval, open_time, high, low, close):
+    """重采样结果 vs 仓库中的高周期数据文件（仅比较基础数据完整覆盖的周期）"""
+    import pandas as pd
+
+    problems = []
+    base_ms = int(np.median(np.diff(open_time)))
+    for timeframe in ('4h', '1d'):
+        path = os.path.join(DATA_DIR, symbol, timeframe, f'{symbol}-{timeframe}-merged.csv')
+        if timeframe == interval or not os.path.exists(path):
+            continue
+        htf = resample_bars(open_time, close, high, low, close, timeframe)
+        complete = (htf['last'] - htf['first'] + 1) * base_ms == (24 if timeframe == '1d' else 4) * 3_600_000
+        stored = pd.read_csv(path).set_index('open_time')
+        common = np.isin(htf['open_time'], stored.index.to_numpy()) & complete
+        keys = htf['open_time'][common]
+        for column in ('high', 'low'):
+            mismatches = int((~np.isclose(htf[column][common], stored.loc[keys, column].to_numpy())).sum())
+            if mismatches:
+                problems.append(f"resampled {timeframe} {column}: {mismatches}/{len(keys)} periods differ from file")
+        print(f"   resample {interval} -> {timeframe}: {len(keys)} complete periods checked against file")
+    return problems
+
+
+def check_stream(open_time, high, low, close, levels):
+    problems = []
+    for timeframe in DEFAULT_TIMEFRAMES:
+        stream = MTFLevelStream(timeframe)
+        rows = np.array([stream.update(*bar) for bar in zip(open_time.tolist(), high, low, close)])
+        for k, name in enumerate(LEVEL_NAMES):
+            if not _same(rows[:, k], levels[timeframe][name]):
+                problems.append(f"stream {timeframe} {name} differs from batch")
+    return problems
+
+
+class LevelStrategy(bt.Strategy):
+    def __init__(self):
+        self.levels = MTFLevels(self.data, timeframe='1d')
+
+
+def check_indicator(df, levels):
+    problems = []
+    for runonce in (True, False):
+        cerebro = bt.Cerebro(runonce=runonce, stdstats=False)
+        cerebro.adddata(bt.feeds.PandasData(dataname=df))
+        cerebro.addstrategy(LevelStrategy)
+        indicator = cerebro.run()[0].levels
+        for name in LEVEL_NAMES:
+            if not _same(np.array(getattr(indicator.lines, name).array), levels['1d'][name]):
+                problems.append(f"{'once' if runonce else 'next'} {name} differs from batch")
+    return problems
+
+
+def report(open_time, high, low, close, levels):
+    for timeframe in DEFAULT_TIMEFRAMES:
+        current = levels[timeframe]
+        print(f"   {timeframe}: breaks up {int(current['break_up'].sum())}, "
+              f"down {int(current['break_down'].sum())}; latest resistance "
+              f"{current['resistance_bottom'][-1]:.4f}-{current['resistance_top'][-1]:.4f}, support "
+              f"{current['support_bottom'][-1]:.4f}-{current['support_top'][-1]:.4f}")
+    # 新数组对象（内容相同）同样命中缓存
+    start_time = time.perf_counter()
+    cached = mtf_levels(open_time.copy(), high.copy(), low.copy(), close.copy())
+    hit_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    for timeframe in DEFAULT_TIMEFRAMES:
+        reference_levels(open_time, high, low, close, timeframe)
+    reference_time = time.perf_counter() - start_time
+    print(f"   cached call {hit_time * 1000:.2f}ms (hit: {cached is levels}); Pine port {reference_time:.2f}s")
+    return [] if cached is levels else ["repeat call on same dataset missed the cache"]
+
+
+def run_mtf_levels_check(symbol='SUIUSDT', interval='2h'):
+    df = load_symbol(symbol, interval)
+    open_time = df['open_time'].to_numpy(dtype=np.int64)
+    high, low, close = (df[col].to_numpy(dtype=np.float64) for col in ('high', 'low', 'close'))
+    print(f"\n[START] Multi-timeframe level engine verification - {symbol} {interval}, {len(df)} bars")
+
+    mtf_levels(open_time[:200], high[:200], low[:200], close[:200])  # 预热JIT内核
+    start_time = time.perf_counter()
+    levels = mtf_levels(open_time, high, low, close)
+    print(f"   {', '.join(DEFAULT_TIMEFRAMES)} levels in {(time.perf_counter() - start_time) * 1000:.1f}ms")
+
+    problems = (check_reference(open_time, high, low, close, levels) +
+                check_causality(open_time, high, low, close, levels) +
+                check_resample(symbol, interval, open_time, high, low, close) +
+                check_stream(open_time, high, low, close, levels) + check_indicator(df, levels) +
+                report(open_time, high, low, close, levels))
+
+    passed = not problems
+    for problem in problems:
+        print(f"   [FAIL] {problem}")
+    print(f"\n[SUMMARY] Multi-timeframe level engine {'PASSED' if passed else 'FAILED'}")
+    return passed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="多周期水平位引擎一致性与无前视验证")
+    parser.add_argument("--symbol", default='SUIUSDT', help="币种 (默认: SUIUSDT)")
+    parser.add_argument("--interval", default='2h', help="时间框架 (默认: 2h)")
+
+    args = parser.parse_args()
+
+    passed = run_mtf_levels_check(args.symbol, args.interval)
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,235 @@
+"""
+Multi-Timeframe Trend Score Verification
+多周期趋势评分验证 - indicators.mtf_trend vs pandas重采样 + 逐bar EMA参考实现
+
+验收点:
+- 各档 EMA(20) > EMA(50) 趋势与参考实现完全一致: pandas.resample 聚合高周期收盘价、逐bar递推EMA、
+  按"基础bar收盘时间 >= 高周期结束时间"以 merge_asof 对齐（严格只用已收盘的高周期bar）
+- 数据缺失（随机删除bar，含高周期最后一根bar）时与参考实现一致
+- 无前视: 截断到任意前缀计算的结果与全量计算的对应部分相同
+- 由基础周期聚合的4h趋势与仓库中4h数据文件上直接计算的趋势一致
+- MTFTrendStream（numba / numpy 两种内核后端）及 MTFTrendScore 指标 runonce / next 与批量计算一致
+- FourSwordsSwingStrategyV20MTF 回测: 报告MTF评分过滤前后的信号数与相对单周期运行的耗时
+"""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+import backtrader as bt
+
+# Add path for imports
+sys.path.append(os.path.dirname(__file__))
+
+import kernels
+from indicators.mtf_trend import (
+    DEFAULT_TIMEFRAMES, DEFAULT_WEIGHTS, SCORE_NAMES, MTFTrendScore, MTFTrendStream, mtf_trend_score,
+)
+from strategies.four_swords_swing_strategy_v1_7_4 import FourSwordsSwingStrategyV174
+from strategies.four_swords_swing_strategy_v2_0_mtf import FourSwordsSwingStrategyV20MTF
+from test_indicator_parity import DATA_DIR, load_symbol
+
+
+PREFIXES = (0.3, 0.55, 0.8)
+_PANDAS_RULES = {'15m': '15min', '1h': '1h', '4h': '4h', '1d': '1D'}
+
+
+def _same(a, b):
+    return np.allclose(np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64), equal_nan=True)
+
+
+def reference_ema(values, period):
+    """逐bar递推EMA（首个完整窗口均值作种子）"""
+    out = np.full(len(values), np.nan)
+    alpha = 2.0 / (1.0 + period)
+    for t in range(period - 1, len(values)):
+        out[t] = np.mean(values[:period]) if t == period - 1 else out[t - 1] * (1 - alpha) + values[t] * alpha
+    return out
+
+
+def reference_trend(open_time, close, timeframe, interval_ms, fast=20, slow=50):
+    """pandas重采样 + merge_asof（高周期bar在收盘时间到达其结束时间的第一根基础bar上生效）"""
+    stamps = pd.to_datetime(open_time, unit='ms')
+    htf = pd.Series(close, index=stamps).resample(_PANDAS_RULES[timeframe], label='left', closed='left').last()
+    htf = htf.dropna()
+    ema_fast, ema_slow = reference_ema(htf.to_numpy(), fast), reference_ema(htf.to_numpy(), slow)
+    known = ~np.isnan(ema_slow)
+    htf_end = htf.index + pd.Timedelta(_PANDAS_RULES[timeframe])
+    table = pd.DataFrame({'end': htf_end, 'bull': np.where(known, ema_fast > ema_slow, np.nan),
+                          'bear': np.where(known, ema_fast < ema_slow, np.nan)})
+    bars = pd.DataFrame({'close_time': stamps + pd.Timedelta(milliseconds=interval_ms)})
+    merged = pd.merge_asof(bars, table, left_on='close_time', right_on='end', direction='backward')
+    return merged['bull'].to_numpy(dtype=np.float64), merged['bear'].to_numpy(dtype=np.float64)
+
+
+def check_reference(open_time, close, interval_ms, label):
+    problems = []
+    result = mtf_trend_score(open_time, close, interval_ms=interval_ms)
+    score = np.zeros(len(close))
+    for timeframe, weight in zip(DEFAULT_TIMEFRAMES, DEFAULT_WEIGHTS):
+        bull, bear = reference_trend(open_time, close, timeframe, interval_ms)
+        if not (_same(result[f'bull_{timeframe}'], bull) and _same(result[f'bear_{timeframe}'], bear)):
+            problems.append(f"{label} {timeframe} trend differs from pandas reference")
+        score += weight * bull
+    if not _same(result['score'], score):
+        problems.append(f"{label} weighted score differs from reference")
+    return problems
+
+
+def with_gaps(open_time, close, seed=7):
+    """随机删除约2%的bar（含高周期最后一根bar的情形）"""
+    rng = np.random.default_rng(seed)
+    keep = rng.random(len(close)) > 0.02
+    keep[:2] = True
+    return open_time[keep], close[keep]
+
+
+def check_causality(open_time, close, result):
+    problems = []
+    interval_ms = int(np.median(np.diff(open_time)))
+    for fraction in PREFIXES:
+        end = int(len(close) * fraction)
+        prefix = mtf_trend_score(open_time[:end], close[:end], interval_ms=interval_ms)
+        for name in SCORE_NAMES:
+            if not _same(prefix[name], result[name][:end]):
+                problems.append(f"{name} on {fraction:.0%} prefix differs from full run (lookahead)")
+    return problems
+
+
+def check_file(symbol, interval, open_time, close, result):
+    """由基础周期聚合的4h趋势 vs 4h数据文件上直接计算的趋势"""
+    problems = []
+    path = os.path.join(DATA_DIR, symbol, '4h', f'{symbol}-4h-merged.csv')
+    if interval == '4h' or '4h' not in DEFAULT_TIMEFRAMES or not os.path.exists(path):
+        return problems
+    stored = pd.read_csv(path)
+    stored = stored[(stored['open_time'] >= open_time[0]) & (stored['open_time'] <= open_time[-1])]
+    closes = stored['close'].to_numpy(dtype=np.float64)
+    bull = np.where(np.isnan(reference_ema(closes, 50)), np.nan, reference_ema(closes, 20) > reference_ema(closes, 50))
+    ends = stored['open_time'].to_numpy(dtype=np.int64) + 4 * 3_600_000
+    interval_ms = int(np.median(np.diff(open_time)))
+    visible = np.searchsorted(ends, open_time + interval_ms, side='right') - 1
+    expected = np.r_[np.nan, bull][visible + 1]
+    actual = result['bull_4h']
+    valid = ~np.isnan(expected) & ~np.isnan(actual)
+    agreement = float((expected[valid] == actual[valid]).mean()) if valid.any() else 0.0
+    if agreement < 0.999:
+        problems.append(f"4h trend from {interval} agrees with the 4h file on {agreement:.2%} of bars")
+    print(f"   {interval} -> 4h trend vs 4h file: {agreement:.3%} agreement on {int(valid.sum())} bars")
+    return problems
+
+
+def check_stream(open_time, close, result, label):
+    problems = []
+    original = kernels.get_backend()
+    try:
+        for backend in ('numba', 'numpy') if kernels.HAS_NUMBA else ('numpy',):
+            kernels.set_backend(backend)
+            stream = MTFTrendStream()
+            rows = np.array([stream.update(t, c) for t, c in zip(open_time.tolist(), close.tolist())])
+            for k, name in enumerate(SCORE_NAMES):
+                if not _same(rows[:, k], result[name]):
+                    problems.append(f"{backend} {label} stream {name} differs from batch")
+    finally:
+        kernels.set_backend(original)
+    return problems
+
+
+class ScoreStrategy(bt.Strategy):
+    def __init__(self):
+        self.mtf = MTFTrendScore(self.data)
+
+
+def check_indicator(df, result):
+    problems = []
+    for runonce in (True, False):
+        cerebro = bt.Cerebro(runonce=runonce, stdstats=False)
+        cerebro.adddata(bt.feeds.PandasData(dataname=df))
+        cerebro.addstrategy(ScoreStrategy)
+        indicator = cerebro.run()[0].mtf
+        for name in SCORE_NAMES:
+            if not _same(np.array(getattr(indicator.lines, name).array), result[name]):
+                problems.append(f"{'once' if runonce else 'next'} {name} differs from batch")
+    return problems
+
+
+def _run_strategy(df, cls, **params):
+    cerebro = bt.Cerebro(stdstats=False)
+    cerebro.adddata(bt.feeds.PandasData(dataname=df))
+    cerebro.broker.setcash(10000.0)
+    cerebro.addstrategy(cls, trade_direction='both', **params)
+    start_time = time.perf_counter()
+    strategy = cerebro.run()[0]
+    return strategy, time.perf_counter() - start_time
+
+
+def report_strategy(df):
+    problems = []
+    devnull = open(os.devnull, 'w')
+    stdout, sys.stdout = sys.stdout, devnull
+    try:
+        _run_strategy(df.iloc[:600], FourSwordsSwingStrategyV20MTF)  # 预热JIT内核
+        single, single_time = _run_strategy(df, FourSwordsSwingStrategyV20MTF, use_mtf_filter=False)
+        mtf, mtf_time = _run_strategy(df, FourSwordsSwingStrategyV20MTF)
+        base, _ = _run_strategy(df, FourSwordsSwingStrategyV174)
+    finally:
+        sys.stdout = stdout
+        devnull.close()
+
+    counters, single_counters = mtf.counters, single.counters
+    before = counters['key_level_passed_long'] + counters['key_level_passed_short']
+    after = counters['mtf_passed_long'] + counters['mtf_passed_short']
+    if counters['wt_passed_long'] + counters['wt_passed_short'] > \
+            single_counters['wt_passed_long'] + single_counters['wt_passed_short']:
+        problems.append("MTF filter let through more signals than the single-timeframe run")
+    if base.mtf_trend is not None:
+        problems.append("v1.7.4 built the MTF indicator although use_mtf_filter is off")
+    print(f"   FourSwords v2.0 MTF: {after}/{before} filtered signals pass the MTF score, "
+          f"{counters['wt_passed_long']} long / {counters['wt_passed_short']} short after WaveTrend "
+          f"(single timeframe: {single_counters['wt_passed_long']} / {single_counters['wt_passed_short']})")
+    print(f"   backtest {single_time:.2f}s single timeframe vs {mtf_time:.2f}s MTF "
+          f"({(mtf_time / single_time - 1) * 100:+.1f}%)")
+    return problems
+
+
+def run_mtf_trend_check(symbol='SUIUSDT', interval='1h'):
+    df = load_symbol(symbol, interval)
+    open_time = df['open_time'].to_numpy(dtype=np.int64)
+    close = df['close'].to_numpy(dtype=np.float64)
+    print(f"\n[START] Multi-timeframe trend score verification - {symbol} {interval}, {len(df)} bars")
+
+    mtf_trend_score(open_time[:200], close[:200])  # 预热JIT内核
+    start_time = time.perf_counter()
+    result = mtf_trend_score(open_time, close)
+    print(f"   {', '.join(DEFAULT_TIMEFRAMES)} score in {(time.perf_counter() - start_time) * 1000:.1f}ms, "
+          f"score >= 0.6 on {int((result['score'] >= 0.6).sum())}/{len(close)} bars")
+
+    interval_ms = int(np.median(np.diff(open_time)))
+    gap_time, gap_close = with_gaps(open_time, close)
+    gap_result = mtf_trend_score(gap_time, gap_close, interval_ms=interval_ms)
+    problems = (check_reference(open_time, close, interval_ms, 'full') +
+                check_reference(gap_time, gap_close, interval_ms, 'gapped') +
+                check_causality(open_time, close, result) +
+                check_file(symbol, interval, open_time, close, result) +
+                check_stream(open_time, close, result, 'full') +
+                check_stream(gap_time, gap_close, gap_result, 'gapped') +
+                check_indicator(df, result) + report_strategy(df))
+
+    passed = not problems
+    for problem in problems:
+        print(f"   [FAIL] {problem}")
+    print(f"\n[SUMMARY] Multi-timeframe trend score {'PASSED' if passed else 'FAILED'}")
+    return passed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="多周期趋势评分一致性与无前视验证")
+    parser.add_argument("--symbol", default='SUIUSDT', help="币种 (默认: SUIUSDT)")
+    parser.add_argument("--interval", default='1h', help="时间框架 (默认: 1h，高周期档位由其聚合)")
+
+    args = parser.parse_args()
+
+    passed = run_mtf_trend_check(args.symbol, args.interval)
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,381 @@
+"""
+Pine Transpiler Verification
+Pine转译验证 - pine.transpile 生成的向量化函数 vs 手工移植与逐bar参考实现
+
+验收点:
+- pine.runtime 的 ta.* 向量化实现与按Pine文档定义式逐bar计算的参考实现一致
+  （linreg / wma / stdev / dev / cci / rsi / atr / mfi / valuewhen / barssince / crossover / change / pivothigh / pivotlow）
+- SQZMOM_WaveTrend.pine 转译结果: wt1 / wt2 与 wavetrend_arrays 一致，sqzOn / sqzOff 与
+  squeeze_momentum_arrays（BB倍数取 multKC，同Pine脚本）在 lookback 之后一致
+- Squeeze_Momentum_LB.pine（v4旧写法）转译结果: val 与逐bar线性回归参考一致
+- pinescript/indicators 下所有脚本宽松模式均可转译、编译并在真实数据上运行；报告语句覆盖率
+- strict 模式对不支持的语句抛出 PineTranspileError；命令行生成的模块可直接 import
+- 报告转译与计算耗时
+"""
+import glob
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+# Add path for imports
+sys.path.append(os.path.dirname(__file__))
+
+from pine import PineTranspileError, transpile, transpile_file
+from pine import runtime as rt
+from indicators.sqzmom_safe import squeeze_momentum_arrays, squeeze_momentum_lookback
+from indicators.wavetrend_safe import wavetrend_arrays
+from test_indicator_parity import load_symbol
+
+
+PINE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pinescript', 'indicators')
+
+
+def _same(a, b, rtol=1e-9, atol=1e-9):
+    a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+    return a.shape == b.shape and np.allclose(a, b, rtol=rtol, atol=atol, equal_nan=True)
+
+
+# === 逐bar参考实现 ===
+
+def _window(x, t, length):
+    return None if t < length - 1 else np.asarray(x[t - length + 1:t + 1])
+
+
+def ref_linreg(x, length, offset):
+    out = np.full(len(x), np.nan)
+    for t in range(len(x)):
+        window = _window(x, t, length)
+        if window is not None:
+            slope, intercept = np.polyfit(np.arange(length), window, 1)
+            out[t] = intercept + slope * (length - 1 - offset)
+    return out
+
+
+def ref_wma(x, length):
+    out = np.full(len(x), np.nan)
+    for t in range(len(x)):
+        window = _window(x, t, length)
+        if window is not None:
+            out[t] = sum(window[i] * (i + 1) for i in range(length)) / (length * (length + 1) / 2)
+    return out
+
+
+def ref_stdev(x, length):
+    out = np.full(len(x), np.nan)
+    for t in range(len(x)):
+        window = _window(x, t, length)
+        if window is not None:
+            out[t] = np.sqrt(np.mean((window - window.mean()) ** 2))
+    return out
+
+
+def ref_dev(x, length):
+    out = np.full(len(x), np.nan)
+    for t in range(len(x)):
+        window = _window(x, t, length)
+        if window is not None:
+            out[t] = np.mean(np.abs(window - window.mean()))
+    return out
+
+
+def ref_rma(x, length):
+    out = np.full(len(x), np.nan)
+    for t in range(length - 1, len(x)):
+        if np.isnan(out[t - 1]) if t else True:
+            window = x[t - length + 1:t + 1]
+            out[t] = np.mean(window)
+        else:
+            out[t] = (out[t - 1] * (length - 1) + x[t]) / length
+    return out
+
+
+def ref_rsi(x, length):
+    delta = np.full(len(x), np.nan)
+    delta[1:] = np.diff(x)
+    up = ref_rma_skip(np.maximum(delta, 0), length)
+    down = ref_rma_skip(np.maximum(-delta, 0), length)
+    out = np.full(len(x), np.nan)
+    for t in range(len(x)):
+        if np.isnan(up[t]) or np.isnan(down[t]):
+            continue
+        out[t] = 100.0 if down[t] == 0 else 0.0 if up[t] == 0 else 100 - 100 / (1 + up[t] / down[t])
+    return out
+
+
+def ref_rma_skip(x, length):
+    """首个完整窗口（跳过前导na）的均值作种子"""
+    first = int(np.argmax(~np.isnan(x)))
+    out = np.full(len(x), np.nan)
+    out[first:] = ref_rma(x[first:], length)
+    return out
+
+
+def ref_atr(high, low, close, length):
+    tr = np.empty(len(close))
+    tr[0] = high[0] - low[0]
+    for t in range(1, len(close)):
+        tr[t] = max(high[t] - low[t], abs(high[t] - close[t - 1]), abs(low[t] - close[t - 1]))
+    return ref_rma(tr, length)
+
+
+def ref_mfi(src, volume, length):
+    upper_flow = np.zeros(len(src))
+    lower_flow = np.zeros(len(src))
+    for t in range(len(src)):
+        change = src[t] - src[t - 1] if t else np.nan
+        upper_flow[t] = 0.0 if change <= 0 else volume[t] * src[t]
+        lower_flow[t] = 0.0 if change >= 0 else volume[t] * src[t]
+    out = np.full(len(src), np.nan)
+    for t in range(length - 1, len(src)):
+        upper, lower = upper_flow[t - length + 1:t + 1].sum(), lower_flow[t - length + 1:t + 1].sum()
+        out[t] = 100.0 - 100.0 / (1.0 + upper / lower) if lower else (np.nan if not upper else 100.0)
+    return out
+
+
+def ref_valuewhen(cond, x, occurrence):
+    out = np.full(len(x), np.nan)
+    hits = []
+    for t in range(len(x)):
+        if cond[t]:
+            hits.append(x[t])
+        if len(hits) > occurrence:
+            out[t] = hits[-1 - occurrence]
+    return out
+
+
+def ref_barssince(cond):
+    out = np.full(len(cond), np.nan)
+    last = None
+    for t in range(len(cond)):
+        if cond[t]:
+            last = t
+        if last is not None:
+            out[t] = t - last
+    return out
+
+
+def ref_crossover(a, b):
+    return np.array([t > 0 and a[t] > b[t] and a[t - 1] <= b[t - 1] for t in range(len(a))])
+
+
+def ref_pivot(x, left, right, high):
+    out = np.full(len(x), np.nan)
+    for t in range(left + right, len(x)):
+        center = t - right
+        others = np.concatenate([x[center - left:center], x[center + 1:t + 1]])
+        if (x[center] > others).all() if high else (x[center] < others).all():
+            out[t] = x[center]
+    return out
+
+
+def check_runtime(open_, high, low, close, volume):
+    problems = []
+    n = 1500
+    h, l, c, v = high[:n], low[:n], close[:n], volume[:n]
+    hl2 = (h + l) / 2
+    fast, slow = rt.sma(c, 10), rt.sma(c, 30)
+    cross = rt.crossover(fast, slow)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cases = [
+            ('linreg', rt.linreg(c, 20, 0), ref_linreg(c, 20, 0)),
+            ('linreg offset', rt.linreg(c, 14, 3), ref_linreg(c, 14, 3)),
+            ('wma', rt.wma(c, 9), ref_wma(c, 9)),
+            ('stdev', rt.stdev(c, 20), ref_stdev(c, 20)),
+            ('dev', rt.dev(c, 20), ref_dev(c, 20)),
+            ('cci', rt.cci(hl2, 20), (hl2 - rt.sma(hl2, 20)) / (0.015 * ref_dev(hl2, 20))),
+            ('rsi', rt.rsi(c, 14), ref_rsi(c, 14)),
+            ('atr', rt.atr(h, l, c, 14), ref_atr(h, l, c, 14)),
+            ('mfi', rt.mfi(hl2, v, 14), ref_mfi(hl2, v, 14)),
+            ('valuewhen', rt.valuewhen(cross, c, 1), ref_valuewhen(cross, c, 1)),
+            ('barssince', rt.barssince(cross), ref_barssince(cross)),
+            ('crossover', cross, ref_crossover(fast, slow)),
+            ('change', rt.change(c, 3), np.concatenate([np.full(3, np.nan), c[3:] - c[:-3]])),
+            ('pivothigh', rt.pivothigh(h, 5, 3), ref_pivot(h, 5, 3, True)),
+            ('pivotlow', rt.pivotlow(l, 4, 4), ref_pivot(l, 4, 4, False)),
+        ]
+    for name, actual, expected in cases:
+        if not _same(actual, expected, rtol=1e-7, atol=1e-7):
+            problems.append(f"runtime {name} differs from per-bar reference")
+    return problems
+
+
+def check_sqzmom_wavetrend(open_, high, low, close, volume):
+    problems = []
+    result = transpile_file(os.path.join(PINE_DIR, 'oscillator', 'SQZMOM_WaveTrend.pine'))
+    out = result.compile()(open_, high, low, close, volume)
+
+    wave = wavetrend_arrays(high, low, close, n1=10, n2=21)
+    for name in ('wt1', 'wt2'):
+        if not _same(out[name], wave[name]):
+            problems.append(f"SQZMOM_WaveTrend {name} differs from wavetrend_arrays")
+
+    squeeze = squeeze_momentum_arrays(high, low, close, bb_mult=1.5)
+    start = squeeze_momentum_lookback(20, 20, True)
+    for pine_name, name in (('sqzOn', 'squeeze_on'), ('sqzOff', 'squeeze_off')):
+        if not np.array_equal(out[pine_name][start:], squeeze[name][start:].astype(bool)):
+            problems.append(f"SQZMOM_WaveTrend {pine_name} differs from squeeze_momentum_arrays")
+    if not any('var' in text or ':=' in text for _, text, _ in result.unsupported):
+        problems.append("SQZMOM_WaveTrend: var / := state tracking should be reported as unsupported")
+
+    try:
+        transpile_file(os.path.join(PINE_DIR, 'oscillator', 'SQZMOM_WaveTrend.pine'), strict=True)
+        problems.append("strict transpile of SQZMOM_WaveTrend did not raise")
+    except PineTranspileError:
+        pass
+    return problems
+
+
+def check_squeeze_lb(open_, high, low, close, volume):
+    problems = []
+    result = transpile_file(os.path.join(PINE_DIR, 'oscillator', 'Squeeze_Momentum_LB.pine'), strict=True)
+    out = result.compile()(open_, high, low, close, volume, lengthKC=20)
+    n = 1500
+    h, l, c = high[:n], low[:n], close[:n]
+    mid = ((rt.highest(h, 20) + rt.lowest(l, 20)) / 2 + rt.sma(c, 20)) / 2
+    expected = ref_linreg(c - mid, 20, 0)
+    if not _same(out['val'][:n], expected, rtol=1e-7, atol=1e-7):
+        problems.append("Squeeze_Momentum_LB val differs from per-bar linreg reference")
+    if 'val' not in result.plots.values():
+        problems.append("Squeeze_Momentum_LB val not registered as plot output")
+    return problems
+
+
+def check_expressions(open_, high, low, close, volume):
+    """子集语法: 用户函数内联、元组返回、三元、nz、历史引用、input.source、与Python内置名冲突的变量改名"""
+    problems = []
+    source = '\n'.join([
+        '//@version=5',
+        'indicator("Expression subset")',
+        'src = input.source(hl2, "Source")',
+        'len = input.int(14, "Length")',
+        'band(x, n) =>',
+        '    basis = ta.sma(x, n)',
+        '    width = 2 * ta.stdev(x, n)',
+        '    [basis + width, basis - width]',
+        'pick(x) =>',
+        '    if x > 0',
+        '        1',
+        '    else if x < 0',
+        '        -1',
+        '    else',
+        '        0',
+        '[upper, lower] = band(src, len)',
+        'mid = (upper + lower) / 2, spread = upper - lower',
+        'up = close > nz(close[2], close) ? ta.change(close) : na',
+        'dir = pick(ta.change(close, 3))',
+        'hit = ta.crossover(close, upper) or ta.crossunder(close, lower)',
+        'last = ta.valuewhen(hit, close, 0)',
+        'plot(mid, "Mid")',
+    ])
+    result = transpile(source, strict=True)
+    out = result.compile()(open_, high, low, close, volume, src='close', len_=20)
+    basis, deviation = rt.sma(close, 20), 2 * rt.stdev(close, 20)
+    previous = np.concatenate([[np.nan, np.nan], close[:-2]])
+    delta = np.concatenate([[np.nan], np.diff(close)])
+    delta3 = np.concatenate([np.full(3, np.nan), close[3:] - close[:-3]])
+    hit = rt.crossover(close, basis + deviation) | rt.crossunder(close, basis - deviation)
+    expected = {
+        'upper': basis + deviation,
+        'lower': basis - deviation,
+        'mid': basis,
+        'spread': 2 * deviation,
+        'up': np.where(close > np.where(np.isnan(previous), close, previous), delta, np.nan),
+        'dir': np.where(delta3 > 0, 1.0, np.where(delta3 < 0, -1.0, 0.0)),
+        'last': ref_valuewhen(hit, close, 0),
+    }
+    for name, values in expected.items():
+        if not _same(out[name], values):
+            problems.append(f"expression subset {name} differs from hand-written NumPy")
+    if result.plots != {'Mid': 'mid'} or result.params != {'src': 'hl2', 'len_': 14}:
+        problems.append(f"expression subset metadata: plots={result.plots}, params={result.params}")
+    return problems
+
+
+def check_all_scripts(open_, high, low, close, volume):
+    problems = []
+    paths = sorted(glob.glob(os.path.join(PINE_DIR, '**', '*.pine'), recursive=True))
+    total = translated = 0
+    for path in paths:
+        name = os.path.relpath(path, PINE_DIR)
+        try:
+            result = transpile_file(path)
+            out = result.compile()(open_, high, low, close, volume)
+        except Exception as exc:
+            problems.append(f"{name}: {type(exc).__name__}: {exc}")
+            continue
+        bad = [key for key, values in out.items() if np.shape(values) != close.shape]
+        if bad:
+            problems.append(f"{name}: outputs with wrong shape {bad}")
+        statements = result.translated + len(result.unsupported)
+        total += statements
+        translated += result.translated
+        print(f"   {name:45s} {result.translated:4d}/{statements:<4d} translated, {len(out):3d} series")
+    print(f"   {len(paths)} scripts: {translated}/{total} computational statements translated "
+          f"({translated / max(total, 1):.0%}); the rest is var / := state, loops, arrays or request.*")
+    return problems
+
+
+def check_cli(open_, high, low, close, volume):
+    problems = []
+    pine_path = os.path.join(PINE_DIR, 'oscillator', 'Squeeze_Momentum_LB.pine')
+    with tempfile.TemporaryDirectory() as tmp:
+        target = os.path.join(tmp, 'squeeze_lb.py')
+        completed = subprocess.run([sys.executable, '-m', 'pine', pine_path, '-o', target],
+                                   cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+        if completed.returncode != 0 or not os.path.exists(target):
+            return [f"python -m pine failed: {completed.stderr.strip()}"]
+        spec = importlib.util.spec_from_file_location('squeeze_lb', target)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        generated = module.squeeze_momentum_lb(open_, high, low, close, volume)
+    direct = transpile_file(pine_path).compile()(open_, high, low, close, volume)
+    if not _same(generated['val'], direct['val']) or module.PARAMS.get('length') != 20:
+        problems.append("CLI-generated module differs from in-process transpile")
+    return problems
+
+
+def report(open_, high, low, close, volume):
+    path = os.path.join(PINE_DIR, 'oscillator', 'SQZMOM_WaveTrend.pine')
+    start_time = time.perf_counter()
+    result = transpile_file(path)
+    function = result.compile()
+    transpile_time = time.perf_counter() - start_time
+    function(open_, high, low, close, volume)  # 预热JIT内核
+    start_time = time.perf_counter()
+    function(open_, high, low, close, volume)
+    run_time = time.perf_counter() - start_time
+    print(f"   SQZMOM_WaveTrend: transpile+compile {transpile_time * 1000:.1f}ms, "
+          f"{len(close)} bars {run_time * 1000:.1f}ms ({len(result.outputs)} series)")
+
+
+def run_pine_transpiler_check(symbol='SUIUSDT', interval='2h'):
+    df = load_symbol(symbol, interval)
+    bars = tuple(df[col].to_numpy(dtype=np.float64) for col in ('open', 'high', 'low', 'close', 'volume'))
+    print(f"\n[START] Pine transpiler verification - {symbol} {interval}, {len(df)} bars")
+
+    problems = (check_runtime(*bars) + check_sqzmom_wavetrend(*bars) + check_squeeze_lb(*bars) +
+                check_expressions(*bars) + check_all_scripts(*bars) + check_cli(*bars))
+    report(*bars)
+
+    passed = not problems
+    for problem in problems:
+        print(f"   [FAIL] {problem}")
+    print(f"\n[SUMMARY] Pine transpiler {'PASSED' if passed else 'FAILED'}")
+    return passed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pine转译一致性验证")
+    parser.add_argument("--symbol", default='SUIUSDT', help="币种 (默认: SUIUSDT)")
+    parser.add_argument("--interval", default='2h', help="时间框架 (默认: 2h)")
+
+    args = parser.parse_args()
+
+    passed = run_pine_transpiler_check(args.symbol, args.interval)
+    sys.exit(0 if passed else 1)
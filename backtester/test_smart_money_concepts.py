@@ -0,0 +1,313 @@
+"""
+Smart Money Concepts Verification
+聪明钱结构引擎验证 - indicators.smart_money_concepts vs Pine原版逐行移植
+
+验收点:
+- 事件序列（枢轴、BOS/CHoCH、EQH/EQL、订单块登记/失效、FVG登记/回补）与逐行移植的Pine循环
+  （ta.highest/lowest 逐窗口求值、订单块切片求极值、每bar遍历全部订单块与FVG）完全一致；
+  含默认参数与 swing_length=20, order_block_filter='range', order_block_mitigation='close', confluence_filter=True
+- 订单块/FVG失效: 移植按原版 for [index, x] in arr + arr.remove(index) 逐下标遍历（删除后紧随的记录前移到
+  当前下标而被跳过）；引擎同一bar删除全部满足条件的记录（文档中的差异）。引擎与 pine_removal=False 的移植
+  逐位一致，与原版删除方式的事件差异数量单独报告，且差异只出现在订单块失效 / FVG回补事件上
+- 逐bar swing_trend / internal_trend / trailing_top / trailing_bottom 与参考实现一致
+- SmartMoneyConcepts 指标 runonce / next 两种模式的信号线与批量计算一致
+- 报告引擎与逐行移植的耗时，以及各类事件数量
+"""
+import os
+import sys
+import time
+from collections import Counter
+import numpy as np
+import backtrader as bt
+
+# Add path for imports
+sys.path.append(os.path.dirname(__file__))
+
+from indicators.adaptive_supertrend import pine_atr
+from indicators.smart_money_concepts import (
+    BULLISH, BEARISH, SWING, INTERNAL, EQUAL, CHART, PIVOT_HIGH, PIVOT_LOW, BOS, CHOCH, EQUAL_HIGHS, EQUAL_LOWS,
+    ORDER_BLOCK, ORDER_BLOCK_MITIGATED, FAIR_VALUE_GAP, FAIR_VALUE_GAP_MITIGATED, EVENT_DTYPE, EVENT_NAMES,
+    SmartMoneyConcepts, smart_money_concepts, event_signal,
+)
+from test_indicator_parity import load_symbol
+
+
+PARAM_SETS = [dict(),
+              dict(swing_length=20, order_block_filter='range', order_block_mitigation='close',
+                   confluence_filter=True)]
+
+
+def _pine_ne(x, y):
+    return x == x and y == y and x != y
+
+
+def remove_crossed(records, crossed, pine_removal=True):
+    """
+    for [index, x] in records ... records.remove(index) 的逐下标移植
+
+    pine_removal=True 时同原版: 删除后下一条记录移到当前下标，下标仍前进，该记录本bar被跳过；
+    False 时同引擎: 同一bar删除全部满足条件的记录
+
+    Returns:
+        删除的记录（按遍历顺序）
+    """
+    removed = []
+    index = 0
+    while index < len(records):
+        if crossed(records[index]):
+            removed.append(records.pop(index))
+            if not pine_removal:
+                continue
+        index += 1
+    return removed
+
+
+def reference_smc(open_, high, low, close, swing_length=50, internal_length=5, equal_length=3,
+                  equal_threshold=0.1, order_block_filter='atr', order_block_mitigation='highlow',
+                  confluence_filter=False, fvg_auto_threshold=True, pine_removal=True):
+    """
+    Smart_Money_Concepts.pine 结构部分的逐行移植（列表 unshift/pop，每bar逐下标遍历全部记录）
+
+    pine_removal: 订单块/FVG失效的删除方式，见 remove_crossed()
+    """
+    n = len(close)
+    nan = float('nan')
+    atr_measure = pine_atr(high, low, close, 200)
+    tr = [nan] + [max(high[t] - low[t], abs(high[t] - close[t - 1]), abs(low[t] - close[t - 1]))
+                  for t in range(1, n)]
+    parsed_highs, parsed_lows = [], []
+    events = []
+    swing_trend, internal_trend = np.zeros(n), np.zeros(n)
+    trailing_top, trailing_bottom = np.empty(n), np.empty(n)
+
+    def new_pivot():
+        return {'level': nan, 'last': nan, 'crossed': False, 'bar': -1}
+
+    pivots = {scope: {'high': new_pivot(), 'low': new_pivot()} for scope in (SWING, INTERNAL, EQUAL)}
+    sizes = {SWING: swing_length, INTERNAL: internal_length, EQUAL: equal_length}
+    legs = {SWING: [], INTERNAL: [], EQUAL: []}
+    trend = {SWING: 0, INTERNAL: 0}
+    seen = {(scope, side): [] for scope in (SWING, INTERNAL) for side in ('high', 'low')}
+    blocks = {SWING: [], INTERNAL: []}
+    gaps = []
+    trailing = {'top': nan, 'bottom': nan}
+    cum_tr = cum_delta = 0.0
+
+    for t in range(n):
+        if t > 0:
+            cum_tr += tr[t]
+        if order_block_filter == 'atr':
+            volatility = atr_measure[t]
+        else:
+            volatility = cum_tr / t if t > 0 else nan
+        high_vol = (high[t] - low[t]) >= 2 * volatility
+        parsed_highs.append(low[t] if high_vol else high[t])
+        parsed_lows.append(high[t] if high_vol else low[t])
+
+        # updateTrailingExtremes
+        if trailing['top'] == trailing['top']:
+            trailing['top'] = max(high[t], trailing['top'])
+        if trailing['bottom'] == trailing['bottom']:
+            trailing['bottom'] = min(low[t], trailing['bottom'])
+
+        # deleteFairValueGaps
+        def gap_crossed(gap):
+            return ((low[t] < gap['bottom'] and gap['bias'] == BULLISH) or
+                    (high[t] > gap['top'] and gap['bias'] == BEARISH))
+
+        for gap in remove_crossed(gaps, gap_crossed, pine_removal):
+            events.append((t, FAIR_VALUE_GAP_MITIGATED, CHART, gap['bias'], gap['top'], gap['bottom'], gap['bar']))
+
+        # getCurrentStructure
+        for scope in (SWING, INTERNAL, EQUAL):
+            size = sizes[scope]
+            leg = legs[scope][-1] if legs[scope] else 0
+            if t >= size:
+                if high[t - size] > max(high[t - size + 1:t + 1]):
+                    leg = 0
+                elif low[t - size] < min(low[t - size + 1:t + 1]):
+                    leg = 1
+            legs[scope].append(leg)
+            if t == 0 or legs[scope][-2] == leg:
+                continue
+            side, level = ('low', low[t - size]) if leg == 1 else ('high', high[t - size])
+            pivot = pivots[scope][side]
+            bias = BULLISH if leg == 1 else BEARISH
+            if scope == EQUAL:
+                if abs(pivot['level'] - level) < equal_threshold * atr_measure[t]:
+                    events.append((t, EQUAL_LOWS if leg == 1 else EQUAL_HIGHS, EQUAL, bias,
+                                   max(pivot['level'], level), min(pivot['level'], level), pivot['bar']))
+            else:
+                events.append((t, PIVOT_LOW if leg == 1 else PIVOT_HIGH, scope, bias, level, level, t - size))
+            pivot.update(last=pivot['level'], level=level, crossed=False, bar=t - size)
+            if scope == SWING:
+                trailing['bottom' if leg == 1 else 'top'] = level
+
+        # displayStructure
+        bullish_bar = bearish_bar = True
+        if confluence_filter:
+            bullish_bar = high[t] - max(close[t], open_[t]) > min(close[t], open_[t] - low[t])
+            bearish_bar = high[t] - max(close[t], open_[t]) < min(close[t], open_[t] - low[t])
+        for scope in (INTERNAL, SWING):
+            for side, bias in (('high', BULLISH), ('low', BEARISH)):
+                pivot = pivots[scope][side]
+                history = seen[(scope, side)]
+                history.append(pivot['level'])
+                prev_level = history[-2] if len(history) > 1 else nan
+                prev_close = close[t - 1] if t > 0 else nan
+                if bias == BULLISH:
+                    cross = close[t] > pivot['level'] and prev_close <= prev_level
+                    extra = _pine_ne(pivot['level'], pivots[SWING]['high']['level']) and bullish_bar \
+                        if scope == INTERNAL else True
+                else:
+                    cross = close[t] < pivot['level'] and prev_close >= prev_level
+                    extra = _pine_ne(pivot['level'], pivots[SWING]['low']['level']) and bearish_bar \
+                        if scope == INTERNAL else True
+                if cross and not pivot['crossed'] and extra:
+                    tag = CHOCH if trend[scope] == -bias else BOS
+                    pivot['crossed'] = True
+                    trend[scope] = bias
+                    events.append((t, tag, scope, bias, pivot['level'], pivot['level'], pivot['bar']))
+                    # storeOrdeBlock
+                    if bias == BEARISH:
+                        window = parsed_highs[pivot['bar']:t]
+                        index = pivot['bar'] + window.index(max(window))
+                    else:
+                        window = parsed_lows[pivot['bar']:t]
+                        index = pivot['bar'] + window.index(min(window))
+                    if len(blocks[scope]) >= 100:
+                        blocks[scope].pop()
+                    block = {'high': parsed_highs[index], 'low': parsed_lows[index], 'bar': index, 'bias': bias}
+                    blocks[scope].insert(0, block)
+                    events.append((t, ORDER_BLOCK, scope, bias, block['high'], block['low'], index))
+
+        # deleteOrderBlocks
+        bearish_source = close[t] if order_block_mitigation == 'close' else high[t]
+        bullish_source = close[t] if order_block_mitigation == 'close' else low[t]
+
+        def block_crossed(block):
+            return ((bearish_source > block['high'] and block['bias'] == BEARISH) or
+                    (bullish_source < block['low'] and block['bias'] == BULLISH))
+
+        for scope in (INTERNAL, SWING):
+            for block in remove_crossed(blocks[scope], block_crossed, pine_removal):
+                events.append((t, ORDER_BLOCK_MITIGATED, scope, block['bias'], block['high'], block['low'],
+                               block['bar']))
+
+        # drawFairValueGaps
+        if t >= 1:
+            delta = (close[t - 1] - open_[t - 1]) / (open_[t - 1] * 100)
+            cum_delta += abs(delta)
+            threshold = cum_delta / t * 2 if fvg_auto_threshold else 0.0
+            if t >= 2:
+                if low[t] > high[t - 2] and close[t - 1] > high[t - 2] and delta > threshold:
+                    gaps.insert(0, {'top': low[t], 'bottom': high[t - 2], 'bias': BULLISH, 'bar': t - 1})
+                    events.append((t, FAIR_VALUE_GAP, CHART, BULLISH, low[t], high[t - 2], t - 1))
+                if high[t] < low[t - 2] and close[t - 1] < low[t - 2] and -delta > threshold:
+                    gaps.insert(0, {'top': high[t], 'bottom': low[t - 2], 'bias': BEARISH, 'bar': t - 1})
+                    events.append((t, FAIR_VALUE_GAP, CHART, BEARISH, high[t], low[t - 2], t - 1))
+
+        swing_trend[t], internal_trend[t] = trend[SWING], trend[INTERNAL]
+        trailing_top[t], trailing_bottom[t] = trailing['top'], trailing['bottom']
+
+    return {'events': np.array(events, dtype=EVENT_DTYPE), 'swing_trend': swing_trend,
+            'internal_trend': internal_trend, 'trailing_top': trailing_top, 'trailing_bottom': trailing_bottom}
+
+
+def event_difference(got, want):
+    """两个事件序列互不包含的事件（按多重集合比较）"""
+    got, want = Counter(got.tolist()), Counter(want.tolist())
+    return list((got - want).elements()), list((want - got).elements())
+
+
+def check_reference(open_, high, low, close):
+    problems = []
+    for params in PARAM_SETS:
+        expected = reference_smc(open_, high, low, close, pine_removal=False, **params)
+        result = smart_money_concepts(open_, high, low, close, **params)
+
+        # 原版删除方式（跳过被删记录之后的一条）的差异: 只报告数量，并确认只影响失效事件
+        literal = reference_smc(open_, high, low, close, **params)['events']
+        engine_only, pine_only = event_difference(result['events'], literal)
+        print(f"   {params}: {len(engine_only) + len(pine_only)} of {len(literal)} events differ from Pine's "
+              f"for...in removal (engine only {len(engine_only)}, Pine only {len(pine_only)})")
+        kinds = {event[1] for event in engine_only + pine_only} - {ORDER_BLOCK_MITIGATED, FAIR_VALUE_GAP_MITIGATED}
+        if kinds:
+            problems.append(f"{params}: Pine removal order changed non-mitigation events "
+                            f"{sorted(EVENT_NAMES[kind] for kind in kinds)}")
+        got, want = result['events'], expected['events']
+        if len(got) != len(want) or not np.array_equal(got, want):
+            diff = next((k for k in range(min(len(got), len(want))) if got[k] != want[k]), min(len(got), len(want)))
+            problems.append(f"{params}: event streams differ ({len(got)} vs {len(want)}), first at #{diff}: "
+                            f"{got[diff] if diff < len(got) else None} vs {want[diff] if diff < len(want) else None}")
+        for name in ('swing_trend', 'internal_trend', 'trailing_top', 'trailing_bottom'):
+            if not np.array_equal(result[name], expected[name], equal_nan=True):
+                problems.append(f"{params}: {name} differs from Pine port")
+    return problems
+
+
+class SmartMoneyStrategy(bt.Strategy):
+    def __init__(self):
+        self.smc = SmartMoneyConcepts(self.data)
+
+
+def check_indicator(df, batch):
+    problems = []
+    n = len(df)
+    expected = {'swing_trend': batch['swing_trend'], 'internal_trend': batch['internal_trend'],
+                'trailing_top': batch['trailing_top'], 'trailing_bottom': batch['trailing_bottom']}
+    for name, (kind, scope) in SmartMoneyConcepts._SIGNAL_LINES.items():
+        expected[name] = event_signal(batch['events'], n, kind, scope)
+    for runonce in (True, False):
+        cerebro = bt.Cerebro(runonce=runonce, stdstats=False)
+        cerebro.adddata(bt.feeds.PandasData(dataname=df))
+        cerebro.addstrategy(SmartMoneyStrategy)
+        indicator = cerebro.run()[0].smc
+        mode = 'once' if runonce else 'next'
+        for name, values in expected.items():
+            if not np.array_equal(np.array(getattr(indicator.lines, name).array), values, equal_nan=True):
+                problems.append(f"{mode} {name}: bars differ from batch")
+        if not np.array_equal(np.array(indicator.events, dtype=EVENT_DTYPE), batch['events']):
+            problems.append(f"{mode} events differ from batch")
+    return problems
+
+
+def report(open_, high, low, close, batch):
+    counts = np.bincount(batch['events']['kind'], minlength=len(EVENT_NAMES))
+    print("   events: " + ", ".join(f"{name} {count}" for name, count in zip(EVENT_NAMES, counts)))
+    timings = {}
+    for name, func in (('engine', smart_money_concepts), ('pine port', reference_smc)):
+        start_time = time.perf_counter()
+        func(open_, high, low, close)
+        timings[name] = time.perf_counter() - start_time
+    print(f"   {len(close)} bars: engine {timings['engine'] * 1000:.0f}ms "
+          f"({len(close) / timings['engine']:,.0f} bars/s), pine port {timings['pine port'] * 1000:.0f}ms")
+
+
+def run_smart_money_check(symbol='SUIUSDT', interval='2h'):
+    df = load_symbol(symbol, interval)
+    open_, high, low, close = (df[col].to_numpy(dtype=np.float64) for col in ('open', 'high', 'low', 'close'))
+    print(f"\n[START] Smart Money Concepts verification - {symbol} {interval}, {len(df)} bars")
+
+    batch = smart_money_concepts(open_, high, low, close)
+    problems = check_reference(open_, high, low, close) + check_indicator(df, batch)
+    report(open_, high, low, close, batch)
+
+    passed = not problems
+    for problem in problems:
+        print(f"   [FAIL] {problem}")
+    print(f"\n[SUMMARY] Smart Money Concepts {'PASSED' if passed else 'FAILED'}")
+    return passed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="聪明钱结构引擎一致性与耗时验证")
+    parser.add_argument("--symbol", default='SUIUSDT', help="币种 (默认: SUIUSDT)")
+    parser.add_argument("--interval", default='2h', help="时间框架 (默认: 2h)")
+
+    args = parser.parse_args()
+
+    passed = run_smart_money_check(args.symbol, args.interval)
+    sys.exit(0 if passed else 1)
@@ -277,6 +277,8 @@ class LayeredTestStrategy(bt.Strategy):
         
         # 监控报告
         if self.params.enable_monitoring and hasattr(self, 'monitor'):
+            self.monitor.merge(*self.sqzmom.denominator_monitors.values(),
+                               self.wavetrend.denominator_monitor)
             summary = self.monitor.get_summary()
             print(f"\n[MONITOR] {self.mode.upper()} Report:")
             print(f"   Total checks: {summary['total_checks']}")
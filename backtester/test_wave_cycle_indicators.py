@@ -0,0 +1,246 @@
+"""
+Weis Wave Volume / Cyclic Smoothed RSI Verification
+Weis波量与周期平滑RSI验证 - indicators.weis_wave / indicators.cyclic_rsi vs Pine原版逐bar移植
+
+验收点:
+- weis_wave() 与逐bar移植的 Weis_Wave_Volume.pine 完全一致（含 showDistributionBelowZero、length=4）
+- cyclic_rsi() 与逐bar移植的 RSI_Cyclic_Smoothed_v6.pine（lmin/lmax 循环、101步 × 窗口的计数循环）
+  完全一致（含 cycle=14 / leveling=25 参数）
+- 流式 update() 与批量计算逐位一致（numba / numpy 两种内核后端），中途 to_state() / from_state() 恢复后继续一致
+- WeisWaveVolume / CyclicSmoothedRSI 指标 runonce / next 两种模式与批量计算一致
+- 报告批量、流式与逐bar移植的耗时
+"""
+import os
+import sys
+import time
+import numpy as np
+import backtrader as bt
+
+# Add path for imports
+sys.path.append(os.path.dirname(__file__))
+
+import kernels
+from kernels import StreamingState
+from indicators.weis_wave import WEIS_WAVE_NAMES, WeisWaveStream, WeisWaveVolume, weis_wave
+from indicators.cyclic_rsi import CYCLIC_RSI_NAMES, CyclicRSIStream, CyclicSmoothedRSI, cyclic_rsi
+from test_indicator_parity import load_symbol
+
+
+WEIS_PARAMS = [dict(), dict(distribution_below_zero=True), dict(length=4)]
+CRSI_PARAMS = [dict(), dict(cycle=14, leveling=25.0)]
+
+
+def reference_weis_wave(close, volume, length=2, distribution_below_zero=False):
+    """Weis_Wave_Volume.pine 的逐bar移植，返回 (3, bar数): up, down, wave"""
+    n = len(close)
+    out = np.zeros((3, n))
+    mov_prev = trend = wave = vol = None
+    for t in range(n):
+        mov = 0 if t == 0 else (1 if close[t] > close[t - 1] else -1 if close[t] < close[t - 1] else 0)
+        trend = mov if mov != 0 and mov_prev is not None and mov != mov_prev else (trend or 0)
+        rising = t >= length and all(close[t] > close[t - i] for i in range(1, length + 1))
+        falling = t >= length and all(close[t] < close[t - i] for i in range(1, length + 1))
+        wave_prev = wave or 0
+        new_wave = trend if trend != wave_prev and (rising or falling) else wave_prev
+        vol = vol + volume[t] if wave is not None and new_wave == wave else volume[t]
+        wave, mov_prev = new_wave, mov
+        out[0, t] = vol if wave == 1 else 0.0
+        if distribution_below_zero:
+            out[1, t] = 0.0 if wave == 1 else -vol if wave == -1 else vol
+        else:
+            out[1, t] = 0.0 if wave == 1 else vol
+        out[2, t] = wave
+    return out
+
+
+def _pine_rma(values, length):
+    """ta.rma: 首个完整窗口的 ta.sma 作种子（顺序累加）"""
+    out = [float('nan')] * len(values)
+    previous = None
+    for t, value in enumerate(values):
+        if previous is None:
+            window = values[max(0, t - length + 1):t + 1]
+            if t >= length - 1 and all(v == v for v in window):
+                total = 0.0
+                for v in window:
+                    total += v
+                previous = total / length
+        else:
+            previous = (1 - 1.0 / length) * previous + value * (1.0 / length)
+        out[t] = float('nan') if previous is None else previous
+    return out
+
+
+def reference_cyclic_rsi(close, cycle=20, vibration=10, leveling=10.0):
+    """RSI_Cyclic_Smoothed_v6.pine 的逐bar移植，返回 (3, bar数): crsi, db, ub"""
+    n = len(close)
+    change = [float('nan')] + [close[t] - close[t - 1] for t in range(1, n)]
+    up = _pine_rma([max(c, 0.0) if c == c else c for c in change], cycle // 2)
+    down = _pine_rma([-min(c, 0.0) if c == c else c for c in change], cycle // 2)
+    torque = 2.0 / (vibration + 1)
+    lag = int((vibration - 1) / 2.0)
+    memory = cycle * 2
+    aperc = leveling / 100
+    rsi, crsi = [], []
+    db = ub = float('nan')
+    out = np.full((3, n), np.nan)
+    for t in range(n):
+        u, d = up[t], down[t]
+        rsi.append(float('nan') if u != u else 100.0 if d == 0 else 0.0 if u == 0 else 100 - 100 / (1 + u / d))
+        lagged = rsi[t - lag] if t >= lag else float('nan')
+        previous = crsi[t - 1] if t and crsi[t - 1] == crsi[t - 1] else 0.0
+        crsi.append(torque * (2 * rsi[t] - lagged) + (1 - torque) * previous)
+        window = [crsi[t - m] if t - m >= 0 else float('nan') for m in range(memory)]
+        lmax, lmin = -999999.0, 999999.0
+        for value in window:
+            if value == value and value > lmax:
+                lmax = value
+            if value == value and value < lmin:
+                lmin = value
+        mstep = (lmax - lmin) / 100
+        for steps in range(101):
+            testvalue = lmin + mstep * steps
+            if sum(1 for value in window if value < testvalue) / memory >= aperc:
+                db = testvalue
+                break
+        for steps in range(101):
+            testvalue = lmax - mstep * steps
+            if sum(1 for value in window if value >= testvalue) / memory >= aperc:
+                ub = testvalue
+                break
+        out[:, t] = (crsi[t], db, ub)
+    return out
+
+
+def _same(a, b):
+    return np.array_equal(np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64), equal_nan=True)
+
+
+def check_reference(close, volume):
+    problems = []
+    for params in WEIS_PARAMS:
+        expected = reference_weis_wave(close.tolist(), volume.tolist(), **params)
+        result = weis_wave(close, volume, **params)
+        for k, name in enumerate(WEIS_WAVE_NAMES):
+            if not _same(result[name], expected[k]):
+                problems.append(f"weis_wave {params} {name}: {int((result[name] != expected[k]).sum())} bars differ")
+    for params in CRSI_PARAMS:
+        expected = reference_cyclic_rsi(close.tolist(), **params)
+        result = cyclic_rsi(close, **params)
+        for k, name in enumerate(CYCLIC_RSI_NAMES):
+            if not _same(result[name], expected[k]):
+                diff = int((~np.isclose(result[name], expected[k], rtol=0, atol=0, equal_nan=True)).sum())
+                problems.append(f"cyclic_rsi {params} {name}: {diff} bars differ from Pine port")
+    return problems
+
+
+def _run_stream(stream, rows, split):
+    """逐bar推进；在 split 处经 to_state() / from_state() 往返一次"""
+    out = []
+    for t, row in enumerate(rows):
+        if t == split:
+            stream = StreamingState.from_state(stream.to_state())
+        out.append(stream.update(*row))
+    return np.array(out).T
+
+
+def check_stream(close, volume):
+    problems = []
+    split = len(close) // 2
+    original = kernels.get_backend()
+    try:
+        for backend in ('numba', 'numpy') if kernels.HAS_NUMBA else ('numpy',):
+            kernels.set_backend(backend)
+            for params in WEIS_PARAMS:
+                batch = weis_wave(close, volume, **params)
+                rows = _run_stream(WeisWaveStream(**params), list(zip(close.tolist(), volume.tolist())), split)
+                for k, name in enumerate(WEIS_WAVE_NAMES):
+                    if not _same(rows[k], batch[name]):
+                        problems.append(f"{backend} WeisWaveStream {params} {name} differs from batch")
+            for params in CRSI_PARAMS:
+                batch = cyclic_rsi(close, **params)
+                rows = _run_stream(CyclicRSIStream(**params), [(c,) for c in close.tolist()], split)
+                for k, name in enumerate(CYCLIC_RSI_NAMES):
+                    if not _same(rows[k], batch[name]):
+                        problems.append(f"{backend} CyclicRSIStream {params} {name} differs from batch")
+    finally:
+        kernels.set_backend(original)
+    return problems
+
+
+class WaveCycleStrategy(bt.Strategy):
+    def __init__(self):
+        self.weis = WeisWaveVolume(self.data)
+        self.crsi = CyclicSmoothedRSI(self.data)
+
+
+def check_indicator(df, close, volume):
+    problems = []
+    expected = {'weis': weis_wave(close, volume), 'crsi': cyclic_rsi(close)}
+    for runonce in (True, False):
+        cerebro = bt.Cerebro(runonce=runonce, stdstats=False)
+        cerebro.adddata(bt.feeds.PandasData(dataname=df))
+        cerebro.addstrategy(WaveCycleStrategy)
+        strategy = cerebro.run()[0]
+        for attr, names in (('weis', WEIS_WAVE_NAMES), ('crsi', CYCLIC_RSI_NAMES)):
+            for name in names:
+                values = np.array(getattr(getattr(strategy, attr).lines, name).array)
+                if not _same(values, expected[attr][name]):
+                    problems.append(f"{'once' if runonce else 'next'} {attr} {name} differs from batch")
+    return problems
+
+
+def _timed(func, *args):
+    start_time = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start_time
+
+
+def report(close, volume):
+    weis_wave(close[:100], volume[:100])
+    cyclic_rsi(close[:100])
+    rows = list(zip(close.tolist(), volume.tolist()))
+
+    def stream_weis():
+        stream = WeisWaveStream()
+        for row in rows:
+            stream.update(*row)
+
+    def stream_crsi():
+        stream = CyclicRSIStream()
+        for c in close.tolist():
+            stream.update(c)
+
+    print(f"   weis wave: batch {_timed(weis_wave, close, volume) * 1000:.1f}ms, "
+          f"stream {_timed(stream_weis) * 1000:.1f}ms, "
+          f"Pine port {_timed(reference_weis_wave, close.tolist(), volume.tolist()) * 1000:.1f}ms")
+    print(f"   cRSI: batch {_timed(cyclic_rsi, close) * 1000:.1f}ms, stream {_timed(stream_crsi) * 1000:.1f}ms, "
+          f"Pine port {_timed(reference_cyclic_rsi, close.tolist()):.2f}s")
+
+
+def run_wave_cycle_check(symbol='SUIUSDT', interval='2h'):
+    df = load_symbol(symbol, interval)
+    close, volume = (df[col].to_numpy(dtype=np.float64) for col in ('close', 'volume'))
+    print(f"\n[START] Weis wave / cyclic RSI verification - {symbol} {interval}, {len(df)} bars")
+
+    problems = check_reference(close, volume) + check_stream(close, volume) + check_indicator(df, close, volume)
+    report(close, volume)
+
+    passed = not problems
+    for problem in problems:
+        print(f"   [FAIL] {problem}")
+    print(f"\n[SUMMARY] Weis wave / cyclic RSI {'PASSED' if passed else 'FAILED'}")
+    return passed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Weis波量与周期平滑RSI一致性与耗时验证")
+    parser.add_argument("--symbol", default='SUIUSDT', help="币种 (默认: SUIUSDT)")
+    parser.add_argument("--interval", default='2h', help="时间框架 (默认: 2h)")
+
+    args = parser.parse_args()
+
+    passed = run_wave_cycle_check(args.symbol, args.interval)
+    sys.exit(0 if passed else 1)
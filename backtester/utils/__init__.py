@@ -7,7 +7,11 @@ from .safe_math import (
     safe_div_line,
     safe_max_eps,
     safe_div,
+    safe_div_array,
+    safe_div_signed_array,
+    safe_max_eps_array,
     check_denominator_health,
+    DenominatorMonitor,
     SafeMathMixin,
     DEFAULT_EPS
 )
@@ -16,7 +20,11 @@ __all__ = [
     'safe_div_line',
     'safe_max_eps', 
     'safe_div',
+    'safe_div_array',
+    'safe_div_signed_array',
+    'safe_max_eps_array',
     'check_denominator_health',
+    'DenominatorMonitor',
     'SafeMathMixin',
     'DEFAULT_EPS'
 ]
\ No newline at end of file
@@ -3,13 +3,24 @@ Safe Math Utilities for Backtrader
 分母防守基础模块 - 解决ZeroDivisionError的工程级方案
 
 不改变策略思想，仅在数学运算层面加入安全防护
+
+- Lines版: safe_div_line / safe_max_eps（backtrader运算图）
+- 数组版: safe_div_array / safe_max_eps_array（NumPy，同时返回被夹底的元素个数）；
+  safe_div_signed_array 为 safe_div 的数组版（保留分母符号）
+- 健康度: DenominatorMonitor 聚合计数，运行结束时一次性报告，替代逐bar的SMOKE打印
 """
 import backtrader as bt
 import math
 
+import numpy as np
+
 # 默认安全阈值 - 可参数化
 DEFAULT_EPS = 1e-12
 
+# 调试开关 - 指标debug（在stop()输出聚合报告）/ 报告中附带触发bar列表
+DEBUG_DENOMINATOR_REPLACEMENT = False
+DEBUG_LOG_TRIGGERS = False
+
 
 def safe_div_line(numerator, denominator, eps=DEFAULT_EPS):
     """
@@ -42,6 +53,56 @@ def safe_max_eps(line, eps=DEFAULT_EPS):
     return bt.Max(line, eps)
 
 
+def safe_max_eps_array(values, eps=DEFAULT_EPS):
+    """
+    数组版 safe_max_eps - 与 bt.Max(line, eps) 逐元素一致，NaN保持为NaN
+
+    Args:
+        values: 一维数组
+        eps: 最小阈值
+
+    Returns:
+        (夹底后的数组, 被夹底的元素个数)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    clamped = eps > values
+    return np.where(clamped, eps, values), int(np.count_nonzero(clamped))
+
+
+def safe_div_array(numerator, denominator, eps=DEFAULT_EPS):
+    """
+    数组版 safe_div_line - numerator / Max(denominator, eps)，NaN保持为NaN
+
+    Args:
+        numerator: 分子数组或数值
+        denominator: 分母数组
+        eps: 最小分母阈值
+
+    Returns:
+        (除法结果数组, 分母被夹底的元素个数)
+    """
+    safe_denominator, clamped = safe_max_eps_array(denominator, eps)
+    return np.asarray(numerator, dtype=np.float64) / safe_denominator, clamped
+
+
+def safe_div_signed_array(numerator, denominator, eps=DEFAULT_EPS):
+    """
+    数组版 safe_div - 仅 |分母| < eps 时替换为同号的 ±eps（0 取 +eps），保留分母符号，NaN保持为NaN
+
+    Args:
+        numerator: 分子数组或数值
+        denominator: 分母数组
+        eps: 最小分母阈值
+
+    Returns:
+        (除法结果数组, 分母被替换的元素个数)
+    """
+    denominator = np.asarray(denominator, dtype=np.float64)
+    clamped = eps > np.abs(denominator)
+    safe_denominator = np.where(clamped, np.where(denominator >= 0, eps, -eps), denominator)
+    return np.asarray(numerator, dtype=np.float64) / safe_denominator, int(np.count_nonzero(clamped))
+
+
 def safe_div(numerator, denominator, eps=DEFAULT_EPS):
     """
     标量版安全除法，供非Lines计算使用
@@ -75,7 +136,7 @@ def safe_div(numerator, denominator, eps=DEFAULT_EPS):
         return 0.0
 
 
-def check_denominator_health(value, name="denominator", eps=DEFAULT_EPS, debug=False):
+def check_denominator_health(value, name="denominator", eps=DEFAULT_EPS, debug=False, monitor=None):
     """
     检查分母健康度，可选打印SMOKE日志
     
@@ -83,11 +144,15 @@ def check_denominator_health(value, name="denominator", eps=DEFAULT_EPS, debug=F
         value: 待检查的值
         name: 分母名称（用于日志）
         eps: 阈值
-        debug: 是否开启调试日志
+        debug: 是否逐次打印SMOKE日志（高频调用时请改用monitor）
+        monitor: 可选的 DenominatorMonitor，只计数不打印
     
     Returns:
         bool: 分母是否健康
     """
+    if monitor is not None:
+        monitor.record(value)
+
     if value is None:
         if debug:
             print(f"SMOKE: {name} is None")
@@ -106,21 +171,147 @@ def check_denominator_health(value, name="denominator", eps=DEFAULT_EPS, debug=F
     return True
 
 
+class DenominatorMonitor:
+    """
+    分母健康度聚合计数器
+
+    记录检查次数、被夹底（小于eps）的次数、原值范围与首末触发bar，
+    不做任何逐bar输出；运行结束时通过 get_summary() / report() 一次性报告。
+    NaN/None 视为预热期，不计入检查次数。
+
+    signed=True（默认）与 check_denominator_health / safe_div 同口径: |值| < eps 才算一次替换，负分母视为健康；
+    signed=False 用于经 safe_max_eps 夹底的非负分母（标准差、区间均值等）: 值 < eps 即替换。
+    """
+
+    def __init__(self, name, eps=DEFAULT_EPS, log_triggers=DEBUG_LOG_TRIGGERS, max_triggers=20, signed=True):
+        self.name = name
+        self.eps = eps
+        self.signed = signed
+        self.log_triggers = log_triggers
+        self.max_triggers = max_triggers
+        self.total_checks = 0
+        self.replacements = 0
+        self.min_value = math.inf
+        self.max_value = -math.inf
+        self.first_trigger = None
+        self.last_trigger = None
+        self.trigger_bars = []
+
+    def record(self, value, bar=None):
+        """记录单个分母值（逐bar路径）"""
+        if value is None or value != value:
+            return
+        self.total_checks += 1
+        if value < self.min_value:
+            self.min_value = value
+        if value > self.max_value:
+            self.max_value = value
+        if self.eps > (abs(value) if self.signed else value):
+            self.replacements += 1
+            self._triggered(bar, bar, [bar] if bar is not None else [])
+
+    def observe(self, values, bar_offset=0):
+        """
+        记录一段分母数组（全序列路径）
+
+        Args:
+            values: 一维数组
+            bar_offset: values[0] 之前的bar数，触发bar按1起计
+        """
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        checks = int(np.count_nonzero(valid))
+        if not checks:
+            return
+        self.total_checks += checks
+        self.min_value = min(self.min_value, float(values[valid].min()))
+        self.max_value = max(self.max_value, float(values[valid].max()))
+
+        triggered = np.flatnonzero(self.eps > (np.abs(values) if self.signed else values))
+        if len(triggered):
+            self.replacements += len(triggered)
+            bars = triggered + bar_offset + 1
+            self._triggered(int(bars[0]), int(bars[-1]), bars[:self.max_triggers].tolist())
+
+    def _triggered(self, first, last, bars):
+        if self.first_trigger is None:
+            self.first_trigger = first
+        self.last_trigger = last
+        if self.log_triggers:
+            room = self.max_triggers - len(self.trigger_bars)
+            self.trigger_bars.extend(bars[:max(room, 0)])
+
+    def merge(self, *others):
+        """合并其他监控器的计数（例如汇总多个指标实例）"""
+        for other in others:
+            self.total_checks += other.total_checks
+            self.replacements += other.replacements
+            self.min_value = min(self.min_value, other.min_value)
+            self.max_value = max(self.max_value, other.max_value)
+            if other.first_trigger is not None:
+                if self.first_trigger is None or other.first_trigger < self.first_trigger:
+                    self.first_trigger = other.first_trigger
+                if self.last_trigger is None or other.last_trigger > self.last_trigger:
+                    self.last_trigger = other.last_trigger
+            if self.log_triggers:
+                room = self.max_triggers - len(self.trigger_bars)
+                self.trigger_bars.extend(other.trigger_bars[:max(room, 0)])
+        return self
+
+    def get_summary(self):
+        """聚合统计"""
+        rate = self.replacements / self.total_checks * 100 if self.total_checks else 0.0
+        value_range = (self.min_value, self.max_value) if self.total_checks else None
+        summary = {
+            'name': self.name,
+            'total_checks': self.total_checks,
+            'replacements': self.replacements,
+            'replacement_rate_pct': rate,
+            'original_value_range': value_range,
+            'first_trigger_bar': self.first_trigger,
+            'last_trigger_bar': self.last_trigger,
+        }
+        if self.log_triggers:
+            summary['trigger_bars'] = list(self.trigger_bars)
+        return summary
+
+    def report(self):
+        """单行报告文本"""
+        summary = self.get_summary()
+        text = (f"SMOKE: {self.name} replacements {summary['replacements']}/{summary['total_checks']} "
+                f"({summary['replacement_rate_pct']:.3f}%)")
+        if summary['original_value_range'] is not None:
+            low, high = summary['original_value_range']
+            text += f" range=[{low:.3e}, {high:.3e}]"
+        if self.first_trigger is not None:
+            text += f" bars {self.first_trigger}->{self.last_trigger}"
+        if self.log_triggers and self.trigger_bars:
+            text += f" first triggers {self.trigger_bars}"
+        return text
+
+
 class SafeMathMixin:
     """
     安全数学运算混入类
     可被策略或指标继承，提供统一的安全运算接口
+    分母健康度计入 self.denominator_monitor，debug时由 report_denominators() 统一输出
     """
     
     def __init__(self, eps=DEFAULT_EPS, debug=False):
         self.eps = eps
         self.debug = debug
+        self.denominator_monitor = DenominatorMonitor(type(self).__name__, eps)
     
     def safe_divide(self, num, den, fallback=0.0):
         """安全除法（标量版）"""
-        if not check_denominator_health(den, "denominator", self.eps, self.debug):
+        if not check_denominator_health(den, "denominator", self.eps, monitor=self.denominator_monitor):
             return fallback
         return safe_div(num, den, self.eps)
+
+    def safe_divide_array(self, num, den):
+        """安全除法（数组版，与 safe_div 同样保留分母符号），替换次数计入监控器"""
+        self.denominator_monitor.observe(den)
+        return safe_div_signed_array(num, den, self.eps)[0]
     
     def safe_divide_lines(self, num, den):
         """安全除法（Lines版）"""
@@ -130,6 +321,11 @@ class SafeMathMixin:
         """保护分母Lines"""
         return safe_max_eps(line, self.eps)
 
+    def report_denominators(self):
+        """debug时输出分母健康度聚合报告"""
+        if self.debug:
+            print(self.denominator_monitor.report())
+
 
 # 预设的安全常量
 SAFE_EPS_STANDARD = 1e-12      # 标准精度
@@ -141,9 +337,15 @@ __all__ = [
     'safe_div_line',
     'safe_max_eps', 
     'safe_div',
+    'safe_div_array',
+    'safe_div_signed_array',
+    'safe_max_eps_array',
     'check_denominator_health',
+    'DenominatorMonitor',
     'SafeMathMixin',
     'DEFAULT_EPS',
+    'DEBUG_DENOMINATOR_REPLACEMENT',
+    'DEBUG_LOG_TRIGGERS',
     'SAFE_EPS_STANDARD',
     'SAFE_EPS_RELAXED',
     'SAFE_EPS_STRICT'